@@ -1,5 +1,14 @@
+from .index import IndexEntry as IndexEntry
+from .index import SiteIndex as SiteIndex
 from .packages import Packages as Packages
 from .compilers import Compilers as Compilers
 from .modules import Modules as Modules
+from .modules import ModuleTreePreview as ModuleTreePreview
 from .config import Config as Config
+from .mirrors import Mirrors as Mirrors
+from .upstreams import Upstreams as Upstreams
+from .concretizer import Concretizer as Concretizer
+from .matrix import ToolchainMatrix as ToolchainMatrix
 from .site import Site as Site
+from .server import SiteService as SiteService
+from .server import UnknownSiteError as UnknownSiteError
@@ -1,6 +1,9 @@
 from abc import ABC, abstractmethod
 
 from pathlib import Path
+from typing import Any, Dict, Optional
+
+from spack_site_generator.utils.schema import validate_section
 
 
 class AbstractSiteConfig(ABC):
@@ -9,21 +12,68 @@ class AbstractSiteConfig(ABC):
 
     This class defines the interface that all site configuration
     sections (e.g., Packages, Compilers, Modules, Config) must follow.
-    At a minimum, subclasses are required to implement ``write``,
-    which outputs the configuration to a YAML file.
+    At a minimum, subclasses are required to implement ``to_dict``,
+    which returns the section as it will be rendered, and ``render``,
+    which returns the YAML file as bytes. ``write`` stores the rendered
+    bytes on disk.
+
+    Attributes:
+        section (str): Name of the Spack configuration section, used to look
+            up the schema the section is validated against.
     """
 
+    section: str = ""
+
     @abstractmethod
-    def write(self, *, path: Path, spack_format: bool = True) -> None:
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return the configuration as a plain dictionary.
+
+        The returned mapping includes the top-level section key (e.g.,
+        ``{"packages": {...}}``) and is exactly what gets rendered to YAML.
+
+        Note:
+            Must be implemented by all subclasses of AbstractSiteConfig.
+        """
+        pass
+
+    def validate(self) -> None:
+        """
+        Validate the configuration against the bundled Spack schema.
+
+        Raises:
+            SchemaValidationError: If the configuration does not match the
+                schema for ``section``.
         """
-        Write the configuration to disk.
+        validate_section(self.section, self.to_dict())
+
+    @abstractmethod
+    def render(self, *, spack_format: bool = True) -> Optional[bytes]:
+        """
+        Render the configuration in memory.
 
         Args:
-            path (Path): Path to the output YAML file.
             spack_format (bool): If True, format the file according to
                 Spack's expected YAML schema.
 
+        Returns:
+            Optional[bytes]: The UTF-8 encoded YAML file, or None if the
+            section is empty and no file should be written.
+
         Note:
             Must be implemented by all subclasses of AbstractSiteConfig.
         """
         pass
+
+    def write(self, *, path: Path, spack_format: bool = True) -> None:
+        """
+        Write the configuration to disk. Empty sections write no file.
+
+        Args:
+            path (Path): Path to the output YAML file.
+            spack_format (bool): If True, format the file according to
+                Spack's expected YAML schema.
+        """
+        data = self.render(spack_format=spack_format)
+        if data is not None:
+            Path(path).write_bytes(data)
@@ -1,9 +1,45 @@
+import itertools
+from concurrent.futures import Executor
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Iterator, List, Optional, Dict, Any, Tuple
 
 from spack_site_generator.utils.autodict import AutoDict
-from spack_site_generator.utils.spack_yaml import to_yaml
+from spack_site_generator.utils.detection_cache import DetectionCache
+from spack_site_generator.utils.elf import runtime_rpaths
+from spack_site_generator.utils.intern import InternPool
+from spack_site_generator.utils.flag_profiles import ResolvedFlags, resolve_flags
+from spack_site_generator.utils.microarch import FAMILIES, TARGETS
+from spack_site_generator.utils.path_check import referenced_paths
+from spack_site_generator.utils.spec import canonical_spec
+from spack_site_generator.utils.spack_yaml import (
+    map_fragment_lines,
+    render_lines,
+    to_yaml_lines,
+)
+from spack_site_generator.utils.schema import (
+    SchemaValidationError,
+    get_validator,
+    validate_section,
+)
 from spack_site_generator.site.abstract_site_config import AbstractSiteConfig
+from spack_site_generator.site.index import (
+    IndexEntry,
+    SiteIndex,
+    check_duplicate_policy,
+    compiler_prefix,
+)
+from spack_site_generator.site.matrix import ToolchainMatrix
+
+_MATRIX_REQUIRED = {"spec", "paths", "operating_system", "target"}
+_MATRIX_OPTIONAL = {"flags", "modules", "environment", "extra_rpaths"}
+
+# Compilers installed here use runtime libraries the dynamic loader finds anyway.
+_SYSTEM_PREFIXES = {"/", "/usr", "/usr/local"}
+
+
+def _combined(first: Optional[List[str]], second: Optional[List[str]]) -> List[str]:
+    """Return the items of both lists without duplicates, in order."""
+    return list(dict.fromkeys(list(first or ()) + list(second or ())))
 
 
 class Compilers(AbstractSiteConfig):
@@ -11,21 +47,48 @@ class Compilers(AbstractSiteConfig):
     Represents a Spack site configuration for compilers.
 
     This class allows managing a list of compiler configurations, ensuring they
-    are properly structured and formatted for Spack.
+    are properly structured and formatted for Spack. Module lists, paths and other
+    repeated values are interned as compilers are added. Compilers added with
+    ``add_matrix`` are generated one at a time while the configuration is
+    validated and written, after the compilers stored in ``config``.
 
     Attributes:
         config (AutoDict): A dictionary-like structure that stores compiler configurations.
+        matrices (List[ToolchainMatrix]): Matrices whose templates render
+            additional compiler entries.
+        index (Optional[SiteIndex]): Index updated as compilers are added, if one
+            was given.
+        flag_profile (Optional[Tuple[str, Optional[str]]]): The flag profile and
+            target applied with ``apply_flag_profile``, if any.
     """
 
-    def __init__(self):
+    section = "compilers"
+
+    def __init__(self, index: Optional[SiteIndex] = None):
         """
         Initialize the compiler configuration with a base structure.
 
         The default configuration includes an override flag to ensure that
         compiler definitions take precedence in Spack.
+
+        Args:
+            index (Optional[SiteIndex]): Index to keep up to date with the
+                compilers added to this configuration.
         """
         self.config = AutoDict()
         self.config["compilers"] = [{"override": True}]
+        self.matrices: List[ToolchainMatrix] = []
+        self.index = index
+        self._interned = InternPool()
+        # (canonical spec, OS, target) -> position in ``config["compilers"]``.
+        self._positions: Dict[Tuple[str, str, str], int] = {}
+        # Raw (spec, OS, target) of every list item when positions were last
+        # complete, to notice entries edited through ``config``.
+        self._seen: Optional[List[Optional[Tuple[Any, Any, Any]]]] = [
+            self._raw(entry) for entry in self.config["compilers"]
+        ]
+        # (profile, target) applied to matrix compilers as they are rendered.
+        self.flag_profile: Optional[Tuple[str, Optional[str]]] = None
 
     def add_compiler(
         self,
@@ -38,10 +101,16 @@ class Compilers(AbstractSiteConfig):
         modules: Optional[list[str]],
         environment: Optional[Dict[str, Any]],
         extra_rpaths: Optional[list[str]],
+        on_duplicate: str = "replace",
     ) -> None:
         """
         Add a new compiler entry to the configuration.
 
+        Compilers are identified by their canonical spec, operating system and
+        target. Adding a compiler that is already present (for example from a
+        second detection run) is handled according to ``on_duplicate``;
+        finding it takes constant time.
+
         Args:
             spec (str): The compiler specification (e.g., "gcc@11.2.0").
             paths (Dict[str, str]): A dictionary specifying compiler paths, typically:
@@ -55,33 +124,510 @@ class Compilers(AbstractSiteConfig):
             modules (Optional[list[str]]): A list of modules that should be loaded before using the compiler.
             environment (Optional[Dict[str, Any]]): Environment variables for the compiler.
             extra_rpaths (Optional[list[str]]): Additional library paths to be added to the RPATH.
+            on_duplicate (str): What to do if the compiler exists: "replace" it,
+                "merge" into it (paths, flags and environment are updated,
+                modules and ``extra_rpaths`` are combined), "skip" the new
+                one, or raise an "error".
+
+        Raises:
+            ValueError: If ``on_duplicate`` is unknown, or if it is "error"
+                and the compiler already exists.
         """
-        self.config["compilers"].append(
-            {
-                "compiler": {
-                    "spec": spec,
-                    "paths": paths,
-                    "flags": flags,
-                    "operating_system": operating_system,
-                    "target": target,
-                    "modules": modules,
-                    "environment": environment,
-                    "extra_rpaths": extra_rpaths,
+        check_duplicate_policy(on_duplicate)
+        key = (canonical_spec(spec), operating_system, target)
+        position = self._position(key)
+        if position is not None:
+            if on_duplicate == "error":
+                raise ValueError(
+                    f"Compiler '{spec}' for {operating_system}/{target} already exists."
+                )
+            if on_duplicate == "skip":
+                return
+            if on_duplicate == "merge":
+                previous = self.config["compilers"][position]["compiler"]
+                paths = {
+                    **previous["paths"],
+                    **{name: path for name, path in paths.items() if path},
                 }
+                flags = {**previous["flags"], **(flags or {})}
+                modules = _combined(previous["modules"], modules)
+                environment = {**(previous["environment"] or {}), **(environment or {})}
+                extra_rpaths = _combined(previous["extra_rpaths"], extra_rpaths)
+
+        interned = self._interned
+        entry = self._compiler_entry(
+            spec=spec,
+            paths=interned.mapping(paths),
+            flags=interned.mapping(flags),
+            operating_system=interned.string(operating_system),
+            target=interned.string(target),
+            modules=interned.strings(modules),
+            environment=interned.mapping(environment),
+            extra_rpaths=interned.strings(extra_rpaths),
+        )
+        compilers = self.config["compilers"]
+        if position is None:
+            self._positions[key] = len(compilers)
+            self._seen.append(self._raw(entry))
+            compilers.append(entry)
+        else:
+            if self.index is not None:
+                self.index.remove(self._index_entry(compilers[position]))
+            self._seen[position] = self._raw(entry)
+            compilers[position] = entry
+        if self.index is not None:
+            self.index.add(self._index_entry(entry), modules=modules)
+
+    @staticmethod
+    def _raw(entry: Dict[str, Any]) -> Optional[Tuple[Any, Any, Any]]:
+        """Return the spec, OS and target of a list item as written, if any."""
+        compiler = entry.get("compiler") if isinstance(entry, dict) else None
+        if compiler is None:
+            return None
+        return (
+            compiler.get("spec"),
+            compiler.get("operating_system"),
+            compiler.get("target"),
+        )
+
+    @staticmethod
+    def _key(entry: Dict[str, Any]) -> Optional[Tuple[str, str, str]]:
+        """Return the identity of a ``compilers`` list item, if it is a compiler."""
+        compiler = entry.get("compiler") if isinstance(entry, dict) else None
+        if compiler is None:
+            return None
+        return (
+            canonical_spec(compiler.get("spec", "")),
+            compiler.get("operating_system", ""),
+            compiler.get("target", ""),
+        )
+
+    def _position(self, key: Tuple[str, str, str]) -> Optional[int]:
+        """
+        Return the position of the compiler identified by ``key``.
+
+        Positions are rebuilt from the ``compilers`` list if it was changed
+        directly through ``config``: when the compiler at the cached position
+        has another key, or, for a key that is not cached, when any spec, OS
+        or target differs from the ones last seen.
+        """
+        compilers = self.config["compilers"]
+        position = self._positions.get(key)
+        if position is not None:
+            if position < len(compilers) and self._key(compilers[position]) == key:
+                return position
+        elif self._seen == [self._raw(entry) for entry in compilers]:
+            return None
+        self._positions = {}
+        for index, entry in enumerate(compilers):
+            entry_key = self._key(entry)
+            if entry_key is not None:
+                self._positions.setdefault(entry_key, index)
+        self._seen = [self._raw(entry) for entry in compilers]
+        return self._positions.get(key)
+
+    def get_compiler(
+        self, *, spec: str, operating_system: str, target: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Return a compiler added with ``add_compiler``.
+
+        Args:
+            spec (str): The compiler specification (e.g., "gcc@12.2.0").
+            operating_system (str): The OS of the compiler.
+            target (str): The target of the compiler.
+
+        Returns:
+            Optional[Dict[str, Any]]: The ``compiler`` mapping, or None if no
+            such compiler exists.
+        """
+        position = self._position((canonical_spec(spec), operating_system, target))
+        if position is None:
+            return None
+        return self.config["compilers"][position]["compiler"]
+
+    def effective_compilers(self) -> List[Dict[str, Any]]:
+        """
+        Return the compilers Spack will see, one per spec, OS and target.
+
+        Compilers generated by matrices are not included.
+
+        Returns:
+            List[Dict[str, Any]]: The ``compiler`` mappings, in the order they
+            were first added.
+        """
+        self._position(("", "", ""))
+        compilers = self.config["compilers"]
+        return [
+            compilers[position]["compiler"]
+            for position in sorted(self._positions.values())
+        ]
+
+    def set_target(self, *, target: str) -> None:
+        """
+        Set the target of every compiler stored in ``config``.
+
+        Compilers of matrices keep the target of their template.
+
+        Args:
+            target (str): The target (e.g., "x86_64").
+        """
+        for entry in self.config["compilers"]:
+            compiler = entry.get("compiler") if isinstance(entry, dict) else None
+            if compiler is not None:
+                compiler["target"] = self._interned.string(target)
+        # Targets are part of the keys, so positions are rebuilt on next use.
+        self._positions = {}
+        self._seen = None
+
+    def compute_extra_rpaths(
+        self, *, cache: Optional[DetectionCache] = None, max_workers: int = 16
+    ) -> Dict[str, List[str]]:
+        """
+        Add the directories of each compiler's runtime libraries to its
+        ``extra_rpaths``.
+
+        The installation prefix of every compiler stored in ``config`` is
+        derived from its executables and scanned with ``runtime_rpaths``,
+        once per prefix. Existing ``extra_rpaths`` are kept. Compilers
+        installed in system prefixes (``/usr``, ...) and compilers of matrices
+        are left alone.
+
+        Args:
+            cache (Optional[DetectionCache]): Cache for the scan of each prefix.
+            max_workers (int): Number of libraries read at the same time.
+
+        Returns:
+            Dict[str, List[str]]: The directories found, by compiler spec, for
+            the compilers that have runtime libraries.
+        """
+        scanned: Dict[str, List[str]] = {}
+        found: Dict[str, List[str]] = {}
+        for entry in self.config["compilers"]:
+            compiler = entry.get("compiler") if isinstance(entry, dict) else None
+            if compiler is None:
+                continue
+            prefix = compiler_prefix(compiler.get("paths"))
+            if not prefix or prefix in _SYSTEM_PREFIXES:
+                continue
+            if prefix not in scanned:
+                scanned[prefix] = runtime_rpaths(
+                    prefix, cache=cache, max_workers=max_workers
+                )
+            rpaths = scanned[prefix]
+            if not rpaths:
+                continue
+            found[compiler["spec"]] = rpaths
+            compiler["extra_rpaths"] = self._interned.strings(
+                _combined(compiler.get("extra_rpaths"), rpaths)
+            )
+        return found
+
+    @staticmethod
+    def _profile_flags(
+        compiler: Dict[str, Any], profile: str, target: Optional[str]
+    ) -> ResolvedFlags:
+        """Resolve a flag profile for a compiler, checking its target family."""
+        family = compiler.get("target")
+        if (
+            profile == "tuned-target"
+            and target in TARGETS
+            and family in FAMILIES
+            and TARGETS[target].family != family
+        ):
+            raise ValueError(
+                f"Compiler '{compiler['spec']}' targets {family}, "
+                f"which cannot run '{target}' code."
+            )
+        return resolve_flags(profile=profile, compiler=compiler["spec"], target=target)
+
+    def apply_flag_profile(
+        self, *, profile: str, target: Optional[str] = None
+    ) -> List[str]:
+        """
+        Set the optimization flags of every compiler from a named profile.
+
+        ``cflags``, ``cxxflags`` and ``fflags`` are replaced; other flags are
+        kept. Stored compilers are updated at once and matrix compilers as they
+        are rendered. Every compiler is checked before any is changed.
+
+        Args:
+            profile (str): One of "portable", "tuned-native", "tuned-target"
+                or "debug".
+            target (Optional[str]): The Spack target (e.g., "zen3") for
+                "tuned-target".
+
+        Returns:
+            List[str]: Compilers too old for ``target``, and the target their
+            flags were built for instead.
+
+        Raises:
+            ValueError: If the profile or target is unknown, or a compiler does
+                not support the profile at its version.
+        """
+        stored = [
+            entry["compiler"]
+            for entry in self.config["compilers"]
+            if isinstance(entry, dict) and "compiler" in entry
+        ]
+        resolved = [
+            self._profile_flags(compiler, profile, target) for compiler in stored
+        ]
+        notes = [note for flags in resolved for note in flags.notes]
+        for matrix in self.matrices:
+            for rendered in matrix.expand():
+                notes.extend(self._profile_flags(rendered, profile, target).notes)
+        interned = self._interned
+        for compiler, flags in zip(stored, resolved):
+            compiler["flags"] = interned.mapping({**compiler["flags"], **flags.flags})
+        self.flag_profile = (profile, target)
+        return list(dict.fromkeys(notes))
+
+    def add_matrix(self, *, matrix: ToolchainMatrix) -> None:
+        """
+        Add one compiler entry for every combination of a toolchain matrix.
+
+        The matrix template takes the same fields as ``add_compiler``: ``spec``,
+        ``paths``, ``operating_system`` and ``target`` are required; ``flags``,
+        ``modules``, ``environment`` and ``extra_rpaths`` default to empty values.
+        Entries are rendered whenever the configuration is validated or written
+        and are never stored.
+
+        Args:
+            matrix (ToolchainMatrix): Axes and compiler template to expand.
+
+        Raises:
+            ValueError: If the template does not provide the fields of a compiler.
+        """
+        missing = _MATRIX_REQUIRED - set(matrix.template)
+        if missing:
+            raise ValueError(f"Matrix template is missing {sorted(missing)}.")
+        unknown = set(matrix.template) - _MATRIX_REQUIRED - _MATRIX_OPTIONAL
+        if unknown:
+            raise ValueError(f"Matrix template has unknown fields {sorted(unknown)}.")
+        self.matrices.append(matrix)
+        if self.index is not None:
+            for entry in self._matrix_compilers(matrix):
+                self.index.add(
+                    self._index_entry(entry), modules=entry["compiler"]["modules"]
+                )
+
+    @staticmethod
+    def _compiler_entry(
+        *,
+        spec: str,
+        paths: Dict[str, str],
+        flags: Dict[str, Any],
+        operating_system: str,
+        target: str,
+        modules: Optional[List[str]],
+        environment: Optional[Dict[str, Any]],
+        extra_rpaths: Optional[List[str]],
+    ) -> Dict[str, Any]:
+        """Build a ``compilers`` list item with its keys in Spack's order."""
+        return {
+            "compiler": {
+                "spec": spec,
+                "paths": paths,
+                "flags": flags,
+                "operating_system": operating_system,
+                "target": target,
+                "modules": modules,
+                "environment": environment,
+                "extra_rpaths": extra_rpaths,
             }
+        }
+
+    def _matrix_compilers(self, matrix: ToolchainMatrix) -> Iterator[Dict[str, Any]]:
+        """Yield the compiler entries of a matrix one combination at a time."""
+        for rendered in matrix.expand():
+            flags = rendered.get("flags", {})
+            if self.flag_profile is not None:
+                profile, target = self.flag_profile
+                resolved = self._profile_flags(rendered, profile, target)
+                flags = {**flags, **resolved.flags}
+            yield self._compiler_entry(
+                spec=rendered["spec"],
+                paths=rendered["paths"],
+                flags=flags,
+                operating_system=rendered["operating_system"],
+                target=rendered["target"],
+                modules=rendered.get("modules", []),
+                environment=rendered.get("environment", {}),
+                extra_rpaths=rendered.get("extra_rpaths", []),
+            )
+
+    @staticmethod
+    def _index_entry(entry: Dict[str, Any]) -> IndexEntry:
+        """Return the index entry describing a ``compilers`` list item."""
+        compiler = entry["compiler"]
+        return IndexEntry(
+            kind="compiler",
+            name=compiler["spec"],
+            spec=compiler["spec"],
+            prefix=compiler_prefix(compiler["paths"]),
+        )
+
+    def iter_paths(self) -> Iterator[Tuple[str, str]]:
+        """
+        Yield the absolute paths referenced by the compilers.
+
+        Covers the compiler executables and ``extra_rpaths`` of every compiler,
+        including those of matrices.
+
+        Yields:
+            Tuple[str, str]: The path and the entry that references it (e.g.,
+            ``"compilers[1].compiler.paths.cc"``).
+        """
+        entries = iter(self.config["compilers"])
+        for matrix in self.matrices:
+            entries = itertools.chain(entries, self._matrix_compilers(matrix))
+        for position, entry in enumerate(entries):
+            compiler = entry.get("compiler")
+            if compiler is None:
+                continue
+            yield from referenced_paths(
+                {
+                    "paths": compiler.get("paths"),
+                    "extra_rpaths": compiler.get("extra_rpaths"),
+                },
+                f"compilers[{position}].compiler",
+            )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return the compiler configuration as a plain dictionary.
+
+        Compilers of matrices are fully expanded, so prefer ``write`` over
+        rendering this dictionary for very large matrices.
+
+        Returns:
+            Dict[str, Any]: The configuration under a top-level ``compilers`` key.
+        """
+        config_dict = self.config.to_dict()
+        if self.matrices:
+            config_dict["compilers"] = list(config_dict["compilers"])
+            for matrix in self.matrices:
+                config_dict["compilers"].extend(self._matrix_compilers(matrix))
+        return config_dict
+
+    def validate(self) -> None:
+        """
+        Validate the configuration against the bundled Spack schema.
+
+        Matrix compilers are generated and checked one at a time.
+
+        Raises:
+            SchemaValidationError: If the configuration does not match the schema.
+        """
+        validate_section(self.section, self.config.to_dict())
+        validate_compiler = get_validator("compilers:compiler")
+        position = len(self.config["compilers"])
+        for matrix in self.matrices:
+            for entry in self._matrix_compilers(matrix):
+                try:
+                    validate_compiler(entry["compiler"])
+                except SchemaValidationError as error:
+                    error.path[:0] = ["compilers", position, "compiler"]
+                    raise
+                position += 1
+
+    def iter_lines(
+        self,
+        *,
+        spack_format: bool = True,
+        anchors: bool = False,
+        executor: Optional[Executor] = None,
+    ) -> Iterator[str]:
+        """
+        Yield the lines of the rendered configuration.
+
+        Compilers stored in ``config`` are rendered at once; matrix compilers
+        follow, rendered one entry at a time. Joining the lines with
+        ``write_lines`` gives the same text as ``to_yaml(self.to_dict())``, except
+        that matrix compilers never use anchors.
+
+        Args:
+            spack_format (bool, optional): Whether to format the YAML output in
+                Spack style. Defaults to True.
+            anchors (bool, optional): Whether to emit YAML anchors and aliases for
+                repeated subtrees of the compilers stored in ``config``.
+            executor (Optional[Executor]): Executor rendering the entries in
+                parallel. The lines are the same with or without it.
+
+        Yields:
+            str: One line of YAML.
+        """
+        yield from to_yaml_lines(
+            self.config.to_dict(),
+            spack_format=spack_format,
+            anchors=anchors,
+            executor=executor,
         )
+        for matrix in self.matrices:
+            yield from map_fragment_lines(
+                ({"compilers": [entry]} for entry in self._matrix_compilers(matrix)),
+                1,
+                executor=executor,
+            )
 
-    def write(self, *, path: Path, spack_format: Optional[bool] = True) -> None:
+    def render(
+        self,
+        *,
+        spack_format: bool = True,
+        anchors: bool = False,
+        executor: Optional[Executor] = None,
+    ) -> Optional[bytes]:
         """
-        Write the compiler configuration to a YAML file. If the configuration is empty,
-        no file will be written.
+        Render the compiler configuration as the content of a YAML file. The
+        configuration is validated against the bundled Spack schema before
+        anything is rendered.
+
+        Args:
+            spack_format (bool): Whether to format the YAML output in Spack style.
+                                 Defaults to True.
+            anchors (bool): Whether to emit YAML anchors and aliases for repeated
+                            subtrees such as module lists. Defaults to False.
+            executor (Optional[Executor]): Executor rendering the compilers in
+                parallel. The bytes are the same with or without it.
+
+        Returns:
+            Optional[bytes]: The encoded file, or None if the configuration is
+            empty.
+        """
+        if self.config.empty():
+            return None
+        self.validate()
+        return render_lines(
+            self.iter_lines(
+                spack_format=spack_format, anchors=anchors, executor=executor
+            ),
+            spack_format=spack_format,
+        )
+
+    def write(
+        self,
+        *,
+        path: Path,
+        spack_format: Optional[bool] = True,
+        anchors: bool = False,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        """
+        Write the rendered compiler configuration to a YAML file. If the
+        configuration is empty, no file will be written.
 
         Args:
             path (str): The file path where the configuration will be saved.
             spack_format (Optional[bool]): Whether to format the YAML output in Spack style.
                                            Defaults to True.
+            anchors (bool): Whether to emit YAML anchors and aliases for repeated
+                            subtrees such as module lists. Defaults to False.
+            executor (Optional[Executor]): Executor rendering the compilers in
+                parallel. The file is the same with or without it.
         """
-        if self.config.empty():
-            return
-        with open(path, "w") as f:
-            f.write(to_yaml(self.config.to_dict(), spack_format=spack_format))
+        data = self.render(
+            spack_format=spack_format, anchors=anchors, executor=executor
+        )
+        if data is not None:
+            Path(path).write_bytes(data)
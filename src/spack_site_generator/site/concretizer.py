@@ -0,0 +1,204 @@
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from spack_site_generator.utils.autodict import AutoDict
+from spack_site_generator.utils.spack_yaml import to_yaml
+from spack_site_generator.utils.schema import validate_section
+from spack_site_generator.site.abstract_site_config import AbstractSiteConfig
+
+#: Named sets of concretizer settings.
+#:
+#: ``fast-reuse`` keeps the solver's search space small: installed, upstream
+#: and cached specs are reused, all roots are solved together, targets are
+#: generic families and no package may appear twice in a DAG. ``fresh``
+#: rebuilds everything for the exact host microarchitecture, still allowing
+#: the build-tool duplicates Spack needs to bootstrap compilers.
+PRESETS: Dict[str, Dict[str, Any]] = {
+    "fast-reuse": {
+        "reuse": True,
+        "unify": True,
+        "targets": {"granularity": "generic", "host_compatible": True},
+        "duplicates": {"strategy": "none"},
+    },
+    "fresh": {
+        "reuse": False,
+        "unify": True,
+        "targets": {"granularity": "microarchitectures", "host_compatible": True},
+        "duplicates": {"strategy": "minimal"},
+    },
+}
+
+
+class Concretizer(AbstractSiteConfig):
+    """
+    Represents the concretizer configuration (``concretizer.yaml``) of a site.
+
+    The concretizer settings decide how much the solver may reuse and how
+    large its search space is, which dominates concretization time on large
+    environments.
+
+    Attributes:
+        config (AutoDict): A dictionary-like structure that stores concretizer
+            settings.
+    """
+
+    section = "concretizer"
+
+    def __init__(self) -> None:
+        """
+        Initialize an empty concretizer configuration.
+        """
+        self.config: AutoDict = AutoDict()
+
+    def set_reuse(self, *, reuse: Union[bool, str, Dict[str, Any]]) -> None:
+        """
+        Set which already concretized specs the solver may reuse.
+
+        Args:
+            reuse (Union[bool, str, Dict[str, Any]]): True to reuse everything,
+                False to build fresh, "dependencies" to reuse everything but
+                the roots, or a mapping with ``roots`` and ``from`` for
+                finer control (e.g., ``{"from": [{"type": "external"}]}``).
+        """
+        self.config["reuse"] = reuse
+
+    def set_unify(self, *, unify: Union[bool, str]) -> None:
+        """
+        Set how the roots of an environment are concretized.
+
+        Args:
+            unify (Union[bool, str]): True to solve all roots together, False
+                to solve them separately, or "when_possible".
+        """
+        self.config["unify"] = unify
+
+    def set_targets(self, *, granularity: str, host_compatible: bool) -> None:
+        """
+        Set the target granularity of the solver.
+
+        Args:
+            granularity (str): "microarchitectures" to consider every
+                microarchitecture or "generic" for generic families only.
+            host_compatible (bool): Whether targets must run on the host.
+        """
+        self.config["targets"]["granularity"] = granularity
+        self.config["targets"]["host_compatible"] = host_compatible
+
+    def set_duplicates(
+        self, *, strategy: str, max_dupes: Optional[Dict[str, int]] = None
+    ) -> None:
+        """
+        Set whether a package may appear more than once in a DAG.
+
+        Args:
+            strategy (str): "none", "minimal" (build tools only) or "full".
+            max_dupes (Optional[Dict[str, int]]): Maximum number of copies per
+                package.
+        """
+        self.config["duplicates"]["strategy"] = strategy
+        if max_dupes:
+            self.config["duplicates"]["max_dupes"] = dict(max_dupes)
+
+    def apply_preset(self, *, preset: str) -> None:
+        """
+        Apply one of the named presets in ``PRESETS``.
+
+        Settings made earlier are overwritten where the preset defines them.
+
+        Args:
+            preset (str): "fast-reuse" or "fresh".
+
+        Raises:
+            ValueError: If the preset is unknown.
+        """
+        if preset not in PRESETS:
+            raise ValueError(
+                f"Unknown concretizer preset '{preset}'; expected one of "
+                f"{sorted(PRESETS)}."
+            )
+        for key, value in PRESETS[preset].items():
+            self.config[key] = value
+
+    def _reuse_sources(self) -> Optional[List[str]]:
+        """Return the reuse source types, or None if all types are reused."""
+        reuse = self.config.get("reuse")
+        if not isinstance(reuse, dict) or "from" not in reuse:
+            return None
+        return [source.get("type", "") for source in reuse["from"]]
+
+    def check(
+        self,
+        *,
+        non_buildable: Iterable[str] = (),
+        upstreams: Iterable[str] = (),
+        binary_mirrors: Iterable[str] = (),
+    ) -> List[str]:
+        """
+        Check the reuse settings against what the site declares.
+
+        Args:
+            non_buildable (Iterable[str]): Packages that may only come from
+                externals.
+            upstreams (Iterable[str]): Names of the site's upstreams.
+            binary_mirrors (Iterable[str]): Names of mirrors with binaries.
+
+        Returns:
+            List[str]: One message per inconsistency.
+        """
+        problems = []
+        reuse = self.config.get("reuse")
+        sources = self._reuse_sources()
+        non_buildable = list(non_buildable)
+        upstreams = list(upstreams)
+        binary_mirrors = list(binary_mirrors)
+        if non_buildable and sources is not None and "external" not in sources:
+            problems.append(
+                "reuse excludes externals, but "
+                f"{', '.join(non_buildable)} can only come from externals"
+            )
+        if upstreams and (reuse is False or (sources and "local" not in sources)):
+            problems.append(
+                f"reuse is disabled for installed specs, so upstreams "
+                f"{', '.join(upstreams)} will not be reused"
+            )
+        if binary_mirrors and (
+            reuse is False or (sources and "buildcache" not in sources)
+        ):
+            problems.append(
+                f"reuse is disabled for build caches, so binaries in "
+                f"{', '.join(binary_mirrors)} will not be reused"
+            )
+        if sources and "buildcache" in sources and not binary_mirrors:
+            problems.append(
+                "reuse lists build caches, but no binary mirror is configured"
+            )
+        return problems
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return the concretizer configuration as a plain dictionary.
+
+        Returns:
+            Dict[str, Any]: The configuration under a top-level ``concretizer``
+            key.
+        """
+        return {"concretizer": self.config.to_dict()}
+
+    def render(self, *, spack_format: bool = True) -> Optional[bytes]:
+        """
+        Render the concretizer configuration as the content of a YAML file. The
+        configuration is validated against the bundled Spack schema before
+        anything is rendered.
+
+        Args:
+            spack_format (bool, optional): Whether to format the YAML output
+                in Spack style. Defaults to True.
+
+        Returns:
+            Optional[bytes]: The encoded file, or None if the configuration is
+            empty.
+        """
+        if self.config.empty():
+            return None
+        config_dict = self.to_dict()
+        validate_section(self.section, config_dict)
+        return to_yaml(config_dict, spack_format=spack_format).encode()
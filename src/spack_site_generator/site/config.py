@@ -10,10 +10,37 @@ Classes:
 """
 
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
 
 from spack_site_generator.utils.autodict import AutoDict
 from spack_site_generator.site.abstract_site_config import AbstractSiteConfig
 from spack_site_generator.utils import to_yaml
+from spack_site_generator.utils.schema import validate_section
+from spack_site_generator.utils.detection_cache import DetectionCache
+from spack_site_generator.utils.fs_bench import (
+    TIME_LIMIT,
+    FilesystemBenchmark,
+    benchmark_directories,
+)
+from spack_site_generator.utils.resources import (
+    MEMORY_PER_JOB,
+    BuildJobsEstimate,
+    estimate_build_jobs,
+)
+
+#: For each directory ``place_directories`` chooses: the subdirectory created
+#: in the chosen candidate, the measurement that ranks candidates, and whether
+#: the directory must survive a reboot (ruling out tmpfs).
+_PLACEMENT = {
+    "build_stage": ("spack-stage", "files_per_second", False),
+    "test_stage": ("spack-test-stage", "files_per_second", False),
+    "source_cache": ("spack-source-cache", "bytes_per_second", True),
+    "misc_cache": ("spack-misc-cache", "files_per_second", True),
+}
+
+_VOLATILE_FILESYSTEMS = {"tmpfs", "ramfs"}
+
+_GIB = 1024**3
 
 
 class Config(AbstractSiteConfig):
@@ -26,26 +53,45 @@ class Config(AbstractSiteConfig):
 
     Attributes:
         config (AutoDict): A dictionary-like structure storing configuration settings.
+        comments (Dict[str, List[str]]): Lines written as ``#`` comments at the
+            top of ``config.yaml``, by the setting they explain (e.g., how
+            ``build_jobs`` was derived).
 
     Methods:
         set_build_jobs(build_jobs: int) -> None:
             Set the number of parallel build jobs.
 
+        autotune_build_jobs(...) -> BuildJobsEstimate:
+            Derive the number of parallel build jobs from the node's resources.
+
         set_stage_paths(build_stage_path: str, test_stage_path: str) -> None:
             Set paths for build and test staging areas.
 
         set_cache_paths(source_cache_path: str, misc_cache_path: str) -> None:
             Set paths for source cache and miscellaneous cache.
 
+        place_directories(candidates: Sequence[str], ...) -> Dict[str, FilesystemBenchmark]:
+            Benchmark candidate directories and place the stage and cache
+            directories on the fastest viable ones.
+
+        to_dict() -> Dict[str, Any]:
+            Return the configuration under a top-level ``config`` key.
+
+        render(spack_format: bool = True) -> Optional[bytes]:
+            Render the configuration as the content of a `config.yaml` file.
+
         write(path: Path, spack_format: bool = True) -> None:
-            Write the configuration to a `config.yaml` file.
+            Write the rendered configuration to a `config.yaml` file.
     """
 
+    section = "config"
+
     def __init__(self):
         """
         Initialize an empty configuration using an AutoDict.
         """
         self.config: AutoDict = AutoDict()
+        self.comments: Dict[str, List[str]] = {}
 
     def set_build_jobs(self, *, build_jobs: int) -> None:
         """
@@ -55,6 +101,51 @@ class Config(AbstractSiteConfig):
             build_jobs (int): The number of build jobs to configure.
         """
         self.config["build_jobs"] = build_jobs
+        self.comments.pop("build_jobs", None)
+
+    def autotune_build_jobs(
+        self,
+        *,
+        memory_per_job: int = MEMORY_PER_JOB,
+        minimum: int = 1,
+        maximum: Optional[int] = None,
+        root: Union[str, Path] = "/",
+        environ: Optional[Dict[str, str]] = None,
+    ) -> BuildJobsEstimate:
+        """
+        Set the number of parallel build jobs from the resources of this node.
+
+        The CPU affinity mask, cgroup CPU quota, Slurm or PBS allocation and
+        available memory are considered, and the tightest limit wins. The
+        reasoning is written as comments at the top of ``config.yaml``. Run
+        the generator on a node like the ones the site targets.
+
+        Example:
+            >>> config.autotune_build_jobs(memory_per_job=4 * 1024**3, maximum=32)
+
+        Args:
+            memory_per_job (int): Bytes of memory needed by one compile job.
+            minimum (int): Floor of the number of jobs.
+            maximum (Optional[int]): Cap of the number of jobs.
+            root (Union[str, Path]): Root of the filesystem to read ``/proc``
+                and ``/sys/fs/cgroup`` from.
+            environ (Optional[Dict[str, str]]): Environment to read scheduler
+                variables from. Defaults to ``os.environ``.
+
+        Returns:
+            BuildJobsEstimate: The chosen number of jobs and its reasoning.
+        """
+        estimate = estimate_build_jobs(
+            memory_per_job=memory_per_job,
+            minimum=minimum,
+            maximum=maximum,
+            root=root,
+            environ=environ,
+        )
+        self.config["build_jobs"] = estimate.jobs
+        self.comments["build_jobs"] = [f"build_jobs: {estimate.jobs} (autotuned)"]
+        self.comments["build_jobs"].extend(f"  {reason}" for reason in estimate.reasons)
+        return estimate
 
     def set_stage_paths(self, *, build_stage_path: str, test_stage_path: str) -> None:
         """
@@ -66,8 +157,10 @@ class Config(AbstractSiteConfig):
         """
         if build_stage_path:
             self.config["build_stage"] = build_stage_path
+            self.comments.pop("build_stage", None)
         if test_stage_path:
             self.config["test_stage"] = test_stage_path
+            self.comments.pop("test_stage", None)
 
     def set_cache_paths(self, *, source_cache_path: str, misc_cache_path: str) -> None:
         """
@@ -79,22 +172,121 @@ class Config(AbstractSiteConfig):
         """
         if source_cache_path:
             self.config["source_cache"] = source_cache_path
+            self.comments.pop("source_cache", None)
         if misc_cache_path:
             self.config["misc_cache"] = misc_cache_path
+            self.comments.pop("misc_cache", None)
 
-    def write(self, *, path: Path, spack_format: bool = True) -> None:
+    def place_directories(
+        self,
+        *,
+        candidates: Sequence[str],
+        settings: Sequence[str] = tuple(_PLACEMENT),
+        min_free_bytes: int = 20 * _GIB,
+        cache: Optional[DetectionCache] = None,
+        hostname: Optional[str] = None,
+        time_limit: float = TIME_LIMIT,
+    ) -> Dict[str, FilesystemBenchmark]:
         """
-        Write the configuration to a `config.yaml` file.
+        Place the stage and cache directories on the fastest viable candidates.
+
+        Every candidate is benchmarked for a few seconds. Candidates that
+        cannot be written or have less than ``min_free_bytes`` free are not
+        viable, and neither are tmpfs candidates for the caches, which must
+        survive a reboot. The build and test stages and the misc cache go to
+        the candidate with the highest small-file rate, the source cache to
+        the one with the highest sequential throughput. Each setting becomes a
+        subdirectory of its candidate (e.g., ``<candidate>/spack-stage``) and
+        the measurements are written as comments at the top of ``config.yaml``.
 
-        If the configuration is empty, the method does nothing.
+        Example:
+            >>> config.place_directories(
+            ...     candidates=["/local_scratch/$user", "/glade/derecho/scratch/$user"],
+            ...     cache=site.detection_cache,
+            ... )
+
+        Args:
+            candidates (Sequence[str]): Candidate directories. Spack's
+                ``$tempdir`` and ``$user`` may be used; they are expanded for
+                the benchmark and kept in the configuration.
+            settings (Sequence[str]): The settings to place, among
+                ``build_stage``, ``test_stage``, ``source_cache`` and
+                ``misc_cache``.
+            min_free_bytes (int): Free space a candidate needs to be viable.
+            cache (Optional[DetectionCache]): Cache for the measurements, shared
+                per host.
+            hostname (Optional[str]): Host the measurements are cached for.
+                Defaults to this host's name.
+            time_limit (float): Seconds spent on each measurement at most.
+
+        Returns:
+            Dict[str, FilesystemBenchmark]: The chosen candidate's measurements,
+            by setting.
+
+        Raises:
+            ValueError: If a setting is unknown or has no viable candidate.
+        """
+        unknown = set(settings) - set(_PLACEMENT)
+        if unknown:
+            raise ValueError(f"Cannot place unknown settings {sorted(unknown)}.")
+        results = benchmark_directories(
+            candidates, cache=cache, hostname=hostname, time_limit=time_limit
+        )
+        chosen = {}
+        for setting in settings:
+            subdirectory, metric, persistent = _PLACEMENT[setting]
+            viable = [
+                result
+                for result in results.values()
+                if result.error is None
+                and result.free_bytes >= min_free_bytes
+                and not (persistent and result.fstype in _VOLATILE_FILESYSTEMS)
+            ]
+            if not viable:
+                raise ValueError(f"No viable candidate directory for '{setting}'.")
+            best = max(viable, key=lambda result: getattr(result, metric))
+            chosen[setting] = best
+            self.config[setting] = f"{best.path.rstrip('/')}/{subdirectory}"
+            self.comments[setting] = [
+                f"{setting}: {best.path} ({best.fstype or 'unknown'}, "
+                f"{best.files_per_second:.0f} files/s, "
+                f"{best.bytes_per_second / 1024**2:.0f} MiB/s, "
+                f"{best.free_bytes / _GIB:.0f} GiB free)"
+            ]
+        return chosen
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return the configuration as a plain dictionary.
+
+        Returns:
+            Dict[str, Any]: The configuration under a top-level ``config`` key.
+        """
+        return {"config": self.config.to_dict()}
+
+    def render(self, *, spack_format: bool = True) -> Optional[bytes]:
+        """
+        Render the configuration as the content of a `config.yaml` file.
+
+        The configuration is validated against the bundled Spack schema before
+        anything is rendered. The lines in ``comments`` come first, as YAML
+        comments.
 
         Args:
-            path (Path): The file path where the configuration will be written.
             spack_format (bool, optional): Whether to format the YAML output
                                            in Spack's style. Defaults to True.
+
+        Returns:
+            Optional[bytes]: The encoded file, or None if the configuration is
+            empty.
         """
         if self.config.empty():
-            return
-        config_dict = {"config": self.config.to_dict()}
-        with open(path, "w") as f:
-            f.write(to_yaml(config_dict, spack_format=spack_format))
+            return None
+        config_dict = self.to_dict()
+        validate_section(self.section, config_dict)
+        comments = "".join(
+            f"# {comment}\n"
+            for comments in self.comments.values()
+            for comment in comments
+        )
+        return (comments + to_yaml(config_dict, spack_format=spack_format)).encode()
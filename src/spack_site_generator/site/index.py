@@ -0,0 +1,276 @@
+"""
+Inverted indexes over the entries of a Spack site.
+
+The :class:`SiteIndex` is kept up to date by ``Packages`` and ``Compilers`` as
+entries are added or replaced, so questions such as "which externals load
+cray-mpich/8.1.25?" are answered without walking the configuration.
+"""
+
+import os
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from spack_site_generator.utils.spec import parse_spec
+
+#: How ``Packages.add_package`` and ``Compilers.add_compiler`` treat an entry
+#: that is already present.
+DUPLICATE_POLICIES = ("replace", "merge", "skip", "error")
+
+
+def check_duplicate_policy(policy: str) -> None:
+    """
+    Check that ``policy`` is one of ``DUPLICATE_POLICIES``.
+
+    Raises:
+        ValueError: If the policy is unknown.
+    """
+    if policy not in DUPLICATE_POLICIES:
+        raise ValueError(
+            f"Unknown duplicate policy '{policy}'; expected one of "
+            f"{list(DUPLICATE_POLICIES)}."
+        )
+
+
+class IndexEntry(NamedTuple):
+    """
+    A single indexed site entry.
+
+    Attributes:
+        kind (str): Either "external" or "compiler".
+        name (str): Package name for externals, compiler spec for compilers.
+        spec (str): The full spec string of the entry.
+        prefix (str): Installation prefix. For compilers this is derived from
+            the directory holding the compiler executables.
+    """
+
+    kind: str
+    name: str
+    spec: str
+    prefix: str
+
+
+class _PrefixNode(object):
+    """A node of the prefix trie, keyed by path component."""
+
+    __slots__ = ("children", "entries")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_PrefixNode"] = {}
+        self.entries: Dict[IndexEntry, None] = {}
+
+
+def _path_components(path: str) -> List[str]:
+    """Split an absolute path into its non-empty components."""
+    return [component for component in path.split("/") if component]
+
+
+def compiler_prefix(paths: Optional[Dict[str, Optional[str]]]) -> str:
+    """
+    Derive an installation prefix from a compiler's executable paths.
+
+    The prefix is the common directory of all executables, with a trailing
+    ``bin`` directory removed (``/opt/gcc/12.2.0/bin/gcc`` -> ``/opt/gcc/12.2.0``).
+
+    Args:
+        paths (Optional[Dict[str, Optional[str]]]): The compiler ``paths`` entry.
+
+    Returns:
+        str: The derived prefix, or an empty string if no absolute path is set.
+    """
+    directories = [
+        os.path.dirname(path)
+        for path in (paths or {}).values()
+        if path and os.path.isabs(path)
+    ]
+    if not directories:
+        return ""
+    prefix = os.path.commonpath(directories)
+    if os.path.basename(prefix) == "bin":
+        prefix = os.path.dirname(prefix)
+    return prefix
+
+
+class SiteIndex(object):
+    """
+    Inverted indexes over the externals and compilers of a site.
+
+    The index maps modules, installation prefixes (through a trie of path
+    components) and compilers to the entries that use them, and virtual
+    providers to the libraries that implement them. Entries are added and
+    removed incrementally; every query runs in time proportional to the size
+    of its result.
+
+    Entries written directly into a section's ``config`` are not indexed.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[IndexEntry, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {}
+        self._by_name: Dict[str, Dict[IndexEntry, None]] = {}
+        self._by_module: Dict[str, Dict[IndexEntry, None]] = {}
+        self._by_compiler: Dict[str, Dict[IndexEntry, None]] = {}
+        self._prefixes = _PrefixNode()
+        self._providers: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        """Return the number of indexed entries."""
+        return len(self._entries)
+
+    def __contains__(self, entry: object) -> bool:
+        return entry in self._entries
+
+    @staticmethod
+    def _compiler_keys(entry: IndexEntry) -> Tuple[str, ...]:
+        """Return the compiler keys (``gcc`` and ``gcc@12.2.0``) of an entry."""
+        if entry.kind == "compiler":
+            parsed = parse_spec(entry.spec)
+            compiler = f"{parsed.name}@{parsed.version}" if parsed.version else None
+            name = parsed.name
+        else:
+            compiler = parse_spec(entry.spec).compiler
+            name = compiler.split("@", 1)[0] if compiler else None
+        return tuple(key for key in dict.fromkeys((name, compiler)) if key)
+
+    def add(self, entry: IndexEntry, *, modules: Optional[Sequence[str]] = ()) -> None:
+        """
+        Add an entry to every index.
+
+        Adding an entry that is already indexed replaces its module list.
+
+        Args:
+            entry (IndexEntry): The entry to add.
+            modules (Optional[Sequence[str]]): Modules loaded by the entry.
+        """
+        if entry in self._entries:
+            self.remove(entry)
+        modules = tuple(dict.fromkeys(modules or ()))
+        compilers = self._compiler_keys(entry)
+        self._entries[entry] = (modules, compilers)
+        self._by_name.setdefault(entry.name, {})[entry] = None
+        for module in modules:
+            self._by_module.setdefault(module, {})[entry] = None
+        for compiler in compilers:
+            self._by_compiler.setdefault(compiler, {})[entry] = None
+        if entry.prefix:
+            node = self._prefixes
+            for component in _path_components(entry.prefix):
+                node = node.children.setdefault(component, _PrefixNode())
+            node.entries[entry] = None
+
+    def remove(self, entry: IndexEntry) -> None:
+        """
+        Remove an entry from every index. Unknown entries are ignored.
+
+        Args:
+            entry (IndexEntry): The entry to remove.
+        """
+        keys = self._entries.pop(entry, None)
+        if keys is None:
+            return
+        modules, compilers = keys
+        self._discard(self._by_name, entry.name, entry)
+        for module in modules:
+            self._discard(self._by_module, module, entry)
+        for compiler in compilers:
+            self._discard(self._by_compiler, compiler, entry)
+        if entry.prefix:
+            trail = [self._prefixes]
+            components = _path_components(entry.prefix)
+            for component in components:
+                trail.append(trail[-1].children[component])
+            del trail[-1].entries[entry]
+            for parent, component in zip(reversed(trail[:-1]), reversed(components)):
+                child = parent.children[component]
+                if child.entries or child.children:
+                    break
+                del parent.children[component]
+
+    @staticmethod
+    def _discard(
+        index: Dict[str, Dict[IndexEntry, None]], key: str, entry: IndexEntry
+    ) -> None:
+        """Remove ``entry`` from ``index[key]``, dropping the key once empty."""
+        entries = index[key]
+        del entries[entry]
+        if not entries:
+            del index[key]
+
+    def set_providers(self, provider: str, libraries: Iterable[str]) -> None:
+        """
+        Record the libraries that implement a virtual provider.
+
+        Args:
+            provider (str): The virtual name (e.g., "mpi").
+            libraries (Iterable[str]): Provider specs (e.g., ["cray-mpich@8.1.25"]).
+        """
+        self._providers[provider] = list(libraries)
+
+    def names(self) -> List[str]:
+        """Return the package and compiler names with indexed entries."""
+        return list(self._by_name)
+
+    def entries_named(self, name: str) -> List[IndexEntry]:
+        """Return the entries registered under a package or compiler name."""
+        return list(self._by_name.get(name, ()))
+
+    def by_module(self, module: str) -> List[IndexEntry]:
+        """
+        Return the entries that load a module.
+
+        Args:
+            module (str): Module name (e.g., "cray-mpich/8.1.25").
+
+        Returns:
+            List[IndexEntry]: Matching entries, in insertion order.
+        """
+        return list(self._by_module.get(module, ()))
+
+    def by_compiler(self, compiler: str) -> List[IndexEntry]:
+        """
+        Return the externals built with a compiler and the matching compilers.
+
+        Args:
+            compiler (str): Compiler as ``name`` or ``name@version``
+                (e.g., "gcc" or "gcc@12.2.0").
+
+        Returns:
+            List[IndexEntry]: Matching entries, in insertion order.
+        """
+        return list(self._by_compiler.get(compiler, ()))
+
+    def under_prefix(self, path: str) -> List[IndexEntry]:
+        """
+        Return the entries installed at or below a directory.
+
+        Args:
+            path (str): Directory to search (e.g., "/glade/u/apps/derecho/23.09").
+
+        Returns:
+            List[IndexEntry]: Matching entries, ordered by prefix one path
+            component at a time (``/a/b`` before ``/a/b/c`` before ``/a/c``);
+            entries with the same prefix are in insertion order.
+        """
+        node = self._prefixes
+        for component in _path_components(path):
+            node = node.children.get(component)
+            if node is None:
+                return []
+        found: List[IndexEntry] = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            found.extend(node.entries)
+            stack.extend(
+                child for _, child in sorted(node.children.items(), reverse=True)
+            )
+        return found
+
+    def providers(self, provider: str) -> List[str]:
+        """
+        Return the libraries recorded for a virtual provider.
+
+        Args:
+            provider (str): The virtual name (e.g., "mpi").
+
+        Returns:
+            List[str]: Provider specs, most preferred first.
+        """
+        return list(self._providers.get(provider, ()))
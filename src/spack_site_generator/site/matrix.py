@@ -0,0 +1,128 @@
+"""
+Lazy cartesian-product expansion of toolchain stacks.
+
+Software stacks are usually installed once per combination of compiler, MPI
+and other toolchain choices. A :class:`ToolchainMatrix` declares those axes
+together with a template for one combination and expands them on demand, one
+combination at a time, so large stacks never have to be materialized.
+"""
+
+import itertools
+from math import prod
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+
+class AxisValue(str):
+    """
+    A value of a matrix axis, usable as a template field.
+
+    Formats as the full value and exposes the parts of a ``name@version``
+    spec, so templates can use ``{compiler}``, ``{compiler.name}`` and
+    ``{compiler.version}``.
+    """
+
+    @property
+    def name(self) -> str:
+        """The part of the value before the first ``@``."""
+        return self.split("@", 1)[0]
+
+    @property
+    def version(self) -> str:
+        """The part of the value after the first ``@``, or an empty string."""
+        return self.partition("@")[2]
+
+
+def _render(template: Any, fields: Dict[str, AxisValue]) -> Any:
+    """Format every string in ``template`` with ``fields``."""
+    if isinstance(template, str):
+        return template.format(**fields)
+    if isinstance(template, dict):
+        return {key: _render(value, fields) for key, value in template.items()}
+    if isinstance(template, list):
+        return [_render(value, fields) for value in template]
+    return template
+
+
+class ToolchainMatrix(object):
+    """
+    A lazily expanded cartesian product of toolchain axes.
+
+    Every string in the template is a ``str.format`` pattern over the axis
+    names. Expanding the matrix yields one rendered copy of the template per
+    combination of axis values, in ``itertools.product`` order.
+
+    Example:
+        >>> matrix = ToolchainMatrix(
+        ...     axes={"compiler": ["gcc@12.2.0", "intel@2023.2.1"],
+        ...           "mpi": ["cray-mpich@8.1.25"]},
+        ...     template={"spec": "netcdf-c@4.9.2%{compiler} ^{mpi}",
+        ...               "modules": ["{compiler.name}/{compiler.version}"]},
+        ... )
+        >>> len(matrix)
+        2
+        >>> next(iter(matrix))["spec"]
+        'netcdf-c@4.9.2%gcc@12.2.0 ^cray-mpich@8.1.25'
+
+    Attributes:
+        axes (Dict[str, Sequence[str]]): Axis names mapped to their values.
+        template (Dict[str, Any]): The per-combination template.
+    """
+
+    def __init__(
+        self,
+        *,
+        axes: Dict[str, Sequence[str]],
+        template: Dict[str, Any],
+    ) -> None:
+        """
+        Declare the axes and per-combination template of a matrix.
+
+        Args:
+            axes (Dict[str, Sequence[str]]): Axis names mapped to their values
+                (e.g., ``{"compiler": ["gcc@12.2.0"], "mpi": ["cray-mpich@8.1.25"]}``).
+            template (Dict[str, Any]): Template rendered for each combination.
+                Strings may reference any axis (``{mpi}``, ``{mpi.version}``).
+
+        Raises:
+            ValueError: If no axes are given or an axis has no values.
+        """
+        if not axes:
+            raise ValueError("A toolchain matrix needs at least one axis.")
+        for axis, values in axes.items():
+            if not values:
+                raise ValueError(f"Matrix axis '{axis}' has no values.")
+        self.axes = {axis: tuple(values) for axis, values in axes.items()}
+        self.template = template
+
+    def __len__(self) -> int:
+        """Return the number of combinations."""
+        return prod(len(values) for values in self.axes.values())
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self.expand()
+
+    def combinations(self) -> Iterator[Dict[str, AxisValue]]:
+        """
+        Yield the axis values of each combination.
+
+        Yields:
+            Dict[str, AxisValue]: Axis names mapped to one value each.
+        """
+        names = list(self.axes)
+        for values in itertools.product(*self.axes.values()):
+            yield dict(zip(names, map(AxisValue, values)))
+
+    def expand(self, template: Optional[Dict[str, Any]] = None) -> Iterator[Any]:
+        """
+        Yield the rendered template of each combination.
+
+        Args:
+            template (Optional[Dict[str, Any]]): Template to render instead of
+                ``self.template``.
+
+        Yields:
+            Any: One freshly rendered template per combination.
+        """
+        template = self.template if template is None else template
+        for fields in self.combinations():
+            yield _render(template, fields)
@@ -0,0 +1,162 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+from urllib.parse import unquote, urlparse
+
+from spack_site_generator.utils.autodict import AutoDict
+from spack_site_generator.utils.build_cache import BinarySpec, MirrorIndex, scan_mirror
+from spack_site_generator.utils.detection_cache import DetectionCache
+from spack_site_generator.utils.spack_yaml import to_yaml
+from spack_site_generator.utils.schema import validate_section
+from spack_site_generator.site.abstract_site_config import AbstractSiteConfig
+
+
+class Mirrors(AbstractSiteConfig):
+    """
+    Represents the mirror configuration (``mirrors.yaml``) of a Spack site.
+
+    Mirrors point Spack at source archives and binary build caches. Local
+    mirrors can be scanned, so the generator knows which specs are already
+    available as binaries before Spack is run.
+
+    Attributes:
+        config (AutoDict): A dictionary-like structure that stores mirror
+            configurations.
+        indexes (Dict[str, MirrorIndex]): Contents of the scanned local
+            mirrors, by mirror name.
+    """
+
+    section = "mirrors"
+
+    def __init__(self) -> None:
+        """
+        Initialize an empty mirror configuration.
+        """
+        self.config: AutoDict = AutoDict()
+        self.indexes: Dict[str, MirrorIndex] = {}
+
+    def add_mirror(
+        self,
+        *,
+        name: str,
+        url: str,
+        source: bool,
+        binary: bool,
+        signed: Optional[bool] = None,
+    ) -> None:
+        """
+        Add a mirror.
+
+        Args:
+            name (str): Name of the mirror (e.g., "local-cache").
+            url (str): URL of the mirror. Absolute paths are converted to
+                ``file://`` URLs.
+            source (bool): Whether Spack fetches source archives from the
+                mirror.
+            binary (bool): Whether Spack installs binaries from the mirror's
+                build cache.
+            signed (Optional[bool]): Whether binaries must be signed. Defaults
+                to Spack's own default.
+        """
+        if url.startswith("/"):
+            url = Path(url).as_uri()
+        mirror = self.config[name]
+        mirror["url"] = url
+        mirror["source"] = source
+        mirror["binary"] = binary
+        if signed is not None:
+            mirror["signed"] = signed
+
+    def binary_mirrors(self) -> List[str]:
+        """
+        Return the mirrors Spack may install binaries from.
+
+        Returns:
+            List[str]: Names of the mirrors whose ``binary`` setting is not
+            disabled.
+        """
+        return [
+            name
+            for name, mirror in self.config.items()
+            if not isinstance(mirror, dict) or mirror.get("binary", True)
+        ]
+
+    def scan(
+        self,
+        *,
+        name: str,
+        path: Optional[Union[str, Path]] = None,
+        cache: Optional[DetectionCache] = None,
+    ) -> MirrorIndex:
+        """
+        Index the contents of a local mirror.
+
+        Args:
+            name (str): Name of the mirror.
+            path (Optional[Union[str, Path]]): The mirror directory. Defaults to
+                the directory of the mirror's ``file://`` URL.
+            cache (Optional[DetectionCache]): Cache for parsed build cache
+                spec files.
+
+        Returns:
+            MirrorIndex: The contents of the mirror, also stored in
+            ``indexes``.
+
+        Raises:
+            ValueError: If no ``path`` is given and the mirror is not a known
+                local mirror.
+            FileNotFoundError: If the mirror directory does not exist.
+        """
+        if path is None:
+            url = self.config.get(name, {}).get("url", "")
+            if not url.startswith("file://"):
+                raise ValueError(f"Mirror '{name}' is not a local mirror.")
+            path = unquote(urlparse(url).path)
+        self.indexes[name] = scan_mirror(path, cache=cache)
+        return self.indexes[name]
+
+    def find_binaries(self, spec: str) -> Dict[str, List[BinarySpec]]:
+        """
+        Return the binaries satisfying a spec in the scanned mirrors.
+
+        Args:
+            spec (str): The spec to look up (e.g., "netcdf-c@4.9.2%gcc@12.2.0").
+
+        Returns:
+            Dict[str, List[BinarySpec]]: Matching binaries by mirror name.
+            Mirrors without a match are left out.
+        """
+        found = {}
+        for name, index in self.indexes.items():
+            binaries = index.find_binaries(spec)
+            if binaries:
+                found[name] = binaries
+        return found
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return the mirror configuration as a plain dictionary.
+
+        Returns:
+            Dict[str, Any]: The configuration under a top-level ``mirrors`` key.
+        """
+        return {"mirrors": self.config.to_dict()}
+
+    def render(self, *, spack_format: bool = True) -> Optional[bytes]:
+        """
+        Render the mirror configuration as the content of a YAML file. The
+        configuration is validated against the bundled Spack schema before
+        anything is rendered.
+
+        Args:
+            spack_format (bool, optional): Whether to format the YAML output
+                in Spack style. Defaults to True.
+
+        Returns:
+            Optional[bytes]: The encoded file, or None if the configuration is
+            empty.
+        """
+        if self.config.empty():
+            return None
+        config_dict = self.to_dict()
+        validate_section(self.section, config_dict)
+        return to_yaml(config_dict, spack_format=spack_format).encode()
@@ -1,10 +1,253 @@
-from pathlib import Path
-from typing import Optional
+import itertools
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 from spack_site_generator.utils.autodict import AutoDict
+from spack_site_generator.utils.spec import ParsedSpec, parse_spec
 from spack_site_generator.utils.spack_yaml import to_yaml
+from spack_site_generator.utils.schema import validate_section
 from spack_site_generator.site.abstract_site_config import AbstractSiteConfig
 
+#: Spack's default projections of each module type, without the hash suffix.
+DEFAULT_PROJECTIONS = {
+    "lmod": "{name}/{version}",
+    "tcl": "{name}/{version}-{compiler.name}-{compiler.version}",
+}
+
+#: Directory of the Lmod modules that do not depend on a non-core compiler.
+CORE = "Core"
+
+_TOKEN = re.compile(r"\{([^{}]*)\}")
+
+
+@dataclass
+class ModuleTreePreview:
+    """
+    The module files a module configuration would generate for a site.
+
+    Hashes are left out of the module names, since externals are not
+    concretized yet.
+
+    Attributes:
+        directories (Dict[str, List[str]]): Module names by directory,
+            relative to the module root (e.g., "Core", "gcc/12.2.0" or
+            "cray-mpich/8.1.25/gcc/12.2.0"). Tcl modules share one directory,
+            "".
+        collisions (Dict[str, List[str]]): Specs whose module files have the
+            same path, by path. Only filled without a hash suffix, since Spack
+            refuses to generate such files.
+        max_visible (int): Most modules on ``MODULEPATH`` at once, with one
+            compiler and one provider of each hierarchy level loaded. This is
+            the number of files ``module avail`` searches.
+    """
+
+    directories: Dict[str, List[str]] = field(default_factory=dict)
+    collisions: Dict[str, List[str]] = field(default_factory=dict)
+    max_visible: int = 0
+
+    @property
+    def modules(self) -> int:
+        """Number of module files."""
+        return sum(len(names) for names in self.directories.values())
+
+    @property
+    def largest(self) -> int:
+        """Number of module files in the largest directory."""
+        return max((len(names) for names in self.directories.values()), default=0)
+
+
+def _split_version(spec: Optional[str]) -> Tuple[str, str]:
+    """Split ``name@version`` into its name and (possibly empty) version."""
+    name, _, version = (spec or "").partition("@")
+    return name, version
+
+
+def _project(projection: str, parsed: ParsedSpec, dependencies: Dict[str, str]) -> str:
+    """
+    Expand the tokens of a projection for a spec.
+
+    Supported tokens are ``{name}``, ``{version}``, ``{compiler.name}``,
+    ``{compiler.version}`` and ``{^dep.name}``/``{^dep.version}`` for a
+    dependency or hierarchy virtual. ``{hash}`` tokens expand to nothing.
+    """
+    compiler_name, compiler_version = _split_version(parsed.compiler)
+
+    def expand(match: "re.Match[str]") -> str:
+        token = match.group(1)
+        if token.startswith("hash"):
+            return ""
+        if token.startswith("^"):
+            dependency, _, attribute = token[1:].partition(".")
+            name, version = _split_version(dependencies.get(dependency))
+            return version if attribute == "version" else name
+        values = {
+            "name": parsed.name,
+            "version": parsed.version or "",
+            "compiler.name": compiler_name,
+            "compiler.version": compiler_version,
+        }
+        if token not in values:
+            raise ValueError(f"Unsupported projection token '{{{token}}}'.")
+        return values[token]
+
+    return _TOKEN.sub(expand, projection).strip("-/")
+
+
+def _select_projection(
+    projections: Dict[str, str],
+    parsed: ParsedSpec,
+    dependencies: Dict[str, str],
+    default: str,
+) -> str:
+    """Return the first projection whose key matches a spec, else ``all``."""
+    for key, projection in projections.items():
+        if key == "all":
+            continue
+        name = key.lstrip("^").split("@", 1)[0].split("%", 1)[0].strip()
+        if name in (dependencies if key.startswith("^") else (parsed.name,)):
+            return projection
+    return projections.get("all", default)
+
+
+def preview_module_tree(
+    specs: Iterable[str],
+    *,
+    module_type: str = "lmod",
+    core_compilers: Sequence[str] = (),
+    hierarchy: Sequence[str] = (),
+    providers: Optional[Dict[str, Sequence[str]]] = None,
+    projections: Optional[Dict[str, str]] = None,
+    hash_length: int = 7,
+) -> ModuleTreePreview:
+    """
+    Lay out the module files Spack would generate for a set of specs.
+
+    Tcl modules go to a single directory. Lmod modules of specs built with a
+    core compiler (or without a compiler) go to ``Core``; the others go to
+    ``<compiler>/<version>``, below ``<provider>/<version>`` for every
+    hierarchy level they depend on, ordered from the last level to the first
+    as Spack does. A spec providing a hierarchy virtual stays at the level
+    that unlocks it.
+
+    Args:
+        specs (Iterable[str]): Spec strings of the modules (e.g., externals).
+        module_type (str): "lmod" or "tcl".
+        core_compilers (Sequence[str]): Lmod core compilers, as ``name`` or
+            ``name@version``.
+        hierarchy (Sequence[str]): Lmod hierarchy levels after the compiler
+            (e.g., ["mpi"]).
+        providers (Optional[Dict[str, Sequence[str]]]): Provider specs of each
+            hierarchy virtual (e.g., {"mpi": ["cray-mpich@8.1.25"]}). A
+            dependency named after the virtual itself always matches.
+        projections (Optional[Dict[str, str]]): Naming projections; the first
+            key naming the package (or, with ``^``, a dependency) wins over
+            ``all``. Defaults to Spack's default for ``module_type``.
+        hash_length (int): Length of the hash suffix Spack appends; 0 lets
+            module files collide.
+
+    Returns:
+        ModuleTreePreview: The directories, collisions and search size.
+
+    Raises:
+        ValueError: If ``module_type`` is unknown or a projection uses an
+            unsupported token.
+    """
+    if module_type not in DEFAULT_PROJECTIONS:
+        raise ValueError(f"Unknown module type '{module_type}'.")
+    projections = projections or {}
+    default = DEFAULT_PROJECTIONS[module_type]
+    provider_names = {
+        virtual: {virtual, *(_split_version(spec)[0] for spec in provided)}
+        for virtual, provided in (providers or {}).items()
+    }
+    for virtual in hierarchy:
+        provider_names.setdefault(virtual, {virtual})
+    # (compiler directory, hierarchy levels) -> module name -> specs
+    placed: Dict[
+        Tuple[Optional[str], Tuple[Tuple[str, str], ...]], Dict[str, List[str]]
+    ] = {}
+    for spec in specs:
+        parsed = parse_spec(spec)
+        # Dependencies by name and by the virtuals they provide.
+        dependencies = {}
+        for dependency in parsed.dependencies:
+            name = _split_version(dependency)[0]
+            dependencies[name] = dependency
+            for virtual, names in provider_names.items():
+                if name in names:
+                    dependencies.setdefault(virtual, dependency)
+        levels: List[Tuple[str, str]] = [
+            (virtual, dependencies[virtual].replace("@", "/"))
+            for virtual in (hierarchy if module_type == "lmod" else ())
+            if virtual in dependencies and parsed.name not in provider_names[virtual]
+        ]
+        compiler: Optional[str] = None
+        if module_type == "lmod":
+            compiler = CORE
+            name, _ = _split_version(parsed.compiler)
+            if parsed.compiler and not (
+                parsed.compiler in core_compilers or name in core_compilers
+            ):
+                compiler = parsed.compiler.replace("@", "/")
+        module = _project(
+            _select_projection(projections, parsed, dependencies, default),
+            parsed,
+            dependencies,
+        )
+        key = (compiler, tuple(levels))
+        placed.setdefault(key, {}).setdefault(module, []).append(spec)
+
+    preview = ModuleTreePreview()
+    for (compiler, levels), modules in sorted(
+        placed.items(), key=lambda item: (item[0][0] or "", item[0][1])
+    ):
+        directory = "/".join(
+            [path for _, path in reversed(levels)] + ([compiler] if compiler else [])
+        )
+        preview.directories[directory] = sorted(modules)
+        if hash_length == 0:
+            for module, owners in modules.items():
+                if len(owners) > 1:
+                    path = f"{directory}/{module}" if directory else module
+                    preview.collisions[path] = owners
+    if module_type == "tcl":
+        preview.max_visible = preview.modules
+        return preview
+    core = len(placed.get((CORE, ()), ()))
+    compilers = {compiler for compiler, _ in placed if compiler != CORE}
+    for compiler in compilers | {CORE}:
+        choices = [
+            [
+                None,
+                *sorted(
+                    {
+                        path
+                        for (other, levels) in placed
+                        if other == compiler
+                        for level, path in levels
+                        if level == virtual
+                    }
+                ),
+            ]
+            for virtual in hierarchy
+        ]
+        for combination in itertools.product(*choices):
+            loaded = {
+                (virtual, path)
+                for virtual, path in zip(hierarchy, combination)
+                if path is not None
+            }
+            visible = core + sum(
+                len(modules)
+                for (other, levels), modules in placed.items()
+                if other == compiler and levels and set(levels) <= loaded
+            )
+            if compiler != CORE:
+                visible += len(placed.get((compiler, ()), ()))
+            preview.max_visible = max(preview.max_visible, visible)
+    return preview
+
 
 class Modules(AbstractSiteConfig):
     """
@@ -17,6 +260,8 @@ class Modules(AbstractSiteConfig):
         config (AutoDict): A dictionary-like structure to store module configurations.
     """
 
+    section = "modules"
+
     def __init__(self) -> None:
         """
         Initialize the module configuration with a default structure.
@@ -60,18 +305,103 @@ class Modules(AbstractSiteConfig):
         if include:
             self.config["default"][module_type]["include"] = include
 
-    def write(self, *, path: Path, spack_format: Optional[bool] = True) -> None:
+    def set_core_compilers(self, *, compilers: List[str]) -> None:
+        """
+        Set the compilers whose modules go to Lmod's ``Core`` directory.
+
+        Packages built with a core compiler are visible without loading a
+        compiler module; every other compiler opens its own level of the
+        hierarchy.
+
+        Args:
+            compilers (List[str]): Compiler specs (e.g., ["gcc@7.5.0"]).
+        """
+        self.config["default"]["lmod"]["core_compilers"] = list(compilers)
+
+    def set_hierarchy(self, *, hierarchy: List[str]) -> None:
+        """
+        Set the levels of the Lmod hierarchy below the compiler level.
+
+        Args:
+            hierarchy (List[str]): Virtual packages opening a level, outermost
+                first (e.g., ["mpi"] or ["mpi", "lapack"]). The compiler level
+                is always part of an Lmod hierarchy; listing "compiler" is
+                allowed and ignored.
+        """
+        self.config["default"]["lmod"]["hierarchy"] = [
+            level for level in hierarchy if level != "compiler"
+        ]
+
+    def set_projections(self, *, module_type: str, projections: Dict[str, str]) -> None:
+        """
+        Set how module files are named.
+
+        Args:
+            module_type (str): The module type (e.g., "tcl", "lmod").
+            projections (Dict[str, str]): Projections by anonymous spec, with
+                ``all`` as the fallback (e.g., {"all": "{name}/{version}"}).
+        """
+        self.config["default"][module_type]["projections"] = dict(projections)
+
+    def preview_tree(
+        self,
+        *,
+        specs: Iterable[str],
+        providers: Optional[Dict[str, Sequence[str]]] = None,
+        module_type: str = "lmod",
+    ) -> ModuleTreePreview:
+        """
+        Preview the module tree this configuration generates for some specs.
+
+        Compare layouts by their ``max_visible`` and ``largest`` directory;
+        smaller values keep ``module avail`` and ``module spider`` fast.
+
+        Args:
+            specs (Iterable[str]): Spec strings of the modules (e.g., the
+                site's externals).
+            providers (Optional[Dict[str, Sequence[str]]]): Provider specs of
+                the hierarchy virtuals.
+            module_type (str): The module type to preview. Defaults to "lmod".
+
+        Returns:
+            ModuleTreePreview: The module directories and their sizes.
+        """
+        settings = self.config.get("default", {}).get(module_type, {})
+        return preview_module_tree(
+            specs,
+            module_type=module_type,
+            core_compilers=settings.get("core_compilers", ()),
+            hierarchy=settings.get("hierarchy", ()),
+            providers=providers,
+            projections=settings.get("projections"),
+            hash_length=settings.get("hash_length", 7),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return the module configuration as a plain dictionary.
+
+        Returns:
+            Dict[str, Any]: The configuration under a top-level ``modules`` key.
+        """
+        return {"modules": self.config.to_dict()}
+
+    def render(self, *, spack_format: bool = True) -> Optional[bytes]:
         """
-        Write the module configuration to a YAML file. If the configuration is empty,
-        no file will be written.
+        Render the module configuration as the content of a YAML file. The
+        configuration is validated against the bundled Spack schema before
+        anything is rendered.
 
         Args:
-            path (str): The file path where the configuration will be saved.
             spack_format (bool, optional): Whether to format the YAML output
-                                           in Spack style. Defaults to True.
+                in Spack style. Defaults to True.
+
+        Returns:
+            Optional[bytes]: The encoded file, or None if the configuration is
+            empty.
         """
         if self.config.empty():
-            return
-        config_dict = {"modules": self.config.to_dict()}
-        with open(path, "w") as f:
-            f.write(to_yaml(config_dict, spack_format=spack_format))
+            return None
+        config_dict = self.to_dict()
+        validate_section(self.section, config_dict)
+        return to_yaml(config_dict, spack_format=spack_format).encode()
@@ -1,9 +1,55 @@
+from concurrent.futures import Executor
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import Iterable, Iterator, List, Dict, Any, NamedTuple, Optional, Tuple
 
 from spack_site_generator.utils.autodict import AutoDict
-from spack_site_generator.utils.spack_yaml import to_yaml
+from spack_site_generator.utils.intern import InternPool
+from spack_site_generator.utils.path_check import referenced_paths
+from spack_site_generator.utils.detection_cache import DetectionCache
+from spack_site_generator.utils.pkg_scan import (
+    extra_attributes,
+    scan_prefixes,
+    select_config,
+    version_matches,
+)
+from spack_site_generator.utils.spack_db import InstalledSpec
+from spack_site_generator.utils.spec import canonical_spec, parse_spec
+from spack_site_generator.utils.spack_yaml import (
+    map_fragment_lines,
+    render_lines,
+    to_yaml,
+    to_yaml_lines,
+    write_if_changed,
+)
+from spack_site_generator.utils.schema import (
+    SchemaValidationError,
+    get_validator,
+    validate_section,
+)
 from spack_site_generator.site.abstract_site_config import AbstractSiteConfig
+from spack_site_generator.site.index import (
+    IndexEntry,
+    SiteIndex,
+    check_duplicate_policy,
+)
+from spack_site_generator.site.matrix import ToolchainMatrix
+
+_MATRIX_KEYS = {"spec", "prefix", "modules", "extra_attributes"}
+
+
+class MatrixPackage(NamedTuple):
+    """
+    A package whose externals are generated from a toolchain matrix.
+
+    Attributes:
+        matrix (ToolchainMatrix): Matrix whose template renders one external.
+        buildable (bool): Whether Spack may build this package from source.
+        override (bool): Whether the package definition overrides lower scopes.
+    """
+
+    matrix: ToolchainMatrix
+    buildable: bool
+    override: bool
 
 
 class Packages(AbstractSiteConfig):
@@ -13,15 +59,40 @@ class Packages(AbstractSiteConfig):
     This class allows managing compiler definitions, external package configurations,
     and provider mappings in Spack's package configuration system.
 
+    Repeated values (module lists, prefixes, extra attribute values) are interned
+    as they are added, so equal module lists are stored once and shared between
+    externals.
+
+    Packages added with ``add_matrix`` keep only their matrix; their externals
+    are generated while the configuration is validated and written, one at a
+    time, and are emitted after the packages stored in ``config``.
+
     Attributes:
         config (AutoDict): A dictionary-like structure that stores package configurations.
+        matrices (Dict[str, MatrixPackage]): Packages whose externals are
+            expanded lazily from a toolchain matrix.
+        index (Optional[SiteIndex]): Index updated as externals and providers are
+            added, if one was given.
     """
 
-    def __init__(self) -> None:
+    section = "packages"
+
+    def __init__(self, index: Optional[SiteIndex] = None) -> None:
         """
         Initialize the package configuration with an empty structure.
+
+        Args:
+            index (Optional[SiteIndex]): Index to keep up to date with the
+                externals and providers added to this configuration.
         """
         self.config: AutoDict = AutoDict()
+        self.matrices: Dict[str, MatrixPackage] = {}
+        self.index = index
+        self._interned = InternPool()
+        # Package name -> canonical spec -> position in its externals list.
+        self._positions: Dict[str, Dict[str, int]] = {}
+        # Package name -> spec string of each external, as last seen.
+        self._specs: Dict[str, List[str]] = {}
 
     def add_provider(
         self,
@@ -48,6 +119,10 @@ class Packages(AbstractSiteConfig):
         ]
         self.config["all"]["providers"][provider_name].append({"override": True})
         self.config[provider_name]["buildable"] = buildable
+        if self.index is not None:
+            self.index.set_providers(
+                provider_name, [f"{library_name}@{library_version}"]
+            )
 
     def add_compiler(self, *, name: str, version: str) -> None:
         """
@@ -62,6 +137,16 @@ class Packages(AbstractSiteConfig):
             {"override": True},
         ]
 
+    def set_target(self, *, target: str) -> None:
+        """
+        Set the microarchitecture Spack builds every package for.
+
+        Args:
+            target (str): A Spack target name (e.g., "zen3"), as returned by
+                ``detect_microarchitecture``.
+        """
+        self.config["all"]["target"] = [target]
+
     def add_package(
         self,
         *,
@@ -72,16 +157,24 @@ class Packages(AbstractSiteConfig):
         prefix: str,
         extra_attributes: Dict[str, str],
         override: bool,
+        on_duplicate: str = "replace",
     ) -> None:
         """
         Add an external package definition to the site configuration.
 
-        This method registers a package under ``packages.yaml``, including its
+        This method registers an external under ``packages.yaml``, including its
         spec string, installation prefix, module dependencies, and optional
         extra attributes. It is primarily used to describe external packages
         (e.g., system compilers, MPI libraries) that Spack should not build
-        from source. If ``override`` is True, any existing definition for the
-        package will be replaced.
+        from source. Each call appends one external to the package, so a
+        package can have one external per compiler and MPI combination.
+
+        Externals are identified by their canonical spec (see
+        ``canonical_spec``), so ``netcdf-c@4.9.2 +mpi%gcc`` and
+        ``netcdf-c@4.9.2%gcc+mpi`` are the same external. Adding an external
+        whose spec is already present is handled according to
+        ``on_duplicate``. Canonical specs are cached, so finding the duplicate
+        does not parse the specs of the other externals again.
 
         Args:
             name (str): Logical package name (e.g., "openmpi").
@@ -96,32 +189,577 @@ class Packages(AbstractSiteConfig):
                 for the external package. Common keys include:
                     - "headers": Path to the package's include directory.
                     - "libs": Path to the main library file or directory.
-            override (bool): If True, replace any existing package definition
-                for this name in the configuration.
+            override (bool): If True, the package definition overrides the
+                definitions of lower configuration scopes (``netcdf-c::``).
+            on_duplicate (str): What to do if an external with the same
+                canonical spec exists: "replace" it, "merge" into it (modules
+                are combined, extra attributes and the prefix are updated),
+                "skip" the new one (leaving the package untouched), or raise an
+                "error".
+
+        Raises:
+            ValueError: If ``name`` was added with ``add_matrix``, if
+                ``on_duplicate`` is unknown, or if it is "error" and the
+                external already exists.
         """
+        if name in self.matrices:
+            raise ValueError(f"Package '{name}' is defined by a toolchain matrix.")
+        check_duplicate_policy(on_duplicate)
 
+        name = self._interned.string(name)
         package_entry = self.config[name]
+        key = canonical_spec(spec)
+        position = None
+        if "externals" in package_entry:
+            position = self._position(name, key)
+        if position is not None and on_duplicate == "error":
+            raise ValueError(f"Package '{name}' already has an external '{spec}'.")
+        if position is not None and on_duplicate == "skip":
+            return
         package_entry["buildable"] = buildable
-        if override:
+        if override and not package_entry.get("override"):
             package_entry["override"] = True
-        package_entry["externals"] = [{"spec": spec, "prefix": prefix}]
+            # Spack-style output turns ``override`` into ``name::`` only when
+            # it directly follows ``buildable``, so it goes before externals.
+            if "externals" in package_entry:
+                package_entry["externals"] = package_entry.pop("externals")
+        if "externals" not in package_entry:
+            package_entry["externals"] = []
+        externals = package_entry["externals"]
+
+        if position is not None and on_duplicate == "merge":
+            previous = externals[position]
+            modules = list(
+                dict.fromkeys(list(previous.get("modules", ())) + list(modules or ()))
+            )
+            extra_attributes = {
+                **previous.get("extra_attributes", {}),
+                **(extra_attributes or {}),
+            }
+            prefix = prefix or previous["prefix"]
+        external = self._external(
+            spec=spec,
+            prefix=self._interned.string(prefix),
+            modules=self._interned.strings(modules),
+            extra_attributes=self._interned.mapping(extra_attributes),
+        )
+        if position is None:
+            self._positions.setdefault(name, {})[key] = len(externals)
+            self._specs.setdefault(name, []).append(external["spec"])
+            externals.append(external)
+        else:
+            if self.index is not None:
+                self.index.remove(self._index_entry(name, externals[position]))
+            self._specs[name][position] = external["spec"]
+            externals[position] = external
+        if self.index is not None:
+            self.index.add(
+                self._index_entry(name, external), modules=external.get("modules")
+            )
+
+    def add_installs(
+        self,
+        *,
+        installs: Iterable[InstalledSpec],
+        buildable: bool = False,
+        override: bool = False,
+        on_duplicate: str = "skip",
+    ) -> int:
+        """
+        Add installations of a Spack install tree as externals.
+
+        Each installation becomes one external of its package, with the spec
+        and prefix recorded in the install database (see ``read_installs``).
+
+        Args:
+            installs (Iterable[InstalledSpec]): The installations to add.
+            buildable (bool): Whether Spack may still build the packages from
+                source. Defaults to False.
+            override (bool): Whether the packages override the definitions of
+                lower configuration scopes.
+            on_duplicate (str): What to do with an installation whose spec is
+                already an external, as for ``add_package``. Defaults to
+                "skip", which keeps the first of several installations of the
+                same spec.
+
+        Returns:
+            int: The number of new externals.
+
+        Raises:
+            ValueError: If ``on_duplicate`` is unknown, or if it is "error"
+                and an external already exists.
+        """
+        check_duplicate_policy(on_duplicate)
+        added = 0
+        for install in installs:
+            known = len(self.config.get(install.name, {}).get("externals", ()))
+            self.add_package(
+                name=install.name,
+                spec=install.spec,
+                buildable=buildable,
+                modules=[],
+                prefix=install.prefix,
+                extra_attributes={},
+                override=override,
+                on_duplicate=on_duplicate,
+            )
+            added += len(self.config[install.name]["externals"]) - known
+        return added
+
+    def scan_extra_attributes(
+        self,
+        *,
+        names: Optional[Iterable[str]] = None,
+        cache: Optional[DetectionCache] = None,
+        max_workers: int = 16,
+    ) -> List[str]:
+        """
+        Fill ``extra_attributes`` from the pkg-config and CMake files of the
+        externals' prefixes.
+
+        Prefixes are scanned in parallel (see ``scan_prefixes``). Each
+        external gets the ``headers`` and ``libs`` of the package file named
+        after its package; attributes that are already set are kept. Matrix
+        externals are not scanned.
+
+        Args:
+            names (Optional[Iterable[str]]): Packages to scan. Defaults to
+                every package with externals.
+            cache (Optional[DetectionCache]): Cache for the scan of each prefix.
+            max_workers (int): Number of prefixes scanned at the same time.
+
+        Returns:
+            List[str]: Externals whose spec declares another version than their
+            package file records.
+        """
+        names = set(names) if names is not None else None
+        externals = [
+            (name, external)
+            for name, entry in self.config.items()
+            if isinstance(entry, dict) and (names is None or name in names)
+            for external in entry.get("externals", ())
+        ]
+        scans = scan_prefixes(
+            (external["prefix"] for _, external in externals),
+            cache=cache,
+            max_workers=max_workers,
+        )
+        problems = []
+        for name, external in externals:
+            config = select_config(name, scans[external["prefix"]])
+            if config is None:
+                continue
+            declared = parse_spec(external["spec"]).version
+            if not version_matches(declared, config.version):
+                problems.append(
+                    f"External '{external['spec']}' declares version {declared}, "
+                    f"but {config.path} records {config.version}."
+                )
+            current = external.get("extra_attributes", {})
+            attributes = {**extra_attributes(config), **current}
+            if attributes != current:
+                external["extra_attributes"] = self._interned.mapping(attributes)
+        return problems
+
+    def _position(self, name: str, key: str) -> Optional[int]:
+        """
+        Return the position of the external of ``name`` with canonical spec ``key``.
+
+        Positions are rebuilt from the ``externals`` list if it was changed
+        directly through ``config``: when the external at the cached position
+        has another spec, or, for a spec that is not cached, when any spec
+        differs from the ones last seen.
+        """
+        externals = self.config[name]["externals"]
+        positions = self._positions.get(name)
+        if positions is not None:
+            position = positions.get(key)
+            if position is not None:
+                if (
+                    position < len(externals)
+                    and canonical_spec(externals[position].get("spec", "")) == key
+                ):
+                    return position
+            elif self._specs[name] == [external.get("spec") for external in externals]:
+                return None
+        positions = self._positions[name] = {}
+        for index, external in enumerate(externals):
+            positions.setdefault(canonical_spec(external.get("spec", "")), index)
+        self._specs[name] = [external.get("spec") for external in externals]
+        return positions.get(key)
+
+    def add_matrix(
+        self,
+        *,
+        name: str,
+        matrix: ToolchainMatrix,
+        buildable: bool,
+        override: bool,
+    ) -> None:
+        """
+        Add one external of a package for every combination of a toolchain matrix.
+
+        The matrix template takes the same fields as ``add_package``: ``spec``
+        and ``prefix`` are required, ``modules`` and ``extra_attributes`` are
+        optional. Externals are rendered from the template whenever the
+        configuration is validated or written and are never stored.
+
+        Example:
+            >>> packages.add_matrix(
+            ...     name="netcdf-c",
+            ...     matrix=ToolchainMatrix(
+            ...         axes={"compiler": ["gcc@12.2.0", "intel@2023.2.1"],
+            ...               "mpi": ["cray-mpich@8.1.25"]},
+            ...         template={
+            ...             "spec": "netcdf-c@4.9.2%{compiler} ^{mpi}",
+            ...             "prefix": "/opt/{compiler.name}/{compiler.version}/netcdf-c",
+            ...             "modules": ["{compiler.name}/{compiler.version}"],
+            ...         },
+            ...     ),
+            ...     buildable=False,
+            ...     override=False,
+            ... )
+
+        Args:
+            name (str): Logical package name (e.g., "netcdf-c").
+            matrix (ToolchainMatrix): Axes and external template to expand.
+            buildable (bool): Whether Spack may build this package from source.
+            override (bool): If True, replace any existing package definition
+                for this name in lower configuration scopes.
+
+        Raises:
+            ValueError: If ``name`` is already defined or the template does not
+                provide the fields of an external.
+        """
+        if name in self.config or name in self.matrices:
+            raise ValueError(f"Package '{name}' is already defined.")
+        missing = {"spec", "prefix"} - set(matrix.template)
+        if missing:
+            raise ValueError(f"Matrix template is missing {sorted(missing)}.")
+        unknown = set(matrix.template) - _MATRIX_KEYS
+        if unknown:
+            raise ValueError(f"Matrix template has unknown fields {sorted(unknown)}.")
+        self.matrices[name] = MatrixPackage(matrix, buildable, override)
+        if self.index is not None:
+            for external in self._matrix_externals(matrix):
+                self.index.add(
+                    self._index_entry(name, external), modules=external.get("modules")
+                )
+
+    @staticmethod
+    def _external(
+        *,
+        spec: str,
+        prefix: str,
+        modules: Optional[List[str]],
+        extra_attributes: Optional[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """Build an ``externals`` list item, leaving out empty optional fields."""
+        external: Dict[str, Any] = {"spec": spec, "prefix": prefix}
         if modules:
-            package_entry["externals"][0]["modules"] = modules
+            external["modules"] = modules
         if extra_attributes:
-            package_entry["externals"][0]["extra_attributes"] = extra_attributes
+            external["extra_attributes"] = extra_attributes
+        return external
+
+    def _matrix_externals(self, matrix: ToolchainMatrix) -> Iterator[Dict[str, Any]]:
+        """Yield the externals of a matrix package one combination at a time."""
+        for rendered in matrix.expand():
+            yield self._external(
+                spec=rendered["spec"],
+                prefix=rendered["prefix"],
+                modules=rendered.get("modules"),
+                extra_attributes=rendered.get("extra_attributes"),
+            )
+
+    @staticmethod
+    def _matrix_header(package: MatrixPackage) -> Dict[str, Any]:
+        """Return the settings of a matrix package that precede its externals."""
+        header: Dict[str, Any] = {"buildable": package.buildable}
+        if package.override:
+            header["override"] = True
+        return header
+
+    @staticmethod
+    def _index_entry(name: str, external: Dict[str, Any]) -> IndexEntry:
+        """Return the index entry describing an external of package ``name``."""
+        return IndexEntry(
+            kind="external",
+            name=name,
+            spec=external["spec"],
+            prefix=external.get("prefix", ""),
+        )
+
+    def non_buildable(self) -> List[str]:
+        """
+        Return the packages Spack may not build from source.
+
+        Returns:
+            List[str]: Names of packages, matrix packages and virtuals with
+            ``buildable: false``.
+        """
+        names = [
+            name
+            for name, entry in self.config.items()
+            if isinstance(entry, dict) and entry.get("buildable") is False
+        ]
+        names.extend(
+            name for name, package in self.matrices.items() if not package.buildable
+        )
+        return names
+
+    def iter_paths(self) -> Iterator[Tuple[str, str]]:
+        """
+        Yield the absolute paths referenced by the externals.
+
+        Covers every prefix and every absolute path among the extra attributes
+        (e.g. ``headers``), including those of matrix externals.
+
+        Yields:
+            Tuple[str, str]: The path and the entry that references it (e.g.,
+            ``"packages.netcdf-c.externals[0].prefix"``).
+        """
+        positions: Dict[str, int] = {}
+        for name, external in self.iter_externals():
+            position = positions[name] = positions.get(name, -1) + 1
+            yield from referenced_paths(
+                {
+                    "prefix": external.get("prefix"),
+                    "extra_attributes": external.get("extra_attributes"),
+                },
+                f"packages.{name}.externals[{position}]",
+            )
+
+    def iter_externals(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Yield every external, including those of matrix packages.
+
+        Yields:
+            Tuple[str, Dict[str, Any]]: The package name and the external as
+            rendered (``spec``, ``prefix`` and optional fields).
+        """
+        for name, entry in self.config.to_dict().items():
+            for external in entry.get("externals", ()):
+                yield name, external
+        for name, package in self.matrices.items():
+            for external in self._matrix_externals(package.matrix):
+                yield name, external
+
+    def _shard_key(
+        self, name: str, prefix: Optional[str], by: str, roots: Dict[str, str]
+    ) -> str:
+        """Return the shard of package ``name`` whose first prefix is ``prefix``."""
+        if by == "prefix":
+            if name == "all":
+                return "all"
+            first = name[0].lower()
+            return first if first.isalnum() else "_"
+        found, depth = "site", -1
+        for root_name, root in roots.items():
+            root = root.rstrip("/")
+            inside = prefix is not None and (
+                prefix == root or prefix.startswith(root + "/")
+            )
+            if inside and len(root) > depth:
+                found, depth = root_name, len(root)
+        return found
+
+    def shard(
+        self, *, by: str = "prefix", roots: Optional[Dict[str, str]] = None
+    ) -> Dict[str, "Packages"]:
+        """
+        Split the configuration into smaller configurations, by package.
+
+        Every package (and every matrix package) is kept whole in exactly one
+        shard, so the shards can be included side by side without Spack
+        merging a package across files. Shard names only depend on the
+        packages they hold, so a change to one package changes one shard.
+
+        Args:
+            by (str): "prefix" to group packages by the first character of
+                their name (with ``all`` on its own), or "upstream" to group
+                them by the root in ``roots`` holding the prefix of their first
+                external. Packages outside every root go to the "site" shard.
+            roots (Optional[Dict[str, str]]): Install roots by name, for
+                sharding by upstream.
+
+        Returns:
+            Dict[str, Packages]: The shards, by name, in sorted order. They
+            share their entries with this configuration.
+
+        Raises:
+            ValueError: If ``by`` is unknown.
+        """
+        if by not in ("prefix", "upstream"):
+            raise ValueError(
+                f"Unknown sharding '{by}'. Expected 'prefix' or 'upstream'."
+            )
+        roots = roots or {}
+        shards: Dict[str, Packages] = {}
+        for name, entry in self.config.items():
+            externals = entry.get("externals") if isinstance(entry, dict) else None
+            prefix = externals[0].get("prefix") if externals else None
+            key = self._shard_key(name, prefix, by, roots)
+            shards.setdefault(key, Packages()).config[name] = entry
+        for name, package in self.matrices.items():
+            first = next(iter(self._matrix_externals(package.matrix)), None)
+            key = self._shard_key(name, first and first["prefix"], by, roots)
+            shards.setdefault(key, Packages()).matrices[name] = package
+        return dict(sorted(shards.items()))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return the package configuration as a plain dictionary.
+
+        Externals of matrix packages are fully expanded, so prefer ``write``
+        over rendering this dictionary for very large matrices.
+
+        Returns:
+            Dict[str, Any]: The configuration under a top-level ``packages`` key.
+        """
+        packages = self.config.to_dict()
+        for name, package in self.matrices.items():
+            packages[name] = self._matrix_header(package)
+            packages[name]["externals"] = list(self._matrix_externals(package.matrix))
+        return {"packages": packages}
+
+    def validate(self) -> None:
+        """
+        Validate the configuration against the bundled Spack schema.
+
+        Matrix externals are generated and checked one at a time.
+
+        Raises:
+            SchemaValidationError: If the configuration does not match the schema.
+        """
+        packages = self.config.to_dict()
+        for name, package in self.matrices.items():
+            packages[name] = self._matrix_header(package)
+        validate_section(self.section, {"packages": packages})
+        validate_external = get_validator("packages:external")
+        for name, package in self.matrices.items():
+            for position, external in enumerate(self._matrix_externals(package.matrix)):
+                try:
+                    validate_external(external)
+                except SchemaValidationError as error:
+                    error.path[:0] = ["packages", name, "externals", position]
+                    raise
+
+    def iter_lines(
+        self,
+        *,
+        spack_format: bool = True,
+        anchors: bool = False,
+        executor: Optional[Executor] = None,
+    ) -> Iterator[str]:
+        """
+        Yield the lines of the rendered configuration.
+
+        Packages stored in ``config`` are rendered at once; matrix packages
+        follow, rendered one external at a time. Joining the lines with
+        ``write_lines`` gives the same text as ``to_yaml(self.to_dict())``, except
+        that matrix externals never use anchors.
+
+        Args:
+            spack_format (bool, optional): Whether to format the YAML output in
+                Spack style. Defaults to True.
+            anchors (bool, optional): Whether to emit YAML anchors and aliases for
+                repeated subtrees of the packages stored in ``config``.
+            executor (Optional[Executor]): Executor rendering the entries in
+                parallel. The lines are the same with or without it.
 
-    def write(self, *, path: Path, spack_format: bool = True) -> None:
+        Yields:
+            str: One line of YAML.
+        """
+        if not self.config.empty():
+            config_dict = {"packages": self.config.to_dict()}
+            yield from to_yaml_lines(
+                config_dict,
+                spack_format=spack_format,
+                anchors=anchors,
+                executor=executor,
+            )
+        elif self.matrices:
+            yield "packages:"
+        for name, package in self.matrices.items():
+            header = {"packages": {name: self._matrix_header(package)}}
+            yield from to_yaml(header, spack_format=spack_format).splitlines()[1:]
+            yield "    externals:"
+            yield from map_fragment_lines(
+                (
+                    {"packages": {name: {"externals": [external]}}}
+                    for external in self._matrix_externals(package.matrix)
+                ),
+                3,
+                executor=executor,
+            )
+
+    def render(
+        self,
+        *,
+        spack_format: bool = True,
+        anchors: bool = False,
+        executor: Optional[Executor] = None,
+    ) -> Optional[bytes]:
+        """
+        Render the package configuration as the content of a YAML file. The
+        configuration is validated against the bundled Spack schema before
+        anything is rendered.
+
+        Args:
+            spack_format (bool, optional): Whether to format the YAML output in Spack style.
+                                           Defaults to True.
+            anchors (bool, optional): Whether to emit YAML anchors and aliases for
+                                      repeated subtrees such as module lists. Defaults
+                                      to False, which renders every value in full.
+            executor (Optional[Executor]): Executor rendering the packages in
+                parallel. The bytes are the same with or without it.
+
+        Returns:
+            Optional[bytes]: The encoded file, or None if the configuration is
+            empty.
+        """
+        if self.config.empty() and not self.matrices:
+            return None
+        self.validate()
+        return render_lines(
+            self.iter_lines(
+                spack_format=spack_format, anchors=anchors, executor=executor
+            ),
+            spack_format=spack_format,
+        )
+
+    def write(
+        self,
+        *,
+        path: Path,
+        spack_format: bool = True,
+        anchors: bool = False,
+        executor: Optional[Executor] = None,
+        if_changed: bool = False,
+    ) -> None:
         """
-        Write the package configuration to a YAML file. If the configuration is empty,
-        no file will be written.
+        Write the rendered package configuration to a YAML file. If the
+        configuration is empty, no file will be written.
 
         Args:
             path (str): The file path where the configuration will be saved.
             spack_format (bool, optional): Whether to format the YAML output in Spack style.
                                            Defaults to True.
+            anchors (bool, optional): Whether to emit YAML anchors and aliases for
+                                      repeated subtrees such as module lists. Defaults
+                                      to False, which writes every value in full.
+            executor (Optional[Executor]): Executor rendering the packages in
+                parallel. The file is the same with or without it.
+            if_changed (bool): Whether to leave ``path`` untouched if it already
+                holds the rendered configuration.
         """
-        if self.config.empty():
+        data = self.render(
+            spack_format=spack_format, anchors=anchors, executor=executor
+        )
+        if data is None:
             return
-        config_dict = {"packages": self.config.to_dict()}
-        with open(path, "w") as file:
-            file.write(to_yaml(config_dict, spack_format=spack_format))
+        if if_changed:
+            write_if_changed(path, data)
+        else:
+            Path(path).write_bytes(data)
@@ -0,0 +1,389 @@
+"""
+A local service rendering site configurations on request.
+
+Node provisioning asks for the same few site configurations over and over, one
+request per node. :class:`SiteService` builds each site once per variant (e.g.,
+node type), renders its files once, and keeps both in a bounded LRU cache.
+The service is exposed over HTTP on localhost or on a Unix socket using only
+the standard library:
+
+- ``GET /sites/<name>/<variant>/<file>`` returns one file (``packages.yaml``,
+  ``packages/a.yaml`` for sharded sites, ...).
+- ``GET /sites/<name>/<variant>/`` returns every file as an uncompressed tar
+  bundle.
+
+Every response carries an ``ETag`` with the SHA-256 digest of its body. A
+request whose ``If-None-Match`` header lists that tag gets ``304 Not
+Modified`` without a body, so clients only download configurations that
+changed.
+
+Example:
+    >>> service = SiteService({"casper": build_casper}, max_entries=16)
+    >>> server = service.http_server(port=8642)
+    >>> server.serve_forever()
+"""
+
+import hashlib
+import http.client
+import io
+import os
+import socket
+import socketserver
+import tarfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple, Union
+from urllib.parse import unquote, urlparse
+
+from spack_site_generator.site.site import Site
+
+#: Builds the site of a name for a variant (e.g., a node type).
+SiteBuilder = Callable[[str], Site]
+
+
+class UnknownSiteError(KeyError):
+    """Raised for a site name that has no registered builder."""
+
+
+def content_tag(data: bytes) -> str:
+    """Return the quoted entity tag of a response body."""
+    return f'"{hashlib.sha256(data).hexdigest()}"'
+
+
+@dataclass
+class RenderedSite:
+    """
+    A built site and its rendered files.
+
+    Attributes:
+        site (Site): The built site.
+        files (Dict[str, bytes]): File contents by path relative to the site
+            directory, in sorted order.
+        tags (Dict[str, str]): Entity tags of ``files``.
+        bundle (bytes): The files as an uncompressed tar archive.
+        bundle_tag (str): Entity tag of ``bundle``.
+    """
+
+    site: Site
+    files: Dict[str, bytes]
+    tags: Dict[str, str] = field(default_factory=dict)
+    bundle: bytes = b""
+    bundle_tag: str = ""
+
+
+def _bundle(name: str, files: Dict[str, bytes]) -> bytes:
+    """Return the files of a site as a reproducible tar archive."""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w", format=tarfile.USTAR_FORMAT) as tar:
+        for path, data in files.items():
+            info = tarfile.TarInfo(f"{name}/{path}")
+            info.size = len(data)
+            info.mode = 0o644
+            tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def render_site(site: Site) -> RenderedSite:
+    """
+    Render every file of a site into memory with ``Site.render``.
+
+    Args:
+        site (Site): The site to render.
+
+    Returns:
+        RenderedSite: The files, bundle and entity tags.
+    """
+    files = dict(sorted(site.render().items()))
+    rendered = RenderedSite(site=site, files=files)
+    rendered.tags = {path: content_tag(data) for path, data in files.items()}
+    rendered.bundle = _bundle(site.name, files)
+    rendered.bundle_tag = content_tag(rendered.bundle)
+    return rendered
+
+
+class SiteService(object):
+    """
+    Builds, renders and caches sites by name and variant.
+
+    Entries are built on first use and evicted least recently used first.
+    Concurrent requests for an entry that is not cached yet wait for a single
+    build instead of building it once each.
+
+    Attributes:
+        builders (Dict[str, SiteBuilder]): Site builders by site name.
+        max_entries (int): Number of (name, variant) entries kept.
+        hits (int): Requests answered from the cache.
+        misses (int): Requests that built an entry.
+    """
+
+    def __init__(
+        self,
+        builders: Optional[Dict[str, SiteBuilder]] = None,
+        *,
+        max_entries: int = 64,
+    ) -> None:
+        """
+        Initialize the service.
+
+        Args:
+            builders (Optional[Dict[str, SiteBuilder]]): Site builders by site
+                name. Each is called with the requested variant.
+            max_entries (int): Number of (name, variant) entries kept.
+
+        Raises:
+            ValueError: If ``max_entries`` is below 1.
+        """
+        if max_entries < 1:
+            raise ValueError("The cache must hold at least one entry.")
+        self.builders: Dict[str, SiteBuilder] = dict(builders or {})
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._cache: "OrderedDict[Tuple[str, str], RenderedSite]" = OrderedDict()
+        self._building: Dict[Tuple[str, str], threading.Lock] = {}
+        # Bumped by ``invalidate``, for every site and per site name, so builds
+        # started before an invalidation are not cached after it.
+        self._epoch = 0
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, builder: SiteBuilder) -> None:
+        """
+        Add or replace the builder of a site, dropping its cached variants.
+
+        Args:
+            name (str): The site name used in request paths.
+            builder (SiteBuilder): Builds the site for a variant.
+        """
+        with self._lock:
+            self.builders[name] = builder
+        self.invalidate(name)
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """
+        Drop cached entries so they are built again on the next request.
+
+        Builds already running when this is called are not cached.
+
+        Args:
+            name (Optional[str]): Site whose variants are dropped. Defaults to
+                every site.
+        """
+        with self._lock:
+            if name is None:
+                self._epoch += 1
+            else:
+                self._generations[name] = self._generations.get(name, 0) + 1
+            for key in [key for key in self._cache if name in (None, key[0])]:
+                del self._cache[key]
+
+    def _cached(self, key: Tuple[str, str]) -> Optional[RenderedSite]:
+        """Return a cached entry and mark it as recently used; needs the lock."""
+        rendered = self._cache.get(key)
+        if rendered is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+        return rendered
+
+    def rendered(self, name: str, variant: str) -> RenderedSite:
+        """
+        Return the rendered files of a site variant, building them if needed.
+
+        Args:
+            name (str): The site name.
+            variant (str): The variant passed to the site's builder.
+
+        Returns:
+            RenderedSite: The built site and its files.
+
+        Raises:
+            UnknownSiteError: If no builder is registered under ``name``.
+                Errors raised by the builder itself are passed on unchanged.
+        """
+        key = (name, variant)
+        with self._lock:
+            rendered = self._cached(key)
+            if rendered is not None:
+                return rendered
+            builder = self.builders.get(name)
+            if builder is None:
+                raise UnknownSiteError(name)
+            build_lock = self._building.setdefault(key, threading.Lock())
+        with build_lock:
+            try:
+                with self._lock:
+                    rendered = self._cached(key)
+                    if rendered is not None:
+                        return rendered
+                    builder = self.builders.get(name, builder)
+                    generation = (self._epoch, self._generations.get(name, 0))
+                rendered = render_site(builder(variant))
+                with self._lock:
+                    self.misses += 1
+                    # A site invalidated during the build is served to this
+                    # request only; the next one builds it again.
+                    if generation == (self._epoch, self._generations.get(name, 0)):
+                        self._cache[key] = rendered
+                        while len(self._cache) > self.max_entries:
+                            self._cache.popitem(last=False)
+            finally:
+                with self._lock:
+                    if self._building.get(key) is build_lock:
+                        del self._building[key]
+        return rendered
+
+    def http_server(
+        self, host: str = "127.0.0.1", port: int = 0
+    ) -> ThreadingHTTPServer:
+        """
+        Create an HTTP server for the service; call ``serve_forever`` on it.
+
+        Args:
+            host (str): Address to listen on. Defaults to localhost only.
+            port (int): Port to listen on; 0 picks a free port, available as
+                ``server.server_address[1]``.
+
+        Returns:
+            ThreadingHTTPServer: The bound server.
+        """
+        server = ThreadingHTTPServer((host, port), _Handler)
+        server.daemon_threads = True
+        server.service = self
+        return server
+
+    def unix_server(self, path: Union[str, Path]) -> "_UnixHTTPServer":
+        """
+        Create an HTTP server on a Unix socket; call ``serve_forever`` on it.
+
+        Args:
+            path (Union[str, Path]): Path of the socket. A stale socket file is
+                replaced.
+
+        Returns:
+            _UnixHTTPServer: The bound server.
+        """
+        path = os.fspath(path)
+        if os.path.exists(path):
+            os.unlink(path)
+        server = _UnixHTTPServer(path, _Handler)
+        server.service = self
+        return server
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """A threading HTTP server listening on a Unix socket."""
+
+    daemon_threads = True
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+def _matches(header: Optional[str], tag: str) -> bool:
+    """Whether an ``If-None-Match`` header lists ``tag``."""
+    if not header:
+        return False
+    tags = [item.strip() for item in header.split(",")]
+    return "*" in tags or tag in (
+        item[2:] if item.startswith("W/") else item for item in tags
+    )
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serves files and bundles of a :class:`SiteService`."""
+
+    protocol_version = "HTTP/1.1"
+
+    def address_string(self) -> str:
+        # Unix sockets have no client address.
+        return self.client_address[0] if self.client_address else "local"
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def _send(
+        self, status: int, body: bytes = b"", content_type: str = "text/plain"
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        parts = unquote(urlparse(self.path).path).strip("/").split("/", 3)
+        if len(parts) < 3 or parts[0] != "sites" or ".." in parts:
+            self._send(
+                HTTPStatus.NOT_FOUND, b"Expected /sites/<name>/<variant>/[file]\n"
+            )
+            return
+        name, variant = parts[1], parts[2]
+        try:
+            rendered = self.server.service.rendered(name, variant)
+        except UnknownSiteError:
+            self._send(HTTPStatus.NOT_FOUND, f"Unknown site '{name}'\n".encode())
+            return
+        except Exception as error:
+            self._send(
+                HTTPStatus.INTERNAL_SERVER_ERROR,
+                f"Building site '{name}' ({variant}) failed: {error}\n".encode(),
+            )
+            return
+        if len(parts) == 4 and parts[3]:
+            filename = parts[3]
+            if filename not in rendered.files:
+                self._send(
+                    HTTPStatus.NOT_FOUND, f"Unknown file '{filename}'\n".encode()
+                )
+                return
+            body, tag = rendered.files[filename], rendered.tags[filename]
+            content_type = "application/yaml"
+            if filename.endswith(".json"):
+                content_type = "application/json"
+        else:
+            body, tag, content_type = (
+                rendered.bundle,
+                rendered.bundle_tag,
+                "application/x-tar",
+            )
+        if _matches(self.headers.get("If-None-Match"), tag):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", tag)
+            self.end_headers()
+            return
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", tag)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    do_HEAD = do_GET
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """
+    An ``http.client`` connection over a Unix socket, for clients of
+    :meth:`SiteService.unix_server`.
+
+    Example:
+        >>> connection = UnixHTTPConnection("/run/ssg.sock")
+        >>> connection.request("GET", "/sites/casper/gpu/packages.yaml")
+    """
+
+    def __init__(self, path: Union[str, Path], timeout: float = 30.0) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = os.fspath(path)
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
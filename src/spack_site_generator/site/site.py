@@ -1,9 +1,74 @@
+import warnings
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
 
 from spack_site_generator.site import Compilers
 from spack_site_generator.site import Modules
 from spack_site_generator.site import Packages
 from spack_site_generator.site import Config
+from spack_site_generator.site import Mirrors
+from spack_site_generator.site import Upstreams
+from spack_site_generator.site import Concretizer
+from spack_site_generator.site.modules import ModuleTreePreview
+from spack_site_generator.site.upstreams import UpstreamStatus
+from spack_site_generator.site.abstract_site_config import AbstractSiteConfig
+from spack_site_generator.site.index import IndexEntry, SiteIndex
+from spack_site_generator.site import snapshot
+from spack_site_generator.utils.build_cache import BinarySpec
+from spack_site_generator.utils.detection_cache import DetectionCache
+from spack_site_generator.utils.manifest import write_manifest
+from spack_site_generator.utils.schema import validate_section
+from spack_site_generator.utils.spack_db import read_installs
+from spack_site_generator.utils.spack_yaml import to_yaml, write_if_changed
+from spack_site_generator.utils.path_check import (
+    SLOW_THRESHOLD,
+    TIMEOUT,
+    PathCheckError,
+    PathCheckReport,
+)
+from spack_site_generator.utils import path_check
+from spack_site_generator.utils import microarch
+
+#: Directory of the ``packages.yaml`` shards, relative to the site directory.
+SHARD_DIR = "packages"
+
+#: File listing the shards for Spack's ``include`` section.
+INCLUDE_FILE = "include.yaml"
+
+#: Attributes of the configuration sections of a site, in writing order.
+SECTIONS = (
+    "packages",
+    "compilers",
+    "modules",
+    "config",
+    "mirrors",
+    "upstreams",
+    "concretizer",
+)
+
+
+class _Section(object):
+    """
+    A site attribute holding a configuration section created on first access.
+
+    The created section is stored in the instance's ``__dict__``, which takes
+    precedence over this descriptor from then on.
+    """
+
+    def __init__(self, factory: Callable[["Site"], AbstractSiteConfig]) -> None:
+        self.factory = factory
+        self.name = ""
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, site: Optional["Site"], owner: Optional[type] = None) -> Any:
+        if site is None:
+            return self
+        section = site.__dict__[self.name] = self.factory(site)
+        return section
 
 
 class Site(object):
@@ -14,7 +79,8 @@ class Site(object):
     a computing environment (packages, compilers, modules, and global
     settings). Once defined, the site can be written to disk as a set of
     YAML files in the format Spack expects (``packages.yaml``,
-    ``compilers.yaml``, ``modules.yaml``, and ``config.yaml``).
+    ``compilers.yaml``, ``modules.yaml``, ``config.yaml``,
+    ``mirrors.yaml``, ``upstreams.yaml`` and ``concretizer.yaml``).
 
     Attributes:
         name (str): Name of the site, used as the directory name for the
@@ -24,31 +90,629 @@ class Site(object):
         compilers (Compilers): Collection of compiler definitions and paths.
         modules (Modules): Module system configuration (Lmod or Tcl).
         config (Config): Global configuration options (e.g., build jobs).
+        mirrors (Mirrors): Source mirrors and binary build caches.
+        upstreams (Upstreams): Shared Spack install trees reused by the site.
+        concretizer (Concretizer): Reuse and search-space settings of the
+            concretizer.
+        index (SiteIndex): Query index over the externals, compilers and
+            providers added through ``packages`` and ``compilers``.
+        detection_cache (Optional[DetectionCache]): Cache shared by the
+            discovery steps run for this site, if any.
+
+    Sections are created on first access, so a site only builds the sections
+    it uses.
     """
 
-    def __init__(self, name):
+    packages = _Section(lambda site: Packages(index=site.index))
+    compilers = _Section(lambda site: Compilers(index=site.index))
+    modules = _Section(lambda site: Modules())
+    config = _Section(lambda site: Config())
+    mirrors = _Section(lambda site: Mirrors())
+    upstreams = _Section(lambda site: Upstreams())
+    concretizer = _Section(lambda site: Concretizer())
+
+    def __init__(self, name, detection_cache: Optional[DetectionCache] = None):
         self.name = name
-        self.packages = Packages()
-        self.compilers = Compilers()
-        self.modules = Modules()
-        self.config = Config()
+        self.detection_cache = detection_cache
+        self.index = SiteIndex()
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        # Snapshots written before an attribute was added lack it; sections
+        # missing from a snapshot are created on first access.
+        defaults = Site(state.get("name", "")).__dict__
+        self.__dict__.update({**defaults, **state})
+
+    def sections(self) -> Dict[str, AbstractSiteConfig]:
+        """
+        Return the configuration sections of the site by file name.
+
+        Returns:
+            Dict[str, AbstractSiteConfig]: File names (e.g., "packages.yaml")
+            mapped to the sections written to them, in writing order.
+        """
+        return {
+            f"{section.section}.yaml": section
+            for section in (getattr(self, name) for name in SECTIONS)
+        }
+
+    def find_by_module(self, module: str) -> List[IndexEntry]:
+        """
+        Return the externals and compilers that load a module.
+
+        Args:
+            module (str): Module name (e.g., "cray-mpich/8.1.25").
+
+        Returns:
+            List[IndexEntry]: Matching entries, in insertion order.
+        """
+        return self.index.by_module(module)
+
+    def find_under_prefix(self, path: str) -> List[IndexEntry]:
+        """
+        Return the externals and compilers installed at or below a directory.
+
+        Args:
+            path (str): Directory to search (e.g., "/glade/u/apps/derecho/23.09").
+
+        Returns:
+            List[IndexEntry]: Matching entries, ordered by prefix (see
+            ``SiteIndex.under_prefix``).
+        """
+        return self.index.under_prefix(path)
+
+    def find_by_compiler(self, compiler: str) -> List[IndexEntry]:
+        """
+        Return the externals built with a compiler and the matching compilers.
+
+        Args:
+            compiler (str): Compiler as ``name`` or ``name@version``
+                (e.g., "gcc@12.2.0").
+
+        Returns:
+            List[IndexEntry]: Matching entries, in insertion order.
+        """
+        return self.index.by_compiler(compiler)
+
+    def find_providers(self, provider: str) -> List[str]:
+        """
+        Return the libraries configured for a virtual provider.
+
+        Args:
+            provider (str): The virtual name (e.g., "mpi").
+
+        Returns:
+            List[str]: Provider specs, most preferred first.
+        """
+        return self.index.providers(provider)
+
+    def available_binaries(self) -> Dict[str, Dict[str, List[BinarySpec]]]:
+        """
+        Return the externals that are available as binaries.
+
+        Every indexed external is looked up in the mirrors scanned with
+        ``mirrors.scan``.
+
+        Returns:
+            Dict[str, Dict[str, List[BinarySpec]]]: External specs mapped to
+            the matching binaries, by mirror name. Externals without a binary
+            are left out.
+        """
+        available = {}
+        for name in self.index.names():
+            for entry in self.index.entries_named(name):
+                if entry.kind != "external":
+                    continue
+                found = self.mirrors.find_binaries(entry.spec)
+                if found:
+                    available[entry.spec] = found
+        return available
+
+    def preview_module_tree(self, *, module_type: str = "lmod") -> ModuleTreePreview:
+        """
+        Preview the module tree ``modules`` generates for the site's externals.
+
+        The providers of the hierarchy levels are taken from ``packages``.
+
+        Args:
+            module_type (str): The module type to preview. Defaults to "lmod".
+
+        Returns:
+            ModuleTreePreview: The module directories and their sizes.
+        """
+        settings = self.modules.config.get("default", {}).get(module_type, {})
+        return self.modules.preview_tree(
+            specs=[external["spec"] for _, external in self.packages.iter_externals()],
+            providers={
+                virtual: self.find_providers(virtual)
+                for virtual in settings.get("hierarchy", ())
+            },
+            module_type=module_type,
+        )
+
+    def import_upstream(
+        self,
+        *,
+        name: str,
+        names: Optional[Iterable[str]] = None,
+        compiler: Optional[str] = None,
+        pattern: Optional[str] = None,
+        explicit: Optional[bool] = None,
+        buildable: bool = False,
+    ) -> int:
+        """
+        Add the installations of an upstream's install tree as externals.
+
+        The upstream's install database is streamed and filtered with
+        ``read_installs``, using the site's detection cache if any.
+
+        Args:
+            name (str): Name of an upstream added to ``upstreams``.
+            names (Optional[Iterable[str]]): Package names to import.
+            compiler (Optional[str]): Compiler to import, as ``name`` or
+                ``name@version``.
+            pattern (Optional[str]): Shell-style pattern the package names
+                must match (e.g., "netcdf-*").
+            explicit (Optional[bool]): Import only explicit (True) or only
+                implicit (False) installations.
+            buildable (bool): Whether Spack may still build the imported
+                packages from source. Defaults to False.
+
+        Returns:
+            int: The number of new externals.
+
+        Raises:
+            KeyError: If no upstream is named ``name``.
+            FileNotFoundError: If the upstream has no install database.
+            ValueError: If the database cannot be parsed.
+        """
+        upstream = self.upstreams.config.get(name)
+        if upstream is None:
+            raise KeyError(f"Site '{self.name}' has no upstream '{name}'.")
+        installs = read_installs(
+            upstream["install_tree"],
+            names=names,
+            compiler=compiler,
+            pattern=pattern,
+            explicit=explicit,
+            cache=self.detection_cache,
+        )
+        return self.packages.add_installs(installs=installs, buildable=buildable)
+
+    def scan_extra_attributes(
+        self, *, names: Optional[Iterable[str]] = None, max_workers: int = 16
+    ) -> List[str]:
+        """
+        Fill the externals' ``extra_attributes`` from their package files.
+
+        See ``Packages.scan_extra_attributes``; the site's detection cache is
+        used if any. Version mismatches are reported as warnings.
+
+        Args:
+            names (Optional[Iterable[str]]): Packages to scan. Defaults to
+                every package with externals.
+            max_workers (int): Number of prefixes scanned at the same time.
+
+        Returns:
+            List[str]: The version mismatches.
+        """
+        problems = self.packages.scan_extra_attributes(
+            names=names, cache=self.detection_cache, max_workers=max_workers
+        )
+        for problem in problems:
+            warnings.warn(f"Site '{self.name}': {problem}", RuntimeWarning)
+        return problems
+
+    def compute_extra_rpaths(self, *, max_workers: int = 16) -> Dict[str, List[str]]:
+        """
+        Add the directories of the compilers' runtime libraries to their
+        ``extra_rpaths``.
+
+        See ``Compilers.compute_extra_rpaths``; the site's detection cache is
+        used if any.
+
+        Args:
+            max_workers (int): Number of libraries read at the same time.
+
+        Returns:
+            Dict[str, List[str]]: The directories found, by compiler spec.
+        """
+        return self.compilers.compute_extra_rpaths(
+            cache=self.detection_cache, max_workers=max_workers
+        )
+
+    def check_upstreams(self) -> Dict[str, UpstreamStatus]:
+        """
+        Check the install database of every upstream.
+
+        Install counts are cached in ``detection_cache``, if the site has one.
+
+        Returns:
+            Dict[str, UpstreamStatus]: The state of each upstream, by name,
+            including the number of installs Spack can reuse from it.
+        """
+        return self.upstreams.check(cache=self.detection_cache)
+
+    def set_target(
+        self, *, target: Optional[str] = None, root: Union[str, Path] = "/"
+    ) -> str:
+        """
+        Build for a node's microarchitecture instead of its generic family.
+
+        Sets ``packages: all: target`` to the microarchitecture (e.g.,
+        "zen3") and the ``target`` of every stored compiler to its family
+        (e.g., "x86_64"), which is what Spack matches compilers against. For
+        partitions with different CPUs (e.g., the CPU and GPU nodes of a
+        cluster), create one site per partition and pass each the ``root`` of
+        a recorded node.
+
+        Args:
+            target (Optional[str]): A Spack target name. Detected from the
+                node described by ``root`` if not given.
+            root (Union[str, Path]): Root of the filesystem to read
+                ``/proc/cpuinfo`` and ``/sys`` from.
+
+        Returns:
+            str: The microarchitecture the site now targets.
+
+        Raises:
+            ValueError: If ``target`` is unknown or the node's CPU cannot be
+                detected.
+        """
+        if target is None:
+            target = microarch.detect_microarchitecture(root)
+        elif target not in microarch.TARGETS:
+            raise ValueError(f"Unknown target '{target}'.")
+        self.packages.set_target(target=target)
+        self.compilers.set_target(target=microarch.TARGETS[target].family)
+        return target
+
+    def apply_flag_profile(self, *, profile: str, target: Optional[str] = None) -> None:
+        """
+        Set the optimization flags of every compiler from a named profile.
+
+        For "tuned-target", the target defaults to the one set with
+        ``set_target``, or else to the microarchitecture of this node.
+        Compilers too old for the target are tuned for the newest ancestor they
+        support, which is reported as a warning.
+
+        Args:
+            profile (str): One of "portable", "tuned-native", "tuned-target"
+                or "debug".
+            target (Optional[str]): The Spack target (e.g., "zen3").
+
+        Raises:
+            ValueError: If the profile or target is unknown, or a compiler does
+                not support the profile at its version.
+        """
+        if profile == "tuned-target" and target is None:
+            targets = self.packages.config.get("all", {}).get("target")
+            target = targets[0] if targets else microarch.detect_microarchitecture()
+        for note in self.compilers.apply_flag_profile(profile=profile, target=target):
+            warnings.warn(f"Site '{self.name}': {note}", RuntimeWarning)
+
+    def check_concretizer(self) -> List[str]:
+        """
+        Check the concretizer's reuse settings against the rest of the site.
+
+        For example, reuse that excludes externals cannot work with packages
+        that are not buildable, and disabling reuse ignores the site's
+        upstreams and binary mirrors.
+
+        Returns:
+            List[str]: One message per inconsistency.
+        """
+        return self.concretizer.check(
+            non_buildable=self.packages.non_buildable(),
+            upstreams=list(self.upstreams.config),
+            binary_mirrors=self.mirrors.binary_mirrors(),
+        )
+
+    def referenced_paths(self) -> Dict[str, List[str]]:
+        """
+        Return the absolute paths referenced by the site.
+
+        Includes external prefixes, absolute extra attributes, compiler
+        executables and ``extra_rpaths``, also for matrix entries, and the
+        install trees and module roots of upstreams.
+
+        Returns:
+            Dict[str, List[str]]: Each path mapped to the entries that reference
+            it (e.g., ``["packages.netcdf-c.externals[0].prefix"]``).
+        """
+        references: Dict[str, List[str]] = {}
+        for section in (self.packages, self.compilers, self.upstreams):
+            for path, reference in section.iter_paths():
+                references.setdefault(path, []).append(reference)
+        return references
 
-    def write(self, *, path: Path) -> None:
+    def check_paths(
+        self,
+        *,
+        max_workers: int = 16,
+        timeout: float = TIMEOUT,
+        slow: float = SLOW_THRESHOLD,
+    ) -> PathCheckReport:
+        """
+        Check that every referenced path exists and is readable.
+
+        Paths are looked up in parallel; see
+        :func:`~spack_site_generator.utils.path_check.check_paths`.
+
+        Args:
+            max_workers (int): Number of lookups running at the same time.
+            timeout (float): Seconds after which a single lookup is abandoned.
+            slow (float): Seconds above which a lookup is reported as slow.
+
+        Returns:
+            PathCheckReport: The missing, unreadable, slow and timed out paths.
+        """
+        return path_check.check_paths(
+            self.referenced_paths(),
+            max_workers=max_workers,
+            timeout=timeout,
+            slow=slow,
+        )
+
+    def save_snapshot(
+        self,
+        path: Union[str, Path],
+        *,
+        sources: Iterable[Union[str, Path]] = (),
+        extra: Iterable[str] = (),
+    ) -> None:
+        """
+        Save the built site as a binary snapshot for fast reloading.
+
+        Args:
+            path (Union[str, Path]): Destination snapshot file.
+            sources (Iterable[Union[str, Path]]): Files the site was built from
+                (e.g., the generating script). Their content is fingerprinted.
+            extra (Iterable[str]): Additional values the site depends on.
+        """
+        snapshot.save_snapshot(
+            self, path, fingerprint=snapshot.source_fingerprint(sources, extra=extra)
+        )
+
+    @classmethod
+    def load_snapshot(
+        cls,
+        path: Union[str, Path],
+        *,
+        sources: Iterable[Union[str, Path]] = (),
+        extra: Iterable[str] = (),
+        rebuild: Optional[Callable[[], "Site"]] = None,
+    ) -> Optional["Site"]:
+        """
+        Load a site from a snapshot, rebuilding it if the snapshot is unusable.
+
+        A snapshot is unusable if it is missing, was written by an incompatible
+        version, or its fingerprint differs from the one of ``sources`` and
+        ``extra``. In that case the site is rebuilt with ``rebuild`` and a fresh
+        snapshot is saved in its place.
+
+        Example:
+            >>> site = Site.load_snapshot(
+            ...     "derecho.snapshot", sources=[__file__], rebuild=build_derecho
+            ... )
+
+        Args:
+            path (Union[str, Path]): The snapshot file.
+            sources (Iterable[Union[str, Path]]): Files the site is built from.
+            extra (Iterable[str]): Additional values the site depends on.
+            rebuild (Optional[Callable[[], Site]]): Builds the site from scratch.
+
+        Returns:
+            Optional[Site]: The loaded or rebuilt site, or None if the snapshot
+            is unusable and no ``rebuild`` callable was given.
+        """
+        sources = list(sources)
+        extra = list(extra)
+        fingerprint = snapshot.source_fingerprint(sources, extra=extra)
+        site = snapshot.load_snapshot(path, fingerprint=fingerprint)
+        if isinstance(site, cls):
+            return site
+        if rebuild is None:
+            return None
+        site = rebuild()
+        snapshot.save_snapshot(site, path, fingerprint=fingerprint)
+        return site
+
+    @staticmethod
+    def _render_executor(processes: Optional[int]) -> Optional[Executor]:
+        """Return a process pool for rendering, or None to render serially."""
+        if processes is None or processes <= 1:
+            return None
+        try:
+            return ProcessPoolExecutor(max_workers=processes)
+        except (OSError, NotImplementedError, ImportError):
+            # Some platforms and sandboxes cannot start worker processes.
+            return None
+
+    @staticmethod
+    def _render_section(
+        section: AbstractSiteConfig,
+        *,
+        anchors: bool,
+        executor: Optional[Executor],
+    ) -> Tuple[Optional[bytes], Optional[Executor]]:
+        """
+        Render one file of the site, returning it and the executor to use next.
+
+        The executor is dropped, and the file rendered again serially, if the
+        process pool breaks.
+        """
+        if not isinstance(section, (Packages, Compilers)):
+            return section.render(spack_format=True), executor
+        try:
+            return section.render(anchors=anchors, executor=executor), executor
+        except BrokenProcessPool:
+            executor.shutdown(wait=False, cancel_futures=True)
+            return section.render(anchors=anchors), None
+
+    @staticmethod
+    def _remove_stale_files(
+        site_dir: Path, files: Dict[str, Any], sharded: bool
+    ) -> None:
+        """Remove package files of a previous layout (sharded or not)."""
+        stale = [site_dir / INCLUDE_FILE]
+        if sharded:
+            stale.append(site_dir / "packages.yaml")
+        shard_dir = site_dir / SHARD_DIR
+        if shard_dir.is_dir():
+            stale.extend(shard_dir.glob("*.yaml"))
+        for path in stale:
+            if path.relative_to(site_dir).as_posix() not in files:
+                path.unlink(missing_ok=True)
+        if shard_dir.is_dir() and not any(shard_dir.iterdir()):
+            shard_dir.rmdir()
+
+    def render(
+        self,
+        *,
+        sections: Optional[Iterable[str]] = None,
+        anchors: bool = False,
+        processes: Optional[int] = None,
+        shard_packages: Optional[str] = None,
+    ) -> Dict[str, bytes]:
+        """
+        Render the site configuration in memory.
+
+        Only the requested sections are rendered (and, if they were never
+        accessed, created). The bytes are exactly those ``write`` stores on
+        disk.
+
+        Args:
+            sections (Optional[Iterable[str]]): Names of the sections to render
+                (e.g., "packages", "compilers"), as listed in ``SECTIONS``.
+                Defaults to every section.
+            anchors (bool): Whether ``packages.yaml`` and ``compilers.yaml``
+                use YAML anchors and aliases for repeated subtrees.
+            processes (Optional[int]): Number of worker processes rendering
+                ``packages.yaml`` and ``compilers.yaml``, as for ``write``.
+            shard_packages (Optional[str]): Render ``packages.yaml`` as
+                ``packages/<shard>.yaml`` files listed in ``include.yaml``, as
+                for ``write``.
+
+        Returns:
+            Dict[str, bytes]: File contents by path relative to the site
+            directory, in writing order. Empty sections are left out.
+
+        Raises:
+            ValueError: If an unknown section is requested.
+        """
+        names = SECTIONS if sections is None else tuple(sections)
+        unknown = sorted(set(names) - set(SECTIONS))
+        if unknown:
+            raise ValueError(f"Unknown site section(s): {', '.join(unknown)}.")
+        requested = [getattr(self, name) for name in SECTIONS if name in names]
+        files: Dict[str, bytes] = {}
+        executor = self._render_executor(processes)
+        try:
+            for section in requested:
+                if isinstance(section, Packages) and shard_packages is not None:
+                    roots = {
+                        name: upstream["install_tree"]
+                        for name, upstream in self.upstreams.config.items()
+                    }
+                    shards = section.shard(by=shard_packages, roots=roots)
+                    rendered = {
+                        f"{SHARD_DIR}/{name}.yaml": shard
+                        for name, shard in shards.items()
+                    }
+                else:
+                    rendered = {f"{section.section}.yaml": section}
+                for filename, part in rendered.items():
+                    data, executor = self._render_section(
+                        part, anchors=anchors, executor=executor
+                    )
+                    if data is not None:
+                        files[filename] = data
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        shard_files = [name for name in files if name.startswith(f"{SHARD_DIR}/")]
+        if shard_files:
+            config_dict = {"include": shard_files}
+            validate_section("include", config_dict)
+            files[INCLUDE_FILE] = to_yaml(config_dict).encode()
+        return files
+
+    def write(
+        self,
+        *,
+        path: Path,
+        anchors: bool = False,
+        manifest: bool = False,
+        check_paths: bool = False,
+        processes: Optional[int] = None,
+        shard_packages: Optional[str] = None,
+    ) -> None:
         """
         Write the site configuration to disk in Spack YAML format.
 
         This method generates a directory named after the site (``self.name``)
-        under the given ``path`` and writes the component configuration files:
-        ``packages.yaml``, ``compilers.yaml``, ``modules.yaml``, and
-        ``config.yaml``.
+        under the given ``path`` and stores the files returned by ``render``,
+        one per section (``packages.yaml``, ``compilers.yaml``,
+        ``modules.yaml``, ``config.yaml``, ``mirrors.yaml``, ``upstreams.yaml``
+        and ``concretizer.yaml``). Empty sections are skipped. Inconsistencies
+        found by ``check_concretizer`` are reported as warnings.
 
         Args:
             path (Path): Base path where the site directory will be created.
                 The site directory itself is named after ``self.name``.
+            anchors (bool): Whether ``packages.yaml`` and ``compilers.yaml``
+                use YAML anchors and aliases for repeated subtrees. Defaults to
+                False, which keeps the output alias-free.
+            manifest (bool): Whether to also write ``manifest.json``, recording
+                the size and SHA-256 digest of every written file, for later
+                verification of deployed copies.
+            check_paths (bool): Whether to check every referenced path with
+                ``check_paths`` before writing anything. Slow and timed out
+                paths are reported as warnings.
+            processes (Optional[int]): Number of worker processes rendering
+                ``packages.yaml`` and ``compilers.yaml`` in chunks of entries.
+                The files are byte-identical to serial rendering, which is used
+                when this is None or 1, or if the process pool cannot be started
+                or breaks.
+            shard_packages (Optional[str]): Split ``packages.yaml`` into
+                ``packages/<shard>.yaml`` files, grouped "by prefix" of the
+                package name or "by upstream" install tree holding the
+                externals (see ``Packages.shard``), and list them in
+                ``include.yaml``, relative to the site directory. Shards are
+                only rewritten when their content changes, so a small edit
+                touches one shard. Package files of the other layout left by
+                earlier writes are removed.
+
+        Raises:
+            PathCheckError: If ``check_paths`` is set and a referenced path is
+                missing or unreadable. No file is written in that case.
         """
+        if check_paths:
+            references = self.referenced_paths()
+            report = path_check.check_paths(references)
+            for line in report.describe(("timed_out", "slow"), references):
+                warnings.warn(f"Site '{self.name}': {line}", RuntimeWarning)
+            if not report.ok:
+                problems = report.describe(("missing", "unreadable"), references)
+                raise PathCheckError(
+                    f"Site '{self.name}' references {len(problems)} missing or "
+                    "unreadable path(s):\n  " + "\n  ".join(problems),
+                    report,
+                )
+        if not self.concretizer.config.empty():
+            for problem in self.check_concretizer():
+                warnings.warn(f"Site '{self.name}': {problem}", RuntimeWarning)
+        files = self.render(
+            anchors=anchors, processes=processes, shard_packages=shard_packages
+        )
         site_dir = Path(path) / self.name
         site_dir.mkdir(parents=True, exist_ok=True)
-        self.packages.write(path=site_dir / "packages.yaml", spack_format=True)
-        self.compilers.write(path=site_dir / "compilers.yaml", spack_format=True)
-        self.modules.write(path=site_dir / "modules.yaml", spack_format=True)
-        self.config.write(path=site_dir / "config.yaml", spack_format=True)
+        self._remove_stale_files(site_dir, files, shard_packages is not None)
+        for filename, data in files.items():
+            if filename.startswith(f"{SHARD_DIR}/") or filename == INCLUDE_FILE:
+                (site_dir / filename).parent.mkdir(exist_ok=True)
+                write_if_changed(site_dir / filename, data)
+            else:
+                (site_dir / filename).write_bytes(data)
+        if manifest:
+            write_manifest(site_dir, list(files), name=self.name)
@@ -0,0 +1,136 @@
+"""
+Binary snapshots of built sites.
+
+Building a large site (running discovery, parsing specs and filling every
+``AutoDict``) can take much longer than loading the finished object. A
+snapshot stores a built site as a pickle (protocol 5) behind a small
+versioned header that carries a fingerprint of the sources the site was built
+from. Loading a snapshot whose header or fingerprint does not match returns
+None, so callers fall back to rebuilding.
+
+Snapshots are pickles: only load snapshots written by a trusted process.
+"""
+
+import hashlib
+import os
+import pickle
+import struct
+import tempfile
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Iterable, Optional, Union
+
+MAGIC = b"SSGSNAP\0"
+SNAPSHOT_VERSION = 1
+PICKLE_PROTOCOL = 5
+
+# Magic, snapshot version, pickle protocol, fingerprint (SHA-256 digest).
+_HEADER = struct.Struct(f">{len(MAGIC)}sHH32s")
+
+
+def _library_version() -> str:
+    """Return the installed version of the generator, if it is installed."""
+    try:
+        return metadata.version("spack_site_generator")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def source_fingerprint(
+    sources: Iterable[Union[str, Path]] = (), *, extra: Iterable[str] = ()
+) -> bytes:
+    """
+    Fingerprint the inputs a site is built from.
+
+    The fingerprint covers the snapshot format, the generator version, the
+    path and content of every source file (e.g. the script that builds the
+    site) and any extra strings (e.g. a variant name). Missing source files
+    contribute a marker instead of their content.
+
+    Args:
+        sources (Iterable[Union[str, Path]]): Files the site is built from.
+        extra (Iterable[str]): Additional values the site depends on.
+
+    Returns:
+        bytes: A SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{SNAPSHOT_VERSION}\0{_library_version()}\0".encode())
+    for source in sources:
+        digest.update(os.fsencode(source) + b"\0")
+        try:
+            digest.update(Path(source).read_bytes())
+        except FileNotFoundError:
+            digest.update(b"\0missing\0")
+        digest.update(b"\0")
+    for value in extra:
+        digest.update(value.encode() + b"\0")
+    return digest.digest()
+
+
+def save_snapshot(obj: Any, path: Union[str, Path], *, fingerprint: bytes) -> None:
+    """
+    Write a snapshot of ``obj``.
+
+    The snapshot is written to a temporary file and moved into place, so
+    concurrent readers never see a partial snapshot.
+
+    Args:
+        obj (Any): The object to store (normally a ``Site``).
+        path (Union[str, Path]): Destination file.
+        fingerprint (bytes): The source fingerprint to store with the object.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    header = _HEADER.pack(MAGIC, SNAPSHOT_VERSION, PICKLE_PROTOCOL, fingerprint)
+    fd, temporary = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(header)
+            pickle.dump(obj, file, protocol=PICKLE_PROTOCOL)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def load_snapshot(path: Union[str, Path], *, fingerprint: bytes) -> Optional[Any]:
+    """
+    Load a snapshot if it is compatible and up to date.
+
+    Args:
+        path (Union[str, Path]): The snapshot file.
+        fingerprint (bytes): The fingerprint of the current sources.
+
+    Returns:
+        Optional[Any]: The stored object, or None if the file is missing,
+        written by an incompatible version, built from different sources or
+        cannot be unpickled.
+    """
+    try:
+        with open(path, "rb") as file:
+            header = file.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                return None
+            magic, version, protocol, stored = _HEADER.unpack(header)
+            if (
+                magic != MAGIC
+                or version != SNAPSHOT_VERSION
+                or protocol > pickle.HIGHEST_PROTOCOL
+                or stored != fingerprint
+            ):
+                return None
+            return pickle.load(file)
+    except FileNotFoundError:
+        return None
+    except (
+        pickle.UnpicklingError,
+        EOFError,
+        AttributeError,
+        ImportError,
+        IndexError,
+        TypeError,
+        ValueError,
+    ):
+        # Truncated or written against classes that have since changed.
+        return None
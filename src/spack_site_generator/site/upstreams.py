@@ -0,0 +1,145 @@
+import os
+from typing import Any, Dict, Iterator, NamedTuple, Optional, Tuple
+
+from spack_site_generator.utils.autodict import AutoDict
+from spack_site_generator.utils.detection_cache import DetectionCache
+from spack_site_generator.utils.path_check import referenced_paths
+from spack_site_generator.utils.spack_db import count_installs, database_path
+from spack_site_generator.utils.spack_yaml import to_yaml
+from spack_site_generator.utils.schema import validate_section
+from spack_site_generator.site.abstract_site_config import AbstractSiteConfig
+
+
+class UpstreamStatus(NamedTuple):
+    """
+    The state of an upstream installation.
+
+    Attributes:
+        name (str): Name of the upstream.
+        database (str): Path of the upstream's install database.
+        exists (bool): Whether the install database exists and can be read.
+        installs (int): Number of installed specs Spack can reuse from the
+            upstream.
+        error (Optional[str]): Why the database could not be read, if it
+            could not.
+    """
+
+    name: str
+    database: str
+    exists: bool
+    installs: int
+    error: Optional[str]
+
+
+class Upstreams(AbstractSiteConfig):
+    """
+    Represents the upstream configuration (``upstreams.yaml``) of a Spack site.
+
+    Upstreams register whole Spack install trees, such as a center-wide
+    software stack, so Spack reuses everything installed there instead of
+    rebuilding it.
+
+    Attributes:
+        config (AutoDict): A dictionary-like structure that stores upstream
+            configurations.
+    """
+
+    section = "upstreams"
+
+    def __init__(self) -> None:
+        """
+        Initialize an empty upstream configuration.
+        """
+        self.config: AutoDict = AutoDict()
+
+    def add_upstream(
+        self,
+        *,
+        name: str,
+        install_tree: str,
+        modules: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """
+        Register a Spack install tree as an upstream.
+
+        Example:
+            >>> upstreams.add_upstream(
+            ...     name="derecho-23.09",
+            ...     install_tree="/glade/u/apps/derecho/23.09/spack/opt/spack",
+            ...     modules={"lmod": "/glade/u/apps/derecho/modules/23.09"},
+            ... )
+
+        Args:
+            name (str): Name of the upstream.
+            install_tree (str): The root of the upstream's install tree.
+            modules (Optional[Dict[str, str]]): Module roots of the upstream by
+                module type (e.g., ``{"lmod": "/path/to/modules"}``).
+        """
+        upstream = self.config[name]
+        upstream["install_tree"] = install_tree
+        if modules:
+            upstream["modules"] = dict(modules)
+
+    def check(
+        self, *, cache: Optional[DetectionCache] = None
+    ) -> Dict[str, UpstreamStatus]:
+        """
+        Check the install database of every upstream.
+
+        Args:
+            cache (Optional[DetectionCache]): Cache for the install counts,
+                keyed on each database file.
+
+        Returns:
+            Dict[str, UpstreamStatus]: The state of each upstream, by name.
+        """
+        statuses = {}
+        for name, upstream in self.config.items():
+            database = os.fspath(database_path(upstream["install_tree"]))
+            try:
+                installs = count_installs(upstream["install_tree"], cache=cache)
+            except (OSError, ValueError) as error:
+                statuses[name] = UpstreamStatus(name, database, False, 0, str(error))
+            else:
+                statuses[name] = UpstreamStatus(name, database, True, installs, None)
+        return statuses
+
+    def iter_paths(self) -> Iterator[Tuple[str, str]]:
+        """
+        Yield the install trees and module roots of the upstreams.
+
+        Yields:
+            Tuple[str, str]: The path and the entry that references it (e.g.,
+            ``"upstreams.derecho.install_tree"``).
+        """
+        for name, upstream in self.config.items():
+            yield from referenced_paths(upstream.to_dict(), f"upstreams.{name}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return the upstream configuration as a plain dictionary.
+
+        Returns:
+            Dict[str, Any]: The configuration under a top-level ``upstreams`` key.
+        """
+        return {"upstreams": self.config.to_dict()}
+
+    def render(self, *, spack_format: bool = True) -> Optional[bytes]:
+        """
+        Render the upstream configuration as the content of a YAML file. The
+        configuration is validated against the bundled Spack schema before
+        anything is rendered.
+
+        Args:
+            spack_format (bool, optional): Whether to format the YAML output
+                in Spack style. Defaults to True.
+
+        Returns:
+            Optional[bytes]: The encoded file, or None if the configuration is
+            empty.
+        """
+        if self.config.empty():
+            return None
+        config_dict = self.to_dict()
+        validate_section(self.section, config_dict)
+        return to_yaml(config_dict, spack_format=spack_format).encode()
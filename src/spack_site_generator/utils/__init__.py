@@ -1,2 +1,21 @@
 from .autodict import AutoDict
-from .spack_yaml import convert_to_spack_yaml, to_yaml
+from .spack_yaml import (
+    convert_to_spack_yaml,
+    render_lines,
+    share_identical_subtrees,
+    to_yaml,
+    to_yaml_lines,
+)
+from .schema import SchemaValidationError, get_validator, validate_section
+from .intern import InternPool
+from .spec import ParsedSpec, canonical_spec, parse_spec
+from .detection_cache import DetectionCache, default_cache_path
+from .path_check import PathCheckError, PathCheckReport, check_paths
+from .build_cache import BinarySpec, MirrorIndex, scan_mirror
+from .spack_db import InstalledSpec, count_installs, database_path, read_installs
+from .resources import BuildJobsEstimate, estimate_build_jobs
+from .fs_bench import FilesystemBenchmark, benchmark_directories, benchmark_directory
+from .microarch import CpuInfo, detect_microarchitecture, parse_cpuinfo
+from .flag_profiles import PROFILES, ResolvedFlags, resolve_flags
+from .pkg_scan import PackageConfig, scan_prefix, scan_prefixes
+from .elf import ElfFile, minimal_rpaths, read_elf, runtime_rpaths
@@ -0,0 +1,248 @@
+"""
+Indexes of local Spack mirrors and binary build caches.
+
+A local mirror directory holds source archives, one directory per package
+(``<mirror>/zlib/zlib-1.3.tar.gz``), and a binary build cache under
+``<mirror>/build_cache`` with one ``*.spec.json`` (or signed
+``*.spec.json.sig``) file per binary package. :func:`scan_mirror` reads those
+files into a :class:`MirrorIndex` that answers which specs are available as
+binaries or sources without asking Spack.
+
+Scanning a build cache parses every spec file in it. Pass a
+:class:`DetectionCache` to reuse the parsed files until the build cache
+directory changes.
+"""
+
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Union
+
+from spack_site_generator.utils.detection_cache import DetectionCache
+from spack_site_generator.utils.spec import parse_spec
+
+BUILD_CACHE_DIR = "build_cache"
+
+_SPEC_SUFFIXES = (".spec.json", ".spec.json.sig")
+_HASH = re.compile(r"-([a-z2-7]{32})$")
+_ARCHIVE = re.compile(r"\.(tar(\.(gz|bz2|xz|zst))?|tgz|tbz2?|txz|zip)$")
+_SIGNED_BEGIN = "-----BEGIN PGP SIGNED MESSAGE-----"
+_SIGNATURE_BEGIN = "-----BEGIN PGP SIGNATURE-----"
+
+
+class BinarySpec(NamedTuple):
+    """
+    A binary package found in a build cache.
+
+    Attributes:
+        name (str): Package name (e.g., "netcdf-c").
+        version (str): Package version (e.g., "4.9.2").
+        compiler (Optional[str]): Compiler as ``name@version``, if recorded.
+        hash (str): The DAG hash of the spec.
+        path (str): The spec file the entry was read from.
+    """
+
+    name: str
+    version: str
+    compiler: Optional[str]
+    hash: str
+    path: str
+
+
+def _version_satisfies(version: Optional[str], wanted: Optional[str]) -> bool:
+    """Whether ``version`` equals ``wanted`` or is one of its sub-versions."""
+    if not wanted:
+        return True
+    if not version:
+        return False
+    return version == wanted or version.startswith(wanted + ".")
+
+
+def _compiler_satisfies(compiler: Optional[str], wanted: Optional[str]) -> bool:
+    """Whether ``compiler`` (``name@version``) satisfies ``wanted``."""
+    if not wanted:
+        return True
+    if not compiler:
+        return False
+    name, _, version = compiler.partition("@")
+    wanted_name, _, wanted_version = wanted.partition("@")
+    return name == wanted_name and _version_satisfies(version, wanted_version)
+
+
+@dataclass
+class MirrorIndex:
+    """
+    The contents of a local mirror.
+
+    Attributes:
+        root (str): The mirror directory.
+        binaries (Dict[str, List[BinarySpec]]): Binary packages by name.
+        sources (Dict[str, List[str]]): Versions of the source archives, by
+            package name.
+    """
+
+    root: str
+    binaries: Dict[str, List[BinarySpec]] = field(default_factory=dict)
+    sources: Dict[str, List[str]] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        """Return the number of binary packages."""
+        return sum(len(specs) for specs in self.binaries.values())
+
+    def find_binaries(self, spec: str) -> List[BinarySpec]:
+        """
+        Return the binaries that satisfy a spec.
+
+        Only the name, version and compiler of ``spec`` are compared; versions
+        match exactly or as a prefix (``@4.9`` matches ``4.9.2``).
+
+        Args:
+            spec (str): The spec to look up (e.g., "netcdf-c@4.9.2%gcc@12").
+
+        Returns:
+            List[BinarySpec]: Matching binaries.
+        """
+        parsed = parse_spec(spec)
+        return [
+            binary
+            for binary in self.binaries.get(parsed.name, ())
+            if _version_satisfies(binary.version, parsed.version)
+            and _compiler_satisfies(binary.compiler, parsed.compiler)
+        ]
+
+    def has_source(self, spec: str) -> bool:
+        """
+        Whether the mirror holds a source archive satisfying a spec.
+
+        Args:
+            spec (str): The spec to look up (e.g., "zlib@1.3").
+
+        Returns:
+            bool: True if a matching archive exists.
+        """
+        parsed = parse_spec(spec)
+        return any(
+            _version_satisfies(version, parsed.version)
+            for version in self.sources.get(parsed.name, ())
+        )
+
+
+def _unsign(text: str) -> str:
+    """Return the message of a PGP clear-signed text."""
+    if not text.startswith(_SIGNED_BEGIN):
+        return text
+    body = text.split("\n\n", 1)[1].split(_SIGNATURE_BEGIN, 1)[0]
+    # Clear-signing escapes lines starting with a dash as "- -".
+    return "\n".join(
+        line[2:] if line.startswith("- ") else line for line in body.splitlines()
+    )
+
+
+def read_spec_file(path: Union[str, Path]) -> Optional[BinarySpec]:
+    """
+    Read the root node of a build cache spec file.
+
+    Args:
+        path (Union[str, Path]): A ``*.spec.json`` or ``*.spec.json.sig`` file.
+
+    Returns:
+        Optional[BinarySpec]: The root package, or None if the file cannot be
+        parsed.
+    """
+    path = os.fspath(path)
+    try:
+        with open(path) as file:
+            nodes = json.loads(_unsign(file.read()))["spec"]["nodes"]
+    except (OSError, ValueError, KeyError, TypeError, IndexError):
+        return None
+    if not nodes:
+        return None
+    stem = os.path.basename(path)
+    for suffix in _SPEC_SUFFIXES:
+        if stem.endswith(suffix):
+            stem = stem[: -len(suffix)]
+    match = _HASH.search(stem)
+    root = next(
+        (node for node in nodes if match and node.get("hash") == match.group(1)),
+        nodes[0],
+    )
+    compiler = root.get("compiler")
+    if isinstance(compiler, dict) and compiler.get("name"):
+        compiler = f"{compiler['name']}@{compiler.get('version', '')}".rstrip("@")
+    else:
+        compiler = None
+    return BinarySpec(
+        name=root.get("name", ""),
+        version=str(root.get("version", "")),
+        compiler=compiler,
+        hash=root.get("hash", ""),
+        path=path,
+    )
+
+
+def _scan_binaries(build_cache: str) -> List[List[Any]]:
+    """Read every spec file of a build cache, in file name order."""
+    binaries = []
+    for entry in sorted(os.scandir(build_cache), key=lambda entry: entry.name):
+        if not entry.name.endswith(_SPEC_SUFFIXES) or not entry.is_file():
+            continue
+        binary = read_spec_file(entry.path)
+        if binary is not None and binary.name:
+            binaries.append(list(binary))
+    return binaries
+
+
+def _scan_sources(root: str) -> Dict[str, List[str]]:
+    """Return the versions of the source archives of a mirror, by package."""
+    sources = {}
+    for entry in sorted(os.scandir(root), key=lambda entry: entry.name):
+        if entry.name.startswith(("_", ".")) or entry.name == BUILD_CACHE_DIR:
+            continue
+        if not entry.is_dir():
+            continue
+        versions = []
+        for archive in sorted(os.listdir(entry.path)):
+            stem = _ARCHIVE.sub("", archive)
+            if stem != archive and stem.startswith(entry.name + "-"):
+                versions.append(stem[len(entry.name) + 1 :])
+        if versions:
+            sources[entry.name] = versions
+    return sources
+
+
+def scan_mirror(
+    root: Union[str, Path], *, cache: Optional[DetectionCache] = None
+) -> MirrorIndex:
+    """
+    Index the source archives and binary packages of a local mirror.
+
+    Args:
+        root (Union[str, Path]): The mirror directory.
+        cache (Optional[DetectionCache]): Cache for the parsed spec files,
+            keyed on the build cache directory, so adding or removing binaries
+            invalidates it. Source archives are only listed and never cached.
+
+    Returns:
+        MirrorIndex: The contents of the mirror.
+
+    Raises:
+        FileNotFoundError: If ``root`` is not a directory.
+    """
+    root = os.path.abspath(root)
+    if not os.path.isdir(root):
+        raise FileNotFoundError(f"Mirror directory '{root}' does not exist.")
+    index = MirrorIndex(root=root, sources=_scan_sources(root))
+    build_cache = os.path.join(root, BUILD_CACHE_DIR)
+    if not os.path.isdir(build_cache):
+        return index
+    if cache is None:
+        binaries = _scan_binaries(build_cache)
+    else:
+        binaries = cache.get_or_compute(
+            "build-cache", build_cache, lambda: _scan_binaries(build_cache)
+        )
+    for binary in map(BinarySpec._make, binaries):
+        index.binaries.setdefault(binary.name, []).append(binary)
+    return index
@@ -0,0 +1,315 @@
+"""
+A detection cache shared across processes, backed by a local SQLite file.
+
+Discovery steps (compiler probes, prefix scans, parsing modulefiles or Spack
+databases) produce results that only change when the inspected file or
+directory changes. :class:`DetectionCache` stores those results keyed by the
+inspected path and its modification time, so every process generating a site
+can reuse them.
+
+The database runs in WAL mode, so any number of readers proceed while one
+writer commits. Every process and thread opens its own connection, which
+makes a single cache safe to share across a process pool. Entries are
+evicted once they are older than ``max_age`` and, least recently used first,
+once the cache grows beyond ``max_bytes``.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+"""
+
+#: Refresh an entry's access time at most this often (seconds), to keep reads
+#: from turning into writes.
+_ACCESS_RESOLUTION = 60.0
+
+#: Check the eviction limits after this many writes from one process.
+_EVICT_EVERY = 256
+
+
+def default_cache_path() -> Path:
+    """
+    Return the default location of the detection cache.
+
+    ``$SPACK_SITE_GENERATOR_CACHE`` takes precedence, followed by
+    ``$XDG_CACHE_HOME/spack_site_generator/detection.sqlite`` and
+    ``~/.cache/spack_site_generator/detection.sqlite``.
+
+    Returns:
+        Path: The cache file path.
+    """
+    if os.environ.get("SPACK_SITE_GENERATOR_CACHE"):
+        return Path(os.environ["SPACK_SITE_GENERATOR_CACHE"])
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "spack_site_generator" / "detection.sqlite"
+
+
+def _mtime_ns(path: Union[str, Path]) -> Optional[int]:
+    """Return the modification time of ``path`` in nanoseconds, if it exists."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class DetectionCache(object):
+    """
+    A process-safe cache of discovery results.
+
+    Values must be JSON serializable and not None. Each value is stored under
+    a namespace (e.g. "spack-db") and the path it was computed from; a lookup
+    only hits if the path's modification time still matches the one recorded
+    when the value was stored. Keys that are not paths can be stored with
+    ``stat=False``, in which case they only expire by age.
+
+    Example:
+        >>> cache = DetectionCache()
+        >>> records = cache.get_or_compute(
+        ...     "spack-db", "/glade/u/apps/.../.spack-db/index.json", parse_db
+        ... )
+
+    Attributes:
+        path (Path): The SQLite database file.
+        max_age (float): Seconds after which an entry is evicted.
+        max_bytes (int): Total size of stored values above which the least
+            recently used entries are evicted.
+        timeout (float): Seconds to wait for a lock held by another writer.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        *,
+        max_age: float = 30 * 24 * 3600.0,
+        max_bytes: int = 256 * 1024 * 1024,
+        timeout: float = 30.0,
+    ) -> None:
+        """
+        Open (and create if needed) a detection cache.
+
+        Args:
+            path (Optional[Union[str, Path]]): The SQLite database file.
+                Defaults to :func:`default_cache_path`.
+            max_age (float): Seconds after which an entry is evicted.
+            max_bytes (int): Size limit for the stored values, in bytes.
+            timeout (float): Seconds to wait for a lock held by another writer.
+        """
+        self.path = Path(path) if path is not None else default_cache_path()
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._local = threading.local()
+        self._writes = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Connections belong to the process and thread that opened them.
+        state = self.__dict__.copy()
+        del state["_local"]
+        state["_writes"] = 0
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, reopening it after a fork."""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+        connection = sqlite3.connect(
+            self.path, timeout=self.timeout, isolation_level=None
+        )
+        connection.execute(f"PRAGMA busy_timeout = {int(self.timeout * 1000)}")
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.executescript(_SCHEMA)
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+    def close(self) -> None:
+        """Close the calling thread's connection."""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            connection.close()
+        self._local.connection = None
+
+    def get(
+        self, namespace: str, path: Union[str, Path], *, stat: bool = True
+    ) -> Optional[Any]:
+        """
+        Look up a cached value.
+
+        Args:
+            namespace (str): The kind of result (e.g., "pkg-scan").
+            path (Union[str, Path]): The path (or key) the value belongs to.
+            stat (bool): Whether the entry is only valid while the path's
+                modification time is unchanged.
+
+        Returns:
+            Optional[Any]: The cached value, or None on a miss.
+        """
+        mtime_ns = _mtime_ns(path) if stat else 0
+        if mtime_ns is None:
+            return None
+        key = os.fspath(path)
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT value, mtime_ns, created, accessed FROM entries "
+            "WHERE namespace = ? AND key = ?",
+            (namespace, key),
+        ).fetchone()
+        if row is None:
+            return None
+        value, stored_mtime_ns, created, accessed = row
+        now = time.time()
+        if stored_mtime_ns != mtime_ns or now - created > self.max_age:
+            return None
+        if now - accessed > _ACCESS_RESOLUTION:
+            connection.execute(
+                "UPDATE entries SET accessed = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, key),
+            )
+        return json.loads(value)
+
+    def put(
+        self,
+        namespace: str,
+        path: Union[str, Path],
+        value: Any,
+        *,
+        stat: bool = True,
+    ) -> None:
+        """
+        Store a value.
+
+        Values computed for a path that no longer exists are not stored.
+
+        Args:
+            namespace (str): The kind of result (e.g., "pkg-scan").
+            path (Union[str, Path]): The path (or key) the value belongs to.
+            value (Any): A JSON-serializable value.
+            stat (bool): Whether the entry is only valid while the path's
+                modification time is unchanged.
+        """
+        mtime_ns = _mtime_ns(path) if stat else 0
+        if mtime_ns is None:
+            return
+        encoded = json.dumps(value, separators=(",", ":")).encode()
+        now = time.time()
+        self._connection().execute(
+            "INSERT OR REPLACE INTO entries "
+            "(namespace, key, mtime_ns, value, size, created, accessed) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (namespace, os.fspath(path), mtime_ns, encoded, len(encoded), now, now),
+        )
+        self._writes += 1
+        if self._writes % _EVICT_EVERY == 0:
+            self.evict()
+
+    def get_or_compute(
+        self,
+        namespace: str,
+        path: Union[str, Path],
+        compute: Callable[[], Any],
+        *,
+        stat: bool = True,
+    ) -> Any:
+        """
+        Return a cached value, computing and storing it on a miss.
+
+        Args:
+            namespace (str): The kind of result (e.g., "pkg-scan").
+            path (Union[str, Path]): The path (or key) the value belongs to.
+            compute (Callable[[], Any]): Computes the value on a miss.
+            stat (bool): Whether the entry is only valid while the path's
+                modification time is unchanged.
+
+        Returns:
+            Any: The cached or freshly computed value.
+        """
+        value = self.get(namespace, path, stat=stat)
+        if value is None:
+            value = compute()
+            self.put(namespace, path, value, stat=stat)
+        return value
+
+    def evict(self, now: Optional[float] = None) -> int:
+        """
+        Remove expired entries, then the least recently used ones above the
+        size limit.
+
+        Args:
+            now (Optional[float]): Current time, as returned by ``time.time()``.
+
+        Returns:
+            int: The number of removed entries.
+        """
+        now = time.time() if now is None else now
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            removed = connection.execute(
+                "DELETE FROM entries WHERE created < ?", (now - self.max_age,)
+            ).rowcount
+            (total,) = connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+            excess = total - self.max_bytes
+            if excess > 0:
+                victims = []
+                for namespace, key, size in connection.execute(
+                    "SELECT namespace, key, size FROM entries ORDER BY accessed"
+                ):
+                    victims.append((namespace, key))
+                    excess -= size
+                    if excess <= 0:
+                        break
+                connection.executemany(
+                    "DELETE FROM entries WHERE namespace = ? AND key = ?", victims
+                )
+                removed += len(victims)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return removed
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        """
+        Remove every entry, or every entry of one namespace.
+
+        Args:
+            namespace (Optional[str]): The namespace to clear.
+        """
+        if namespace is None:
+            self._connection().execute("DELETE FROM entries")
+        else:
+            self._connection().execute(
+                "DELETE FROM entries WHERE namespace = ?", (namespace,)
+            )
+
+    def __len__(self) -> int:
+        """Return the number of stored entries."""
+        (count,) = self._connection().execute("SELECT COUNT(*) FROM entries").fetchone()
+        return count
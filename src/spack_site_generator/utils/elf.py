@@ -0,0 +1,335 @@
+"""
+Reading the dynamic section of ELF shared libraries, without external tools.
+
+Binaries built by a compiler need its runtime libraries (``libstdc++.so.6``,
+``libgfortran.so.5``, ...) at run time. Spack adds a compiler's
+``extra_rpaths`` to everything it builds, so the right copies are found on
+compute nodes without ``LD_LIBRARY_PATH``. This module finds the directories
+those libraries live in: :func:`read_elf` reads the ``SONAME``, ``NEEDED``,
+``RUNPATH`` and ``RPATH`` entries of a library from a memory map, touching
+only the headers and the dynamic section, and :func:`runtime_rpaths` walks a
+compiler installation, reads its libraries on a thread pool and picks the
+fewest directories that provide every runtime library and the dependencies
+those cannot find through their own ``RUNPATH``.
+"""
+
+import mmap
+import os
+import re
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Union
+
+from spack_site_generator.utils.detection_cache import DetectionCache
+
+#: Base names of the compiler runtime libraries that need an rpath.
+RUNTIME_LIBRARIES = frozenset(
+    {
+        # GCC
+        "libstdc++",
+        "libgfortran",
+        "libgcc_s",
+        "libquadmath",
+        "libgomp",
+        "libatomic",
+        # Intel
+        "libifcore",
+        "libifcoremt",
+        "libifport",
+        "libimf",
+        "libintlc",
+        "libirng",
+        "libsvml",
+        "libiomp5",
+        # NVIDIA HPC SDK
+        "libnvc",
+        "libnvf",
+        "libnvcpumath",
+        "libnvhpcatm",
+        "libnvomp",
+        # LLVM
+        "libc++",
+        "libc++abi",
+        "libomp",
+        "libflang_rt.runtime",
+    }
+)
+
+_MAGIC = b"\x7fELF"
+_PT_LOAD = 1
+_PT_DYNAMIC = 2
+_DT_NULL = 0
+_DT_NEEDED = 1
+_DT_STRTAB = 5
+_DT_STRSZ = 10
+_DT_SONAME = 14
+_DT_RPATH = 15
+_DT_RUNPATH = 29
+
+# Header, program header and dynamic entry layouts by ELF class.
+_LAYOUTS = {
+    1: ("HHIIIIIHHHHHH", "IIIIIIII", "iI"),
+    2: ("HHIQQQIHHHHHH", "IIQQQQQQ", "qQ"),
+}
+
+_SHARED_LIBRARY = re.compile(r"^lib.+\.so(\.\d+)*$")
+
+
+class ElfFile(NamedTuple):
+    """
+    The dynamic linking information of an ELF file.
+
+    Attributes:
+        path (str): The file that was read.
+        elf_class (int): 32 or 64.
+        machine (int): The ``e_machine`` of the file (e.g., 62 for x86_64).
+        soname (Optional[str]): The ``SONAME``, if any.
+        needed (Tuple[str, ...]): The ``NEEDED`` libraries, in order.
+        runpath (Tuple[str, ...]): The ``RUNPATH`` directories, unexpanded.
+        rpath (Tuple[str, ...]): The ``RPATH`` directories, unexpanded.
+    """
+
+    path: str
+    elf_class: int
+    machine: int
+    soname: Optional[str]
+    needed: Tuple[str, ...]
+    runpath: Tuple[str, ...]
+    rpath: Tuple[str, ...]
+
+
+def _string(data: mmap.mmap, offset: int, end: int) -> str:
+    """Return the NUL-terminated string at ``offset`` of a string table."""
+    stop = data.find(b"\0", offset, end)
+    if stop < 0:
+        raise ValueError("Unterminated string.")
+    return data[offset:stop].decode("utf-8", "replace")
+
+
+def _parse(data: mmap.mmap, path: str) -> Optional[ElfFile]:
+    """Parse the headers and dynamic section of a mapped ELF file."""
+    if data[:4] != _MAGIC or data[4] not in _LAYOUTS or data[5] not in (1, 2):
+        return None
+    elf_class = 32 if data[4] == 1 else 64
+    order = "<" if data[5] == 1 else ">"
+    header, program, dynamic = (order + layout for layout in _LAYOUTS[data[4]])
+    fields = struct.unpack_from(header, data, 16)
+    machine, phoff, phentsize, phnum = fields[1], fields[4], fields[8], fields[9]
+
+    loads: List[Tuple[int, int, int]] = []
+    dynamic_segment: Optional[Tuple[int, int]] = None
+    for index in range(phnum):
+        segment = struct.unpack_from(program, data, phoff + index * phentsize)
+        if elf_class == 64:
+            p_type, _, offset, vaddr, _, filesz = segment[:6]
+        else:
+            p_type, offset, vaddr, _, filesz = segment[:5]
+        if p_type == _PT_LOAD:
+            loads.append((vaddr, offset, filesz))
+        elif p_type == _PT_DYNAMIC:
+            dynamic_segment = (offset, filesz)
+    if dynamic_segment is None:
+        return ElfFile(path, elf_class, machine, None, (), (), ())
+
+    entries: List[Tuple[int, int]] = []
+    size = struct.calcsize(dynamic)
+    offset, filesz = dynamic_segment
+    for position in range(offset, offset + filesz - size + 1, size):
+        tag, value = struct.unpack_from(dynamic, data, position)
+        if tag == _DT_NULL:
+            break
+        entries.append((tag, value))
+    values = dict(entries)
+    if _DT_STRTAB not in values:
+        return ElfFile(path, elf_class, machine, None, (), (), ())
+    # The string table is given as a virtual address; map it to the file.
+    address = values[_DT_STRTAB]
+    table = next(
+        (
+            file_offset + address - vaddr
+            for vaddr, file_offset, load_size in loads
+            if vaddr <= address < vaddr + load_size
+        ),
+        address,
+    )
+    end = table + values.get(_DT_STRSZ, len(data) - table)
+
+    def strings(tag: int) -> List[str]:
+        return [
+            _string(data, table + value, end) for key, value in entries if key == tag
+        ]
+
+    def paths(tag: int) -> Tuple[str, ...]:
+        return tuple(
+            directory
+            for value in strings(tag)
+            for directory in value.split(":")
+            if directory
+        )
+
+    sonames = strings(_DT_SONAME)
+    return ElfFile(
+        path=path,
+        elf_class=elf_class,
+        machine=machine,
+        soname=sonames[0] if sonames else None,
+        needed=tuple(strings(_DT_NEEDED)),
+        runpath=paths(_DT_RUNPATH),
+        rpath=paths(_DT_RPATH),
+    )
+
+
+def read_elf(path: Union[str, Path]) -> Optional[ElfFile]:
+    """
+    Read the dynamic linking information of an ELF file.
+
+    The file is memory-mapped, so only the pages holding the headers, the
+    dynamic section and the strings it refers to are read from disk.
+
+    Args:
+        path (Union[str, Path]): The file (e.g., a shared library).
+
+    Returns:
+        Optional[ElfFile]: The information, or None if the file cannot be read
+        or is not a valid ELF file.
+    """
+    path = os.fspath(path)
+    try:
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size < 64:
+                return None
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return _parse(data, path)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def _expand(directory: str, origin: str) -> str:
+    """Expand ``$ORIGIN`` in a ``RUNPATH`` or ``RPATH`` directory."""
+    for variable in ("${ORIGIN}", "$ORIGIN"):
+        directory = directory.replace(variable, origin)
+    return os.path.normpath(directory)
+
+
+def _base_name(soname: str) -> str:
+    """Return the name of a library without ``.so`` and version suffixes."""
+    return soname.split(".so", 1)[0]
+
+
+def minimal_rpaths(
+    libraries: Dict[str, ElfFile],
+    *,
+    runtime: Iterable[str] = RUNTIME_LIBRARIES,
+) -> List[str]:
+    """
+    Return the fewest directories providing a set of runtime libraries.
+
+    A directory provides a library if it holds an entry named after the
+    library's ``SONAME``, which is how the dynamic loader looks it up. The
+    runtime libraries found in ``libraries`` are required, and so are the
+    ``NEEDED`` libraries they depend on that are provided by ``libraries``
+    but not found through their own ``RPATH`` or ``RUNPATH``. Directories are
+    then chosen greedily, most required libraries first.
+
+    Args:
+        libraries (Dict[str, ElfFile]): Libraries by the path they were found
+            at (symbolic links included), as read by ``read_elf``.
+        runtime (Iterable[str]): Base names of the runtime libraries (e.g.,
+            "libstdc++").
+
+    Returns:
+        List[str]: The directories, in the order they were chosen.
+    """
+    runtime = set(runtime)
+    providers: Dict[str, List[str]] = {}
+    files: Dict[str, ElfFile] = {}
+    for path, info in sorted(libraries.items()):
+        name = os.path.basename(path)
+        if (info.soname or name) != name:
+            continue
+        providers.setdefault(name, []).append(os.path.dirname(path))
+        files.setdefault(name, info)
+
+    required: Set[str] = set()
+    queue = [name for name in providers if _base_name(name) in runtime]
+    while queue:
+        name = queue.pop()
+        if name in required:
+            continue
+        required.add(name)
+        info, origin = files[name], providers[name][0]
+        searched = {_expand(d, origin) for d in info.runpath + info.rpath}
+        for dependency in info.needed:
+            if dependency in providers and searched.isdisjoint(providers[dependency]):
+                queue.append(dependency)
+
+    covers: Dict[str, Set[str]] = {}
+    for name in required:
+        for directory in providers[name]:
+            covers.setdefault(directory, set()).add(name)
+    chosen: List[str] = []
+    missing = set(required)
+    while missing:
+        directory = min(covers, key=lambda d: (-len(covers[d] & missing), len(d), d))
+        chosen.append(directory)
+        missing -= covers[directory]
+    return chosen
+
+
+def _runtime_rpaths(prefix: str, elf_class: int, max_workers: int) -> List[str]:
+    """Walk a prefix, read its libraries and return their minimal rpaths."""
+    found: Dict[str, str] = {}
+    for directory, _, names in os.walk(prefix):
+        for name in names:
+            if _SHARED_LIBRARY.match(name):
+                path = os.path.join(directory, name)
+                found[path] = os.path.realpath(path)
+    targets = sorted(set(found.values()))
+    if not targets:
+        return []
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(targets)), thread_name_prefix="elf"
+    ) as executor:
+        read = dict(zip(targets, executor.map(read_elf, targets)))
+    libraries = {
+        path: read[target]
+        for path, target in found.items()
+        if read[target] is not None and read[target].elf_class == elf_class
+    }
+    return minimal_rpaths(libraries)
+
+
+def runtime_rpaths(
+    prefix: Union[str, Path],
+    *,
+    elf_class: int = 64,
+    cache: Optional[DetectionCache] = None,
+    max_workers: int = 16,
+) -> List[str]:
+    """
+    Compute the ``extra_rpaths`` of a compiler installation.
+
+    Every ``lib*.so*`` file below ``prefix`` is read on a thread pool; files
+    reached through several symbolic links are read once.
+
+    Args:
+        prefix (Union[str, Path]): The compiler installation prefix.
+        elf_class (int): Only libraries of this class (32 or 64) are used, so
+            the 32-bit copies of multilib installations are ignored.
+        cache (Optional[DetectionCache]): Cache for the result, stored under
+            the "elf-rpaths-<class>" namespace and keyed on the prefix.
+        max_workers (int): Number of files read at the same time.
+
+    Returns:
+        List[str]: The directories, as returned by ``minimal_rpaths``. Empty
+        if ``prefix`` holds no runtime library.
+    """
+    prefix = os.path.abspath(prefix)
+    if cache is None or not os.path.isdir(prefix):
+        return _runtime_rpaths(prefix, elf_class, max_workers)
+    return cache.get_or_compute(
+        f"elf-rpaths-{elf_class}",
+        prefix,
+        lambda: _runtime_rpaths(prefix, elf_class, max_workers),
+    )
@@ -0,0 +1,315 @@
+"""
+Named optimization flag profiles for Spack compilers.
+
+A profile turns a compiler (``gcc@12.2.0``) and, for tuned builds, a Spack
+target (``zen3``) into the ``cflags``, ``cxxflags`` and ``fflags`` of a
+``compilers.yaml`` entry:
+
+- ``portable``: moderate optimization that runs on any node of the family.
+- ``tuned-native``: full optimization for whatever CPU runs the build.
+- ``tuned-target``: full optimization for a named microarchitecture, so that
+  builds on a login node still target the compute nodes.
+- ``debug``: no optimization, debug information and runtime checks.
+
+Target flags come from a table of the first compiler version supporting each
+target, in the spirit of ``archspec``. A compiler too old for a target falls
+back to the nearest ancestor it supports (e.g., ``zen3`` to ``zen2`` with
+GCC 10.2); a compiler supporting none of them is rejected.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from spack_site_generator.utils.microarch import TARGETS, ancestors
+from spack_site_generator.utils.spec import parse_spec
+
+PROFILES = ("portable", "tuned-native", "tuned-target", "debug")
+
+_LANGUAGES = ("cflags", "cxxflags", "fflags")
+
+#: Target -> compiler -> (first supporting version, flags).
+_TARGET_FLAGS: Dict[str, Dict[str, Tuple[str, str]]] = {
+    "x86_64": {
+        "gcc": ("4.2", "-march=x86-64 -mtune=generic"),
+        "clang": ("3.9", "-march=x86-64 -mtune=generic"),
+        "aocc": ("2.2", "-march=x86-64 -mtune=generic"),
+        "oneapi": ("2021.1", "-march=x86-64 -mtune=generic"),
+        "intel": ("16.0", "-march=pentium4 -mtune=generic"),
+        "nvhpc": ("20.5", "-tp=px"),
+    },
+    "x86_64_v2": {
+        "gcc": ("11.1", "-march=x86-64-v2 -mtune=generic"),
+        "clang": ("12.0", "-march=x86-64-v2 -mtune=generic"),
+        "oneapi": ("2021.2", "-march=x86-64-v2 -mtune=generic"),
+    },
+    "x86_64_v3": {
+        "gcc": ("11.1", "-march=x86-64-v3 -mtune=generic"),
+        "clang": ("12.0", "-march=x86-64-v3 -mtune=generic"),
+        "oneapi": ("2021.2", "-march=x86-64-v3 -mtune=generic"),
+    },
+    "x86_64_v4": {
+        "gcc": ("11.1", "-march=x86-64-v4 -mtune=generic"),
+        "clang": ("12.0", "-march=x86-64-v4 -mtune=generic"),
+        "oneapi": ("2021.2", "-march=x86-64-v4 -mtune=generic"),
+    },
+    "nehalem": {
+        "gcc": ("4.9", "-march=nehalem -mtune=nehalem"),
+        "clang": ("3.9", "-march=nehalem -mtune=nehalem"),
+        "oneapi": ("2021.1", "-march=nehalem -mtune=nehalem"),
+        "intel": ("16.0", "-march=corei7 -mtune=corei7"),
+    },
+    "westmere": {
+        "gcc": ("4.9", "-march=westmere -mtune=westmere"),
+        "clang": ("3.9", "-march=westmere -mtune=westmere"),
+        "oneapi": ("2021.1", "-march=westmere -mtune=westmere"),
+        "intel": ("16.0", "-march=corei7 -mtune=corei7"),
+    },
+    "sandybridge": {
+        "gcc": ("4.9", "-march=sandybridge -mtune=sandybridge"),
+        "clang": ("3.9", "-march=sandybridge -mtune=sandybridge"),
+        "oneapi": ("2021.1", "-march=sandybridge -mtune=sandybridge"),
+        "intel": ("16.0", "-march=corei7-avx -mtune=corei7-avx"),
+        "nvhpc": ("20.5", "-tp=sandybridge"),
+    },
+    "ivybridge": {
+        "gcc": ("4.9", "-march=ivybridge -mtune=ivybridge"),
+        "clang": ("3.9", "-march=ivybridge -mtune=ivybridge"),
+        "oneapi": ("2021.1", "-march=ivybridge -mtune=ivybridge"),
+        "intel": ("16.0", "-march=core-avx-i -mtune=core-avx-i"),
+    },
+    "haswell": {
+        "gcc": ("4.9", "-march=haswell -mtune=haswell"),
+        "clang": ("3.9", "-march=haswell -mtune=haswell"),
+        "oneapi": ("2021.1", "-march=haswell -mtune=haswell"),
+        "intel": ("16.0", "-march=core-avx2 -mtune=core-avx2"),
+        "nvhpc": ("20.5", "-tp=haswell"),
+    },
+    "broadwell": {
+        "gcc": ("4.9", "-march=broadwell -mtune=broadwell"),
+        "clang": ("3.9", "-march=broadwell -mtune=broadwell"),
+        "oneapi": ("2021.1", "-march=broadwell -mtune=broadwell"),
+        "intel": ("18.0", "-march=broadwell -mtune=broadwell"),
+    },
+    "skylake": {
+        "gcc": ("6.0", "-march=skylake -mtune=skylake"),
+        "clang": ("3.9", "-march=skylake -mtune=skylake"),
+        "oneapi": ("2021.1", "-march=skylake -mtune=skylake"),
+        "intel": ("18.0", "-march=skylake -mtune=skylake"),
+        "nvhpc": ("20.5", "-tp=skylake"),
+    },
+    "skylake_avx512": {
+        "gcc": ("6.0", "-march=skylake-avx512 -mtune=skylake-avx512"),
+        "clang": ("3.9", "-march=skylake-avx512 -mtune=skylake-avx512"),
+        "oneapi": ("2021.1", "-march=skylake-avx512 -mtune=skylake-avx512"),
+        "intel": ("18.0", "-march=skylake-avx512 -mtune=skylake-avx512"),
+    },
+    "cascadelake": {
+        "gcc": ("9.0", "-march=cascadelake -mtune=cascadelake"),
+        "clang": ("8.0", "-march=cascadelake -mtune=cascadelake"),
+        "oneapi": ("2021.1", "-march=cascadelake -mtune=cascadelake"),
+        "intel": ("19.0.1", "-march=cascadelake -mtune=cascadelake"),
+    },
+    "icelake": {
+        "gcc": ("8.0", "-march=icelake-server -mtune=icelake-server"),
+        "clang": ("7.0", "-march=icelake-server -mtune=icelake-server"),
+        "oneapi": ("2021.1", "-march=icelake-server -mtune=icelake-server"),
+        "intel": ("18.0", "-march=icelake-server -mtune=icelake-server"),
+    },
+    "sapphirerapids": {
+        "gcc": ("11.1", "-march=sapphirerapids -mtune=sapphirerapids"),
+        "clang": ("12.0", "-march=sapphirerapids -mtune=sapphirerapids"),
+        "oneapi": ("2022.1", "-march=sapphirerapids -mtune=sapphirerapids"),
+        "intel": ("2021.2", "-march=sapphirerapids -mtune=sapphirerapids"),
+    },
+    "zen": {
+        "gcc": ("6.0", "-march=znver1 -mtune=znver1"),
+        "clang": ("4.0", "-march=znver1 -mtune=znver1"),
+        "aocc": ("2.2", "-march=znver1 -mtune=znver1"),
+        "intel": ("16.0", "-march=core-avx2 -mtune=core-avx2"),
+        "nvhpc": ("20.5", "-tp=zen"),
+    },
+    "zen2": {
+        "gcc": ("9.0", "-march=znver2 -mtune=znver2"),
+        "clang": ("9.0", "-march=znver2 -mtune=znver2"),
+        "aocc": ("2.2", "-march=znver2 -mtune=znver2"),
+        "nvhpc": ("20.5", "-tp=zen2"),
+    },
+    "zen3": {
+        "gcc": ("10.3", "-march=znver3 -mtune=znver3"),
+        "clang": ("12.0", "-march=znver3 -mtune=znver3"),
+        "aocc": ("3.0", "-march=znver3 -mtune=znver3"),
+        "nvhpc": ("21.11", "-tp=zen3"),
+    },
+    "zen4": {
+        "gcc": ("12.3", "-march=znver4 -mtune=znver4"),
+        "clang": ("16.0", "-march=znver4 -mtune=znver4"),
+        "aocc": ("4.0", "-march=znver4 -mtune=znver4"),
+        "nvhpc": ("23.9", "-tp=zen4"),
+    },
+    "aarch64": {
+        "gcc": ("4.8", "-march=armv8-a -mtune=generic"),
+        "clang": ("3.9", "-march=armv8-a -mtune=generic"),
+        "nvhpc": ("20.5", "-tp=px"),
+    },
+    "neoverse_n1": {
+        "gcc": ("9.0", "-mcpu=neoverse-n1"),
+        "clang": ("10.0", "-mcpu=neoverse-n1"),
+        "nvhpc": ("20.5", "-tp=neoverse-n1"),
+    },
+    "neoverse_v1": {
+        "gcc": ("11.1", "-mcpu=neoverse-v1"),
+        "clang": ("12.0", "-mcpu=neoverse-v1"),
+        "nvhpc": ("22.5", "-tp=neoverse-v1"),
+    },
+    "neoverse_v2": {
+        "gcc": ("13.1", "-mcpu=neoverse-v2"),
+        "clang": ("16.0", "-mcpu=neoverse-v2"),
+        "nvhpc": ("23.3", "-tp=neoverse-v2"),
+    },
+    "a64fx": {
+        "gcc": ("11.1", "-mcpu=a64fx"),
+        "clang": ("11.0", "-mcpu=a64fx"),
+    },
+    "ppc64le": {
+        "gcc": ("4.8", "-mcpu=powerpc64le -mtune=powerpc64le"),
+        "clang": ("3.9", "-mcpu=powerpc64le -mtune=powerpc64le"),
+    },
+    "power8le": {
+        "gcc": ("4.9", "-mcpu=power8 -mtune=power8"),
+        "clang": ("3.9", "-mcpu=power8 -mtune=power8"),
+    },
+    "power9le": {
+        "gcc": ("6.0", "-mcpu=power9 -mtune=power9"),
+        "clang": ("3.9", "-mcpu=power9 -mtune=power9"),
+    },
+    "power10le": {
+        "gcc": ("11.1", "-mcpu=power10 -mtune=power10"),
+        "clang": ("13.0", "-mcpu=power10 -mtune=power10"),
+    },
+}
+
+#: Compiler -> (first supporting version, flags) for the host's own CPU.
+_NATIVE_FLAGS: Dict[str, Tuple[str, str]] = {
+    "gcc": ("4.2", "-march=native -mtune=native"),
+    "clang": ("3.9", "-march=native"),
+    "aocc": ("2.2", "-march=native"),
+    "oneapi": ("2021.1", "-march=native"),
+    "intel": ("16.0", "-xHost"),
+    "nvhpc": ("20.5", "-tp=native"),
+}
+
+#: Compiler -> language -> flags of the ``debug`` profile.
+_DEBUG_FLAGS: Dict[str, Dict[str, str]] = {
+    "gcc": {
+        "cflags": "-O0 -g",
+        "cxxflags": "-O0 -g",
+        "fflags": "-O0 -g -fcheck=all -fbacktrace",
+    },
+    "intel": {
+        "cflags": "-O0 -g -traceback",
+        "cxxflags": "-O0 -g -traceback",
+        "fflags": "-O0 -g -traceback -check all",
+    },
+    "nvhpc": {
+        "cflags": "-O0 -g -traceback",
+        "cxxflags": "-O0 -g -traceback",
+        "fflags": "-O0 -g -traceback -Mbounds",
+    },
+    "cce": {"cflags": "-O0 -g", "cxxflags": "-O0 -g", "fflags": "-O0 -g -R bcps"},
+}
+_DEFAULT_DEBUG = {"cflags": "-O0 -g", "cxxflags": "-O0 -g", "fflags": "-O0 -g"}
+
+_OPTIMIZATION = {"portable": "-O2", "tuned-native": "-O3", "tuned-target": "-O3"}
+
+
+def _version(text: str) -> Tuple[int, ...]:
+    """Return the leading numeric components of a version (``"12.2.0"``)."""
+    return tuple(int(part) for part in re.findall(r"\d+", text.split("-")[0]))
+
+
+def _supports(version: Optional[str], minimum: str) -> bool:
+    """Whether ``version`` is at least ``minimum``; unknown versions are not."""
+    return version is not None and _version(version) >= _version(minimum)
+
+
+@dataclass
+class ResolvedFlags:
+    """
+    The flags of a profile for one compiler.
+
+    Attributes:
+        flags (Dict[str, str]): ``cflags``, ``cxxflags`` and ``fflags``.
+        target (Optional[str]): The target the flags optimize for, if the
+            profile is ``tuned-target``. It differs from the requested target
+            when the compiler is too old for it.
+        notes (List[str]): Explanations of fallbacks, if any.
+    """
+
+    flags: Dict[str, str]
+    target: Optional[str] = None
+    notes: List[str] = field(default_factory=list)
+
+
+def _target_flags(
+    compiler: str, name: str, version: Optional[str], target: str
+) -> Tuple[str, str]:
+    """Return the flags and actual target of the nearest supported target."""
+    for candidate in [target] + ancestors(target):
+        entry = _TARGET_FLAGS.get(candidate, {}).get(name)
+        if entry is not None and _supports(version, entry[0]):
+            return entry[1], candidate
+    raise ValueError(f"Compiler '{compiler}' cannot optimize for target '{target}'.")
+
+
+def resolve_flags(
+    *, profile: str, compiler: str, target: Optional[str] = None
+) -> ResolvedFlags:
+    """
+    Return the flags of a profile for a compiler.
+
+    Args:
+        profile (str): One of ``PROFILES``.
+        compiler (str): The compiler spec (e.g., "gcc@12.2.0").
+        target (Optional[str]): A Spack target name (e.g., "zen3"); required
+            for ``tuned-target``.
+
+    Returns:
+        ResolvedFlags: The flags, and the target they were built for.
+
+    Raises:
+        ValueError: If the profile or target is unknown, or if the compiler
+            (at its version) does not support the profile's flags.
+    """
+    if profile not in PROFILES:
+        raise ValueError(
+            f"Unknown flag profile '{profile}'. Expected one of {PROFILES}."
+        )
+    parsed = parse_spec(compiler)
+    name = "clang" if parsed.name == "llvm" else parsed.name
+    if profile == "debug":
+        return ResolvedFlags(flags=dict(_DEBUG_FLAGS.get(name, _DEFAULT_DEBUG)))
+
+    optimization = _OPTIMIZATION[profile]
+    if profile == "portable":
+        return ResolvedFlags(flags=dict.fromkeys(_LANGUAGES, optimization))
+
+    result = ResolvedFlags(flags={})
+    if profile == "tuned-native":
+        entry = _NATIVE_FLAGS.get(name)
+        if entry is None or not _supports(parsed.version, entry[0]):
+            raise ValueError(f"Compiler '{compiler}' cannot optimize for the host.")
+        arch = entry[1]
+    else:
+        if target is None or target not in TARGETS:
+            raise ValueError(
+                f"Profile 'tuned-target' needs a known target, not {target!r}."
+            )
+        arch, result.target = _target_flags(compiler, name, parsed.version, target)
+        if result.target != target:
+            result.notes.append(
+                f"{compiler} does not support {target}; optimizing for "
+                f"{result.target} instead."
+            )
+    result.flags = dict.fromkeys(_LANGUAGES, f"{optimization} {arch}")
+    return result
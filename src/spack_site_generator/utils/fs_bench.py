@@ -0,0 +1,233 @@
+"""
+Short filesystem microbenchmarks for placing Spack's stage and cache directories.
+
+Building in a node-local SSD or tmpfs is several times faster than building on
+a parallel filesystem, mostly because builds create and delete many small
+files. :func:`benchmark_directory` measures, within a fixed time budget, the
+small-file create/delete rate and the sequential write throughput of a
+directory together with its free space, so the fastest viable candidate can be
+chosen for each of Spack's directories.
+
+Candidates may use Spack's ``$tempdir`` and ``$user`` variables and
+environment variables. Candidates that do not exist yet are measured on their
+closest existing parent.
+"""
+
+import getpass
+import os
+import shutil
+import socket
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, Optional
+
+from spack_site_generator.utils.detection_cache import DetectionCache
+
+#: Seconds spent on each of the two measurements of a directory.
+TIME_LIMIT = 1.0
+
+_SMALL_FILE = b"\0" * 4096
+_CHUNK = b"\0" * (1 << 20)
+
+
+@dataclass
+class FilesystemBenchmark:
+    """
+    The measured performance of a directory.
+
+    Attributes:
+        path (str): The candidate directory, as given.
+        files_per_second (float): Small files created, written and deleted per
+            second.
+        bytes_per_second (float): Sequential write throughput, including the
+            final ``fsync``.
+        free_bytes (int): Free space available to the user.
+        fstype (str): Filesystem type (e.g., "tmpfs", "lustre"), if known.
+        error (Optional[str]): Why the directory could not be measured.
+    """
+
+    path: str
+    files_per_second: float = 0.0
+    bytes_per_second: float = 0.0
+    free_bytes: int = 0
+    fstype: str = ""
+    error: Optional[str] = None
+
+
+def expand_path(path: str) -> str:
+    """
+    Expand Spack's ``$tempdir`` and ``$user`` and environment variables.
+
+    Args:
+        path (str): A path as written in ``config.yaml``.
+
+    Returns:
+        str: The absolute path on this host.
+    """
+    for variable, value in (
+        ("$tempdir", tempfile.gettempdir()),
+        ("${tempdir}", tempfile.gettempdir()),
+        ("$user", getpass.getuser()),
+        ("${user}", getpass.getuser()),
+    ):
+        path = path.replace(variable, value)
+    return os.path.abspath(os.path.expanduser(os.path.expandvars(path)))
+
+
+def _existing_parent(path: str) -> str:
+    """Return ``path`` or its closest existing parent directory."""
+    while not os.path.isdir(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def filesystem_type(path: str, mounts: str = "/proc/mounts") -> str:
+    """
+    Return the type of the filesystem holding ``path``.
+
+    Args:
+        path (str): An existing path.
+        mounts (str): The mount table to read.
+
+    Returns:
+        str: The filesystem type of the longest matching mount point, or an
+        empty string if it cannot be determined.
+    """
+    path = os.path.realpath(path)
+    best, fstype = "", ""
+    try:
+        with open(mounts) as file:
+            for line in file:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mount_point = fields[1].replace("\\040", " ")
+                inside = path == mount_point or path.startswith(
+                    mount_point.rstrip("/") + "/"
+                )
+                if inside and len(mount_point) >= len(best):
+                    best, fstype = mount_point, fields[2]
+    except OSError:
+        return ""
+    return fstype
+
+
+def _small_files(directory: str, time_limit: float, count: int) -> float:
+    """Create, write and delete small files; return the rate per second."""
+    start = time.monotonic()
+    done = 0
+    while done < count:
+        name = os.path.join(directory, f"f{done}")
+        with open(name, "wb") as file:
+            file.write(_SMALL_FILE)
+        os.unlink(name)
+        done += 1
+        if time.monotonic() - start > time_limit:
+            break
+    return done / max(time.monotonic() - start, 1e-9)
+
+
+def _sequential(directory: str, time_limit: float, size: int) -> float:
+    """Write one large file sequentially; return the throughput in bytes/s."""
+    start = time.monotonic()
+    written = 0
+    with open(os.path.join(directory, "stream"), "wb") as file:
+        while written < size:
+            file.write(_CHUNK)
+            written += len(_CHUNK)
+            if time.monotonic() - start > time_limit:
+                break
+        file.flush()
+        os.fsync(file.fileno())
+    return written / max(time.monotonic() - start, 1e-9)
+
+
+def benchmark_directory(
+    path: str,
+    *,
+    time_limit: float = TIME_LIMIT,
+    file_count: int = 2000,
+    stream_bytes: int = 256 * 1024 * 1024,
+) -> FilesystemBenchmark:
+    """
+    Measure a candidate directory.
+
+    The measurements run in a temporary directory created inside the
+    candidate (or its closest existing parent) and removed afterwards. Each
+    of the two measurements stops after ``time_limit`` seconds.
+
+    Args:
+        path (str): The candidate directory. Spack and environment variables
+            are expanded.
+        time_limit (float): Seconds spent on each measurement at most.
+        file_count (int): Number of small files to create at most.
+        stream_bytes (int): Number of bytes to write sequentially at most.
+
+    Returns:
+        FilesystemBenchmark: The measurements, or the error that prevented them.
+    """
+    target = _existing_parent(expand_path(path))
+    result = FilesystemBenchmark(path=path, fstype=filesystem_type(target))
+    try:
+        result.free_bytes = shutil.disk_usage(target).free
+        scratch = tempfile.mkdtemp(dir=target, prefix=".ssg-bench-")
+    except OSError as error:
+        result.error = str(error)
+        return result
+    try:
+        result.files_per_second = _small_files(scratch, time_limit, file_count)
+        result.bytes_per_second = _sequential(scratch, time_limit, stream_bytes)
+    except OSError as error:
+        result.error = str(error)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return result
+
+
+def benchmark_directories(
+    paths: Iterable[str],
+    *,
+    cache: Optional[DetectionCache] = None,
+    hostname: Optional[str] = None,
+    time_limit: float = TIME_LIMIT,
+) -> Dict[str, FilesystemBenchmark]:
+    """
+    Measure candidate directories one after the other.
+
+    Directories are measured sequentially so the measurements do not compete
+    for the same disks. With a ``cache``, the speeds are stored per host and
+    directory and reused on later runs; free space is always measured again.
+    Failed measurements are not cached.
+
+    Args:
+        paths (Iterable[str]): The candidate directories.
+        cache (Optional[DetectionCache]): Cache for the measurements.
+        hostname (Optional[str]): Host the measurements are cached for.
+            Defaults to this host's name.
+        time_limit (float): Seconds spent on each measurement at most.
+
+    Returns:
+        Dict[str, FilesystemBenchmark]: The measurements, by candidate.
+    """
+    hostname = hostname or socket.gethostname()
+    results = {}
+    for path in dict.fromkeys(paths):
+        key = f"{hostname}:{expand_path(path)}"
+        cached = cache.get("fs-bench", key, stat=False) if cache is not None else None
+        if cached is not None:
+            result = FilesystemBenchmark(**{**cached, "path": path})
+            target = _existing_parent(expand_path(path))
+            try:
+                result.free_bytes = shutil.disk_usage(target).free
+            except OSError as error:
+                result.error = str(error)
+        else:
+            result = benchmark_directory(path, time_limit=time_limit)
+            if cache is not None and result.error is None:
+                cache.put("fs-bench", key, asdict(result), stat=False)
+        results[path] = result
+    return results
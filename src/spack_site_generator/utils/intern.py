@@ -0,0 +1,96 @@
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class InternPool:
+    """
+    Share repeated values between configuration entries.
+
+    Large sites repeat the same module lists (e.g. ``["ncarenv/23.09",
+    "gcc/12.2.0"]``), installation roots and operating system names across
+    hundreds of entries. An InternPool interns those strings and hands out a
+    single list object for every equal list it sees, so each distinct value
+    is stored only once.
+
+    Lists returned by the pool are shared between entries and must be treated
+    as read-only; assign a new list instead of mutating one in place.
+
+    Example:
+        >>> pool = InternPool()
+        >>> a = pool.strings(["gcc/12.2.0", "netcdf/4.9.2"])
+        >>> b = pool.strings(["gcc/12.2.0", "netcdf/4.9.2"])
+        >>> a is b
+        True
+    """
+
+    def __init__(self) -> None:
+        self._lists: Dict[Tuple[str, ...], List[str]] = {}
+
+    def __len__(self) -> int:
+        """Return the number of distinct lists held by the pool."""
+        return len(self._lists)
+
+    @staticmethod
+    def string(value: Any) -> Any:
+        """
+        Intern a string value. Non-string values are returned unchanged.
+
+        Args:
+            value (Any): The value to intern.
+
+        Returns:
+            Any: The interned string, or ``value`` itself.
+        """
+        if type(value) is str:
+            return sys.intern(value)
+        return value
+
+    def strings(self, values: Optional[List[str]]) -> Optional[List[str]]:
+        """
+        Return the shared list equal to ``values``.
+
+        Lists containing anything other than strings, as well as empty or None
+        values, are returned unchanged.
+
+        Args:
+            values (Optional[List[str]]): The list to intern.
+
+        Returns:
+            Optional[List[str]]: A list equal to ``values``, shared with every
+            other entry that interned an equal list.
+        """
+        if not values or not all(type(value) is str for value in values):
+            return values
+        key = tuple(values)
+        shared = self._lists.get(key)
+        if shared is None:
+            shared = [sys.intern(value) for value in values]
+            self._lists[key] = shared
+        return shared
+
+    def mapping(self, values: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Return a copy of ``values`` with its keys and string values interned.
+
+        Nested dictionaries are interned recursively and lists of strings are
+        replaced by their shared counterparts.
+
+        Args:
+            values (Optional[Dict[str, Any]]): The mapping to intern.
+
+        Returns:
+            Optional[Dict[str, Any]]: The interned copy, or ``values`` if it is
+            empty or None.
+        """
+        if not values:
+            return values
+        interned = {}
+        for key, value in values.items():
+            if isinstance(value, dict):
+                value = self.mapping(value)
+            elif isinstance(value, list):
+                value = self.strings(value)
+            else:
+                value = self.string(value)
+            interned[self.string(key)] = value
+        return interned
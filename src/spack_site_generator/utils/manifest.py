@@ -0,0 +1,307 @@
+"""
+Checksummed manifests for generated site directories.
+
+A manifest records the size and SHA-256 digest of every file of a site. Deployed
+copies of the site are verified against it in parallel on a thread pool:
+files are read in large chunks and ``hashlib`` releases the GIL while hashing
+them, so verification is bound by I/O rather than by the interpreter.
+
+The module can also be run as a command::
+
+    python -m spack_site_generator.utils.manifest --manifest site/manifest.json \\
+        /nodes/*/spack/site
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+HASH_ALGORITHM = "sha256"
+CHUNK_SIZE = 1 << 20
+
+
+def hash_file(path: Path, chunk_size: int = CHUNK_SIZE) -> Tuple[str, int]:
+    """
+    Hash a file in fixed-size chunks.
+
+    Args:
+        path (Path): The file to hash.
+        chunk_size (int): Number of bytes read per chunk.
+
+    Returns:
+        Tuple[str, int]: The hex digest and the number of bytes hashed.
+    """
+    digest = hashlib.new(HASH_ALGORITHM)
+    size = 0
+    with open(path, "rb", buffering=0) as file:
+        # Small files only need a buffer as large as themselves.
+        buffer = bytearray(max(1, min(chunk_size, os.fstat(file.fileno()).st_size)))
+        view = memoryview(buffer)
+        while True:
+            count = file.readinto(buffer)
+            if not count:
+                break
+            digest.update(view[:count])
+            size += count
+    return digest.hexdigest(), size
+
+
+def _site_files(site_dir: Path) -> List[str]:
+    """Return the manifest-relative paths of every file below ``site_dir``."""
+    found = []
+    for root, _, files in os.walk(site_dir):
+        for name in files:
+            relative = Path(root, name).relative_to(site_dir).as_posix()
+            if relative != MANIFEST_NAME:
+                found.append(relative)
+    return sorted(found)
+
+
+def build_manifest(
+    site_dir: Path,
+    filenames: Optional[Iterable[str]] = None,
+    *,
+    name: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Build the manifest of a site directory.
+
+    Args:
+        site_dir (Path): The directory holding the site's YAML files.
+        filenames (Optional[Iterable[str]]): Paths relative to ``site_dir`` to
+            record. Defaults to every file below ``site_dir``.
+        name (Optional[str]): Site name stored in the manifest. Defaults to the
+            directory name.
+
+    Returns:
+        Dict[str, Any]: The manifest.
+    """
+    site_dir = Path(site_dir)
+    filenames = _site_files(site_dir) if filenames is None else sorted(filenames)
+    files = {}
+    for filename in filenames:
+        digest, size = hash_file(site_dir / filename)
+        files[filename] = {"digest": digest, "size": size}
+    return {
+        "version": MANIFEST_VERSION,
+        "algorithm": HASH_ALGORITHM,
+        "site": name or site_dir.name,
+        "files": files,
+    }
+
+
+def write_manifest(
+    site_dir: Path,
+    filenames: Optional[Iterable[str]] = None,
+    *,
+    name: Optional[str] = None,
+) -> Path:
+    """
+    Build a site's manifest and write it as ``manifest.json`` in ``site_dir``.
+
+    Args:
+        site_dir (Path): The directory holding the site's YAML files.
+        filenames (Optional[Iterable[str]]): Paths relative to ``site_dir`` to
+            record. Defaults to every file below ``site_dir``.
+        name (Optional[str]): Site name stored in the manifest.
+
+    Returns:
+        Path: Path of the written manifest.
+    """
+    manifest = build_manifest(site_dir, filenames, name=name)
+    path = Path(site_dir) / MANIFEST_NAME
+    with open(path, "w") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+        file.write("\n")
+    return path
+
+
+def load_manifest(path: Path) -> Dict[str, Any]:
+    """
+    Load a manifest written by :func:`write_manifest`.
+
+    Args:
+        path (Path): Path of the manifest file.
+
+    Returns:
+        Dict[str, Any]: The manifest.
+
+    Raises:
+        ValueError: If the manifest version or hash algorithm is not supported.
+    """
+    with open(path) as file:
+        manifest = json.load(file)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported manifest version {manifest.get('version')!r}.")
+    if manifest.get("algorithm") != HASH_ALGORITHM:
+        raise ValueError(f"Unsupported hash algorithm {manifest.get('algorithm')!r}.")
+    return manifest
+
+
+@dataclass
+class VerificationResult:
+    """
+    The outcome of verifying one site directory against a manifest.
+
+    Attributes:
+        site_dir (Path): The verified directory.
+        missing (List[str]): Manifest files absent from the directory.
+        mismatched (List[str]): Files whose size or digest differ.
+        unexpected (List[str]): Files present but not listed in the manifest.
+        unreadable (List[str]): Files, or the directory's own manifest, that
+            exist but cannot be read (permissions, directories, corrupt JSON).
+    """
+
+    site_dir: Path
+    missing: List[str] = field(default_factory=list)
+    mismatched: List[str] = field(default_factory=list)
+    unexpected: List[str] = field(default_factory=list)
+    unreadable: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        """True if the directory holds exactly the files of the manifest."""
+        return not (
+            self.missing or self.mismatched or self.unexpected or self.unreadable
+        )
+
+
+def _check_file(path: Path, expected: Dict[str, Any]) -> str:
+    """
+    Return "ok", "missing", "mismatched" or "unreadable" for one file of a
+    deployed site.
+    """
+    try:
+        if path.stat().st_size != expected["size"]:
+            return "mismatched"
+        digest, _ = hash_file(path)
+    except FileNotFoundError:
+        return "missing"
+    except OSError:
+        return "unreadable"
+    return "ok" if digest == expected["digest"] else "mismatched"
+
+
+def verify_sites(
+    site_dirs: Sequence[Path],
+    manifest: Optional[Dict[str, Any]] = None,
+    *,
+    max_workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+) -> List[VerificationResult]:
+    """
+    Verify deployed site directories against a manifest in parallel.
+
+    Every file of every directory is checked as a separate task, so a few
+    large directories and many small ones both keep the pool busy. Files are
+    compared by size first and only hashed when the size matches.
+
+    Args:
+        site_dirs (Sequence[Path]): Deployed site directories.
+        manifest (Optional[Dict[str, Any]]): Reference manifest. Defaults to
+            the ``manifest.json`` found in each directory.
+        max_workers (Optional[int]): Size of the thread pool created when no
+            ``executor`` is given.
+        executor (Optional[Executor]): Executor to run the checks on.
+
+    Returns:
+        List[VerificationResult]: One result per directory, in input order.
+    """
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        checks = []
+        results = []
+        for site_dir in map(Path, site_dirs):
+            result = VerificationResult(site_dir=site_dir)
+            results.append(result)
+            try:
+                expected = manifest or load_manifest(site_dir / MANIFEST_NAME)
+            except FileNotFoundError:
+                result.missing.append(MANIFEST_NAME)
+                continue
+            except (OSError, ValueError):
+                result.unreadable.append(MANIFEST_NAME)
+                continue
+            files = expected["files"]
+            if site_dir.is_dir():
+                result.unexpected.extend(
+                    name for name in _site_files(site_dir) if name not in files
+                )
+            for name, entry in sorted(files.items()):
+                future = executor.submit(_check_file, site_dir / name, entry)
+                checks.append((result, name, future))
+        for result, name, future in checks:
+            outcome = future.result()
+            if outcome != "ok":
+                getattr(result, outcome).append(name)
+        return results
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+
+def verify_site(
+    site_dir: Path, manifest: Optional[Dict[str, Any]] = None
+) -> VerificationResult:
+    """
+    Verify one deployed site directory against a manifest.
+
+    Args:
+        site_dir (Path): The deployed site directory.
+        manifest (Optional[Dict[str, Any]]): Reference manifest. Defaults to
+            the ``manifest.json`` found in ``site_dir``.
+
+    Returns:
+        VerificationResult: The outcome of the verification.
+    """
+    return verify_sites([site_dir], manifest)[0]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Verify deployed site directories from the command line.
+
+    Args:
+        argv (Optional[Sequence[str]]): Command-line arguments.
+
+    Returns:
+        int: 0 if every directory matches the manifest, 1 otherwise.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m spack_site_generator.utils.manifest",
+        description="Verify deployed Spack site directories against a manifest.",
+    )
+    parser.add_argument("site_dirs", nargs="+", type=Path, help="site directories")
+    parser.add_argument(
+        "--manifest",
+        type=Path,
+        help="reference manifest (defaults to each directory's own manifest.json)",
+    )
+    parser.add_argument("--jobs", type=int, default=None, help="number of threads")
+    args = parser.parse_args(argv)
+
+    manifest = load_manifest(args.manifest) if args.manifest else None
+    failed = 0
+    for result in verify_sites(args.site_dirs, manifest, max_workers=args.jobs):
+        if result.ok:
+            continue
+        failed += 1
+        for kind in ("missing", "mismatched", "unexpected", "unreadable"):
+            for name in getattr(result, kind):
+                print(f"{result.site_dir}: {kind}: {name}")
+    print(f"{len(args.site_dirs) - failed}/{len(args.site_dirs)} site(s) verified")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,375 @@
+"""
+Detection of the host microarchitecture under Spack's target names.
+
+Spack optimizes for the target of a spec (e.g., ``zen3`` or ``icelake``); a
+site that declares ``x86_64`` everywhere gets generic code. This module reads
+the CPU description the kernel exposes in ``/proc/cpuinfo`` (and, on ARM, the
+``MIDR_EL1`` register under ``/sys``) and returns the most specific target in
+a table of the microarchitectures Spack knows, following the same rules as
+Spack's ``archspec``: a target matches if the vendor agrees and the host has
+every feature the target and its ancestors require, and the match with the
+most ancestors wins.
+
+Like :mod:`~spack_site_generator.utils.resources`, every file is read relative
+to ``root``, so nodes of other partitions can be described by a recorded copy
+of their ``/proc/cpuinfo``.
+"""
+
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple, Union
+
+#: Architecture families, as used in the ``target`` of ``compilers.yaml``.
+FAMILIES = ("x86_64", "aarch64", "ppc64le")
+
+
+class Microarchitecture(NamedTuple):
+    """
+    A Spack target.
+
+    Attributes:
+        name (str): Spack's name of the target (e.g., "zen3").
+        family (str): Architecture family (e.g., "x86_64").
+        vendor (str): CPU vendor as reported by the kernel, or "generic".
+        parents (Tuple[str, ...]): Targets this one extends.
+        features (FrozenSet[str]): Features required in addition to those of
+            the parents.
+        part (Optional[Tuple[int, int]]): ARM implementer and part number
+            identifying the core, if the target is an ARM core.
+    """
+
+    name: str
+    family: str
+    vendor: str
+    parents: Tuple[str, ...] = ()
+    features: FrozenSet[str] = frozenset()
+    part: Optional[Tuple[int, int]] = None
+
+
+def _target(
+    name: str,
+    family: str,
+    vendor: str,
+    parents: Tuple[str, ...] = (),
+    features: str = "",
+    part: Optional[Tuple[int, int]] = None,
+) -> Tuple[str, Microarchitecture]:
+    return name, Microarchitecture(
+        name, family, vendor, parents, frozenset(features.split()), part
+    )
+
+
+#: The targets that can be detected, by name. Features use the flag names of
+#: ``/proc/cpuinfo``.
+TARGETS: Dict[str, Microarchitecture] = dict(
+    [
+        _target("x86_64", "x86_64", "generic"),
+        _target(
+            "x86_64_v2",
+            "x86_64",
+            "generic",
+            ("x86_64",),
+            "cx16 lahf_lm popcnt sse4_1 sse4_2 ssse3",
+        ),
+        _target(
+            "x86_64_v3",
+            "x86_64",
+            "generic",
+            ("x86_64_v2",),
+            "abm avx avx2 bmi1 bmi2 f16c fma movbe xsave",
+        ),
+        _target(
+            "x86_64_v4",
+            "x86_64",
+            "generic",
+            ("x86_64_v3",),
+            "avx512bw avx512cd avx512dq avx512f avx512vl",
+        ),
+        _target(
+            "nehalem",
+            "x86_64",
+            "GenuineIntel",
+            ("x86_64_v2",),
+            "mmx sse sse2 ssse3 sse4_1 sse4_2 popcnt",
+        ),
+        _target("westmere", "x86_64", "GenuineIntel", ("nehalem",), "aes pclmulqdq"),
+        _target("sandybridge", "x86_64", "GenuineIntel", ("westmere",), "avx"),
+        _target("ivybridge", "x86_64", "GenuineIntel", ("sandybridge",), "rdrand f16c"),
+        _target(
+            "haswell",
+            "x86_64",
+            "GenuineIntel",
+            ("ivybridge", "x86_64_v3"),
+            "movbe fma avx2 bmi1 bmi2",
+        ),
+        _target("broadwell", "x86_64", "GenuineIntel", ("haswell",), "rdseed adx"),
+        _target(
+            "skylake",
+            "x86_64",
+            "GenuineIntel",
+            ("broadwell",),
+            "clflushopt xsavec xsaveopt",
+        ),
+        _target(
+            "skylake_avx512",
+            "x86_64",
+            "GenuineIntel",
+            ("skylake", "x86_64_v4"),
+            "avx512f avx512cd avx512bw avx512dq avx512vl clwb",
+        ),
+        _target(
+            "cascadelake",
+            "x86_64",
+            "GenuineIntel",
+            ("skylake_avx512",),
+            "avx512_vnni",
+        ),
+        _target(
+            "icelake",
+            "x86_64",
+            "GenuineIntel",
+            ("cascadelake",),
+            "avx512_bitalg avx512_vbmi2 avx512_vpopcntdq avx512ifma avx512vbmi "
+            "gfni sha_ni vaes vpclmulqdq",
+        ),
+        _target(
+            "sapphirerapids",
+            "x86_64",
+            "GenuineIntel",
+            ("icelake",),
+            "amx_bf16 amx_int8 amx_tile avx512_bf16 avx512_fp16 serialize",
+        ),
+        _target(
+            "zen",
+            "x86_64",
+            "AuthenticAMD",
+            ("x86_64_v3",),
+            "adx aes avx avx2 bmi1 bmi2 clflushopt clzero f16c fma mmx movbe "
+            "pclmulqdq popcnt rdseed sse sse2 sse4_1 sse4_2 sse4a ssse3 xsavec "
+            "xsaveopt",
+        ),
+        _target("zen2", "x86_64", "AuthenticAMD", ("zen",), "clwb"),
+        _target("zen3", "x86_64", "AuthenticAMD", ("zen2",), "pku vaes vpclmulqdq"),
+        _target(
+            "zen4",
+            "x86_64",
+            "AuthenticAMD",
+            ("zen3", "x86_64_v4"),
+            "avx512_bf16 avx512_bitalg avx512_vbmi2 avx512_vnni avx512_vpopcntdq "
+            "avx512ifma avx512vbmi gfni",
+        ),
+        _target("aarch64", "aarch64", "generic"),
+        _target(
+            "neoverse_n1",
+            "aarch64",
+            "ARM",
+            ("aarch64",),
+            "asimd atomics fp",
+            (0x41, 0xD0C),
+        ),
+        _target(
+            "neoverse_v1",
+            "aarch64",
+            "ARM",
+            ("neoverse_n1",),
+            "sve",
+            (0x41, 0xD40),
+        ),
+        _target(
+            "neoverse_v2",
+            "aarch64",
+            "ARM",
+            ("neoverse_v1",),
+            "sve2",
+            (0x41, 0xD4F),
+        ),
+        _target("a64fx", "aarch64", "Fujitsu", ("aarch64",), "sve", (0x46, 0x001)),
+        _target("ppc64le", "ppc64le", "generic"),
+        _target("power8le", "ppc64le", "IBM", ("ppc64le",)),
+        _target("power9le", "ppc64le", "IBM", ("power8le",)),
+        _target("power10le", "ppc64le", "IBM", ("power9le",)),
+    ]
+)
+
+_ARM_VENDORS = {0x41: "ARM", 0x46: "Fujitsu"}
+_POWER = re.compile(r"POWER(\d+)")
+
+
+@dataclass
+class CpuInfo:
+    """
+    The description of a CPU read from ``/proc/cpuinfo``.
+
+    Attributes:
+        family (str): Architecture family (e.g., "x86_64").
+        vendor (str): CPU vendor (e.g., "AuthenticAMD"), or "generic".
+        features (Set[str]): Feature flags of the first processor.
+        model_name (str): Marketing name of the CPU, if reported.
+        part (Optional[Tuple[int, int]]): ARM implementer and part number.
+        generation (int): POWER generation (e.g., 9), or 0.
+    """
+
+    family: str
+    vendor: str = "generic"
+    features: Set[str] = field(default_factory=set)
+    model_name: str = ""
+    part: Optional[Tuple[int, int]] = None
+    generation: int = 0
+
+
+def _first_processor(text: str) -> Dict[str, str]:
+    """Return the fields of the first processor block of ``/proc/cpuinfo``."""
+    fields: Dict[str, str] = {}
+    for line in text.splitlines():
+        if not line.strip():
+            if fields:
+                break
+            continue
+        key, separator, value = line.partition(":")
+        if separator:
+            fields.setdefault(key.strip(), value.strip())
+    return fields
+
+
+def parse_cpuinfo(text: str, midr: Optional[str] = None) -> CpuInfo:
+    """
+    Parse the content of ``/proc/cpuinfo``.
+
+    Args:
+        text (str): The content of ``/proc/cpuinfo``.
+        midr (Optional[str]): The content of ARM's ``midr_el1`` register file,
+            used when ``text`` does not identify the core.
+
+    Returns:
+        CpuInfo: The description of the first processor.
+
+    Raises:
+        ValueError: If ``text`` describes no known architecture.
+    """
+    fields = _first_processor(text)
+    if "flags" in fields:
+        return CpuInfo(
+            family="x86_64",
+            vendor=fields.get("vendor_id", "generic"),
+            features=set(fields["flags"].split()),
+            model_name=fields.get("model name", ""),
+        )
+    if "Features" in fields or "CPU implementer" in fields:
+        info = CpuInfo(
+            family="aarch64", features=set(fields.get("Features", "").split())
+        )
+        try:
+            implementer = int(fields["CPU implementer"], 0)
+            info.part = implementer, int(fields["CPU part"], 0)
+        except (KeyError, ValueError):
+            if midr:
+                register = int(midr.strip(), 16)
+                info.part = register >> 24, (register >> 4) & 0xFFF
+        if info.part is not None:
+            info.vendor = _ARM_VENDORS.get(info.part[0], "generic")
+        return info
+    match = _POWER.search(fields.get("cpu", ""))
+    if match:
+        return CpuInfo(
+            family="ppc64le",
+            vendor="IBM",
+            model_name=fields["cpu"],
+            generation=int(match.group(1)),
+        )
+    raise ValueError("Unrecognized /proc/cpuinfo content.")
+
+
+def ancestors(name: str) -> List[str]:
+    """
+    Return every target a target extends, nearest first.
+
+    Args:
+        name (str): A name in ``TARGETS``.
+
+    Returns:
+        List[str]: The ancestors, without duplicates.
+    """
+    found: List[str] = []
+    queue = list(TARGETS[name].parents)
+    while queue:
+        parent = queue.pop(0)
+        if parent not in found:
+            found.append(parent)
+            queue.extend(TARGETS[parent].parents)
+    return found
+
+
+def _required(name: str) -> FrozenSet[str]:
+    """Return the features a target and its ancestors require."""
+    required = set(TARGETS[name].features)
+    for parent in ancestors(name):
+        required |= TARGETS[parent].features
+    return frozenset(required)
+
+
+def _compatible(target: Microarchitecture, info: CpuInfo) -> bool:
+    """Whether the CPU described by ``info`` can run code built for ``target``."""
+    if target.family != info.family:
+        return False
+    if target.vendor not in ("generic", info.vendor):
+        return False
+    if info.family == "ppc64le":
+        generation = _POWER.search(target.name.upper())
+        return not generation or int(generation.group(1)) <= info.generation
+    if target.part is not None and info.part is not None:
+        # ARM cores are identified by part number; features only refine that.
+        return target.part == info.part or any(
+            TARGETS[descendant].part == info.part
+            for descendant in TARGETS
+            if target.name in ancestors(descendant)
+        )
+    return _required(target.name) <= info.features
+
+
+def best_target(info: CpuInfo) -> str:
+    """
+    Return the most specific target the described CPU supports.
+
+    Args:
+        info (CpuInfo): The CPU, as returned by ``parse_cpuinfo``.
+
+    Returns:
+        str: A name in ``TARGETS``, at least the family itself.
+    """
+    candidates = [
+        target.name for target in TARGETS.values() if _compatible(target, info)
+    ]
+    # Prefer vendor-specific targets over generic levels of the same depth.
+    return max(
+        candidates,
+        key=lambda name: (len(ancestors(name)), TARGETS[name].vendor != "generic"),
+    )
+
+
+def detect_microarchitecture(root: Union[str, Path] = "/") -> str:
+    """
+    Detect the Spack target of a node.
+
+    Args:
+        root (Union[str, Path]): Root of the filesystem to read
+            ``/proc/cpuinfo`` and ``/sys`` from. Pass a recorded copy to
+            describe a node of another partition.
+
+    Returns:
+        str: The target name (e.g., "zen3").
+
+    Raises:
+        ValueError: If ``/proc/cpuinfo`` is missing or not understood.
+    """
+    root = Path(root)
+    try:
+        text = (root / "proc/cpuinfo").read_text()
+    except OSError as error:
+        raise ValueError(f"Cannot read {root / 'proc/cpuinfo'}: {error}") from error
+    midr_path = root / "sys/devices/system/cpu/cpu0/regs/identification/midr_el1"
+    try:
+        midr: Optional[str] = midr_path.read_text()
+    except OSError:
+        midr = None
+    return best_target(parse_cpuinfo(text, midr))
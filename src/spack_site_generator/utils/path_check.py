@@ -0,0 +1,258 @@
+"""
+Pre-flight checks of the paths referenced by a site.
+
+Prefixes, compiler executables and RPATH directories are only looked up by
+Spack once a build starts, so a stale path surfaces far from the site that
+introduced it. :func:`check_paths` stats every referenced path up front on a
+bounded set of threads. Directories shared by several paths are checked first,
+once, and paths below a missing directory are reported without being looked
+up. Each lookup has its own timeout, and lookups still queued when every
+thread is stuck on a hung network filesystem are reported as timed out, so a
+dead mount delays the check instead of blocking it.
+"""
+
+import os
+import stat
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+#: Lookups taking longer than this many seconds are reported as slow.
+SLOW_THRESHOLD = 1.0
+
+#: Seconds after which a lookup is abandoned and reported as timed out.
+TIMEOUT = 10.0
+
+
+class PathCheckError(ValueError):
+    """
+    Raised when referenced paths are missing or unreadable.
+
+    Attributes:
+        report (PathCheckReport): The full result of the check.
+    """
+
+    def __init__(self, message: str, report: "PathCheckReport") -> None:
+        super().__init__(message)
+        self.report = report
+
+
+@dataclass
+class PathCheckReport:
+    """
+    The outcome of checking a set of paths.
+
+    Attributes:
+        checked (int): Number of distinct paths checked.
+        missing (List[str]): Paths that do not exist.
+        unreadable (List[str]): Paths that exist but cannot be read (or, for
+            directories, listed and traversed).
+        slow (Dict[str, float]): Paths whose lookup exceeded the slow
+            threshold, mapped to the lookup time in seconds.
+        timed_out (List[str]): Paths whose lookup did not finish in time.
+    """
+
+    checked: int = 0
+    missing: List[str] = field(default_factory=list)
+    unreadable: List[str] = field(default_factory=list)
+    slow: Dict[str, float] = field(default_factory=dict)
+    timed_out: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        """True if no path is missing or unreadable."""
+        return not (self.missing or self.unreadable)
+
+    def describe(
+        self,
+        kinds: Sequence[str] = ("missing", "unreadable", "timed_out", "slow"),
+        references: Optional[Mapping[str, Sequence[str]]] = None,
+    ) -> List[str]:
+        """
+        Describe the problems found, one line per path.
+
+        Args:
+            kinds (Sequence[str]): The problem kinds to describe.
+            references (Optional[Mapping[str, Sequence[str]]]): Paths mapped to
+                the configuration entries that reference them.
+
+        Returns:
+            List[str]: Lines such as ``"missing: /opt/gcc (compilers[1].cc)"``.
+        """
+        lines = []
+        for kind in kinds:
+            problems = getattr(self, kind)
+            for path in problems:
+                line = f"{kind.replace('_', ' ')}: {path}"
+                if kind == "slow":
+                    line += f" ({problems[path]:.2f}s)"
+                if references and references.get(path):
+                    line += f" ({', '.join(references[path])})"
+                lines.append(line)
+        return lines
+
+
+def referenced_paths(value: Any, reference: str) -> Iterator[Tuple[str, str]]:
+    """
+    Yield the absolute paths found in a configuration value.
+
+    Strings are paths if they are absolute and do not use Spack's ``$``
+    variables; dictionaries and lists are searched recursively.
+
+    Args:
+        value (Any): A configuration value (e.g., an external's fields).
+        reference (str): Dotted location of ``value`` in the configuration.
+
+    Yields:
+        Tuple[str, str]: Each path and the location that references it.
+    """
+    if isinstance(value, str):
+        if os.path.isabs(value) and "$" not in value:
+            yield value, reference
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            yield from referenced_paths(item, f"{reference}.{key}")
+    elif isinstance(value, list):
+        for position, item in enumerate(value):
+            yield from referenced_paths(item, f"{reference}[{position}]")
+
+
+def _lookup(path: str, started: Dict[str, float]) -> Tuple[str, float]:
+    """Stat one path, returning "ok", "missing" or "unreadable" and the time taken."""
+    start = started[path] = time.monotonic()
+    try:
+        mode = os.stat(path).st_mode
+    except (FileNotFoundError, NotADirectoryError):
+        return "missing", time.monotonic() - start
+    except OSError:
+        return "unreadable", time.monotonic() - start
+    access = os.R_OK | os.X_OK if stat.S_ISDIR(mode) else os.R_OK
+    status = "ok" if os.access(path, access) else "unreadable"
+    return status, time.monotonic() - start
+
+
+def _run(
+    paths: Iterable[str], *, max_workers: int, timeout: float
+) -> Dict[str, Tuple[str, float]]:
+    """
+    Look up ``paths`` on daemon threads, abandoning lookups that exceed ``timeout``.
+
+    The timeout counts from the moment a worker starts a lookup, not from when
+    it was queued. Once every worker is blocked past the timeout (e.g., all on
+    the same hung mount), the lookups still queued are reported as timed out
+    rather than waiting for a worker that may never return. Workers are
+    daemon threads, so abandoned lookups do not keep the interpreter from
+    exiting.
+    """
+    queue = deque(paths)
+    total = len(queue)
+    started: Dict[str, float] = {}
+    results: Dict[str, Tuple[str, float]] = {}
+    # Timed out lookups whose worker is still blocked.
+    abandoned: Set[str] = set()
+    condition = threading.Condition()
+
+    def work() -> None:
+        while True:
+            with condition:
+                if not queue:
+                    return
+                path = queue.popleft()
+            outcome = _lookup(path, started)
+            with condition:
+                abandoned.discard(path)
+                results.setdefault(path, outcome)
+                condition.notify()
+
+    workers = min(max_workers, total)
+    for index in range(workers):
+        threading.Thread(target=work, name=f"path-check-{index}", daemon=True).start()
+    poll = min(timeout / 4, 0.05)
+    with condition:
+        while len(results) < total:
+            condition.wait(poll)
+            now = time.monotonic()
+            for path, start in list(started.items()):
+                if path not in results and now - start > timeout:
+                    results[path] = "timeout", now - start
+                    abandoned.add(path)
+            if queue and len(abandoned) >= workers:
+                while queue:
+                    results[queue.popleft()] = "timeout", 0.0
+    return results
+
+
+def check_paths(
+    paths: Iterable[str],
+    *,
+    max_workers: int = 16,
+    timeout: float = TIMEOUT,
+    slow: float = SLOW_THRESHOLD,
+) -> PathCheckReport:
+    """
+    Check that paths exist and are readable, in parallel.
+
+    Parent directories shared by two or more paths are looked up first. Paths
+    below a missing parent are reported missing, and paths below a parent
+    whose lookup timed out are reported as timed out, without touching the
+    filesystem again.
+
+    Args:
+        paths (Iterable[str]): Absolute paths to check. Duplicates are checked
+            once.
+        max_workers (int): Number of lookups running at the same time.
+        timeout (float): Seconds after which a single lookup is abandoned.
+            Lookups that have not started once every worker is stuck past
+            this are reported as timed out as well.
+        slow (float): Seconds above which a completed lookup is reported as
+            slow.
+
+    Returns:
+        PathCheckReport: The missing, unreadable, slow and timed out paths, each
+        in sorted order.
+    """
+    paths = sorted(set(paths))
+    shared: Dict[str, int] = {}
+    for path in paths:
+        parent = os.path.dirname(path.rstrip("/"))
+        if parent and parent != "/":
+            shared[parent] = shared.get(parent, 0) + 1
+    parents = [parent for parent, count in shared.items() if count > 1]
+
+    results = _run(parents, max_workers=max_workers, timeout=timeout)
+    remaining = []
+    for path in paths:
+        if path in results:
+            continue
+        parent = results.get(os.path.dirname(path.rstrip("/")))
+        if parent is not None and parent[0] in ("missing", "timeout"):
+            results[path] = parent[0], 0.0
+        else:
+            remaining.append(path)
+    results.update(_run(remaining, max_workers=max_workers, timeout=timeout))
+
+    report = PathCheckReport(checked=len(paths))
+    for path in paths:
+        status, elapsed = results[path]
+        if status == "missing":
+            report.missing.append(path)
+        elif status == "unreadable":
+            report.unreadable.append(path)
+        elif status == "timeout":
+            report.timed_out.append(path)
+        if status != "timeout" and elapsed > slow:
+            report.slow[path] = elapsed
+    return report
@@ -0,0 +1,343 @@
+"""
+Scanning of pkg-config and CMake package files below external prefixes.
+
+Most libraries install a pkg-config file (``lib/pkgconfig/netcdf.pc``) or a
+CMake package configuration (``lib/cmake/netCDF/netCDFConfig.cmake``) that
+records their version, include directories and libraries. Reading those files
+gives Spack the ``headers`` and ``libs`` hints of an external without guessing
+paths, and shows whether the version declared in the external's spec is the
+one actually installed.
+
+Only the conventional locations are searched, so a scan lists a handful of
+directories per prefix. :func:`scan_prefixes` scans many prefixes on a thread
+pool and caches the result of each prefix.
+"""
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Union
+
+from spack_site_generator.utils.detection_cache import DetectionCache
+
+#: Directories below a prefix holding pkg-config files.
+PKGCONFIG_DIRS = ("lib/pkgconfig", "lib64/pkgconfig", "share/pkgconfig")
+
+#: Directories below a prefix holding one directory per CMake package.
+CMAKE_DIRS = ("lib/cmake", "lib64/cmake", "share/cmake", "cmake")
+
+_PC_VARIABLE = re.compile(r"^([A-Za-z0-9_.]+)\s*=\s*(.*)$")
+_PC_KEYWORD = re.compile(r"^([A-Za-z.]+)\s*:\s*(.*)$")
+_PC_REFERENCE = re.compile(r"\$\{([A-Za-z0-9_.]+)\}")
+_CMAKE_CONFIG = re.compile(r"^(.+?)(?:Config|-config)\.cmake$")
+_CMAKE_VERSION = re.compile(
+    r"set\s*\(\s*PACKAGE_VERSION\s+\"?([^\s\")]+)", re.IGNORECASE
+)
+_CMAKE_INCLUDES = re.compile(
+    r"(?:set\s*\(\s*\w+_INCLUDE_DIRS?|INTERFACE_INCLUDE_DIRECTORIES)\s+\"([^\"]+)\"",
+    re.IGNORECASE,
+)
+_CMAKE_LIBRARIES = re.compile(
+    r"(?:set\s*\(\s*\w+_LIBRARY_DIRS?|IMPORTED_LOCATION\w*)\s+\"([^\"]+)\"",
+    re.IGNORECASE,
+)
+_CMAKE_PREFIXES = ("${PACKAGE_PREFIX_DIR}", "${_IMPORT_PREFIX}")
+
+
+class PackageConfig(NamedTuple):
+    """
+    What a pkg-config or CMake package file says about an installation.
+
+    Attributes:
+        name (str): Package name, from the file name (e.g., "netcdf" or
+            "netCDF").
+        version (Optional[str]): Installed version, if recorded.
+        include_dirs (List[str]): Absolute include directories.
+        library_dirs (List[str]): Absolute directories holding the libraries.
+        libraries (List[str]): Library names linked against (e.g., "netcdf").
+        path (str): The file the entry was read from.
+    """
+
+    name: str
+    version: Optional[str]
+    include_dirs: List[str]
+    library_dirs: List[str]
+    libraries: List[str]
+    path: str
+
+
+def _unique(items: Iterable[str]) -> List[str]:
+    """Return items without duplicates, in order."""
+    return list(dict.fromkeys(item for item in items if item))
+
+
+def parse_pc(path: Union[str, Path], text: Optional[str] = None) -> PackageConfig:
+    """
+    Parse a pkg-config file.
+
+    Variables are expanded, and only the ``-I``, ``-L`` and ``-l`` flags of
+    ``Cflags`` and ``Libs`` are kept.
+
+    Args:
+        path (Union[str, Path]): The ``.pc`` file.
+        text (Optional[str]): Its content, if already read.
+
+    Returns:
+        PackageConfig: The recorded version, directories and libraries.
+    """
+    path = os.fspath(path)
+    if text is None:
+        with open(path, errors="replace") as file:
+            text = file.read()
+    variables: Dict[str, str] = {"pcfiledir": os.path.dirname(path)}
+    keywords: Dict[str, str] = {}
+
+    def expand(value: str) -> str:
+        return _PC_REFERENCE.sub(lambda m: variables.get(m.group(1), ""), value)
+
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        keyword = _PC_KEYWORD.match(line)
+        variable = _PC_VARIABLE.match(line)
+        if keyword:
+            keywords[keyword.group(1).lower()] = expand(keyword.group(2).strip())
+        elif variable:
+            variables[variable.group(1)] = expand(variable.group(2).strip())
+    cflags = keywords.get("cflags", "").split()
+    libs = keywords.get("libs", "").split()
+    return PackageConfig(
+        name=os.path.basename(path)[: -len(".pc")],
+        version=keywords.get("version") or None,
+        include_dirs=_unique(flag[2:] for flag in cflags if flag.startswith("-I")),
+        library_dirs=_unique(flag[2:] for flag in libs if flag.startswith("-L")),
+        libraries=_unique(flag[2:] for flag in libs if flag.startswith("-l")),
+        path=path,
+    )
+
+
+def _cmake_paths(values: Iterable[str], prefix: str, directory: str) -> List[str]:
+    """Expand the prefix variables of CMake paths and split lists."""
+    paths = []
+    for value in values:
+        for item in value.split(";"):
+            for variable in _CMAKE_PREFIXES:
+                item = item.replace(variable, prefix)
+            item = item.replace("${CMAKE_CURRENT_LIST_DIR}", directory)
+            if os.path.isabs(item) and "${" not in item and "$<" not in item:
+                paths.append(os.path.normpath(item))
+    return paths
+
+
+def parse_cmake_config(
+    path: Union[str, Path], *, prefix: Union[str, Path]
+) -> PackageConfig:
+    """
+    Parse a CMake package configuration and the files next to it.
+
+    The version is read from the ``*ConfigVersion.cmake`` (or
+    ``*-config-version.cmake``) file; include and library locations from every
+    ``.cmake`` file of the package directory, which covers the exported
+    targets files. ``PACKAGE_PREFIX_DIR`` and ``_IMPORT_PREFIX`` are taken to
+    be ``prefix``.
+
+    Args:
+        path (Union[str, Path]): The ``*Config.cmake`` or ``*-config.cmake``
+            file.
+        prefix (Union[str, Path]): The installation prefix.
+
+    Returns:
+        PackageConfig: The recorded version and directories.
+    """
+    path = os.fspath(path)
+    prefix = os.fspath(prefix)
+    directory = os.path.dirname(path)
+    name = _CMAKE_CONFIG.match(os.path.basename(path)).group(1)
+    version = None
+    includes: List[str] = []
+    libraries: List[str] = []
+    for entry in sorted(os.scandir(directory), key=lambda entry: entry.name):
+        if not entry.name.endswith(".cmake") or not entry.is_file():
+            continue
+        try:
+            with open(entry.path, errors="replace") as file:
+                text = file.read()
+        except OSError:
+            continue
+        if entry.name.lower().endswith(("configversion.cmake", "config-version.cmake")):
+            match = _CMAKE_VERSION.search(text)
+            if match and version is None:
+                version = match.group(1)
+            continue
+        includes.extend(_CMAKE_INCLUDES.findall(text))
+        libraries.extend(_CMAKE_LIBRARIES.findall(text))
+    library_paths = _cmake_paths(libraries, prefix, directory)
+    return PackageConfig(
+        name=name,
+        version=version,
+        include_dirs=_unique(_cmake_paths(includes, prefix, directory)),
+        library_dirs=_unique(
+            os.path.dirname(item) if os.path.splitext(item)[1] else item
+            for item in library_paths
+        ),
+        libraries=[],
+        path=path,
+    )
+
+
+def _scan(prefix: str) -> List[List[object]]:
+    """Return the package files below a prefix as plain lists."""
+    configs: List[PackageConfig] = []
+    for relative in PKGCONFIG_DIRS:
+        directory = os.path.join(prefix, relative)
+        try:
+            entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name.endswith(".pc") and entry.is_file():
+                try:
+                    configs.append(parse_pc(entry.path))
+                except OSError:
+                    continue
+    for relative in CMAKE_DIRS:
+        directory = os.path.join(prefix, relative)
+        try:
+            packages = sorted(os.scandir(directory), key=lambda entry: entry.name)
+        except OSError:
+            continue
+        for package in packages:
+            if not package.is_dir():
+                continue
+            try:
+                files = sorted(os.listdir(package.path))
+            except OSError:
+                continue
+            for name in files:
+                if _CMAKE_CONFIG.match(name) and "version" not in name.lower():
+                    configs.append(
+                        parse_cmake_config(
+                            os.path.join(package.path, name), prefix=prefix
+                        )
+                    )
+    return [list(config) for config in configs]
+
+
+def scan_prefix(
+    prefix: Union[str, Path], *, cache: Optional[DetectionCache] = None
+) -> List[PackageConfig]:
+    """
+    Find and parse the pkg-config and CMake package files of a prefix.
+
+    Args:
+        prefix (Union[str, Path]): The installation prefix.
+        cache (Optional[DetectionCache]): Cache for the result, stored under
+            the "pkg-scan" namespace and keyed on the prefix.
+
+    Returns:
+        List[PackageConfig]: pkg-config files first, then CMake packages, each
+        in file name order. Empty if the prefix does not exist.
+    """
+    prefix = os.path.abspath(prefix)
+    if cache is None or not os.path.isdir(prefix):
+        configs = _scan(prefix)
+    else:
+        configs = cache.get_or_compute("pkg-scan", prefix, lambda: _scan(prefix))
+    return [PackageConfig._make(config) for config in configs]
+
+
+def scan_prefixes(
+    prefixes: Iterable[Union[str, Path]],
+    *,
+    cache: Optional[DetectionCache] = None,
+    max_workers: int = 16,
+) -> Dict[str, List[PackageConfig]]:
+    """
+    Scan several prefixes at the same time.
+
+    Args:
+        prefixes (Iterable[Union[str, Path]]): The installation prefixes.
+        cache (Optional[DetectionCache]): Cache for the result of each prefix.
+        max_workers (int): Number of prefixes scanned at the same time.
+
+    Returns:
+        Dict[str, List[PackageConfig]]: The package files, by prefix as given.
+    """
+    prefixes = list(dict.fromkeys(os.fspath(prefix) for prefix in prefixes))
+    if not prefixes:
+        return {}
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(prefixes)), thread_name_prefix="pkg-scan"
+    ) as executor:
+        results = executor.map(
+            lambda prefix: scan_prefix(prefix, cache=cache), prefixes
+        )
+        return dict(zip(prefixes, results))
+
+
+def _normalized(name: str) -> str:
+    """Return a package name in a form comparable across naming styles."""
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+def select_config(
+    package: str, configs: List[PackageConfig]
+) -> Optional[PackageConfig]:
+    """
+    Return the package file describing a package.
+
+    Args:
+        package (str): The Spack package name (e.g., "netcdf-c").
+        configs (List[PackageConfig]): The files found below its prefix.
+
+    Returns:
+        Optional[PackageConfig]: The file named after the package, ignoring
+        case and punctuation; else the first file whose name starts the
+        package name (``netCDF`` for ``netcdf-c``); else the only file of the
+        prefix; else None.
+    """
+    wanted = _normalized(package)
+    names = [_normalized(config.name) for config in configs]
+    for config, name in zip(configs, names):
+        if name == wanted:
+            return config
+    for config, name in zip(configs, names):
+        if name and wanted.startswith(name):
+            return config
+    return configs[0] if len(configs) == 1 else None
+
+
+def extra_attributes(config: PackageConfig) -> Dict[str, str]:
+    """
+    Return the ``extra_attributes`` hints of an external.
+
+    Args:
+        config (PackageConfig): The package file of the external.
+
+    Returns:
+        Dict[str, str]: ``headers`` (the first include directory) and ``libs``
+        (the first library directory), for those that are known.
+    """
+    attributes = {}
+    if config.include_dirs:
+        attributes["headers"] = config.include_dirs[0]
+    if config.library_dirs:
+        attributes["libs"] = config.library_dirs[0]
+    return attributes
+
+
+def version_matches(declared: Optional[str], installed: Optional[str]) -> bool:
+    """
+    Whether a declared spec version agrees with an installed version.
+
+    Args:
+        declared (Optional[str]): The version of the spec (e.g., "4.9").
+        installed (Optional[str]): The version in the package file.
+
+    Returns:
+        bool: True if either is unknown, or if ``installed`` is ``declared``
+        or one of its sub-versions.
+    """
+    if not declared or not installed:
+        return True
+    return installed == declared or installed.startswith(declared + ".")
@@ -0,0 +1,256 @@
+"""
+Detection of the CPU and memory resources available to builds.
+
+The number of parallel build jobs a node can sustain depends on more than its
+CPU count: the process may be pinned to a subset of CPUs, a cgroup may cap its
+CPU time or memory, and a batch job only owns the CPUs it requested.
+:func:`estimate_build_jobs` combines all of these and explains the result.
+
+Every file is read relative to ``root`` and every variable from ``environ``,
+so the detection can be exercised against a fake system tree.
+"""
+
+import math
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Mapping, Optional, Tuple, Union
+
+#: Memory reserved per compile job unless stated otherwise (bytes).
+MEMORY_PER_JOB = 2 * 1024**3
+
+_GIB = 1024**3
+
+
+@dataclass
+class BuildJobsEstimate:
+    """
+    The number of build jobs chosen for a node and how it was derived.
+
+    Attributes:
+        jobs (int): The number of parallel build jobs.
+        reasons (List[str]): One line per limit that was considered.
+    """
+
+    jobs: int
+    reasons: List[str] = field(default_factory=list)
+
+
+def _read(root: Path, path: str) -> Optional[str]:
+    """Return the stripped content of ``root/path``, or None if unreadable."""
+    try:
+        return (root / path.lstrip("/")).read_text().strip()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def _cgroups(root: Path) -> List[Tuple[str, str]]:
+    """Return the (controllers, path) pairs of ``/proc/self/cgroup``."""
+    content = _read(root, "/proc/self/cgroup") or ""
+    groups = []
+    for line in content.splitlines():
+        parts = line.split(":", 2)
+        if len(parts) == 3:
+            groups.append((parts[1], parts[2]))
+    return groups
+
+
+def _cgroup_dirs(root: Path, controller: Optional[str]) -> List[str]:
+    """
+    Return the cgroup directories (relative to ``root``) limiting the process.
+
+    The process's own group comes first, followed by its ancestors, since a
+    limit on any of them applies. ``controller`` selects a cgroup v1
+    hierarchy; None selects the unified cgroup v2 hierarchy.
+    """
+    for controllers, path in _cgroups(root):
+        if controller is None and controllers == "":
+            base = "/sys/fs/cgroup"
+        elif controller is not None and controller in controllers.split(","):
+            base = f"/sys/fs/cgroup/{controllers}"
+        else:
+            continue
+        dirs = []
+        parts = [part for part in path.split("/") if part]
+        while True:
+            dirs.append("/".join([base] + parts))
+            if not parts:
+                return dirs
+            parts.pop()
+    return []
+
+
+def _integer(text: Optional[str]) -> Optional[int]:
+    """Parse a non-negative integer, returning None for anything else."""
+    try:
+        value = int(text) if text is not None else -1
+    except ValueError:
+        return None
+    return value if value >= 0 else None
+
+
+def cgroup_cpu_limit(root: Union[str, Path] = "/") -> Optional[Tuple[float, str]]:
+    """
+    Return the CPU quota imposed by cgroups.
+
+    Reads ``cpu.max`` (cgroup v2) or ``cpu.cfs_quota_us`` and
+    ``cpu.cfs_period_us`` (cgroup v1) of the process's cgroup and its
+    ancestors and keeps the tightest limit.
+
+    Args:
+        root (Union[str, Path]): Root of the filesystem to read.
+
+    Returns:
+        Optional[Tuple[float, str]]: The number of CPUs the quota allows and
+        the file it was read from, or None if no quota is set.
+    """
+    root = Path(root)
+    limits = []
+    for directory in _cgroup_dirs(root, None):
+        content = _read(root, f"{directory}/cpu.max")
+        if content:
+            quota, _, period = content.partition(" ")
+            quota, period = _integer(quota), _integer(period or "100000")
+            if quota and period:
+                limits.append((quota / period, f"{directory}/cpu.max"))
+    for directory in _cgroup_dirs(root, "cpu"):
+        quota = _integer(_read(root, f"{directory}/cpu.cfs_quota_us"))
+        period = _integer(_read(root, f"{directory}/cpu.cfs_period_us"))
+        if quota and period:
+            limits.append((quota / period, f"{directory}/cpu.cfs_quota_us"))
+    return min(limits) if limits else None
+
+
+def available_memory(root: Union[str, Path] = "/") -> Optional[Tuple[int, str]]:
+    """
+    Return the memory available for new processes.
+
+    This is ``MemAvailable`` from ``/proc/meminfo``, lowered to the headroom
+    left under a cgroup memory limit (``memory.max`` in cgroup v2,
+    ``memory.limit_in_bytes`` in cgroup v1) when one is tighter.
+
+    Args:
+        root (Union[str, Path]): Root of the filesystem to read.
+
+    Returns:
+        Optional[Tuple[int, str]]: The available bytes and where the figure
+        came from, or None if it cannot be determined.
+    """
+    root = Path(root)
+    candidates = []
+    for line in (_read(root, "/proc/meminfo") or "").splitlines():
+        if line.startswith("MemAvailable:"):
+            candidates.append((int(line.split()[1]) * 1024, "/proc/meminfo"))
+    for directory in _cgroup_dirs(root, None):
+        limit = _integer(_read(root, f"{directory}/memory.max"))
+        if limit is not None:
+            usage = _integer(_read(root, f"{directory}/memory.current")) or 0
+            candidates.append((max(limit - usage, 0), f"{directory}/memory.max"))
+    for directory in _cgroup_dirs(root, "memory"):
+        limit = _integer(_read(root, f"{directory}/memory.limit_in_bytes"))
+        # cgroup v1 reports "no limit" as a huge page-aligned number.
+        if limit is not None and limit < 1 << 62:
+            usage = _integer(_read(root, f"{directory}/memory.usage_in_bytes")) or 0
+            candidates.append(
+                (max(limit - usage, 0), f"{directory}/memory.limit_in_bytes")
+            )
+    return min(candidates) if candidates else None
+
+
+def scheduler_cpus(
+    environ: Optional[Mapping[str, str]] = None,
+) -> Optional[Tuple[int, str]]:
+    """
+    Return the CPUs allocated by a batch scheduler to the current job.
+
+    Slurm's ``SLURM_CPUS_PER_TASK`` and ``SLURM_CPUS_ON_NODE`` and PBS's
+    ``NCPUS`` are consulted, in that order.
+
+    Args:
+        environ (Optional[Mapping[str, str]]): Environment to read. Defaults to
+            ``os.environ``.
+
+    Returns:
+        Optional[Tuple[int, str]]: The number of CPUs and the variable it was
+        read from, or None outside of a batch job.
+    """
+    environ = os.environ if environ is None else environ
+    for variable in ("SLURM_CPUS_PER_TASK", "SLURM_CPUS_ON_NODE", "NCPUS"):
+        value = _integer(environ.get(variable))
+        if value:
+            return value, variable
+    return None
+
+
+def affinity_cpus() -> int:
+    """Return the number of CPUs the process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def estimate_build_jobs(
+    *,
+    memory_per_job: int = MEMORY_PER_JOB,
+    minimum: int = 1,
+    maximum: Optional[int] = None,
+    root: Union[str, Path] = "/",
+    environ: Optional[Mapping[str, str]] = None,
+) -> BuildJobsEstimate:
+    """
+    Derive the number of parallel build jobs the current node can sustain.
+
+    The estimate is the smallest of the CPUs in the process's affinity mask,
+    the cgroup CPU quota (rounded up), the CPUs allocated by Slurm or PBS and
+    the available memory divided by ``memory_per_job``, clamped to
+    ``[minimum, maximum]``.
+
+    Args:
+        memory_per_job (int): Bytes of memory needed by one compile job.
+        minimum (int): Floor of the estimate.
+        maximum (Optional[int]): Cap of the estimate.
+        root (Union[str, Path]): Root of the filesystem to read ``/proc`` and
+            ``/sys/fs/cgroup`` from.
+        environ (Optional[Mapping[str, str]]): Environment to read scheduler
+            variables from. Defaults to ``os.environ``.
+
+    Returns:
+        BuildJobsEstimate: The number of jobs and the reasoning behind it.
+
+    Raises:
+        ValueError: If ``minimum`` is below 1 or above ``maximum``.
+    """
+    if minimum < 1 or (maximum is not None and maximum < minimum):
+        raise ValueError(f"Invalid build job bounds [{minimum}, {maximum}].")
+    cpus = affinity_cpus()
+    limits = [(cpus, f"CPU affinity allows {cpus} CPU(s)")]
+    quota = cgroup_cpu_limit(root)
+    if quota is not None:
+        cpus, source = quota
+        limits.append(
+            (math.ceil(cpus), f"cgroup quota allows {cpus:g} CPU(s) ({source})")
+        )
+    allocated = scheduler_cpus(environ)
+    if allocated is not None:
+        cpus, variable = allocated
+        limits.append((cpus, f"batch job allocated {cpus} CPU(s) ({variable})"))
+    memory = available_memory(root)
+    if memory is not None:
+        available, source = memory
+        jobs = available // memory_per_job
+        limits.append(
+            (
+                jobs,
+                f"{available / _GIB:.1f} GiB available ({source}) at "
+                f"{memory_per_job / _GIB:.1f} GiB per job allows {jobs} job(s)",
+            )
+        )
+    jobs = min(limit for limit, _ in limits)
+    reasons = [reason for _, reason in limits]
+    if jobs < minimum:
+        reasons.append(f"raised to the floor of {minimum}")
+        jobs = minimum
+    if maximum is not None and jobs > maximum:
+        reasons.append(f"lowered to the cap of {maximum}")
+        jobs = maximum
+    return BuildJobsEstimate(jobs=jobs, reasons=reasons)
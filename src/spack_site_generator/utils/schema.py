@@ -0,0 +1,636 @@
+"""
+Vendored Spack configuration schemas and a compiled, cached validator.
+
+The schemas below are a trimmed, offline copy of the JSON-schema definitions
+Spack uses to load ``packages.yaml``, ``compilers.yaml``, ``modules.yaml``,
+``config.yaml``, ``mirrors.yaml``, ``upstreams.yaml``, ``concretizer.yaml``
+and ``include.yaml``. Only the subset of JSON schema needed by those definitions is
+supported (``type``, ``properties``, ``required``, ``additionalProperties``,
+``items``, ``anyOf``, ``enum`` and ``minimum``).
+
+Each schema is compiled once into a tree of small closures and cached, so
+validating a section only walks the data and never re-interprets the schema.
+"""
+
+from functools import lru_cache
+from typing import Any, Callable, Dict, List
+
+Validator = Callable[[Any], None]
+
+
+class SchemaValidationError(ValueError):
+    """
+    Raised when a configuration section does not match its schema.
+
+    Attributes:
+        message (str): Description of the mismatch.
+        path (List[Any]): Keys and list indices leading to the offending value.
+    """
+
+    def __init__(self, message: str) -> None:
+        super().__init__(message)
+        self.message = message
+        self.path: List[Any] = []
+
+    def __str__(self) -> str:
+        location = ""
+        for key in self.path:
+            if isinstance(key, int):
+                location += f"[{key}]"
+            else:
+                location += f".{key}" if location else str(key)
+        return f"{location}: {self.message}" if location else self.message
+
+
+# -----------------------------------------------------------------------------
+# Schema definitions
+# -----------------------------------------------------------------------------
+
+_STRING = {"type": "string"}
+_BOOLEAN = {"type": "boolean"}
+_STRING_LIST = {"type": "array", "items": _STRING}
+_OPTIONAL_STRING = {"type": ["string", "null"]}
+_OPTIONAL_STRING_LIST = {"type": ["array", "null"], "items": _STRING}
+
+#: The ``{"override": True}`` marker converted into ``::`` by ``to_yaml``.
+_OVERRIDE = {
+    "type": "object",
+    "required": ["override"],
+    "properties": {"override": _BOOLEAN},
+    "additionalProperties": False,
+}
+
+_PREFERENCE_LIST = {"type": "array", "items": {"anyOf": [_STRING, _OVERRIDE]}}
+
+EXTERNAL_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "required": ["spec"],
+    "properties": {
+        "spec": _STRING,
+        "prefix": _STRING,
+        "modules": _STRING_LIST,
+        "extra_attributes": {"type": "object"},
+    },
+    "additionalProperties": False,
+}
+
+PACKAGE_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "buildable": _BOOLEAN,
+        "override": _BOOLEAN,
+        "externals": {"type": "array", "items": EXTERNAL_SCHEMA},
+        "version": {"type": "array", "items": {"type": ["string", "number"]}},
+        "target": _PREFERENCE_LIST,
+        "compiler": _PREFERENCE_LIST,
+        "providers": {"type": "object", "additionalProperties": _PREFERENCE_LIST},
+        "variants": {"type": ["string", "array"], "items": _STRING},
+        "require": {"type": ["string", "array", "object"]},
+        "prefer": {"type": "array"},
+        "conflict": {"type": "array"},
+        "permissions": {"type": "object"},
+    },
+    "additionalProperties": False,
+}
+
+PACKAGES_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "required": ["packages"],
+    "properties": {
+        "packages": {"type": "object", "additionalProperties": PACKAGE_SCHEMA},
+    },
+    "additionalProperties": False,
+}
+
+COMPILER_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "required": ["spec", "paths", "operating_system"],
+    "properties": {
+        "spec": _STRING,
+        "paths": {
+            "type": "object",
+            "properties": {
+                "cc": _OPTIONAL_STRING,
+                "cxx": _OPTIONAL_STRING,
+                "f77": _OPTIONAL_STRING,
+                "fc": _OPTIONAL_STRING,
+            },
+            "additionalProperties": False,
+        },
+        "flags": {
+            "type": ["object", "null"],
+            "properties": {
+                "cflags": _OPTIONAL_STRING,
+                "cxxflags": _OPTIONAL_STRING,
+                "fflags": _OPTIONAL_STRING,
+                "cppflags": _OPTIONAL_STRING,
+                "ldflags": _OPTIONAL_STRING,
+                "ldlibs": _OPTIONAL_STRING,
+            },
+            "additionalProperties": False,
+        },
+        "operating_system": _STRING,
+        "target": _STRING,
+        "modules": _OPTIONAL_STRING_LIST,
+        "environment": {
+            "type": ["object", "null"],
+            "properties": {
+                "set": {"type": "object", "additionalProperties": _STRING},
+                "unset": _STRING_LIST,
+                "prepend_path": {"type": "object", "additionalProperties": _STRING},
+                "append_path": {"type": "object", "additionalProperties": _STRING},
+                "remove_path": {"type": "object", "additionalProperties": _STRING},
+            },
+            "additionalProperties": False,
+        },
+        "extra_rpaths": _OPTIONAL_STRING_LIST,
+        "implicit_rpaths": {"type": ["array", "boolean", "null"], "items": _STRING},
+        "alias": _OPTIONAL_STRING,
+    },
+    "additionalProperties": False,
+}
+
+COMPILERS_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "required": ["compilers"],
+    "properties": {
+        "compilers": {
+            "type": "array",
+            "items": {
+                "anyOf": [
+                    _OVERRIDE,
+                    {
+                        "type": "object",
+                        "required": ["compiler"],
+                        "properties": {"compiler": COMPILER_SCHEMA},
+                        "additionalProperties": False,
+                    },
+                ]
+            },
+        },
+    },
+    "additionalProperties": False,
+}
+
+_MODULE_TYPE_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "all": {"type": "object"},
+        "hash_length": {"type": "integer", "minimum": 0},
+        "hide_implicits": _BOOLEAN,
+        "exclude_implicits": _BOOLEAN,
+        "include": _STRING_LIST,
+        "exclude": _STRING_LIST,
+        "naming_scheme": _STRING,
+        "projections": {"type": "object", "additionalProperties": _STRING},
+        "core_compilers": _STRING_LIST,
+        "core_specs": _STRING_LIST,
+        "filter_hierarchy_specs": {"type": "object"},
+        "hierarchy": _STRING_LIST,
+        "verbose": _BOOLEAN,
+        "defaults": _STRING_LIST,
+    },
+    # Anything else is a per-spec section, e.g. ``openmpi: {environment: ...}``.
+    "additionalProperties": {"type": "object"},
+}
+
+MODULES_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "required": ["modules"],
+    "properties": {
+        "modules": {
+            "type": "object",
+            "properties": {
+                "prefix_inspections": {
+                    "type": "object",
+                    "additionalProperties": _STRING_LIST,
+                },
+            },
+            "additionalProperties": {
+                "type": "object",
+                "properties": {
+                    "enable": {
+                        "type": "array",
+                        "items": {"anyOf": [{"enum": ["tcl", "lmod"]}, _OVERRIDE]},
+                    },
+                    "roots": {"type": "object", "additionalProperties": _STRING},
+                    "arch_folder": _BOOLEAN,
+                    "use_view": {"type": ["string", "boolean"]},
+                    "tcl": _MODULE_TYPE_SCHEMA,
+                    "lmod": _MODULE_TYPE_SCHEMA,
+                },
+                "additionalProperties": False,
+            },
+        },
+    },
+    "additionalProperties": False,
+}
+
+_ANY: Dict[str, Any] = {}
+
+CONFIG_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "required": ["config"],
+    "properties": {
+        "config": {
+            "type": "object",
+            "properties": {
+                "build_jobs": {"type": "integer", "minimum": 1},
+                "build_stage": {"type": ["string", "array"], "items": _STRING},
+                "test_stage": _STRING,
+                "source_cache": _STRING,
+                "misc_cache": _STRING,
+                "install_tree": {"type": ["string", "object"]},
+                "install_hash_length": {"type": "integer", "minimum": 1},
+                "environments_root": _STRING,
+                "license_dir": _STRING,
+                "template_dirs": _STRING_LIST,
+                "extensions": _STRING_LIST,
+                "shared_linking": _ANY,
+                "connect_timeout": {"type": "integer", "minimum": 0},
+                "verify_ssl": _BOOLEAN,
+                "ssl_certs": _STRING,
+                "suppress_gpg_warnings": _BOOLEAN,
+                "debug": _BOOLEAN,
+                "checksum": _BOOLEAN,
+                "deprecated": _BOOLEAN,
+                "locks": _BOOLEAN,
+                "dirty": _BOOLEAN,
+                "build_language": _STRING,
+                "ccache": _BOOLEAN,
+                "db_lock_timeout": {"type": "integer", "minimum": 1},
+                "package_lock_timeout": {"type": ["integer", "null"]},
+                "allow_sgid": _BOOLEAN,
+                "install_status": _BOOLEAN,
+                "binary_index_ttl": {"type": "integer", "minimum": 0},
+                "url_fetch_method": _STRING,
+                "additional_external_search_paths": _STRING_LIST,
+                "flags": {"type": "object"},
+                "aliases": {"type": "object"},
+            },
+            "additionalProperties": False,
+        },
+    },
+    "additionalProperties": False,
+}
+
+_MIRROR_URL: Dict[str, Any] = {
+    "anyOf": [
+        _STRING,
+        {
+            "type": "object",
+            "required": ["url"],
+            "properties": {
+                "url": _STRING,
+                "access_pair": {"type": ["array", "object", "null"]},
+                "access_token": _OPTIONAL_STRING,
+                "profile": _OPTIONAL_STRING,
+                "endpoint_url": _OPTIONAL_STRING,
+            },
+            "additionalProperties": False,
+        },
+    ]
+}
+
+MIRROR_SCHEMA: Dict[str, Any] = {
+    "anyOf": [
+        _STRING,
+        {
+            "type": "object",
+            "anyOf": [{"required": ["url"]}, {"required": ["fetch", "push"]}],
+            "properties": {
+                "url": _STRING,
+                "fetch": _MIRROR_URL,
+                "push": _MIRROR_URL,
+                "source": _BOOLEAN,
+                "binary": _BOOLEAN,
+                "signed": _BOOLEAN,
+                "autopush": _BOOLEAN,
+                "access_pair": {"type": ["array", "object", "null"]},
+                "access_token": _OPTIONAL_STRING,
+                "profile": _OPTIONAL_STRING,
+                "endpoint_url": _OPTIONAL_STRING,
+            },
+            "additionalProperties": False,
+        },
+    ]
+}
+
+MIRRORS_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "required": ["mirrors"],
+    "properties": {
+        "mirrors": {"type": "object", "additionalProperties": MIRROR_SCHEMA},
+    },
+    "additionalProperties": False,
+}
+
+UPSTREAMS_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "required": ["upstreams"],
+    "properties": {
+        "upstreams": {
+            "type": "object",
+            "additionalProperties": {
+                "type": "object",
+                "required": ["install_tree"],
+                "properties": {
+                    "install_tree": _STRING,
+                    "modules": {
+                        "type": "object",
+                        "properties": {"tcl": _STRING, "lmod": _STRING},
+                        "additionalProperties": False,
+                    },
+                },
+                "additionalProperties": False,
+            },
+        },
+    },
+    "additionalProperties": False,
+}
+
+CONCRETIZER_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "required": ["concretizer"],
+    "properties": {
+        "concretizer": {
+            "type": "object",
+            "properties": {
+                "reuse": {
+                    "anyOf": [
+                        _BOOLEAN,
+                        {"enum": ["dependencies"]},
+                        {
+                            "type": "object",
+                            "properties": {
+                                "roots": _BOOLEAN,
+                                "include": _STRING_LIST,
+                                "exclude": _STRING_LIST,
+                                "from": {
+                                    "type": "array",
+                                    "items": {
+                                        "type": "object",
+                                        "required": ["type"],
+                                        "properties": {
+                                            "type": {
+                                                "enum": [
+                                                    "local",
+                                                    "buildcache",
+                                                    "external",
+                                                    "environment",
+                                                ]
+                                            },
+                                            "path": _STRING,
+                                            "include": _STRING_LIST,
+                                            "exclude": _STRING_LIST,
+                                        },
+                                        "additionalProperties": False,
+                                    },
+                                },
+                            },
+                            "additionalProperties": False,
+                        },
+                    ]
+                },
+                "enable_node_namespace": _BOOLEAN,
+                "targets": {
+                    "type": "object",
+                    "properties": {
+                        "host_compatible": _BOOLEAN,
+                        "granularity": {"enum": ["generic", "microarchitectures"]},
+                    },
+                    "additionalProperties": False,
+                },
+                "unify": {"anyOf": [_BOOLEAN, {"enum": ["when_possible"]}]},
+                "duplicates": {
+                    "type": "object",
+                    "properties": {
+                        "strategy": {"enum": ["none", "minimal", "full"]},
+                        "max_dupes": {
+                            "type": "object",
+                            "additionalProperties": {"type": "integer", "minimum": 1},
+                        },
+                    },
+                    "additionalProperties": False,
+                },
+                "timeout": {"type": "integer", "minimum": 0},
+                "error_on_timeout": _BOOLEAN,
+                "static_analysis": _BOOLEAN,
+                "os_compatible": {"type": "object"},
+                "splice": {"type": "object"},
+            },
+            "additionalProperties": False,
+        },
+    },
+    "additionalProperties": False,
+}
+
+INCLUDE_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "required": ["include"],
+    "properties": {"include": _STRING_LIST},
+    "additionalProperties": False,
+}
+
+#: Schemas addressable by name through :func:`get_validator`.
+SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "packages": PACKAGES_SCHEMA,
+    "packages:external": EXTERNAL_SCHEMA,
+    "compilers": COMPILERS_SCHEMA,
+    "compilers:compiler": COMPILER_SCHEMA,
+    "modules": MODULES_SCHEMA,
+    "config": CONFIG_SCHEMA,
+    "mirrors": MIRRORS_SCHEMA,
+    "upstreams": UPSTREAMS_SCHEMA,
+    "concretizer": CONCRETIZER_SCHEMA,
+    "include": INCLUDE_SCHEMA,
+}
+
+
+# -----------------------------------------------------------------------------
+# Schema compiler
+# -----------------------------------------------------------------------------
+
+_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "boolean": lambda value: isinstance(value, bool),
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "number": lambda value: isinstance(value, (int, float))
+    and not isinstance(value, bool),
+    "null": lambda value: value is None,
+}
+
+
+def _type_name(value: Any) -> str:
+    """Return the JSON-schema type name of ``value`` for error messages."""
+    for name, check in _TYPE_CHECKS.items():
+        if check(value):
+            return name
+    return type(value).__name__
+
+
+def _descend(validator: Validator, value: Any, key: Any) -> None:
+    """Run ``validator`` on a child value, recording ``key`` on failure."""
+    try:
+        validator(value)
+    except SchemaValidationError as error:
+        error.path.insert(0, key)
+        raise
+
+
+def compile_schema(schema: Dict[str, Any]) -> Validator:
+    """
+    Compile a schema into a validator function.
+
+    The returned callable raises :class:`SchemaValidationError` when its
+    argument does not match ``schema`` and returns None otherwise.
+
+    Args:
+        schema (Dict[str, Any]): A schema using the supported JSON-schema subset.
+
+    Returns:
+        Validator: The compiled validator.
+    """
+    checks: List[Validator] = []
+
+    if "type" in schema:
+        names = schema["type"]
+        names = [names] if isinstance(names, str) else list(names)
+        type_checks = tuple(_TYPE_CHECKS[name] for name in names)
+        expected = " or ".join(names)
+
+        def check_type(value: Any) -> None:
+            for type_check in type_checks:
+                if type_check(value):
+                    return
+            raise SchemaValidationError(f"expected {expected}, got {_type_name(value)}")
+
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = list(schema["enum"])
+
+        def check_enum(value: Any) -> None:
+            if value not in allowed:
+                raise SchemaValidationError(f"{value!r} is not one of {allowed}")
+
+        checks.append(check_enum)
+
+    if "minimum" in schema:
+        minimum = schema["minimum"]
+
+        def check_minimum(value: Any) -> None:
+            if isinstance(value, (int, float)) and value < minimum:
+                raise SchemaValidationError(f"{value} is less than {minimum}")
+
+        checks.append(check_minimum)
+
+    if "anyOf" in schema:
+        options = [compile_schema(option) for option in schema["anyOf"]]
+
+        def check_any_of(value: Any) -> None:
+            errors = []
+            for option in options:
+                try:
+                    option(value)
+                    return
+                except SchemaValidationError as error:
+                    errors.append(str(error))
+            raise SchemaValidationError(
+                "does not match any allowed form (" + "; ".join(errors) + ")"
+            )
+
+        checks.append(check_any_of)
+
+    if "required" in schema:
+        required = tuple(schema["required"])
+
+        def check_required(value: Any) -> None:
+            if isinstance(value, dict):
+                for key in required:
+                    if key not in value:
+                        raise SchemaValidationError(f"missing required key '{key}'")
+
+        checks.append(check_required)
+
+    if "properties" in schema or "additionalProperties" in schema:
+        properties = {
+            key: compile_schema(sub_schema)
+            for key, sub_schema in schema.get("properties", {}).items()
+        }
+        additional = schema.get("additionalProperties", True)
+        if isinstance(additional, dict):
+            additional = compile_schema(additional)
+
+        def check_properties(value: Any) -> None:
+            if not isinstance(value, dict):
+                return
+            for key, item in value.items():
+                validator = properties.get(key)
+                if validator is not None:
+                    _descend(validator, item, key)
+                elif additional is False:
+                    raise SchemaValidationError(f"unexpected key '{key}'")
+                elif additional is not True:
+                    _descend(additional, item, key)
+
+        checks.append(check_properties)
+
+    if "items" in schema:
+        item_validator = compile_schema(schema["items"])
+
+        def check_items(value: Any) -> None:
+            if not isinstance(value, list):
+                return
+            for index, item in enumerate(value):
+                _descend(item_validator, item, index)
+
+        checks.append(check_items)
+
+    if not checks:
+        return lambda value: None
+    if len(checks) == 1:
+        return checks[0]
+
+    def check_all(value: Any) -> None:
+        for check in checks:
+            check(value)
+
+    return check_all
+
+
+@lru_cache(maxsize=None)
+def get_validator(name: str) -> Validator:
+    """
+    Return the compiled validator for a named schema.
+
+    Validators are compiled on first use and cached for the lifetime of the
+    process.
+
+    Args:
+        name (str): A key of :data:`SCHEMAS` (e.g., "packages").
+
+    Returns:
+        Validator: The compiled validator.
+
+    Raises:
+        KeyError: If no schema is registered under ``name``.
+    """
+    return compile_schema(SCHEMAS[name])
+
+
+def validate_section(name: str, data: Dict[str, Any]) -> None:
+    """
+    Validate an in-memory configuration section against its schema.
+
+    Args:
+        name (str): The schema name (e.g., "packages", "compilers").
+        data (Dict[str, Any]): The section as it will be rendered, including
+            its top-level key (e.g., ``{"packages": {...}}``).
+
+    Raises:
+        SchemaValidationError: If ``data`` does not match the schema.
+    """
+    get_validator(name)(data)
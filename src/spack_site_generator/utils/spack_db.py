@@ -0,0 +1,326 @@
+"""
+Reading the install database of a Spack installation tree.
+
+Every Spack install tree records its installations in
+``<install_tree>/.spack-db/index.json``. The site generator reads it to learn
+what an upstream installation already provides, and to import its installs as
+externals.
+
+The database of a center's install tree can be hundreds of megabytes, so it is
+never loaded at once: :func:`iter_records` decodes one install record at a time
+from a bounded buffer with ``json.JSONDecoder.raw_decode``.
+"""
+
+import fnmatch
+import json
+import os
+import re
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from spack_site_generator.utils.detection_cache import DetectionCache
+
+DATABASE_PATH = os.path.join(".spack-db", "index.json")
+
+#: Characters read from the database at a time.
+CHUNK_SIZE = 1 << 20
+
+#: Variants that are not written into the spec of an imported external.
+_SKIPPED_PARAMETERS = {
+    "cflags",
+    "cppflags",
+    "cxxflags",
+    "fflags",
+    "ldflags",
+    "ldlibs",
+    "patches",
+    "dev_path",
+}
+
+_INSTALLS = re.compile(r'"installs"\s*:\s*\{')
+_SEPARATOR = re.compile(r"[\s,]*")
+_COLON = re.compile(r"\s*:\s*")
+
+
+class InstalledSpec(NamedTuple):
+    """
+    An installation recorded in a Spack install database.
+
+    Attributes:
+        name (str): Package name (e.g., "netcdf-c").
+        version (str): Package version (e.g., "4.9.2").
+        compiler (Optional[str]): Compiler as ``name@version``, if recorded.
+        hash (str): The DAG hash of the spec.
+        prefix (str): Installation prefix.
+        spec (str): Spec string for an external, with version, compiler and
+            variants (e.g., "netcdf-c@4.9.2%gcc@12.2.0 +mpi ~dap").
+        explicit (bool): Whether the spec was installed explicitly rather than
+            as a dependency.
+    """
+
+    name: str
+    version: str
+    compiler: Optional[str]
+    hash: str
+    prefix: str
+    spec: str
+    explicit: bool
+
+
+def database_path(install_tree: Union[str, Path]) -> Path:
+    """
+    Return the install database of an install tree.
+
+    Args:
+        install_tree (Union[str, Path]): The root of the install tree (e.g.,
+            ``/glade/u/apps/derecho/23.09/spack/opt/spack``).
+
+    Returns:
+        Path: The ``index.json`` file of the tree.
+    """
+    return Path(install_tree) / DATABASE_PATH
+
+
+def iter_records(
+    path: Union[str, Path], *, chunk_size: int = CHUNK_SIZE
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Yield the install records of a database file one at a time.
+
+    Only the record being decoded and one chunk of the file are held in
+    memory.
+
+    Args:
+        path (Union[str, Path]): The ``index.json`` file.
+        chunk_size (int): Characters read from the file at a time.
+
+    Yields:
+        Tuple[str, Dict[str, Any]]: The hash and the record of each install,
+        in file order.
+
+    Raises:
+        ValueError: If the file is not a Spack install database or is
+            truncated.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as file:
+        buffer = ""
+        while True:
+            chunk = file.read(chunk_size)
+            buffer += chunk
+            match = _INSTALLS.search(buffer)
+            if match:
+                break
+            if not chunk:
+                raise ValueError(f"'{path}' is not a Spack install database.")
+            # Keep enough of the tail for a key split across chunks.
+            buffer = buffer[-256:]
+        position = match.end()
+        while True:
+            position = _SEPARATOR.match(buffer, position).end()
+            if buffer.startswith("}", position):
+                return
+            try:
+                key, end = decoder.raw_decode(buffer, position)
+                colon = _COLON.match(buffer, end)
+                if colon is None:
+                    raise ValueError("incomplete record")
+                record, end = decoder.raw_decode(buffer, colon.end())
+            except ValueError:
+                # The record continues in the next chunk.
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    raise ValueError(f"'{path}' is truncated or malformed.")
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            if not isinstance(key, str) or not isinstance(record, dict):
+                raise ValueError(f"'{path}' is not a Spack install database.")
+            yield key, record
+            position = end
+            if position >= chunk_size:
+                buffer = buffer[position:]
+                position = 0
+
+
+def _node(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the spec node of a record, for every database version."""
+    node = record.get("spec") or {}
+    if "name" not in node and len(node) == 1:
+        # Databases before version 6 key the node by package name.
+        ((name, node),) = node.items()
+        node = {**node, "name": name}
+    return node
+
+
+def _variants(parameters: Dict[str, Any]) -> List[str]:
+    """Return the variants of a spec node as sorted spec tokens."""
+    variants = []
+    for name, value in sorted(parameters.items()):
+        if name in _SKIPPED_PARAMETERS:
+            continue
+        if value is True:
+            variants.append(f"+{name}")
+        elif value is False:
+            variants.append(f"~{name}")
+        elif isinstance(value, list):
+            if value:
+                variants.append(f"{name}={','.join(map(str, value))}")
+        elif value is not None:
+            variants.append(f"{name}={value}")
+    return variants
+
+
+def installed_spec(key: str, record: Dict[str, Any]) -> Optional[InstalledSpec]:
+    """
+    Describe an install record.
+
+    Args:
+        key (str): The key of the record in the database, its hash.
+        record (Dict[str, Any]): The record, as yielded by ``iter_records``.
+
+    Returns:
+        Optional[InstalledSpec]: The installation, or None if it was removed
+        or the record has no package name or prefix.
+    """
+    if not record.get("installed", True) or not record.get("path"):
+        return None
+    node = _node(record)
+    name = node.get("name")
+    if not name:
+        return None
+    version = str(node.get("version", ""))
+    compiler = node.get("compiler")
+    if isinstance(compiler, dict) and compiler.get("name"):
+        compiler = f"{compiler['name']}@{compiler.get('version', '')}".rstrip("@")
+    else:
+        compiler = None
+    spec = name + (f"@{version}" if version else "")
+    spec += f"%{compiler}" if compiler else ""
+    spec = " ".join([spec, *_variants(node.get("parameters") or {})])
+    return InstalledSpec(
+        name=name,
+        version=version,
+        compiler=compiler,
+        hash=node.get("hash", key),
+        prefix=record["path"],
+        spec=spec,
+        explicit=bool(record.get("explicit", False)),
+    )
+
+
+def _read(path: str) -> List[List[Any]]:
+    """Return the installations of a database file as plain lists."""
+    installs = []
+    for key, record in iter_records(path):
+        install = installed_spec(key, record)
+        if install is not None:
+            installs.append(list(install))
+    return installs
+
+
+def _count(path: str) -> int:
+    """Count the installed records of a database file."""
+    return sum(1 for _, record in iter_records(path) if record.get("installed", True))
+
+
+def _compiler_matches(compiler: Optional[str], wanted: str) -> bool:
+    """Whether ``compiler`` is ``wanted``, given as ``name`` or ``name@version``."""
+    if not compiler:
+        return False
+    name, _, version = compiler.partition("@")
+    wanted_name, _, wanted_version = wanted.partition("@")
+    return name == wanted_name and (
+        not wanted_version
+        or version == wanted_version
+        or version.startswith(wanted_version + ".")
+    )
+
+
+def read_installs(
+    install_tree: Union[str, Path],
+    *,
+    names: Optional[Iterable[str]] = None,
+    compiler: Optional[str] = None,
+    pattern: Optional[str] = None,
+    explicit: Optional[bool] = None,
+    cache: Optional[DetectionCache] = None,
+) -> List[InstalledSpec]:
+    """
+    Read the installations recorded in an install tree's database.
+
+    The database is streamed (see ``iter_records``). With a ``cache``, the
+    parsed installations are stored under the "spack-db" namespace, keyed on
+    the database file and its modification time, and filtered afterwards, so
+    later runs with other filters do not read the database again.
+
+    Args:
+        install_tree (Union[str, Path]): The root of the install tree.
+        names (Optional[Iterable[str]]): Package names to keep.
+        compiler (Optional[str]): Compiler to keep, as ``name`` or
+            ``name@version`` (e.g., "gcc@12" matches gcc 12.2.0).
+        pattern (Optional[str]): Shell-style pattern the package name must
+            match (e.g., "netcdf-*").
+        explicit (Optional[bool]): Keep only explicit (True) or only implicit
+            (False) installations.
+        cache (Optional[DetectionCache]): Cache for the parsed database.
+
+    Returns:
+        List[InstalledSpec]: The matching installations, in database order.
+
+    Raises:
+        FileNotFoundError: If the install tree has no database.
+        ValueError: If the database cannot be parsed.
+    """
+    path = os.fspath(database_path(install_tree))
+    if cache is None:
+        records = _read(path)
+    else:
+        records = cache.get_or_compute("spack-db", path, lambda: _read(path))
+    names = set(names) if names is not None else None
+    return [
+        install
+        for install in map(InstalledSpec._make, records)
+        if (names is None or install.name in names)
+        and (compiler is None or _compiler_matches(install.compiler, compiler))
+        and (pattern is None or fnmatch.fnmatchcase(install.name, pattern))
+        and (explicit is None or install.explicit == explicit)
+    ]
+
+
+def count_installs(
+    install_tree: Union[str, Path], *, cache: Optional[DetectionCache] = None
+) -> int:
+    """
+    Count the installations recorded in an install tree's database.
+
+    Records of specs that were uninstalled but are still referenced by other
+    installations are not counted. The database is streamed (see
+    ``iter_records``).
+
+    Args:
+        install_tree (Union[str, Path]): The root of the install tree.
+        cache (Optional[DetectionCache]): Cache for the count, keyed on the
+            database file, so a changed database is read again.
+
+    Returns:
+        int: The number of installed specs.
+
+    Raises:
+        FileNotFoundError: If the install tree has no database.
+        ValueError: If the database cannot be parsed.
+    """
+    path = os.fspath(database_path(install_tree))
+    if cache is None:
+        return _count(path)
+    return cache.get_or_compute("spack-db-count", path, lambda: _count(path))
@@ -1,8 +1,99 @@
+import io
+import itertools
+import os
+from collections import deque
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Dict, Any, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
+
 import yaml
-from typing import Dict, Any
+
+#: Entries rendered by one task when rendering on an executor.
+BATCH_SIZE = 64
+
+#: Batches queued on an executor ahead of the one being written.
+_WINDOW = 32
+
+
+class _NoAliasDumper(yaml.Dumper):
+    """
+    A YAML dumper that never emits anchors or aliases.
+
+    Configuration sections share list objects between entries (see
+    ``InternPool``); this dumper writes every occurrence out in full.
+    """
+
+    def ignore_aliases(self, data: Any) -> bool:
+        return True
+
+
+def _has_override(node: Any) -> bool:
+    """Return True if ``node`` is a mapping carrying ``override: true``."""
+    return isinstance(node, dict) and node.get("override") is True
 
 
-def convert_to_spack_yaml(yaml_data: Dict[str, Any]) -> str:
+def share_identical_subtrees(yaml_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return a copy of ``yaml_data`` in which equal subtrees are the same object.
+
+    Dumping the result with an alias-aware dumper emits the first occurrence of
+    each repeated list or mapping with an anchor and every later occurrence as
+    an alias. Empty containers, subtrees containing ``override: true`` and the
+    direct children of an overriding mapping are never shared, since the Spack
+    ``::`` rewrite works line by line and cannot follow an alias.
+
+    Args:
+        yaml_data (Dict[str, Any]): The dictionary to deduplicate.
+
+    Returns:
+        Dict[str, Any]: A structurally equal copy with shared subtrees.
+    """
+    shared: Dict[Any, Any] = {}
+
+    def share(node: Any, allow: bool) -> Tuple[Any, Any, bool]:
+        if isinstance(node, dict):
+            overriding = _has_override(node)
+            children = [
+                (key, share(value, not overriding)) for key, value in node.items()
+            ]
+            copy = {key: child for key, (child, _, _) in children}
+            key = ("map",) + tuple((k, child_key) for k, (_, child_key, _) in children)
+            shareable = (
+                bool(node) and not overriding and all(ok for _, (_, _, ok) in children)
+            )
+        elif isinstance(node, list):
+            children = [share(value, True) for value in node]
+            copy = [child for child, _, _ in children]
+            key = ("seq",) + tuple(child_key for _, child_key, _ in children)
+            shareable = bool(node) and all(ok for _, _, ok in children)
+        else:
+            try:
+                hash(node)
+                key = (type(node).__name__, node)
+            except TypeError:
+                key = ("id", id(node))
+            return node, key, True
+        if not (shareable and allow):
+            return copy, key, shareable
+        return shared.setdefault(key, copy), key, True
+
+    return share(yaml_data, True)[0]
+
+
+def _dump(yaml_data: Dict[str, Any], anchors: bool) -> str:
+    """Dump ``yaml_data`` in block style, with or without anchors and aliases."""
+    if anchors:
+        return yaml.dump(
+            share_identical_subtrees(yaml_data),
+            default_flow_style=False,
+            sort_keys=False,
+        )
+    return yaml.dump(
+        yaml_data, Dumper=_NoAliasDumper, default_flow_style=False, sort_keys=False
+    )
+
+
+def convert_to_spack_yaml(yaml_data: Dict[str, Any], anchors: bool = False) -> str:
     """
     Convert a dictionary to a YAML-formatted string, applying Spack-specific formatting.
 
@@ -12,14 +103,17 @@ def convert_to_spack_yaml(yaml_data: Dict[str, Any]) -> str:
 
     Args:
         yaml_data (Dict[str, Any]): The dictionary to convert.
+        anchors (bool, optional): Whether to emit YAML anchors and aliases for
+                                  repeated subtrees. Defaults to False.
 
     Returns:
         str: The formatted YAML string.
     """
-    yaml_lines = yaml.dump(
-        yaml_data, default_flow_style=False, sort_keys=False
-    ).splitlines()
+    return "\n".join(_spack_format_lines(_dump(yaml_data, anchors).splitlines()))
+
 
+def _spack_format_lines(yaml_lines: List[str]) -> List[str]:
+    """Rewrite the keys of overriding mappings to Spack's ``key::`` form."""
     formatted_lines = []
     line_index = 0
 
@@ -42,10 +136,12 @@ def convert_to_spack_yaml(yaml_data: Dict[str, Any]) -> str:
             formatted_lines.append(yaml_lines[line_index])
             line_index += 1
 
-    return "\n".join(formatted_lines)
+    return formatted_lines
 
 
-def to_yaml(yaml_data: Dict[str, Any], spack_format: bool = True) -> str:
+def to_yaml(
+    yaml_data: Dict[str, Any], spack_format: bool = True, anchors: bool = False
+) -> str:
     """
     Convert a dictionary to a YAML-formatted string.
 
@@ -53,10 +149,205 @@ def to_yaml(yaml_data: Dict[str, Any], spack_format: bool = True) -> str:
         yaml_data (Dict[str, Any]): The dictionary to convert.
         spack_format (bool, optional): Whether to apply Spack-specific formatting.
                                        Defaults to True.
+        anchors (bool, optional): Whether to emit YAML anchors and aliases for
+                                  repeated subtrees. The default output never
+                                  contains aliases. Defaults to False.
 
     Returns:
         str: The formatted YAML string.
     """
     if spack_format:
-        return convert_to_spack_yaml(yaml_data)
-    return yaml.dump(yaml_data, default_flow_style=False, sort_keys=False)
+        return convert_to_spack_yaml(yaml_data, anchors=anchors)
+    return _dump(yaml_data, anchors)
+
+
+def fragment_lines(yaml_data: Dict[str, Any], skip: int) -> List[str]:
+    """
+    Render a single entry of a larger document and return its own lines.
+
+    ``yaml_data`` wraps the entry in the same parent keys it has in the full
+    document (e.g. ``{"packages": {"hdf5": {"externals": [external]}}}``), so
+    indentation and line wrapping match what the full document would contain.
+    The first ``skip`` lines, which belong to the wrapper, are dropped.
+
+    Args:
+        yaml_data (Dict[str, Any]): The wrapped entry.
+        skip (int): Number of wrapper lines to drop.
+
+    Returns:
+        List[str]: The lines of the entry, without aliases.
+    """
+    return _dump(yaml_data, anchors=False).splitlines()[skip:]
+
+
+def _fragment_batch(fragments: List[Dict[str, Any]], skip: int) -> List[str]:
+    """Render a batch of fragments; runs in executor workers."""
+    lines = []
+    for fragment in fragments:
+        lines.extend(fragment_lines(fragment, skip))
+    return lines
+
+
+def map_fragment_lines(
+    fragments: Iterable[Dict[str, Any]],
+    skip: int,
+    *,
+    executor: Optional[Executor] = None,
+    batch_size: int = BATCH_SIZE,
+) -> Iterator[str]:
+    """
+    Yield the lines of ``fragment_lines`` for each fragment, in order.
+
+    With an ``executor``, fragments are rendered in batches of ``batch_size``
+    on the executor while earlier batches are yielded. Only a bounded number
+    of batches is queued, so long generators are not materialized at once.
+    The lines are the same with or without an executor.
+
+    Args:
+        fragments (Iterable[Dict[str, Any]]): Wrapped entries, as taken by
+            ``fragment_lines``. They must be picklable to use a process pool.
+        skip (int): Number of wrapper lines to drop from each fragment.
+        executor (Optional[Executor]): Executor rendering the batches.
+        batch_size (int): Number of fragments rendered by one task.
+
+    Yields:
+        str: One line of YAML.
+    """
+    if executor is None:
+        for fragment in fragments:
+            yield from fragment_lines(fragment, skip)
+        return
+    fragments = iter(fragments)
+    pending: deque = deque()
+    while True:
+        batch = list(itertools.islice(fragments, batch_size))
+        if batch:
+            pending.append(executor.submit(_fragment_batch, batch, skip))
+        if pending and (not batch or len(pending) >= _WINDOW):
+            yield from pending.popleft().result()
+        elif not batch:
+            return
+
+
+def to_yaml_lines(
+    yaml_data: Dict[str, Any],
+    *,
+    spack_format: bool = True,
+    anchors: bool = False,
+    executor: Optional[Executor] = None,
+    batch_size: int = BATCH_SIZE,
+) -> List[str]:
+    """
+    Return the lines of ``to_yaml(yaml_data)``, rendering entries in parallel.
+
+    With an ``executor``, every entry of a top-level mapping or list (e.g.,
+    each package under ``packages``) is dumped as its own fragment on the
+    executor, and the fragments are joined in their original order before the
+    Spack formatting is applied. Block-style YAML renders each entry
+    independently of its neighbours, so the result is identical to the serial
+    one. Anchors span the whole document, so they are always rendered
+    serially.
+
+    Args:
+        yaml_data (Dict[str, Any]): The dictionary to convert.
+        spack_format (bool, optional): Whether to apply Spack-specific
+                                       formatting. Defaults to True.
+        anchors (bool, optional): Whether to emit YAML anchors and aliases for
+                                  repeated subtrees. Defaults to False.
+        executor (Optional[Executor]): Executor dumping the entries.
+        batch_size (int): Number of entries dumped by one task.
+
+    Returns:
+        List[str]: The lines of the rendered document.
+    """
+    if executor is None or anchors or not yaml_data:
+        return to_yaml(
+            yaml_data, spack_format=spack_format, anchors=anchors
+        ).splitlines()
+    lines: List[str] = []
+    for key, value in yaml_data.items():
+        if isinstance(value, dict) and value:
+            entries = [{key: {name: entry}} for name, entry in value.items()]
+        elif isinstance(value, list) and value:
+            entries = [{key: [entry]} for entry in value]
+        else:
+            entries = [{key: value}]
+        # The first entry keeps the line of the top-level key.
+        lines.extend(fragment_lines(entries[0], skip=0))
+        lines.extend(
+            map_fragment_lines(entries[1:], 1, executor=executor, batch_size=batch_size)
+        )
+    if spack_format:
+        return "\n".join(_spack_format_lines(lines)).splitlines()
+    return lines
+
+
+def write_lines(file: TextIO, lines: Iterable[str], spack_format: bool = True) -> None:
+    """
+    Write YAML lines to a file, joined the same way ``to_yaml`` joins them.
+
+    Writing ``to_yaml(data).splitlines()`` produces exactly ``to_yaml(data)``,
+    which lets sections stream entries that are generated on the fly.
+
+    Args:
+        file (TextIO): The open file to write to.
+        lines (Iterable[str]): The YAML lines.
+        spack_format (bool, optional): Whether the lines are in Spack style,
+                                       which has no trailing newline. Defaults to True.
+    """
+    first = True
+    for line in lines:
+        if not first:
+            file.write("\n")
+        file.write(line)
+        first = False
+    if not spack_format and not first:
+        file.write("\n")
+
+
+def render_lines(lines: Iterable[str], spack_format: bool = True) -> bytes:
+    """
+    Join YAML lines the same way ``write_lines`` does and encode them.
+
+    Args:
+        lines (Iterable[str]): The YAML lines.
+        spack_format (bool, optional): Whether the lines are in Spack style,
+                                       which has no trailing newline. Defaults to True.
+
+    Returns:
+        bytes: The UTF-8 encoded text.
+    """
+    buffer = io.StringIO()
+    write_lines(buffer, lines, spack_format=spack_format)
+    return buffer.getvalue().encode()
+
+
+def write_if_changed(path: Union[str, Path], data: bytes) -> bool:
+    """
+    Write rendered bytes to a file unless it already holds exactly them.
+
+    The bytes are written to a temporary file next to ``path``, which then
+    atomically replaces ``path``. An unchanged file is left untouched,
+    including its modification time.
+
+    Args:
+        path (Union[str, Path]): The file to write.
+        data (bytes): The file contents, as returned by a ``render`` method.
+
+    Returns:
+        bool: True if the file was written, False if it was already current.
+    """
+    path = Path(path)
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+    except OSError:
+        pass
+    temporary = path.with_name(f".{path.name}.tmp")
+    try:
+        temporary.write_bytes(data)
+        os.replace(temporary, path)
+        return True
+    finally:
+        if temporary.exists():
+            temporary.unlink()
@@ -0,0 +1,118 @@
+"""
+Lightweight parsing of Spack spec strings.
+
+Only the parts of a spec that the site generator needs to reason about are
+extracted: the root package name and version, the compiler (``%gcc@12.2.0``)
+and the names of ``^`` dependencies. Variants and flags are left untouched,
+except by :func:`canonical_spec`, which only reorders them.
+"""
+
+import re
+from typing import NamedTuple, Optional, Tuple
+
+_NAME = re.compile(r"\s*([A-Za-z0-9_][\w.-]*)")
+_VERSION = re.compile(r"@\s*([^\s%+~^@]+)")
+_COMPILER = re.compile(r"%\s*([A-Za-z0-9_][\w.-]*)(?:\s*@\s*([^\s%+~^@]+))?")
+_SIGIL_SPACE = re.compile(r"\s*([@%])\s*")
+_TOKEN = re.compile(r"[+~][^\s+~=]+|[^\s+~]+=(?:\"[^\"]*\"|'[^']*'|\S+)|\S+")
+
+
+class ParsedSpec(NamedTuple):
+    """
+    The pieces of a spec string used for indexing and matching.
+
+    Attributes:
+        name (str): Root package name (e.g., "netcdf-c").
+        version (Optional[str]): Root version, if given (e.g., "4.9.2").
+        compiler (Optional[str]): Compiler as ``name`` or ``name@version``.
+        dependencies (Tuple[str, ...]): ``^`` dependencies as ``name`` or
+            ``name@version``.
+    """
+
+    name: str
+    version: Optional[str]
+    compiler: Optional[str]
+    dependencies: Tuple[str, ...]
+
+
+def _name_and_version(text: str) -> Tuple[str, Optional[str]]:
+    """Return the leading package name and version of a spec fragment."""
+    name_match = _NAME.match(text)
+    if not name_match:
+        return "", None
+    version_match = _VERSION.match(text, name_match.end())
+    return name_match.group(1), version_match.group(1) if version_match else None
+
+
+def _with_version(name: str, version: Optional[str]) -> str:
+    """Join a name and an optional version as ``name@version``."""
+    return f"{name}@{version}" if version else name
+
+
+def parse_spec(spec: str) -> ParsedSpec:
+    """
+    Parse a Spack spec string.
+
+    Example:
+        >>> parse_spec("netcdf-c@4.9.2%gcc@12.2.0 ^cray-mpich@8.1.25")
+        ParsedSpec(name='netcdf-c', version='4.9.2', compiler='gcc@12.2.0', dependencies=('cray-mpich@8.1.25',))
+
+    Args:
+        spec (str): The spec string.
+
+    Returns:
+        ParsedSpec: The parsed spec. Missing parts are None or empty.
+    """
+    root, *dependencies = spec.split("^")
+    name, version = _name_and_version(root)
+    compiler_match = _COMPILER.search(root)
+    compiler = None
+    if compiler_match:
+        compiler = _with_version(compiler_match.group(1), compiler_match.group(2))
+    return ParsedSpec(
+        name=name,
+        version=version,
+        compiler=compiler,
+        dependencies=tuple(
+            _with_version(*_name_and_version(dependency))
+            for dependency in dependencies
+            if dependency.strip()
+        ),
+    )
+
+
+def _canonical_node(text: str) -> str:
+    """Return the canonical form of one node (the root or a dependency)."""
+    text = _SIGIL_SPACE.sub(r"\1", text.strip())
+    name, version = _name_and_version(text)
+    head = _with_version(name, version)
+    rest = text[len(head) :]
+    compiler_match = _COMPILER.search(rest)
+    if compiler_match:
+        head += "%" + _with_version(compiler_match.group(1), compiler_match.group(2))
+        rest = rest[: compiler_match.start()] + " " + rest[compiler_match.end() :]
+    tokens = sorted(_TOKEN.findall(rest), key=lambda token: (token.lstrip("+~"), token))
+    return " ".join([head] + tokens)
+
+
+def canonical_spec(spec: str) -> str:
+    """
+    Return a canonical form of a spec string, for detecting duplicates.
+
+    Whitespace is normalized, variants and other attributes of each node are
+    sorted, and ``^`` dependencies are sorted, so specs that only differ in
+    spelling compare equal.
+
+    Example:
+        >>> canonical_spec("netcdf-c @4.9.2 ~shared+mpi %gcc@12.2.0 ^hdf5 ^cray-mpich")
+        'netcdf-c@4.9.2%gcc@12.2.0 +mpi ~shared ^cray-mpich ^hdf5'
+
+    Args:
+        spec (str): The spec string.
+
+    Returns:
+        str: The canonical spec string.
+    """
+    root, *dependencies = spec.split("^")
+    nodes = sorted(_canonical_node(node) for node in dependencies if node.strip())
+    return " ^".join([_canonical_node(root)] + nodes)
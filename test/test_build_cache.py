@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+from spack_site_generator.utils.build_cache import (
+    BinarySpec,
+    read_spec_file,
+    scan_mirror,
+)
+from spack_site_generator.utils.detection_cache import DetectionCache
+
+HASH = "abcdefghijklmnopqrstuvwxyz234567"
+
+
+def _spec_json(name, version, compiler, dag_hash):
+    """A minimal build cache spec file with a dependency listed first."""
+    return json.dumps(
+        {
+            "spec": {
+                "_meta": {"version": 4},
+                "nodes": [
+                    {"name": "zlib", "version": "1.3", "hash": "z" * 32},
+                    {
+                        "name": name,
+                        "version": version,
+                        "compiler": {"name": compiler[0], "version": compiler[1]},
+                        "hash": dag_hash,
+                    },
+                ],
+            }
+        },
+        indent=1,
+    )
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    """A local mirror with two binaries (one signed) and a source archive."""
+    build_cache = tmp_path / "build_cache"
+    build_cache.mkdir()
+    name = f"linux-sles15-zen3-gcc-12.2.0-netcdf-c-4.9.2-{HASH}.spec.json"
+    (build_cache / name).write_text(
+        _spec_json("netcdf-c", "4.9.2", ("gcc", "12.2.0"), HASH)
+    )
+    signed_hash = "b" * 32
+    (
+        build_cache / f"linux-intel-2023.2.1-hdf5-1.14.3-{signed_hash}.spec.json.sig"
+    ).write_text(
+        "-----BEGIN PGP SIGNED MESSAGE-----\nHash: SHA512\n\n"
+        + _spec_json("hdf5", "1.14.3", ("intel", "2023.2.1"), signed_hash)
+        + "\n-----BEGIN PGP SIGNATURE-----\n\nabc\n-----END PGP SIGNATURE-----\n"
+    )
+    (build_cache / "index.json").write_text("{}")
+    (tmp_path / "zlib").mkdir()
+    (tmp_path / "zlib" / "zlib-1.3.tar.gz").write_text("")
+    (tmp_path / "zlib" / "README").write_text("")
+    return tmp_path
+
+
+def test_read_spec_file_picks_root_node(mirror):
+    """The root node is the one whose hash is in the file name."""
+    path = next((mirror / "build_cache").glob("*netcdf-c*"))
+    assert read_spec_file(path) == BinarySpec(
+        "netcdf-c", "4.9.2", "gcc@12.2.0", HASH, str(path)
+    )
+
+
+def test_scan_mirror(mirror):
+    """Binaries, including signed ones, and source archives are indexed."""
+    index = scan_mirror(mirror)
+    assert len(index) == 2
+    assert index.binaries["hdf5"][0].compiler == "intel@2023.2.1"
+    assert index.sources == {"zlib": ["1.3"]}
+    assert index.has_source("zlib@1.3")
+    assert not index.has_source("zlib@1.2")
+
+
+@pytest.mark.parametrize(
+    "spec, found",
+    [
+        ("netcdf-c", True),
+        ("netcdf-c@4.9", True),
+        ("netcdf-c@4.9.2%gcc@12", True),
+        ("netcdf-c@4.9.1", False),
+        ("netcdf-c%intel", False),
+        ("hdf5@1.14.3%intel@2023.2.1 ^cray-mpich", True),
+    ],
+)
+def test_find_binaries(mirror, spec, found):
+    """Specs match binaries by name, version prefix and compiler."""
+    assert bool(scan_mirror(mirror).find_binaries(spec)) is found
+
+
+def test_scan_mirror_uses_cache(mirror, tmp_path_factory):
+    """Cached spec files are reused until the build cache changes."""
+    cache = DetectionCache(tmp_path_factory.mktemp("cache") / "detection.sqlite")
+    assert len(scan_mirror(mirror, cache=cache)) == 2
+    assert len(cache) == 1
+    assert len(scan_mirror(mirror, cache=cache)) == 2
+
+    (mirror / "build_cache" / f"zlib-1.3-{'c' * 32}.spec.json").write_text(
+        _spec_json("zlib", "1.3", ("gcc", "12.2.0"), "c" * 32)
+    )
+    assert len(scan_mirror(mirror, cache=cache)) == 3
+
+
+def test_scan_missing_mirror(tmp_path):
+    """Scanning a directory that does not exist fails."""
+    with pytest.raises(FileNotFoundError):
+        scan_mirror(tmp_path / "missing")
@@ -1,6 +1,7 @@
 import pytest
 import yaml
-from spack_site_generator.site import Compilers
+from spack_site_generator.site import Compilers, SiteIndex
+from spack_site_generator.site import compilers as compilers_module
 
 
 @pytest.fixture
@@ -83,3 +84,145 @@ def test_write_yaml_without_compilers_creates_only_override(compilers, tmp_path)
     # Behavior: compilers list exists and contains only override
     assert "compilers" in data
     assert data["compilers"] == [{"override": True}]
+
+
+def _add_gcc(compilers, **overrides):
+    fields = {
+        "spec": "gcc@12.2.0",
+        "paths": {"cc": "/opt/gcc/bin/gcc", "cxx": "/opt/gcc/bin/g++"},
+        "operating_system": "rhel8",
+        "target": "x86_64",
+        "flags": {"cflags": "-O2"},
+        "modules": ["gcc/12.2.0"],
+        "environment": None,
+        "extra_rpaths": ["/opt/gcc/lib64"],
+    }
+    fields.update(overrides)
+    compilers.add_compiler(**fields)
+
+
+def test_readding_a_compiler_replaces_it_by_default(compilers):
+    """A compiler with the same spec, OS and target is replaced in place."""
+    _add_gcc(compilers)
+    _add_gcc(compilers, spec="gcc@12.2.0", flags={"cflags": "-O3"})
+
+    assert len(compilers.config["compilers"]) == 2
+    compiler = compilers.get_compiler(
+        spec="gcc@12.2.0", operating_system="rhel8", target="x86_64"
+    )
+    assert compiler["flags"] == {"cflags": "-O3"}
+
+
+def test_compilers_differing_in_target_are_kept(compilers):
+    """The operating system and target are part of a compiler's identity."""
+    _add_gcc(compilers)
+    _add_gcc(compilers, target="aarch64")
+
+    assert [c["target"] for c in compilers.effective_compilers()] == [
+        "x86_64",
+        "aarch64",
+    ]
+    assert (
+        compilers.get_compiler(
+            spec="gcc@12.2.0", operating_system="rhel9", target="x86_64"
+        )
+        is None
+    )
+
+
+def test_merging_a_compiler_combines_its_fields(compilers):
+    """Merging keeps existing paths and combines modules and RPATHs."""
+    _add_gcc(compilers)
+    _add_gcc(
+        compilers,
+        paths={"cc": None, "fc": "/opt/gcc/bin/gfortran"},
+        flags={"fflags": "-O2"},
+        modules=["binutils/2.40"],
+        environment={"set": {"LC_ALL": "C"}},
+        extra_rpaths=["/opt/gcc/lib64", "/opt/gcc/lib"],
+        on_duplicate="merge",
+    )
+
+    compiler = compilers.effective_compilers()[0]
+    assert compiler["paths"] == {
+        "cc": "/opt/gcc/bin/gcc",
+        "cxx": "/opt/gcc/bin/g++",
+        "fc": "/opt/gcc/bin/gfortran",
+    }
+    assert compiler["flags"] == {"cflags": "-O2", "fflags": "-O2"}
+    assert compiler["modules"] == ["gcc/12.2.0", "binutils/2.40"]
+    assert compiler["environment"] == {"set": {"LC_ALL": "C"}}
+    assert compiler["extra_rpaths"] == ["/opt/gcc/lib64", "/opt/gcc/lib"]
+
+
+def test_skip_and_error_policies(compilers):
+    """Duplicates can be ignored or rejected."""
+    _add_gcc(compilers)
+    _add_gcc(compilers, flags={"cflags": "-O0"}, on_duplicate="skip")
+    assert compilers.effective_compilers()[0]["flags"] == {"cflags": "-O2"}
+
+    with pytest.raises(ValueError, match="already exists"):
+        _add_gcc(compilers, on_duplicate="error")
+    with pytest.raises(ValueError, match="Unknown duplicate policy"):
+        _add_gcc(compilers, on_duplicate="append")
+
+
+def test_lookup_follows_direct_edits(compilers):
+    """Positions are rebuilt when the list is edited through ``config``."""
+    _add_gcc(compilers)
+    _add_gcc(compilers, spec="clang@17.0.6")
+    del compilers.config["compilers"][1]
+
+    compiler = compilers.get_compiler(
+        spec="clang@17.0.6", operating_system="rhel8", target="x86_64"
+    )
+    assert compiler["spec"] == "clang@17.0.6"
+    assert (
+        compilers.get_compiler(
+            spec="gcc@12.2.0", operating_system="rhel8", target="x86_64"
+        )
+        is None
+    )
+
+
+def test_lookup_follows_specs_edited_in_place(compilers):
+    """A spec changed through ``config`` is found without a length change."""
+    _add_gcc(compilers, spec="gcc@11.4.0")
+    _add_gcc(compilers, spec="clang@17.0.6")
+    compilers.effective_compilers()
+    compilers.config["compilers"][1]["compiler"]["spec"] = "gcc@12.2.0"
+
+    compiler = compilers.get_compiler(
+        spec="gcc@12.2.0", operating_system="rhel8", target="x86_64"
+    )
+    assert compiler is compilers.config["compilers"][1]["compiler"]
+    _add_gcc(compilers, modules=["gcc/12.2.0-new"])
+    specs = [entry["compiler"]["spec"] for entry in compilers.config["compilers"][1:]]
+    assert specs == ["gcc@12.2.0", "clang@17.0.6"]
+
+
+def test_adding_compilers_does_not_rescan(compilers, monkeypatch):
+    """Each new compiler canonicalizes its own spec only."""
+    calls = []
+    canonical_spec = compilers_module.canonical_spec
+
+    def counting_canonical_spec(spec):
+        calls.append(spec)
+        return canonical_spec(spec)
+
+    monkeypatch.setattr(compilers_module, "canonical_spec", counting_canonical_spec)
+    for version in range(500):
+        _add_gcc(compilers, spec=f"gcc@{version}.1.0")
+    assert len(calls) == 500
+    assert len(compilers.effective_compilers()) == 500
+
+
+def test_replacing_a_compiler_updates_the_index():
+    """The site index only holds the current version of a compiler."""
+    index = SiteIndex()
+    compilers = Compilers(index=index)
+    _add_gcc(compilers)
+    _add_gcc(compilers, modules=["gcc/12.2.0-new"])
+
+    assert index.by_module("gcc/12.2.0") == []
+    assert len(index.by_module("gcc/12.2.0-new")) == 1
@@ -0,0 +1,97 @@
+import pytest
+import yaml
+
+from spack_site_generator.site import Concretizer, Site
+from spack_site_generator.utils.schema import SchemaValidationError
+
+
+@pytest.fixture
+def concretizer():
+    """Fixture to create a fresh instance of Concretizer for each test."""
+    return Concretizer()
+
+
+def test_setters(concretizer):
+    """Each setter fills its part of the configuration."""
+    concretizer.set_reuse(reuse="dependencies")
+    concretizer.set_unify(unify="when_possible")
+    concretizer.set_targets(granularity="generic", host_compatible=False)
+    concretizer.set_duplicates(strategy="minimal", max_dupes={"cmake": 2})
+    assert concretizer.to_dict() == {
+        "concretizer": {
+            "reuse": "dependencies",
+            "unify": "when_possible",
+            "targets": {"granularity": "generic", "host_compatible": False},
+            "duplicates": {"strategy": "minimal", "max_dupes": {"cmake": 2}},
+        }
+    }
+    concretizer.validate()
+
+
+@pytest.mark.parametrize("preset", ["fast-reuse", "fresh"])
+def test_presets_are_valid(concretizer, preset, tmp_path):
+    """Presets produce configurations Spack accepts."""
+    concretizer.apply_preset(preset=preset)
+    concretizer.write(path=tmp_path / "concretizer.yaml")
+    written = yaml.safe_load((tmp_path / "concretizer.yaml").read_text())
+    assert written["concretizer"]["reuse"] is (preset == "fast-reuse")
+
+
+def test_unknown_preset(concretizer):
+    """Unknown presets are rejected."""
+    with pytest.raises(ValueError, match="fast-reuse"):
+        concretizer.apply_preset(preset="fastest")
+
+
+def test_invalid_settings_are_rejected(concretizer, tmp_path):
+    """Values Spack does not accept fail validation."""
+    concretizer.set_unify(unify="sometimes")
+    with pytest.raises(SchemaValidationError, match="unify"):
+        concretizer.write(path=tmp_path / "concretizer.yaml")
+
+
+def _site():
+    """A site with a non-buildable external, an upstream and a binary mirror."""
+    site = Site(name="testsite")
+    site.packages.add_package(
+        name="cray-mpich",
+        spec="cray-mpich@8.1.25",
+        buildable=False,
+        modules=["cray-mpich/8.1.25"],
+        prefix="/opt/cray/pe/mpich/8.1.25",
+        extra_attributes={},
+        override=False,
+    )
+    site.upstreams.add_upstream(name="center", install_tree="/opt/spack")
+    site.mirrors.add_mirror(name="cache", url="/opt/mirror", source=False, binary=True)
+    site.mirrors.add_mirror(name="sources", url="/opt/src", source=True, binary=False)
+    return site
+
+
+def test_fast_reuse_is_consistent():
+    """The reuse-heavy preset uses everything the site declares."""
+    site = _site()
+    site.concretizer.apply_preset(preset="fast-reuse")
+    assert site.check_concretizer() == []
+
+
+def test_fresh_preset_ignores_upstreams_and_binaries():
+    """Disabling reuse is reported for upstreams and binary mirrors."""
+    site = _site()
+    site.concretizer.apply_preset(preset="fresh")
+    problems = site.check_concretizer()
+    assert len(problems) == 2
+    assert "upstreams center" in problems[0]
+    assert "binaries in cache" in problems[1]
+
+
+def test_reuse_sources_must_include_externals(tmp_path):
+    """Reuse restricted to build caches cannot use non-buildable externals."""
+    site = _site()
+    site.concretizer.set_reuse(reuse={"from": [{"type": "buildcache"}]})
+    problems = site.check_concretizer()
+    assert any("cray-mpich can only come from externals" in p for p in problems)
+    with pytest.warns(RuntimeWarning) as warned:
+        site.write(path=tmp_path)
+    assert len(warned) == len(problems)
+    assert (tmp_path / "testsite" / "concretizer.yaml").is_file()
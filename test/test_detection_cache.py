@@ -0,0 +1,81 @@
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from spack_site_generator.utils.detection_cache import DetectionCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """A detection cache in a temporary directory."""
+    return DetectionCache(tmp_path / "cache" / "detection.sqlite")
+
+
+def test_hit_until_path_changes(cache, tmp_path):
+    """Entries should be invalidated when the inspected path changes."""
+    prefix = tmp_path / "netcdf-c"
+    prefix.mkdir()
+    cache.put("pkg-scan", prefix, {"version": "4.9.2"})
+    assert cache.get("pkg-scan", prefix) == {"version": "4.9.2"}
+    assert cache.get("elf", prefix) is None
+
+    stat = prefix.stat()
+    os.utime(prefix, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.get("pkg-scan", prefix) is None
+
+
+def test_missing_paths_are_never_cached(cache, tmp_path):
+    """Results for paths that do not exist should not be stored."""
+    cache.put("pkg-scan", tmp_path / "missing", {"version": "1.0"})
+    assert len(cache) == 0
+
+
+def test_get_or_compute_computes_once(cache, tmp_path):
+    """A miss should compute and store the value; a hit should not recompute."""
+    calls = []
+
+    def compute():
+        calls.append(True)
+        return ["gcc@12.2.0"]
+
+    assert cache.get_or_compute("probe", tmp_path, compute) == ["gcc@12.2.0"]
+    assert cache.get_or_compute("probe", tmp_path, compute) == ["gcc@12.2.0"]
+    assert len(calls) == 1
+
+
+def test_evict_by_age_and_size(tmp_path):
+    """Old entries go first, then the least recently used above the limit."""
+    cache = DetectionCache(tmp_path / "detection.sqlite", max_age=100, max_bytes=25)
+    cache.put("bench", "old", "x", stat=False)
+    assert cache.evict(now=10**12) == 1
+    for key in ("a", "b", "c"):
+        cache.put("bench", key, "0123456789", stat=False)
+    assert cache.evict() == 1
+    assert cache.get("bench", "a", stat=False) is None
+    assert cache.get("bench", "c", stat=False) == "0123456789"
+
+
+def test_cache_survives_pickling(cache):
+    """Caches can travel to worker processes and reopen their connection."""
+    cache.put("bench", "host:/tmp", 1.5, stat=False)
+    clone = pickle.loads(pickle.dumps(cache))
+    assert clone.get("bench", "host:/tmp", stat=False) == 1.5
+
+
+def _store(args):
+    cache, worker = args
+    for index in range(50):
+        cache.put("probe", f"{worker}:{index}", [worker, index], stat=False)
+    return sum(
+        cache.get("probe", f"{other}:0", stat=False) is not None for other in range(4)
+    )
+
+
+def test_concurrent_writers(cache):
+    """Several processes should be able to read and write at the same time."""
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        list(pool.map(_store, [(cache, worker) for worker in range(4)]))
+    assert len(cache) == 200
+    assert cache.get("probe", "3:49", stat=False) == [3, 49]
@@ -0,0 +1,222 @@
+import os
+import struct
+
+import pytest
+
+from spack_site_generator.site import Site
+from spack_site_generator.utils.detection_cache import DetectionCache
+from spack_site_generator.utils.elf import (
+    ElfFile,
+    minimal_rpaths,
+    read_elf,
+    runtime_rpaths,
+)
+
+BASE = 0x400000
+
+
+def elf_library(
+    soname, needed=(), runpath=None, *, elf_class=64, byteorder="<"
+) -> bytes:
+    """Build a minimal shared library with a loadable dynamic section."""
+    strtab = b"\0"
+
+    def string(value):
+        nonlocal strtab
+        offset = len(strtab)
+        strtab += value.encode() + b"\0"
+        return offset
+
+    entries = [(1, string(name)) for name in needed]
+    if soname:
+        entries.append((14, string(soname)))
+    if runpath:
+        entries.append((29, string(runpath)))
+    wide = elf_class == 64
+    header_size, phentsize = (64, 56) if wide else (52, 32)
+    strtab_offset = header_size + 2 * phentsize
+    dynamic_offset = (strtab_offset + len(strtab) + 7) // 8 * 8
+    entries += [(5, BASE + strtab_offset), (10, len(strtab)), (0, 0)]
+    entry_format = byteorder + ("qQ" if wide else "iI")
+    dynamic_size = len(entries) * struct.calcsize(entry_format)
+    size = dynamic_offset + dynamic_size
+
+    ident = b"\x7fELF" + bytes([2 if wide else 1, 1 if byteorder == "<" else 2, 1])
+    header = ident.ljust(16, b"\0") + struct.pack(
+        byteorder + ("HHIQQQIHHHHHH" if wide else "HHIIIIIHHHHHH"),
+        3, 62 if wide else 3, 1, 0, header_size, 0, 0,
+        header_size, phentsize, 2, 0, 0, 0,
+    )  # fmt: skip
+    if wide:
+        program = byteorder + "IIQQQQQQ"
+        load = struct.pack(program, 1, 5, 0, BASE, BASE, size, size, 0x1000)
+        dynamic = struct.pack(
+            program, 2, 6, dynamic_offset, BASE + dynamic_offset,
+            BASE + dynamic_offset, dynamic_size, dynamic_size, 8,
+        )  # fmt: skip
+    else:
+        program = byteorder + "IIIIIIII"
+        load = struct.pack(program, 1, 0, BASE, BASE, size, size, 5, 0x1000)
+        dynamic = struct.pack(
+            program, 2, dynamic_offset, BASE + dynamic_offset,
+            BASE + dynamic_offset, dynamic_size, dynamic_size, 6, 4,
+        )  # fmt: skip
+    data = (header + load + dynamic + strtab).ljust(dynamic_offset, b"\0")
+    return data + b"".join(struct.pack(entry_format, *entry) for entry in entries)
+
+
+def install(path, soname, *links, **kwargs):
+    """Write a library and the symbolic links pointing at it."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(elf_library(soname, **kwargs))
+    for link in links:
+        os.symlink(path.name, path.parent / link)
+
+
+@pytest.fixture
+def gcc(tmp_path):
+    """A GCC installation with 64-bit, 32-bit and plugin libraries."""
+    prefix = tmp_path / "gcc" / "12.2.0"
+    (prefix / "bin").mkdir(parents=True)
+    for name in ("gcc", "g++", "gfortran"):
+        (prefix / "bin" / name).write_text("#!/bin/sh\n")
+    lib64 = prefix / "lib64"
+    install(
+        lib64 / "libstdc++.so.6.0.30",
+        "libstdc++.so.6",
+        "libstdc++.so.6",
+        "libstdc++.so",
+        needed=("libm.so.6", "libgcc_s.so.1", "libc.so.6"),
+    )
+    install(lib64 / "libgcc_s.so.1", "libgcc_s.so.1", needed=("libc.so.6",))
+    install(
+        lib64 / "libgfortran.so.5.0.0",
+        "libgfortran.so.5",
+        "libgfortran.so.5",
+        needed=("libquadmath.so.0", "libgcc_s.so.1"),
+    )
+    install(
+        lib64 / "libgomp.so.1.0.0",
+        "libgomp.so.1",
+        "libgomp.so.1",
+        needed=("libhwloc.so.15",),
+        runpath="$ORIGIN/../hwloc/lib",
+    )
+    install(prefix / "hwloc" / "lib" / "libhwloc.so.15", "libhwloc.so.15")
+    install(prefix / "quadmath" / "libquadmath.so.0", "libquadmath.so.0")
+    install(prefix / "lib" / "libstdc++.so.6", "libstdc++.so.6", elf_class=32)
+    install(
+        prefix / "libexec" / "plugin" / "libcc1plugin.so.0",
+        "libcc1plugin.so.0",
+        needed=("libstdc++.so.6",),
+    )
+    return prefix
+
+
+@pytest.mark.parametrize("elf_class", [32, 64])
+@pytest.mark.parametrize("byteorder", ["<", ">"])
+def test_read_elf_reads_dynamic_section(tmp_path, elf_class, byteorder):
+    """SONAME, NEEDED and RUNPATH are read for every class and byte order."""
+    path = tmp_path / "libfoo.so.1"
+    path.write_bytes(
+        elf_library(
+            "libfoo.so.1",
+            ("libbar.so.2", "libc.so.6"),
+            "$ORIGIN:/opt/bar/lib",
+            elf_class=elf_class,
+            byteorder=byteorder,
+        )
+    )
+
+    info = read_elf(path)
+
+    assert info == ElfFile(
+        path=str(path),
+        elf_class=elf_class,
+        machine=62 if elf_class == 64 else 3,
+        soname="libfoo.so.1",
+        needed=("libbar.so.2", "libc.so.6"),
+        runpath=("$ORIGIN", "/opt/bar/lib"),
+        rpath=(),
+    )
+
+
+def test_read_elf_rejects_other_files(tmp_path):
+    """Files that are not ELF, or are cut short, are skipped."""
+    script = tmp_path / "libscript.so"
+    script.write_text("#!/bin/sh\n" * 10)
+    truncated = tmp_path / "libtruncated.so"
+    truncated.write_bytes(elf_library("libtruncated.so")[:100])
+
+    assert read_elf(script) is None
+    assert read_elf(truncated) is None
+    assert read_elf(tmp_path / "missing.so") is None
+
+
+def test_runtime_rpaths_picks_fewest_directories(gcc):
+    """Runtime libraries and the dependencies they cannot find are covered."""
+    rpaths = runtime_rpaths(gcc)
+
+    # libhwloc is found through libgomp's RUNPATH, the 32-bit libstdc++ and
+    # the plugin are ignored.
+    assert rpaths == [str(gcc / "lib64"), str(gcc / "quadmath")]
+
+
+def test_minimal_rpaths_prefers_directories_covering_more():
+    """A directory providing every library beats one providing some."""
+
+    def library(path, soname):
+        return path, ElfFile(path, 64, 62, soname, (), (), ())
+
+    libraries = dict(
+        [
+            library("/a/libstdc++.so.6", "libstdc++.so.6"),
+            library("/b/libstdc++.so.6", "libstdc++.so.6"),
+            library("/b/libgfortran.so.5", "libgfortran.so.5"),
+            library("/a/libgfortran.so", "libgfortran.so.5"),
+        ]
+    )
+
+    assert minimal_rpaths(libraries) == ["/b"]
+    assert minimal_rpaths({}) == []
+
+
+def test_runtime_rpaths_are_cached(gcc, tmp_path):
+    """The result of a prefix is stored in the detection cache."""
+    cache = DetectionCache(tmp_path / "cache.sqlite")
+
+    rpaths = runtime_rpaths(gcc, cache=cache)
+
+    assert cache.get("elf-rpaths-64", str(gcc)) == rpaths
+    assert runtime_rpaths(gcc, cache=cache) == rpaths
+
+
+def test_site_computes_compiler_extra_rpaths(gcc):
+    """Compilers get the directories of their runtime libraries."""
+    site = Site(name="rpaths")
+    for spec, paths in (
+        ("gcc@12.2.0", {"cc": str(gcc / "bin" / "gcc"), "cxx": None}),
+        ("gcc@11.2.0", {"cc": "/usr/bin/gcc", "cxx": "/usr/bin/g++"}),
+    ):
+        site.compilers.add_compiler(
+            spec=spec,
+            paths=paths,
+            flags={},
+            operating_system="rhel8",
+            target="x86_64",
+            modules=[],
+            environment={},
+            extra_rpaths=["/opt/extra"],
+        )
+
+    found = site.compute_extra_rpaths()
+
+    expected = [str(gcc / "lib64"), str(gcc / "quadmath")]
+    assert found == {"gcc@12.2.0": expected}
+    compilers = {
+        entry["compiler"]["spec"]: entry["compiler"]["extra_rpaths"]
+        for entry in site.compilers.to_dict()["compilers"]
+        if "compiler" in entry
+    }
+    assert compilers["gcc@12.2.0"] == ["/opt/extra", *expected]
+    assert compilers["gcc@11.2.0"] == ["/opt/extra"]
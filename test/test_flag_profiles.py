@@ -0,0 +1,150 @@
+import pytest
+
+from spack_site_generator.site import Compilers, Site
+from spack_site_generator.site.matrix import ToolchainMatrix
+from spack_site_generator.utils.flag_profiles import resolve_flags
+
+
+@pytest.mark.parametrize(
+    "compiler, target, expected",
+    [
+        ("gcc@12.2.0", "zen3", "-O3 -march=znver3 -mtune=znver3"),
+        ("gcc@10.2.0", "zen3", "-O3 -march=znver2 -mtune=znver2"),
+        (
+            "oneapi@2023.2.1",
+            "icelake",
+            "-O3 -march=icelake-server -mtune=icelake-server",
+        ),
+        (
+            "intel@2021.10.0",
+            "skylake_avx512",
+            "-O3 -march=skylake-avx512 -mtune=skylake-avx512",
+        ),
+        ("nvhpc@23.1", "zen3", "-O3 -tp=zen3"),
+        ("gcc@12.2.0", "neoverse_v1", "-O3 -mcpu=neoverse-v1"),
+    ],
+)
+def test_tuned_target_flags(compiler, target, expected):
+    """Target flags follow the compiler family and version."""
+    resolved = resolve_flags(profile="tuned-target", compiler=compiler, target=target)
+    assert resolved.flags == {
+        "cflags": expected,
+        "cxxflags": expected,
+        "fflags": expected,
+    }
+
+
+def test_old_compilers_fall_back_to_an_ancestor():
+    """A compiler too old for a target is tuned for the nearest supported ancestor."""
+    resolved = resolve_flags(
+        profile="tuned-target", compiler="gcc@10.2.0", target="zen3"
+    )
+    assert resolved.target == "zen2"
+    assert resolved.notes == [
+        "gcc@10.2.0 does not support zen3; optimizing for zen2 instead."
+    ]
+
+
+def test_unsupported_combinations_are_rejected():
+    """Profiles a compiler cannot honour raise ValueError."""
+    with pytest.raises(ValueError, match="cannot optimize for target"):
+        resolve_flags(
+            profile="tuned-target", compiler="aocc@4.0.0", target="neoverse_v1"
+        )
+    with pytest.raises(ValueError, match="cannot optimize for the host"):
+        resolve_flags(profile="tuned-native", compiler="cce@15.0.1")
+    with pytest.raises(ValueError, match="cannot optimize for the host"):
+        resolve_flags(profile="tuned-native", compiler="gcc")
+    with pytest.raises(ValueError, match="needs a known target"):
+        resolve_flags(profile="tuned-target", compiler="gcc@12.2.0")
+    with pytest.raises(ValueError, match="Unknown flag profile"):
+        resolve_flags(profile="fast", compiler="gcc@12.2.0")
+
+
+def test_portable_and_debug_profiles():
+    """Portable and debug flags need no target."""
+    assert (
+        resolve_flags(profile="portable", compiler="cce@15.0.1").flags["cflags"]
+        == "-O2"
+    )
+    debug = resolve_flags(profile="debug", compiler="gcc@12.2.0").flags
+    assert debug["cflags"] == "-O0 -g"
+    assert "-fcheck=all" in debug["fflags"]
+
+
+def _compiler(compilers, spec, target="x86_64"):
+    compilers.add_compiler(
+        spec=spec,
+        paths={"cc": f"/opt/{spec}/bin/cc"},
+        operating_system="sles15",
+        target=target,
+        flags={"ldflags": "-Wl,--as-needed"},
+        modules=[],
+        environment={},
+        extra_rpaths=[],
+    )
+
+
+def test_apply_flag_profile_updates_every_compiler():
+    """Stored and matrix compilers receive the profile; other flags are kept."""
+    compilers = Compilers()
+    _compiler(compilers, "gcc@12.2.0")
+    _compiler(compilers, "gcc@10.2.0")
+    compilers.add_matrix(
+        matrix=ToolchainMatrix(
+            axes={"aocc": ["aocc@4.0.0"]},
+            template={
+                "spec": "{aocc}",
+                "paths": {"cc": "/opt/aocc/bin/clang"},
+                "operating_system": "sles15",
+                "target": "x86_64",
+            },
+        )
+    )
+
+    notes = compilers.apply_flag_profile(profile="tuned-target", target="zen3")
+
+    assert notes == ["gcc@10.2.0 does not support zen3; optimizing for zen2 instead."]
+    flags = [
+        entry["compiler"]["flags"] for entry in compilers.to_dict()["compilers"][1:]
+    ]
+    assert flags[0]["cflags"] == "-O3 -march=znver3 -mtune=znver3"
+    assert flags[0]["ldflags"] == "-Wl,--as-needed"
+    assert flags[1]["fflags"] == "-O3 -march=znver2 -mtune=znver2"
+    assert flags[2] == {
+        name: "-O3 -march=znver3 -mtune=znver3"
+        for name in ("cflags", "cxxflags", "fflags")
+    }
+    compilers.validate()
+
+
+def test_apply_flag_profile_is_all_or_nothing():
+    """No compiler is changed if one of them cannot take the profile."""
+    compilers = Compilers()
+    _compiler(compilers, "gcc@12.2.0")
+    _compiler(compilers, "cce@15.0.1")
+
+    with pytest.raises(ValueError):
+        compilers.apply_flag_profile(profile="tuned-native")
+    assert all(
+        "cflags" not in entry["compiler"]["flags"]
+        for entry in compilers.config["compilers"][1:]
+    )
+
+    with pytest.raises(ValueError, match="cannot run"):
+        compilers.apply_flag_profile(profile="tuned-target", target="neoverse_v1")
+
+
+def test_site_tunes_for_its_declared_target():
+    """The site's own target is used when none is given."""
+    site = Site(name="derecho")
+    _compiler(site.compilers, "gcc@12.2.0")
+    site.set_target(target="zen3")
+
+    site.apply_flag_profile(profile="tuned-target")
+
+    compiler = site.compilers.effective_compilers()[0]
+    assert compiler["flags"]["cxxflags"] == "-O3 -march=znver3 -mtune=znver3"
+    with pytest.warns(RuntimeWarning, match="optimizing for zen2"):
+        _compiler(site.compilers, "gcc@9.3.0")
+        site.apply_flag_profile(profile="tuned-target")
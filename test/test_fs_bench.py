@@ -0,0 +1,125 @@
+import getpass
+import shutil
+
+import pytest
+import yaml
+
+from spack_site_generator.site import Config
+from spack_site_generator.utils import fs_bench
+from spack_site_generator.utils.detection_cache import DetectionCache
+from spack_site_generator.utils.fs_bench import (
+    FilesystemBenchmark,
+    benchmark_directories,
+    benchmark_directory,
+    expand_path,
+    filesystem_type,
+)
+
+GIB = 1024**3
+
+
+def test_benchmark_directory(tmp_path):
+    """A writable directory is measured and left clean."""
+    result = benchmark_directory(
+        str(tmp_path / "not" / "yet" / "created"),
+        time_limit=0.05,
+        file_count=20,
+        stream_bytes=2 << 20,
+    )
+    assert result.error is None
+    assert result.files_per_second > 0 and result.bytes_per_second > 0
+    assert result.free_bytes > 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_benchmark_unwritable_directory():
+    """Directories that cannot be written report an error."""
+    result = benchmark_directory("/proc/spack-stage", time_limit=0.05)
+    assert result.error is not None
+
+
+def test_expand_path(monkeypatch):
+    """Spack's $user and environment variables are expanded."""
+    monkeypatch.setenv("SCRATCH", "/glade/derecho/scratch")
+    assert expand_path("$SCRATCH/$user/stage") == (
+        f"/glade/derecho/scratch/{getpass.getuser()}/stage"
+    )
+
+
+def test_filesystem_type(tmp_path):
+    """The longest matching mount point wins."""
+    mounts = tmp_path / "mounts"
+    mounts.write_text(
+        "/dev/root / ext4 rw 0 0\n"
+        "tmpfs /dev/shm tmpfs rw 0 0\n"
+        "lustre@o2ib:/scratch /glade/derecho/scratch lustre rw 0 0\n"
+    )
+    assert filesystem_type("/dev/shm/build", str(mounts)) == "tmpfs"
+    assert filesystem_type("/glade/derecho/scratch/u", str(mounts)) == "lustre"
+    assert filesystem_type("/glade/derecho/scratchy", str(mounts)) == "ext4"
+
+
+@pytest.fixture
+def fake_benchmarks(monkeypatch):
+    """Replace measurements by fixed results and count how often they run."""
+    measured = []
+    results = {
+        "/dev/shm": FilesystemBenchmark("/dev/shm", 9000.0, 4e9, 100 * GIB, "tmpfs"),
+        "/local": FilesystemBenchmark("/local", 5000.0, 1e9, 500 * GIB, "xfs"),
+        "/lustre": FilesystemBenchmark("/lustre", 300.0, 3e9, 10**6 * GIB, "lustre"),
+        "/full": FilesystemBenchmark("/full", 20000.0, 5e9, GIB, "xfs"),
+        "/broken": FilesystemBenchmark("/broken", error="Permission denied"),
+    }
+
+    def benchmark(path, *, time_limit):
+        measured.append(path)
+        return FilesystemBenchmark(**{**vars(results[path])})
+
+    monkeypatch.setattr(fs_bench, "benchmark_directory", benchmark)
+    monkeypatch.setattr(
+        fs_bench.shutil, "disk_usage", lambda path: shutil._ntuple_diskusage(0, 0, GIB)
+    )
+    return measured
+
+
+def test_place_directories(fake_benchmarks, tmp_path):
+    """Each setting goes to the fastest viable candidate for its workload."""
+    config = Config()
+    chosen = config.place_directories(
+        candidates=["/dev/shm", "/local", "/lustre", "/full", "/broken"]
+    )
+    assert {setting: result.path for setting, result in chosen.items()} == {
+        "build_stage": "/dev/shm",
+        "test_stage": "/dev/shm",
+        "source_cache": "/lustre",
+        "misc_cache": "/local",
+    }
+    assert config.config["build_stage"] == "/dev/shm/spack-stage"
+    assert config.config["source_cache"] == "/lustre/spack-source-cache"
+
+    config.set_cache_paths(source_cache_path="/opt/cache", misc_cache_path="")
+    config.write(path=tmp_path / "config.yaml")
+    text = (tmp_path / "config.yaml").read_text()
+    assert "# build_stage: /dev/shm (tmpfs, 9000 files/s" in text
+    assert "# source_cache" not in text
+    assert yaml.safe_load(text)["config"]["misc_cache"] == "/local/spack-misc-cache"
+
+
+def test_place_directories_without_viable_candidate(fake_benchmarks):
+    """A setting without a viable candidate is an error."""
+    with pytest.raises(ValueError, match="source_cache"):
+        Config().place_directories(candidates=["/dev/shm", "/broken"])
+    with pytest.raises(ValueError, match="unknown settings"):
+        Config().place_directories(candidates=["/local"], settings=["stage"])
+
+
+def test_measurements_are_cached_per_host(fake_benchmarks, tmp_path):
+    """Cached measurements are reused per host; failures are measured again."""
+    cache = DetectionCache(tmp_path / "cache.sqlite")
+    candidates = ["/local", "/broken"]
+    benchmark_directories(candidates, cache=cache, hostname="derecho1")
+    results = benchmark_directories(candidates, cache=cache, hostname="derecho1")
+    benchmark_directories(candidates, cache=cache, hostname="casper1")
+    assert fake_benchmarks == ["/local", "/broken", "/broken", "/local", "/broken"]
+    assert results["/local"].files_per_second == 5000.0
+    assert results["/local"].free_bytes == GIB
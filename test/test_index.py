@@ -0,0 +1,155 @@
+import pytest
+
+from spack_site_generator.site import IndexEntry, Site, SiteIndex
+
+NETCDF_ROOT = "/glade/u/apps/derecho/23.09/spack/opt/spack/netcdf/4.9.2/packages"
+
+
+@pytest.fixture
+def site():
+    """A small derecho-like site with externals, a compiler and a provider."""
+    site = Site(name="derecho")
+    site.packages.add_provider(
+        provider_name="mpi",
+        library_name="cray-mpich",
+        library_version="8.1.25",
+        buildable=False,
+    )
+    site.packages.add_package(
+        name="cray-mpich",
+        spec="cray-mpich@8.1.25%gcc@12.2.0 +wrappers",
+        buildable=False,
+        modules=["craype/2.7.20", "cray-mpich/8.1.25"],
+        prefix="",
+        extra_attributes={},
+        override=False,
+    )
+    for name, version in (("netcdf-c", "4.9.2"), ("netcdf-fortran", "4.6.1")):
+        site.packages.add_package(
+            name=name,
+            spec=f"{name}@{version}%gcc@12.2.0 ^cray-mpich@8.1.25",
+            buildable=False,
+            modules=["ncarenv/23.09", "gcc/12.2.0", "netcdf/4.9.2"],
+            prefix=f"{NETCDF_ROOT}/{name}/{version}/gcc/12.2.0",
+            extra_attributes={},
+            override=False,
+        )
+    site.compilers.add_compiler(
+        spec="gcc@12.2.0",
+        paths={
+            "cc": "/opt/cray/pe/gcc/12.2.0/bin/gcc",
+            "cxx": "/opt/cray/pe/gcc/12.2.0/bin/g++",
+            "f77": "/opt/cray/pe/gcc/12.2.0/bin/gfortran",
+            "fc": "/opt/cray/pe/gcc/12.2.0/bin/gfortran",
+        },
+        operating_system="sles15",
+        target="x86_64",
+        flags={},
+        modules=["ncarenv/23.09", "gcc/12.2.0"],
+        environment={},
+        extra_rpaths=[],
+    )
+    return site
+
+
+def test_find_by_module(site):
+    """Module queries should return every entry loading that module."""
+    assert [entry.name for entry in site.find_by_module("cray-mpich/8.1.25")] == [
+        "cray-mpich"
+    ]
+    assert [entry.name for entry in site.find_by_module("ncarenv/23.09")] == [
+        "netcdf-c",
+        "netcdf-fortran",
+        "gcc@12.2.0",
+    ]
+    assert site.find_by_module("missing/1.0") == []
+
+
+def test_find_under_prefix(site):
+    """Prefix queries should return entries installed below a directory."""
+    names = {entry.name for entry in site.find_under_prefix("/glade/u/apps/derecho")}
+    assert names == {"netcdf-c", "netcdf-fortran"}
+    assert [entry.prefix for entry in site.find_under_prefix("/opt/cray/pe/")] == [
+        "/opt/cray/pe/gcc/12.2.0"
+    ]
+    assert site.find_under_prefix("/glade/work") == []
+
+
+def test_find_by_compiler(site):
+    """Compiler queries should match by name or by name and version."""
+    exact = {entry.name for entry in site.find_by_compiler("gcc@12.2.0")}
+    assert exact == {"cray-mpich", "netcdf-c", "netcdf-fortran", "gcc@12.2.0"}
+    assert {entry.name for entry in site.find_by_compiler("gcc")} == exact
+    assert site.find_by_compiler("intel@2023.2.1") == []
+
+
+def test_find_providers(site):
+    """Provider queries should return the configured library."""
+    assert site.find_providers("mpi") == ["cray-mpich@8.1.25"]
+    assert site.find_providers("blas") == []
+
+
+def test_adding_externals_updates_the_index(site):
+    """New externals are indexed next to existing ones; duplicates replace them."""
+    site.packages.add_package(
+        name="netcdf-c",
+        spec="netcdf-c@4.9.3%gcc@13.1.0",
+        buildable=False,
+        modules=["netcdf/4.9.3"],
+        prefix="/glade/work/netcdf-c",
+        extra_attributes={},
+        override=False,
+    )
+    assert "netcdf-c" in {entry.name for entry in site.find_by_module("netcdf/4.9.2")}
+    assert [entry.spec for entry in site.find_under_prefix("/glade/work")] == [
+        "netcdf-c@4.9.3%gcc@13.1.0"
+    ]
+
+    site.packages.add_package(
+        name="netcdf-c",
+        spec="netcdf-c@4.9.2 %gcc@12.2.0 ^cray-mpich@8.1.25",
+        buildable=False,
+        modules=["netcdf/4.9.2-mpi"],
+        prefix=f"{NETCDF_ROOT}/netcdf-c/4.9.2/gcc/12.2.0",
+        extra_attributes={},
+        override=False,
+    )
+    assert "netcdf-c" not in {
+        entry.name for entry in site.find_by_module("netcdf/4.9.2")
+    }
+    assert [entry.spec for entry in site.find_by_module("netcdf/4.9.2-mpi")] == [
+        "netcdf-c@4.9.2 %gcc@12.2.0 ^cray-mpich@8.1.25"
+    ]
+    assert len(site.index.entries_named("netcdf-c")) == 2
+
+
+def test_remove_prunes_empty_prefix_nodes():
+    """Removing the last entry under a path should leave nothing behind."""
+    index = SiteIndex()
+    entry = IndexEntry(kind="external", name="zlib", spec="zlib@1.3", prefix="/a/b")
+    index.add(entry, modules=["zlib/1.3"])
+    index.remove(entry)
+    assert len(index) == 0
+    assert index.under_prefix("/a") == []
+    assert index.by_module("zlib/1.3") == []
+
+
+def test_under_prefix_orders_by_prefix():
+    """Entries come back ordered by prefix, not by insertion."""
+    index = SiteIndex()
+    for name, prefix in (
+        ("c", "/a/c"),
+        ("bb", "/a/b/b"),
+        ("b", "/a/b"),
+        ("ba", "/a/b/a"),
+    ):
+        index.add(
+            IndexEntry(kind="external", name=name, spec=name, prefix=prefix),
+            modules=[],
+        )
+    assert [entry.prefix for entry in index.under_prefix("/a")] == [
+        "/a/b",
+        "/a/b/a",
+        "/a/b/b",
+        "/a/c",
+    ]
@@ -0,0 +1,67 @@
+from spack_site_generator.site import Compilers, Packages
+from spack_site_generator.utils.intern import InternPool
+
+
+def test_equal_lists_are_shared():
+    """Equal string lists should resolve to a single shared list object."""
+    pool = InternPool()
+    first = pool.strings(["ncarenv/23.09", "gcc/12.2.0"])
+    second = pool.strings(["ncarenv/23.09", "gcc/12.2.0"])
+    assert first is second
+    assert len(pool) == 1
+
+
+def test_empty_and_non_string_lists_are_untouched():
+    """Empty, None and mixed-type lists should be returned as given."""
+    pool = InternPool()
+    mixed = ["a", {"override": True}]
+    assert pool.strings(mixed) is mixed
+    assert pool.strings(None) is None
+    assert pool.strings([]) == []
+    assert len(pool) == 0
+
+
+def test_mapping_interns_nested_values():
+    """Nested dictionaries should be copied with their lists shared."""
+    pool = InternPool()
+    first = pool.mapping({"set": {"PATH": "/usr/bin"}, "unset": ["LD_PRELOAD"]})
+    second = pool.mapping({"unset": ["LD_PRELOAD"]})
+    assert first == {"set": {"PATH": "/usr/bin"}, "unset": ["LD_PRELOAD"]}
+    assert first["unset"] is second["unset"]
+
+
+def test_packages_share_module_lists():
+    """Externals with the same module list should share one list object."""
+    packages = Packages()
+    for name in ("netcdf-c", "netcdf-fortran"):
+        packages.add_package(
+            name=name,
+            spec=f"{name}@4.9.2",
+            buildable=False,
+            modules=["ncarenv/23.09", "gcc/12.2.0", "netcdf/4.9.2"],
+            prefix="/glade/u/apps/derecho/23.09",
+            extra_attributes={},
+            override=False,
+        )
+    c_external = packages.config["netcdf-c"]["externals"][0]
+    fortran_external = packages.config["netcdf-fortran"]["externals"][0]
+    assert c_external["modules"] is fortran_external["modules"]
+    assert c_external["prefix"] is fortran_external["prefix"]
+
+
+def test_compilers_share_module_lists():
+    """Compilers with the same module list should share one list object."""
+    compilers = Compilers()
+    for spec in ("gcc@12.2.0", "gcc@13.1.0"):
+        compilers.add_compiler(
+            spec=spec,
+            paths={"cc": "gcc", "cxx": "g++", "f77": None, "fc": None},
+            operating_system="sles15",
+            target="x86_64",
+            flags={},
+            modules=["ncarenv/23.09"],
+            environment={},
+            extra_rpaths=[],
+        )
+    first, second = compilers.config["compilers"][1:]
+    assert first["compiler"]["modules"] is second["compiler"]["modules"]
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import shutil
+
+import pytest
+
+from spack_site_generator.site import Site
+from spack_site_generator.utils import manifest
+from spack_site_generator.utils.manifest import (
+    MANIFEST_NAME,
+    hash_file,
+    load_manifest,
+    main,
+    verify_site,
+    verify_sites,
+)
+
+
+@pytest.fixture
+def site_dir(tmp_path):
+    """A written site with a manifest."""
+    site = Site(name="casper")
+    site.packages.add_package(
+        name="ecflow",
+        spec="ecflow@5.8.4",
+        buildable=False,
+        modules=["ecflow/5.8.4"],
+        prefix="/glade/work/ecflow-5.8.4",
+        extra_attributes={},
+        override=False,
+    )
+    site.config.set_build_jobs(build_jobs=4)
+    site.write(path=tmp_path / "generated", manifest=True)
+    return tmp_path / "generated" / "casper"
+
+
+def test_manifest_lists_written_files(site_dir):
+    """The manifest should record every written section with its size."""
+    manifest = load_manifest(site_dir / MANIFEST_NAME)
+    assert manifest["site"] == "casper"
+    assert sorted(manifest["files"]) == [
+        "compilers.yaml",
+        "config.yaml",
+        "modules.yaml",
+        "packages.yaml",
+    ]
+    packages = site_dir / "packages.yaml"
+    assert manifest["files"]["packages.yaml"] == {
+        "digest": hash_file(packages)[0],
+        "size": packages.stat().st_size,
+    }
+
+
+def test_hash_file_reads_in_chunks(tmp_path):
+    """Chunked hashing should match hashing the whole file at once."""
+    data = bytes(range(256)) * 1000
+    path = tmp_path / "blob"
+    path.write_bytes(data)
+
+    assert hash_file(path, chunk_size=4096) == (
+        hashlib.sha256(data).hexdigest(),
+        len(data),
+    )
+
+
+def test_verify_detects_changes(site_dir, tmp_path):
+    """Deployed copies should be checked for missing, changed and extra files."""
+    copies = []
+    for node in range(4):
+        copy = tmp_path / f"node{node}"
+        shutil.copytree(site_dir, copy)
+        copies.append(copy)
+    (copies[1] / "config.yaml").unlink()
+    (copies[2] / "packages.yaml").write_text("packages: {}\n")
+    (copies[3] / "mirrors.yaml").write_text("mirrors: {}\n")
+
+    manifest = load_manifest(site_dir / MANIFEST_NAME)
+    results = verify_sites(copies, manifest, max_workers=4)
+
+    assert results[0].ok
+    assert results[1].missing == ["config.yaml"]
+    assert results[2].mismatched == ["packages.yaml"]
+    assert results[3].unexpected == ["mirrors.yaml"]
+    assert not any(result.ok for result in results[1:])
+
+
+def test_verify_site_uses_own_manifest(site_dir, tmp_path):
+    """Without a reference manifest, a directory's own manifest is used."""
+    assert verify_site(site_dir).ok
+    assert verify_site(tmp_path / "missing").missing == [MANIFEST_NAME]
+
+
+def test_verify_reports_unreadable_files(site_dir, tmp_path, monkeypatch):
+    """Unreadable files and corrupt manifests are reported, not raised."""
+    copies = []
+    for node in range(3):
+        copy = tmp_path / f"node{node}"
+        shutil.copytree(site_dir, copy)
+        copies.append(copy)
+    (copies[0] / "config.yaml").unlink()
+    (copies[0] / "config.yaml").mkdir()
+    (copies[1] / MANIFEST_NAME).write_text("{not json")
+
+    def unreadable_modules(path, chunk_size=manifest.CHUNK_SIZE):
+        if path.name == "modules.yaml":
+            raise PermissionError(13, "Permission denied", str(path))
+        return hash_file(path, chunk_size)
+
+    monkeypatch.setattr(manifest, "hash_file", unreadable_modules)
+    results = verify_sites(copies, max_workers=2)
+
+    assert "config.yaml" in results[0].mismatched + results[0].unreadable
+    assert results[0].unreadable[-1:] == ["modules.yaml"]
+    assert results[1].unreadable == [MANIFEST_NAME]
+    assert results[2].unreadable == ["modules.yaml"]
+    assert not any(result.ok for result in results)
+
+
+def test_load_manifest_rejects_unknown_version(tmp_path):
+    """Manifests from an incompatible format version should be refused."""
+    path = tmp_path / MANIFEST_NAME
+    path.write_text(json.dumps({"version": 99, "algorithm": "sha256", "files": {}}))
+    with pytest.raises(ValueError, match="version"):
+        load_manifest(path)
+
+
+def test_command_line_exit_status(site_dir, tmp_path, capsys):
+    """The verify command should exit non-zero when a copy differs."""
+    copy = tmp_path / "node"
+    shutil.copytree(site_dir, copy)
+    manifest = str(site_dir / MANIFEST_NAME)
+    assert main(["--manifest", manifest, str(copy)]) == 0
+    (copy / "modules.yaml").write_text("modules: {}\n")
+    assert main(["--manifest", manifest, str(copy)]) == 1
+    assert "mismatched: modules.yaml" in capsys.readouterr().out
@@ -0,0 +1,168 @@
+import pytest
+import yaml
+
+from spack_site_generator.site import Compilers, Packages, Site, ToolchainMatrix
+from spack_site_generator.utils.schema import SchemaValidationError
+from spack_site_generator.utils.spack_yaml import to_yaml
+
+COMPILERS = ["gcc@12.2.0", "intel@2023.2.1", "nvhpc@23.7", "cce@15.0.1"]
+MPIS = ["cray-mpich@8.1.25", "openmpi@4.1.6", "mpich@4.1.2"]
+
+
+@pytest.fixture
+def netcdf_matrix():
+    """A 4 compilers x 3 MPIs matrix for netcdf-c."""
+    return ToolchainMatrix(
+        axes={"compiler": COMPILERS, "mpi": MPIS},
+        template={
+            "spec": "netcdf-c@4.9.2%{compiler} ^{mpi} +parallel-netcdf~szip+mpi+dap",
+            "prefix": "/glade/u/apps/derecho/23.09/spack/opt/spack/netcdf-c/4.9.2/"
+            "{compiler.name}/{compiler.version}/{mpi.name}/{mpi.version}",
+            "modules": ["ncarenv/23.09", "{compiler.name}/{compiler.version}"],
+        },
+    )
+
+
+def test_matrix_expands_every_combination(netcdf_matrix):
+    """The matrix should render one template per combination, lazily."""
+    assert len(netcdf_matrix) == 12
+    expansion = netcdf_matrix.expand()
+    first = next(expansion)
+    assert first["spec"].startswith("netcdf-c@4.9.2%gcc@12.2.0 ^cray-mpich@8.1.25")
+    assert first["prefix"].endswith("/gcc/12.2.0/cray-mpich/8.1.25")
+    assert first["modules"] == ["ncarenv/23.09", "gcc/12.2.0"]
+    assert len(list(expansion)) == 11
+
+
+def test_matrix_rejects_empty_axis():
+    """An axis without values would silently produce nothing."""
+    with pytest.raises(ValueError, match="'mpi'"):
+        ToolchainMatrix(axes={"compiler": COMPILERS, "mpi": []}, template={})
+
+
+@pytest.mark.parametrize("spack_format", [True, False])
+def test_packages_stream_matches_materialized_output(
+    netcdf_matrix, tmp_path, spack_format
+):
+    """Streaming matrix externals should write the same bytes as to_yaml."""
+    packages = Packages()
+    packages.add_provider(
+        provider_name="mpi",
+        library_name="cray-mpich",
+        library_version="8.1.25",
+        buildable=False,
+    )
+    packages.add_matrix(
+        name="netcdf-c", matrix=netcdf_matrix, buildable=False, override=True
+    )
+    output_file = tmp_path / "packages.yaml"
+    packages.write(path=output_file, spack_format=spack_format)
+
+    expected = to_yaml(packages.to_dict(), spack_format=spack_format)
+    assert output_file.read_text() == expected
+    assert len(packages.to_dict()["packages"]["netcdf-c"]["externals"]) == 12
+
+
+def test_packages_matrix_only(netcdf_matrix, tmp_path):
+    """A configuration holding only matrix packages should still be written."""
+    packages = Packages()
+    packages.add_matrix(
+        name="netcdf-c", matrix=netcdf_matrix, buildable=False, override=False
+    )
+    output_file = tmp_path / "packages.yaml"
+    packages.write(path=output_file, spack_format=False)
+    data = yaml.safe_load(output_file.read_text())
+    assert data == packages.to_dict()
+
+
+def test_packages_matrix_name_conflicts(netcdf_matrix):
+    """A package cannot be both a matrix and a regular entry."""
+    packages = Packages()
+    packages.add_matrix(
+        name="netcdf-c", matrix=netcdf_matrix, buildable=False, override=False
+    )
+    with pytest.raises(ValueError, match="toolchain matrix"):
+        packages.add_package(
+            name="netcdf-c",
+            spec="netcdf-c@4.9.2",
+            buildable=False,
+            modules=[],
+            prefix="/opt/netcdf-c",
+            extra_attributes={},
+            override=False,
+        )
+    with pytest.raises(ValueError, match="already defined"):
+        packages.add_matrix(
+            name="netcdf-c", matrix=netcdf_matrix, buildable=False, override=False
+        )
+
+
+def test_packages_matrix_validation_reports_position():
+    """Invalid rendered externals should be reported with their position."""
+    packages = Packages()
+    packages.add_matrix(
+        name="hdf5",
+        matrix=ToolchainMatrix(
+            axes={"compiler": ["gcc@12.2.0"]},
+            template={"spec": "hdf5%{compiler}", "prefix": "/opt", "modules": "x"},
+        ),
+        buildable=False,
+        override=False,
+    )
+    with pytest.raises(SchemaValidationError) as excinfo:
+        packages.validate()
+    assert excinfo.value.path == ["packages", "hdf5", "externals", 0, "modules"]
+
+
+def test_compilers_stream_matches_materialized_output(tmp_path):
+    """Matrix compilers should follow the stored compilers in the output."""
+    compilers = Compilers()
+    compilers.add_compiler(
+        spec="gcc@12.2.0",
+        paths={"cc": "/usr/bin/gcc", "cxx": None, "f77": None, "fc": None},
+        operating_system="sles15",
+        target="x86_64",
+        flags={},
+        modules=[],
+        environment={},
+        extra_rpaths=[],
+    )
+    compilers.add_matrix(
+        matrix=ToolchainMatrix(
+            axes={"gcc": ["gcc@11.4.0", "gcc@13.1.0"]},
+            template={
+                "spec": "{gcc}",
+                "paths": {
+                    "cc": "/opt/gcc/{gcc.version}/bin/gcc",
+                    "cxx": "/opt/gcc/{gcc.version}/bin/g++",
+                    "f77": None,
+                    "fc": None,
+                },
+                "operating_system": "sles15",
+                "target": "x86_64",
+                "modules": ["gcc/{gcc.version}"],
+            },
+        )
+    )
+    output_file = tmp_path / "compilers.yaml"
+    compilers.write(path=output_file)
+    assert output_file.read_text() == to_yaml(compilers.to_dict())
+    assert len(compilers.to_dict()["compilers"]) == 4
+
+
+def test_compilers_matrix_requires_compiler_fields():
+    """Templates missing required compiler fields should be rejected."""
+    with pytest.raises(ValueError, match="missing"):
+        Compilers().add_matrix(
+            matrix=ToolchainMatrix(axes={"gcc": ["gcc@12.2.0"]}, template={})
+        )
+
+
+def test_site_index_covers_matrix_entries(netcdf_matrix):
+    """Matrix externals should be queryable through the site index."""
+    site = Site(name="derecho")
+    site.packages.add_matrix(
+        name="netcdf-c", matrix=netcdf_matrix, buildable=False, override=False
+    )
+    assert len(site.find_by_compiler("intel@2023.2.1")) == 3
+    assert len(site.find_by_module("ncarenv/23.09")) == 12
@@ -0,0 +1,92 @@
+from pathlib import Path
+
+import pytest
+
+from spack_site_generator.site import Site
+from spack_site_generator.utils.microarch import (
+    TARGETS,
+    ancestors,
+    best_target,
+    detect_microarchitecture,
+    parse_cpuinfo,
+)
+
+NODES = Path(__file__).parent / "data" / "nodes"
+
+
+@pytest.mark.parametrize(
+    "node, expected",
+    [
+        ("derecho-cpu", "zen3"),
+        ("casper-cpu", "skylake_avx512"),
+        ("casper-gpu", "icelake"),
+        ("graviton3", "neoverse_v1"),
+        ("power9", "power9le"),
+    ],
+)
+def test_recorded_nodes_are_detected(node, expected):
+    """Recorded /proc/cpuinfo files map to Spack's target names."""
+    assert detect_microarchitecture(NODES / node) == expected
+
+
+def test_arm_cores_fall_back_to_the_midr_register():
+    """Without CPU part lines, the core is identified from MIDR_EL1 under /sys."""
+    text = (NODES / "graviton3" / "proc" / "cpuinfo").read_text()
+    assert parse_cpuinfo(text).part is None
+    assert parse_cpuinfo(text, midr="0x00000000411fd401").part == (0x41, 0xD40)
+
+
+def test_missing_features_fall_back_to_an_older_generation():
+    """A CPU lacking one feature of a target gets that target's parent."""
+    text = (NODES / "derecho-cpu" / "proc" / "cpuinfo").read_text()
+    info = parse_cpuinfo(text)
+    info.features.discard("vaes")
+    assert best_target(info) == "zen2"
+    info.vendor = "HygonGenuine"
+    assert best_target(info) == "x86_64_v3"
+
+
+def test_ancestors_cover_generic_levels():
+    """Vendor targets extend the generic x86_64 feature levels."""
+    assert ancestors("zen4")[:2] == ["zen3", "x86_64_v4"]
+    assert "x86_64" in ancestors("icelake")
+    assert all(parent in TARGETS for name in TARGETS for parent in ancestors(name))
+
+
+def test_unknown_cpuinfo_is_rejected(tmp_path):
+    """Files describing no known architecture raise ValueError."""
+    with pytest.raises(ValueError):
+        detect_microarchitecture(tmp_path)
+    (tmp_path / "proc").mkdir()
+    (tmp_path / "proc" / "cpuinfo").write_text("processor\t: 0\n")
+    with pytest.raises(ValueError, match="Unrecognized"):
+        detect_microarchitecture(tmp_path)
+
+
+def test_site_set_target_per_partition():
+    """Each partition's site targets its own nodes."""
+    sites = {}
+    for partition in ("casper-cpu", "casper-gpu"):
+        site = sites[partition] = Site(name=partition)
+        site.compilers.add_compiler(
+            spec="gcc@12.2.0",
+            paths={"cc": "/usr/bin/gcc"},
+            operating_system="opensuse15",
+            target="x86_64",
+            flags={},
+            modules=[],
+            environment={},
+            extra_rpaths=[],
+        )
+        site.set_target(root=NODES / partition)
+
+    assert sites["casper-cpu"].packages.config["all"]["target"] == ["skylake_avx512"]
+    assert sites["casper-gpu"].packages.config["all"]["target"] == ["icelake"]
+    gcc = sites["casper-gpu"].compilers.get_compiler(
+        spec="gcc@12.2.0", operating_system="opensuse15", target="x86_64"
+    )
+    assert gcc["target"] == "x86_64"
+    sites["casper-gpu"].packages.validate()
+
+    with pytest.raises(ValueError, match="Unknown target"):
+        sites["casper-gpu"].set_target(target="zen9")
@@ -0,0 +1,113 @@
+import json
+
+import pytest
+import yaml
+
+from spack_site_generator.site import Mirrors, Site
+from spack_site_generator.utils.schema import SchemaValidationError
+
+
+@pytest.fixture
+def mirrors():
+    """Fixture to create a fresh instance of Mirrors for each test."""
+    return Mirrors()
+
+
+def test_add_mirror_converts_paths_to_urls(mirrors):
+    """Local paths become file:// URLs."""
+    mirrors.add_mirror(name="local", url="/opt/mirror", source=True, binary=True)
+    mirrors.add_mirror(
+        name="remote",
+        url="https://cache.example.org",
+        source=False,
+        binary=True,
+        signed=False,
+    )
+    assert mirrors.to_dict() == {
+        "mirrors": {
+            "local": {"url": "file:///opt/mirror", "source": True, "binary": True},
+            "remote": {
+                "url": "https://cache.example.org",
+                "source": False,
+                "binary": True,
+                "signed": False,
+            },
+        }
+    }
+
+
+def test_write_skips_empty_config(mirrors, tmp_path):
+    """An empty mirror configuration writes no file."""
+    mirrors.write(path=tmp_path / "mirrors.yaml")
+    assert not (tmp_path / "mirrors.yaml").exists()
+    assert mirrors.render() is None
+
+
+def test_render_matches_write(mirrors, tmp_path):
+    """The rendered bytes are the written file."""
+    mirrors.add_mirror(name="local", url="/opt/mirror", source=True, binary=True)
+    mirrors.write(path=tmp_path / "mirrors.yaml")
+    assert mirrors.render() == (tmp_path / "mirrors.yaml").read_bytes()
+
+
+def test_write_validates(mirrors, tmp_path):
+    """Invalid mirror entries are rejected before writing."""
+    mirrors.config["broken"]["binary"] = True
+    with pytest.raises(SchemaValidationError):
+        mirrors.write(path=tmp_path / "mirrors.yaml")
+
+
+def test_scan_requires_local_mirror(mirrors):
+    """Only file:// mirrors can be scanned without an explicit path."""
+    mirrors.add_mirror(
+        name="remote", url="https://cache.example.org", source=False, binary=True
+    )
+    with pytest.raises(ValueError, match="not a local mirror"):
+        mirrors.scan(name="remote")
+
+
+def test_site_reports_available_binaries(tmp_path):
+    """Externals found in a scanned build cache are reported with the mirror."""
+    build_cache = tmp_path / "mirror" / "build_cache"
+    build_cache.mkdir(parents=True)
+    (build_cache / f"netcdf-c-4.9.2-{'a' * 32}.spec.json").write_text(
+        json.dumps(
+            {
+                "spec": {
+                    "nodes": [
+                        {
+                            "name": "netcdf-c",
+                            "version": "4.9.2",
+                            "compiler": {"name": "gcc", "version": "12.2.0"},
+                            "hash": "a" * 32,
+                        }
+                    ]
+                }
+            }
+        )
+    )
+    site = Site(name="testsite")
+    for name, spec in [("netcdf-c", "netcdf-c@4.9.2%gcc@12.2.0"), ("zlib", "zlib@1.3")]:
+        site.packages.add_package(
+            name=name,
+            spec=spec,
+            buildable=False,
+            modules=[],
+            prefix=f"/opt/{name}",
+            extra_attributes={},
+            override=False,
+        )
+    site.mirrors.add_mirror(
+        name="local", url=str(tmp_path / "mirror"), source=False, binary=True
+    )
+    site.mirrors.scan(name="local")
+
+    available = site.available_binaries()
+    assert list(available) == ["netcdf-c@4.9.2%gcc@12.2.0"]
+    assert available["netcdf-c@4.9.2%gcc@12.2.0"]["local"][0].hash == "a" * 32
+
+    site.write(path=tmp_path / "out")
+    written = yaml.safe_load(
+        (tmp_path / "out" / "testsite" / "mirrors.yaml").read_text()
+    )
+    assert written["mirrors"]["local"]["url"] == (tmp_path / "mirror").as_uri()
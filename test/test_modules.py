@@ -85,3 +85,113 @@ def test_write_yaml_without_modules_creates_empty_file(modules, tmp_path):
     assert "modules" in data
     assert "default" in data["modules"]
     assert data["modules"]["default"].get("enable", []) == []
+
+
+SPECS = [
+    "cmake@3.26.3",
+    "zlib@1.2.13%gcc@7.5.0",
+    "hdf5@1.14.0%gcc@12.2.0",
+    "hdf5@1.14.0%intel@2023.1.0",
+    "cray-mpich@8.1.25%gcc@12.2.0",
+    "netcdf-c@4.9.2%gcc@12.2.0 ^cray-mpich@8.1.25",
+    "parallel-netcdf@1.12.3%gcc@12.2.0 ^cray-mpich@8.1.25",
+    "netcdf-c@4.9.2%intel@2023.1.0 ^openmpi@4.1.5",
+]
+PROVIDERS = {"mpi": ["cray-mpich@8.1.25", "openmpi@4.1.5"]}
+
+
+def _lmod(modules, hash_length=0):
+    modules.add_module_type(
+        module_type="lmod",
+        autoload="direct",
+        hash_length=hash_length,
+        hide_implicits=True,
+        include=[],
+        exclude=[],
+    )
+
+
+def test_hierarchy_settings_are_written(modules, tmp_path):
+    """Core compilers, hierarchy and projections end up in the lmod section."""
+    _lmod(modules)
+    modules.set_core_compilers(compilers=["gcc@7.5.0"])
+    modules.set_hierarchy(hierarchy=["compiler", "mpi"])
+    modules.set_projections(module_type="lmod", projections={"all": "{name}/{version}"})
+    modules.write(path=tmp_path / "modules.yaml")
+
+    lmod = yaml.safe_load((tmp_path / "modules.yaml").read_text())["modules"][
+        "default"
+    ]["lmod"]
+    assert lmod["core_compilers"] == ["gcc@7.5.0"]
+    assert lmod["hierarchy"] == ["mpi"]
+    assert lmod["projections"] == {"all": "{name}/{version}"}
+
+
+def test_preview_hierarchical_tree(modules):
+    """Modules are placed by compiler and MPI, shrinking what is visible at once."""
+    _lmod(modules)
+    modules.set_core_compilers(compilers=["gcc@7.5.0"])
+    modules.set_hierarchy(hierarchy=["mpi"])
+
+    preview = modules.preview_tree(specs=SPECS, providers=PROVIDERS)
+
+    assert preview.directories == {
+        "Core": ["cmake/3.26.3", "zlib/1.2.13"],
+        "gcc/12.2.0": ["cray-mpich/8.1.25", "hdf5/1.14.0"],
+        "cray-mpich/8.1.25/gcc/12.2.0": ["netcdf-c/4.9.2", "parallel-netcdf/1.12.3"],
+        "intel/2023.1.0": ["hdf5/1.14.0"],
+        "openmpi/4.1.5/intel/2023.1.0": ["netcdf-c/4.9.2"],
+    }
+    assert preview.modules == 8
+    assert preview.largest == 2
+    assert preview.max_visible == 6
+    assert preview.collisions == {}
+
+
+def test_preview_flat_tree_reports_collisions(modules):
+    """Without a hierarchy or hash, equal names of different builds collide."""
+    _lmod(modules)
+    modules.config["default"]["lmod"]["hash_length"] = 0
+    modules.config["default"]["tcl"]["hash_length"] = 0
+    modules.set_projections(module_type="tcl", projections={"all": "{name}/{version}"})
+
+    preview = modules.preview_tree(specs=SPECS, module_type="tcl")
+
+    assert list(preview.directories) == [""]
+    assert preview.max_visible == preview.modules == 6
+    assert preview.collisions == {
+        "hdf5/1.14.0": ["hdf5@1.14.0%gcc@12.2.0", "hdf5@1.14.0%intel@2023.1.0"],
+        "netcdf-c/4.9.2": [
+            "netcdf-c@4.9.2%gcc@12.2.0 ^cray-mpich@8.1.25",
+            "netcdf-c@4.9.2%intel@2023.1.0 ^openmpi@4.1.5",
+        ],
+    }
+
+
+def test_preview_projection_tokens(modules):
+    """Package and dependency keys select projections; hashes are left out."""
+    _lmod(modules, hash_length=7)
+    modules.set_core_compilers(compilers=["gcc"])
+    modules.set_projections(
+        module_type="lmod",
+        projections={
+            "all": "{name}/{version}-{hash:7}",
+            "^mpi": "{name}/{version}-{^mpi.name}",
+        },
+    )
+    modules.set_hierarchy(hierarchy=["mpi"])
+
+    preview = modules.preview_tree(specs=SPECS[:6], providers=PROVIDERS)
+
+    assert preview.directories["Core"] == [
+        "cmake/3.26.3",
+        "cray-mpich/8.1.25",
+        "hdf5/1.14.0",
+        "zlib/1.2.13",
+    ]
+    assert preview.directories["cray-mpich/8.1.25/Core"] == [
+        "netcdf-c/4.9.2-cray-mpich"
+    ]
+    modules.set_projections(module_type="lmod", projections={"all": "{variants}"})
+    with pytest.raises(ValueError, match="variants"):
+        modules.preview_tree(specs=SPECS)
@@ -114,3 +114,170 @@ def test_write_yaml(packages, tmp_path):
     assert "externals" in data["packages"]["hdf5"]
     assert "modules" in data["packages"]["hdf5"]["externals"][0]
     assert "extra_attributes" in data["packages"]["hdf5"]["externals"][0]
+
+
+def _add_hdf5(packages, spec, *, modules, on_duplicate="replace", **overrides):
+    """Add an hdf5 external with the given spec and modules."""
+    fields = dict(
+        name="hdf5",
+        spec=spec,
+        buildable=False,
+        modules=modules,
+        prefix="/usr/local/hdf5",
+        extra_attributes={"headers": "/usr/local/include"},
+        override=False,
+        on_duplicate=on_duplicate,
+    )
+    fields.update(overrides)
+    packages.add_package(**fields)
+
+
+def test_add_package_appends_externals(packages):
+    """Externals with different specs are kept side by side."""
+    _add_hdf5(packages, "hdf5@1.12.0%gcc@12.2.0", modules=["gcc"])
+    _add_hdf5(packages, "hdf5@1.12.0%intel@2023.2.1", modules=["intel"])
+    assert [e["spec"] for e in packages.config["hdf5"]["externals"]] == [
+        "hdf5@1.12.0%gcc@12.2.0",
+        "hdf5@1.12.0%intel@2023.2.1",
+    ]
+
+
+def test_duplicate_policies(packages):
+    """Duplicates are detected by canonical spec and handled per policy."""
+    _add_hdf5(packages, "hdf5@1.12.0+mpi%gcc@12.2.0", modules=["gcc"])
+    _add_hdf5(packages, "hdf5@1.12.0%gcc@12.2.0", modules=["other"])
+    _add_hdf5(packages, "hdf5 @1.12.0 %gcc@12.2.0 +mpi", modules=["hdf5"])
+    externals = packages.config["hdf5"]["externals"]
+    assert [e["modules"] for e in externals] == [["hdf5"], ["other"]]
+
+    _add_hdf5(
+        packages,
+        "hdf5@1.12.0%gcc@12.2.0+mpi",
+        modules=["gcc", "hdf5"],
+        on_duplicate="merge",
+        prefix="",
+        extra_attributes={"libs": "/usr/local/lib"},
+    )
+    assert externals[0] == {
+        "spec": "hdf5@1.12.0%gcc@12.2.0+mpi",
+        "prefix": "/usr/local/hdf5",
+        "modules": ["hdf5", "gcc"],
+        "extra_attributes": {
+            "headers": "/usr/local/include",
+            "libs": "/usr/local/lib",
+        },
+    }
+
+    _add_hdf5(packages, "hdf5@1.12.0%gcc@12.2.0", modules=["x"], on_duplicate="skip")
+    assert externals[1]["modules"] == ["other"]
+    with pytest.raises(ValueError, match="already has an external"):
+        _add_hdf5(packages, "hdf5@1.12.0%gcc@12.2.0", modules=[], on_duplicate="error")
+    with pytest.raises(ValueError, match="duplicate policy"):
+        _add_hdf5(packages, "hdf5@1.12.1", modules=[], on_duplicate="ignore")
+    assert len(externals) == 2
+
+
+def test_duplicates_found_after_direct_edits(packages):
+    """Externals edited directly in config are still found as duplicates."""
+    _add_hdf5(packages, "hdf5@1.12.0", modules=["a"])
+    packages.config["hdf5"]["externals"].insert(
+        0, {"spec": "hdf5@1.10.0", "prefix": "/opt/hdf5"}
+    )
+    _add_hdf5(packages, "hdf5@1.10.0", modules=["b"])
+    assert [e.get("modules") for e in packages.config["hdf5"]["externals"]] == [
+        ["b"],
+        ["a"],
+    ]
+
+
+def test_spec_edited_in_place_is_found_as_duplicate(packages):
+    """A spec changed in config without changing the length is still found."""
+    _add_hdf5(packages, "hdf5@1.12.0", modules=["a"])
+    _add_hdf5(packages, "hdf5@1.14.0", modules=["b"])
+    packages.config["hdf5"]["externals"][0]["spec"] = "hdf5@1.10.0"
+    _add_hdf5(packages, "hdf5@1.10.0", modules=["c"])
+    assert [e.get("modules") for e in packages.config["hdf5"]["externals"]] == [
+        ["c"],
+        ["b"],
+    ]
+
+
+def test_skip_leaves_package_untouched(packages):
+    """Skipping a duplicate changes neither buildable nor override."""
+    _add_hdf5(packages, "hdf5@1.12.0", modules=["a"])
+    _add_hdf5(
+        packages,
+        "hdf5@1.12.0",
+        modules=["b"],
+        on_duplicate="skip",
+        buildable=True,
+        override=True,
+    )
+    assert packages.config["hdf5"].to_dict() == {
+        "buildable": False,
+        "externals": [
+            {
+                "spec": "hdf5@1.12.0",
+                "prefix": "/usr/local/hdf5",
+                "modules": ["a"],
+                "extra_attributes": {"headers": "/usr/local/include"},
+            }
+        ],
+    }
+
+
+def test_override_renders_double_colon_key(packages):
+    """Overriding packages render as ``name::`` with their modules intact."""
+    packages.add_package(
+        name="ecflow",
+        spec="ecflow@5.8.4",
+        buildable=False,
+        modules=["ecflow/5.8.4"],
+        prefix="/opt/ecflow",
+        extra_attributes={},
+        override=True,
+    )
+    # Overriding a package that already has externals keeps the same layout.
+    _add_hdf5(packages, "hdf5@1.12.0", modules=["hdf5/1.12.0"])
+    _add_hdf5(packages, "hdf5@1.14.0", modules=["hdf5/1.14.0"], override=True)
+
+    text = packages.render().decode()
+
+    lines = [line.rstrip() for line in text.splitlines()]
+    assert "  ecflow::" in lines and "  hdf5::" in lines
+    assert "      - ecflow/5.8.4" in lines
+    data = yaml.safe_load(text)["packages"]
+    assert data["ecflow:"] == {
+        "buildable": False,
+        "externals": [
+            {
+                "spec": "ecflow@5.8.4",
+                "prefix": "/opt/ecflow",
+                "modules": ["ecflow/5.8.4"],
+            }
+        ],
+    }
+    assert [e["modules"] for e in data["hdf5:"]["externals"]] == [
+        ["hdf5/1.12.0"],
+        ["hdf5/1.14.0"],
+    ]
+
+
+def test_many_externals_per_package(packages):
+    """Thousands of externals per package are added without rescanning."""
+    for index in range(5000):
+        _add_hdf5(packages, f"hdf5@1.{index}", modules=[])
+    _add_hdf5(packages, "hdf5@1.4999", modules=["last"])
+    externals = packages.config["hdf5"]["externals"]
+    assert len(externals) == 5000 and externals[-1]["modules"] == ["last"]
+
+
+def test_shard_keeps_each_package_whole(packages):
+    """Every package lands in exactly one shard, with all of its externals."""
+    _add_hdf5(packages, "hdf5@1.14.3", modules=[])
+    _add_hdf5(packages, "hdf5@1.12.2", modules=[])
+    shards = packages.shard(by="upstream", roots={"apps": "/usr/local"})
+    assert list(shards) == ["apps"]
+    assert len(shards["apps"].config["hdf5"]["externals"]) == 2
+    with pytest.raises(ValueError, match="Unknown sharding"):
+        packages.shard(by="size")
@@ -0,0 +1,168 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from spack_site_generator.site import Site
+from spack_site_generator.utils import path_check
+from spack_site_generator.utils.path_check import PathCheckError, check_paths
+
+
+def _make_site(tmp_path):
+    """A site whose package and compiler reference paths below ``tmp_path``."""
+    prefix = tmp_path / "netcdf-c"
+    (prefix / "include").mkdir(parents=True)
+    bindir = tmp_path / "gcc" / "bin"
+    bindir.mkdir(parents=True)
+    for name in ("gcc", "g++"):
+        (bindir / name).write_text("")
+
+    site = Site(name="testsite")
+    site.packages.add_package(
+        name="netcdf-c",
+        spec="netcdf-c@4.9.2",
+        buildable=False,
+        modules=[],
+        prefix=str(prefix),
+        extra_attributes={"headers": str(prefix / "include")},
+        override=False,
+    )
+    site.compilers.add_compiler(
+        spec="gcc@12.2.0",
+        paths={"cc": str(bindir / "gcc"), "cxx": str(bindir / "g++"), "f77": None},
+        operating_system="sles15",
+        target="x86_64",
+        flags={},
+        modules=[],
+        environment={},
+        extra_rpaths=["$SPACK_ROOT/lib", str(tmp_path / "gcc" / "lib64")],
+    )
+    return site
+
+
+def test_referenced_paths(tmp_path):
+    """Prefixes, absolute attributes, executables and rpaths are collected."""
+    references = _make_site(tmp_path).referenced_paths()
+    assert references[str(tmp_path / "netcdf-c")] == [
+        "packages.netcdf-c.externals[0].prefix"
+    ]
+    assert references[str(tmp_path / "gcc" / "bin" / "gcc")] == [
+        "compilers[1].compiler.paths.cc"
+    ]
+    assert str(tmp_path / "gcc" / "lib64") in references
+    assert not any("$" in path for path in references)
+
+
+def test_check_paths_reports_missing(tmp_path):
+    """Missing paths are reported; existing ones are not."""
+    report = _make_site(tmp_path).check_paths()
+    assert report.checked == 5
+    assert report.missing == [str(tmp_path / "gcc" / "lib64")]
+    assert report.unreadable == []
+    assert not report.ok
+
+
+def test_missing_shared_parent_skips_children(tmp_path, monkeypatch):
+    """Paths below a missing shared parent are reported without a lookup."""
+    looked_up = []
+    lookup = path_check._lookup
+
+    def recording_lookup(path, started):
+        looked_up.append(path)
+        return lookup(path, started)
+
+    monkeypatch.setattr(path_check, "_lookup", recording_lookup)
+    gone = tmp_path / "gone"
+    paths = [str(gone / name) for name in ("cc", "cxx", "fc")]
+    report = check_paths(paths + [str(tmp_path)])
+    assert report.missing == sorted(paths)
+    assert sorted(looked_up) == sorted([str(gone), str(tmp_path)])
+
+
+@pytest.mark.skipif(os.geteuid() == 0, reason="root can read any file")
+def test_unreadable(tmp_path):
+    """Files without read permission are reported as unreadable."""
+    secret = tmp_path / "secret"
+    secret.write_text("")
+    secret.chmod(0)
+    assert check_paths([str(secret)]).unreadable == [str(secret)]
+
+
+def test_slow_and_timed_out_lookups(tmp_path, monkeypatch):
+    """Lookups are timed individually and abandoned after the timeout."""
+    lookup = path_check._lookup
+
+    def sluggish_lookup(path, started):
+        start = started[path] = time.monotonic()
+        time.sleep({"slow": 0.2, "hung": 2.0}.get(os.path.basename(path), 0))
+        status, _ = lookup(path, {})
+        return status, time.monotonic() - start
+
+    monkeypatch.setattr(path_check, "_lookup", sluggish_lookup)
+    start = time.monotonic()
+    report = check_paths(
+        [str(tmp_path / name) for name in ("a/slow", "b/hung", "c/fast")],
+        timeout=0.5,
+        slow=0.1,
+    )
+    assert time.monotonic() - start < 1.5
+    assert report.timed_out == [str(tmp_path / "b/hung")]
+    assert list(report.slow) == [str(tmp_path / "a/slow")]
+
+
+def test_more_hung_lookups_than_workers(monkeypatch):
+    """Queued lookups time out once every worker is stuck on a hung mount."""
+    release = threading.Event()
+    stat = os.stat
+
+    def hanging_stat(path, *args, **kwargs):
+        if str(path).startswith("/hung"):
+            release.wait(10)
+        return stat(path, *args, **kwargs)
+
+    monkeypatch.setattr(path_check.os, "stat", hanging_stat)
+    start = time.monotonic()
+    try:
+        report = check_paths(
+            ["/hung/a", "/hung2/b", "/hung3/c"], max_workers=2, timeout=0.2
+        )
+    finally:
+        release.set()
+    assert time.monotonic() - start < 2.0
+    assert report.timed_out == ["/hung/a", "/hung2/b", "/hung3/c"]
+
+
+def test_hung_lookups_do_not_block_exit(tmp_path):
+    """An interpreter with abandoned lookups still exits."""
+    script = tmp_path / "hang.py"
+    script.write_text(
+        "import os, threading\n"
+        "from spack_site_generator.utils import path_check\n"
+        "os.stat = lambda *args, **kwargs: threading.Event().wait()\n"
+        "report = path_check.check_paths(['/hung/a'], timeout=0.1)\n"
+        "print(report.timed_out)\n"
+    )
+    environment = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    completed = subprocess.run(
+        [sys.executable, str(script)],
+        capture_output=True,
+        text=True,
+        timeout=10,
+        env=environment,
+    )
+    assert completed.stdout.strip() == "['/hung/a']"
+
+
+def test_write_checks_paths(tmp_path):
+    """Site.write only checks paths when asked and writes nothing on failure."""
+    site = _make_site(tmp_path)
+    with pytest.raises(PathCheckError, match="compilers\\[1\\].compiler.extra_rpaths"):
+        site.write(path=tmp_path / "out", check_paths=True)
+    assert not (tmp_path / "out").exists()
+
+    (tmp_path / "gcc" / "lib64").mkdir()
+    site.write(path=tmp_path / "out", check_paths=True)
+    assert (tmp_path / "out" / "testsite" / "packages.yaml").is_file()
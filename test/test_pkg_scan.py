@@ -0,0 +1,135 @@
+import pytest
+
+from spack_site_generator.site import Site
+from spack_site_generator.utils.detection_cache import DetectionCache
+from spack_site_generator.utils.pkg_scan import (
+    PackageConfig,
+    parse_pc,
+    scan_prefix,
+    scan_prefixes,
+    select_config,
+    version_matches,
+)
+
+NETCDF_PC = """\
+# netcdf.pc, as installed by netcdf-c
+prefix=/glade/u/apps/netcdf/4.9.2
+exec_prefix=${prefix}
+libdir=${exec_prefix}/lib
+includedir=${prefix}/include
+
+Name: netcdf
+Description: NetCDF Client Library for C
+URL: https://www.unidata.ucar.edu/netcdf
+Version: 4.9.2
+Libs: -L${libdir} -lnetcdf
+Libs.private: -lhdf5_hl -lhdf5 -lm -lz
+Cflags: -I${includedir}
+"""
+
+CMAKE_VERSION = 'set(PACKAGE_VERSION "1.14.0")\n'
+CMAKE_TARGETS = """\
+get_filename_component(_IMPORT_PREFIX "${CMAKE_CURRENT_LIST_FILE}" PATH)
+set_target_properties(hdf5-shared PROPERTIES
+  INTERFACE_INCLUDE_DIRECTORIES "${_IMPORT_PREFIX}/include"
+)
+set_target_properties(hdf5-shared PROPERTIES
+  IMPORTED_LOCATION_RELEASE "${_IMPORT_PREFIX}/lib/libhdf5.so.310.0.0"
+)
+"""
+
+
+@pytest.fixture
+def prefixes(tmp_path):
+    """A netcdf-c prefix with a pkg-config file and an hdf5 prefix with CMake files."""
+    netcdf = tmp_path / "netcdf"
+    (netcdf / "lib" / "pkgconfig").mkdir(parents=True)
+    (netcdf / "lib" / "pkgconfig" / "netcdf.pc").write_text(
+        NETCDF_PC.replace("/glade/u/apps/netcdf/4.9.2", str(netcdf))
+    )
+    hdf5 = tmp_path / "hdf5"
+    cmake = hdf5 / "share" / "cmake" / "hdf5"
+    cmake.mkdir(parents=True)
+    (cmake / "hdf5-config.cmake").write_text("include(hdf5-targets.cmake)\n")
+    (cmake / "hdf5-config-version.cmake").write_text(CMAKE_VERSION)
+    (cmake / "hdf5-targets.cmake").write_text(CMAKE_TARGETS)
+    return {"netcdf": str(netcdf), "hdf5": str(hdf5)}
+
+
+def test_parse_pc_expands_variables(tmp_path):
+    """Variables are expanded and only directory and library flags are kept."""
+    config = parse_pc(tmp_path / "netcdf.pc", NETCDF_PC)
+    assert config == PackageConfig(
+        name="netcdf",
+        version="4.9.2",
+        include_dirs=["/glade/u/apps/netcdf/4.9.2/include"],
+        library_dirs=["/glade/u/apps/netcdf/4.9.2/lib"],
+        libraries=["netcdf"],
+        path=str(tmp_path / "netcdf.pc"),
+    )
+
+
+def test_scan_prefix_reads_cmake_packages(prefixes):
+    """CMake versions come from the version file, locations from the targets."""
+    (config,) = scan_prefix(prefixes["hdf5"])
+    assert config.name == "hdf5"
+    assert config.version == "1.14.0"
+    assert config.include_dirs == [f"{prefixes['hdf5']}/include"]
+    assert config.library_dirs == [f"{prefixes['hdf5']}/lib"]
+    assert scan_prefix(prefixes["hdf5"] + "/missing") == []
+
+
+def test_scan_prefixes_caches_each_prefix(prefixes, tmp_path):
+    """Prefixes are scanned together and cached one by one."""
+    cache = DetectionCache(tmp_path / "cache.sqlite")
+    scans = scan_prefixes(prefixes.values(), cache=cache)
+    assert [config.name for config in scans[prefixes["netcdf"]]] == ["netcdf"]
+    assert cache.get("pkg-scan", prefixes["hdf5"]) is not None
+    assert scan_prefixes(prefixes.values(), cache=cache) == scans
+
+
+def test_select_config_and_versions():
+    """Package files are matched by name, and versions by prefix."""
+    configs = [
+        PackageConfig("netCDF", "4.9.2", [], [], [], "a"),
+        PackageConfig("netcdf-fortran", "4.6.1", [], [], [], "b"),
+    ]
+    assert select_config("netcdf-fortran", configs) is configs[1]
+    assert select_config("netcdf-c", configs) is configs[0]
+    assert select_config("zlib", configs) is None
+    assert select_config("zlib", configs[:1]) is configs[0]
+    assert version_matches("4.9", "4.9.2")
+    assert not version_matches("4.9.1", "4.9.2")
+    assert version_matches(None, "4.9.2")
+
+
+def test_site_fills_extra_attributes_and_checks_versions(prefixes):
+    """Externals get headers and libs; mismatched versions are reported."""
+    site = Site(name="scan")
+    for name, spec, prefix in (
+        ("netcdf-c", "netcdf-c@4.9.2%gcc@12.2.0", prefixes["netcdf"]),
+        ("hdf5", "hdf5@1.12.2%gcc@12.2.0", prefixes["hdf5"]),
+    ):
+        site.packages.add_package(
+            name=name,
+            spec=spec,
+            buildable=False,
+            modules=[],
+            prefix=prefix,
+            extra_attributes={"libs": "/custom"} if name == "hdf5" else {},
+            override=False,
+        )
+
+    with pytest.warns(RuntimeWarning, match="declares version 1.12.2"):
+        problems = site.scan_extra_attributes()
+
+    assert len(problems) == 1
+    packages = site.packages.to_dict()["packages"]
+    assert packages["netcdf-c"]["externals"][0]["extra_attributes"] == {
+        "headers": f"{prefixes['netcdf']}/include",
+        "libs": f"{prefixes['netcdf']}/lib",
+    }
+    assert packages["hdf5"]["externals"][0]["extra_attributes"] == {
+        "headers": f"{prefixes['hdf5']}/include",
+        "libs": "/custom",
+    }
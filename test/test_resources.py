@@ -0,0 +1,133 @@
+import os
+
+import pytest
+import yaml
+
+from spack_site_generator.site import Config
+from spack_site_generator.utils import resources
+from spack_site_generator.utils.resources import (
+    available_memory,
+    cgroup_cpu_limit,
+    estimate_build_jobs,
+    scheduler_cpus,
+)
+
+GIB = 1024**3
+
+
+def _write(root, path, content):
+    """Create ``root/path`` with ``content``."""
+    target = root / path.lstrip("/")
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(content)
+
+
+@pytest.fixture
+def fake_root(tmp_path, monkeypatch):
+    """A system tree with 64 CPUs in the affinity mask and 100 GiB available."""
+    monkeypatch.setattr(resources, "affinity_cpus", lambda: 64)
+    _write(
+        tmp_path,
+        "/proc/meminfo",
+        f"MemTotal: {256 * GIB // 1024} kB\nMemAvailable: {100 * GIB // 1024} kB\n",
+    )
+    _write(tmp_path, "/proc/self/cgroup", "0::/user.slice/session-1.scope\n")
+    return tmp_path
+
+
+def test_cgroup_v2_limits(fake_root):
+    """The tightest cpu.max and memory.max along the cgroup path apply."""
+    _write(fake_root, "/sys/fs/cgroup/user.slice/cpu.max", "350000 100000\n")
+    _write(fake_root, "/sys/fs/cgroup/user.slice/session-1.scope/cpu.max", "max 100000")
+    _write(fake_root, "/sys/fs/cgroup/user.slice/memory.max", str(16 * GIB))
+    _write(fake_root, "/sys/fs/cgroup/user.slice/memory.current", str(6 * GIB))
+    assert cgroup_cpu_limit(fake_root) == (3.5, "/sys/fs/cgroup/user.slice/cpu.max")
+    assert available_memory(fake_root) == (
+        10 * GIB,
+        "/sys/fs/cgroup/user.slice/memory.max",
+    )
+
+
+def test_cgroup_v1_limits(fake_root):
+    """cgroup v1 CFS quotas and memory limits are read; -1 means unlimited."""
+    _write(
+        fake_root,
+        "/proc/self/cgroup",
+        "4:memory:/job/1\n3:cpu,cpuacct:/job/1\n",
+    )
+    cpu = "/sys/fs/cgroup/cpu,cpuacct/job/1"
+    _write(fake_root, f"{cpu}/cpu.cfs_quota_us", "800000")
+    _write(fake_root, f"{cpu}/cpu.cfs_period_us", "100000")
+    _write(fake_root, "/sys/fs/cgroup/cpu,cpuacct/cpu.cfs_quota_us", "-1")
+    _write(fake_root, "/sys/fs/cgroup/memory/memory.limit_in_bytes", str(1 << 63))
+    assert cgroup_cpu_limit(fake_root) == (8.0, f"{cpu}/cpu.cfs_quota_us")
+    assert available_memory(fake_root) == (100 * GIB, "/proc/meminfo")
+
+
+@pytest.mark.parametrize(
+    "environ, expected",
+    [
+        ({}, None),
+        ({"NCPUS": "12"}, (12, "NCPUS")),
+        ({"SLURM_CPUS_ON_NODE": "36", "NCPUS": "12"}, (36, "SLURM_CPUS_ON_NODE")),
+        (
+            {"SLURM_CPUS_PER_TASK": "4", "SLURM_CPUS_ON_NODE": "36"},
+            (4, "SLURM_CPUS_PER_TASK"),
+        ),
+        ({"NCPUS": "lots"}, None),
+    ],
+)
+def test_scheduler_cpus(environ, expected):
+    """Slurm variables take precedence over PBS; invalid values are ignored."""
+    assert scheduler_cpus(environ) == expected
+
+
+def test_estimate_takes_tightest_limit(fake_root):
+    """Memory, quota and scheduler limits lower the affinity count."""
+    estimate = estimate_build_jobs(root=fake_root, environ={})
+    assert estimate.jobs == 50
+    assert "allows 50 job(s)" in estimate.reasons[-1]
+
+    _write(fake_root, "/sys/fs/cgroup/cpu.max", "250000 100000")
+    estimate = estimate_build_jobs(root=fake_root, environ={"NCPUS": "8"})
+    assert estimate.jobs == 3
+    assert any(
+        "cgroup quota allows 2.5 CPU(s)" in reason for reason in estimate.reasons
+    )
+
+
+def test_estimate_floor_and_cap(fake_root):
+    """Per-site floors and caps are applied and explained."""
+    low = estimate_build_jobs(
+        root=fake_root, environ={}, memory_per_job=200 * GIB, minimum=2
+    )
+    assert low.jobs == 2 and low.reasons[-1] == "raised to the floor of 2"
+    high = estimate_build_jobs(root=fake_root, environ={}, maximum=16)
+    assert high.jobs == 16 and high.reasons[-1] == "lowered to the cap of 16"
+    with pytest.raises(ValueError):
+        estimate_build_jobs(root=fake_root, environ={}, minimum=4, maximum=2)
+
+
+def test_config_records_reasoning(fake_root, tmp_path):
+    """Autotuned build jobs are written with their reasoning as comments."""
+    config = Config()
+    config.autotune_build_jobs(root=fake_root, environ={"NCPUS": "6"})
+    config.write(path=tmp_path / "config.yaml")
+    text = (tmp_path / "config.yaml").read_text()
+    assert text.startswith("# build_jobs: 6 (autotuned)\n#   CPU affinity allows 64")
+    assert "#   batch job allocated 6 CPU(s) (NCPUS)\n" in text
+    assert yaml.safe_load(text) == {"config": {"build_jobs": 6}}
+
+    config.set_build_jobs(build_jobs=3)
+    config.write(path=tmp_path / "config.yaml")
+    assert not (tmp_path / "config.yaml").read_text().startswith("#")
+
+
+def test_affinity_cpus_matches_process():
+    """Without a mask the CPU count of the machine is used."""
+    expected = (
+        len(os.sched_getaffinity(0))
+        if hasattr(os, "sched_getaffinity")
+        else os.cpu_count()
+    )
+    assert resources.affinity_cpus() == expected
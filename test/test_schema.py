@@ -0,0 +1,86 @@
+import pytest
+
+from spack_site_generator.site import Compilers, Packages
+from spack_site_generator.utils.schema import (
+    SchemaValidationError,
+    get_validator,
+    validate_section,
+)
+
+
+def test_valid_packages_section_passes():
+    """A well-formed packages section should validate without error."""
+    validate_section(
+        "packages",
+        {
+            "packages": {
+                "all": {"providers": {"mpi": ["openmpi@4.1.1", {"override": True}]}},
+                "hdf5": {
+                    "buildable": False,
+                    "externals": [{"spec": "hdf5@1.12.0", "prefix": "/opt/hdf5"}],
+                },
+            }
+        },
+    )
+
+
+def test_error_reports_path_to_offending_value():
+    """Validation errors should point at the key that failed."""
+    with pytest.raises(SchemaValidationError) as excinfo:
+        validate_section(
+            "packages",
+            {"packages": {"hdf5": {"externals": [{"spec": 12, "prefix": "/x"}]}}},
+        )
+    assert excinfo.value.path == ["packages", "hdf5", "externals", 0, "spec"]
+    assert str(excinfo.value).startswith("packages.hdf5.externals[0].spec:")
+
+
+def test_unknown_key_is_rejected():
+    """Keys Spack does not know about should be rejected."""
+    with pytest.raises(SchemaValidationError, match="unexpected key 'build_job'"):
+        validate_section("config", {"config": {"build_job": 4}})
+
+
+def test_bool_is_not_an_integer():
+    """Booleans should not be accepted where Spack expects an integer."""
+    with pytest.raises(SchemaValidationError, match="expected integer"):
+        validate_section("config", {"config": {"build_jobs": True}})
+
+
+def test_validator_is_compiled_once():
+    """Repeated lookups should return the same cached validator."""
+    assert get_validator("compilers") is get_validator("compilers")
+
+
+def test_write_validates_before_rendering(tmp_path):
+    """An invalid section should raise and leave no file behind."""
+    compilers = Compilers()
+    compilers.add_compiler(
+        spec="gcc@12.2.0",
+        paths={"cc": "/usr/bin/gcc", "cpp": "/usr/bin/cpp"},
+        operating_system="sles15",
+        target="x86_64",
+        flags={},
+        modules=None,
+        environment=None,
+        extra_rpaths=None,
+    )
+    output_file = tmp_path / "compilers.yaml"
+    with pytest.raises(SchemaValidationError, match="unexpected key 'cpp'"):
+        compilers.write(path=output_file)
+    assert not output_file.exists()
+
+
+def test_section_validate_method():
+    """Sections should expose validate() for checks without writing."""
+    packages = Packages()
+    packages.add_package(
+        name="zlib",
+        spec="zlib@1.3",
+        buildable=False,
+        modules=["zlib/1.3"],
+        prefix="/usr",
+        extra_attributes={},
+        override=False,
+    )
+    packages.validate()
@@ -0,0 +1,185 @@
+import http.client
+import io
+import sys
+import tarfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import yaml
+
+from spack_site_generator.site import Site, SiteService, UnknownSiteError
+from spack_site_generator.site.server import UnixHTTPConnection
+
+BUILDS = []
+
+
+def build_casper(variant):
+    """Build a small site whose build jobs depend on the node type."""
+    BUILDS.append(variant)
+    site = Site(name="casper")
+    site.packages.add_package(
+        name="cuda" if variant == "gpu" else "openblas",
+        spec="cuda@12.2.0" if variant == "gpu" else "openblas@0.3.24",
+        buildable=False,
+        modules=[],
+        prefix="/glade/u/apps/casper/23.10/opt",
+        extra_attributes={},
+        override=False,
+    )
+    site.config.set_build_jobs(build_jobs=8 if variant == "gpu" else 4)
+    return site
+
+
+@pytest.fixture
+def service():
+    BUILDS.clear()
+    return SiteService({"casper": build_casper}, max_entries=2)
+
+
+@pytest.fixture
+def server(service):
+    server = service.http_server()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _get(server, path, headers=None):
+    connection = http.client.HTTPConnection(*server.server_address, timeout=10)
+    connection.request("GET", path, headers=headers or {})
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+    return response, body
+
+
+def test_serves_single_files_with_etags(server):
+    """Files are served per variant, and unchanged files are not sent twice."""
+    response, body = _get(server, "/sites/casper/gpu/packages.yaml")
+    assert response.status == 200
+    assert response.getheader("Content-Type") == "application/yaml"
+    assert "cuda" in yaml.safe_load(body)["packages"]
+
+    tag = response.getheader("ETag")
+    response, body = _get(
+        server, "/sites/casper/gpu/packages.yaml", {"If-None-Match": f'W/{tag}, "x"'}
+    )
+    assert response.status == 304 and body == b""
+
+    response, body = _get(
+        server, "/sites/casper/cpu/packages.yaml", {"If-None-Match": tag}
+    )
+    assert response.status == 200 and b"openblas" in body
+
+
+def test_serves_bundles(server):
+    """The variant directory returns every file as a tar archive."""
+    response, body = _get(server, "/sites/casper/gpu/")
+    assert response.getheader("Content-Type") == "application/x-tar"
+    with tarfile.open(fileobj=io.BytesIO(body)) as tar:
+        names = tar.getnames()
+        config = tar.extractfile("casper/config.yaml").read()
+    assert "casper/packages.yaml" in names
+    assert b"build_jobs: 8" in config
+    assert _get(server, "/sites/casper/gpu/")[1] == body
+
+
+def test_unknown_sites_and_files_are_not_found(server):
+    """Unknown names and paths return 404."""
+    assert _get(server, "/sites/derecho/cpu/packages.yaml")[0].status == 404
+    assert _get(server, "/sites/casper/cpu/mirrors.yaml")[0].status == 404
+    assert _get(server, "/casper")[0].status == 404
+
+
+def test_cache_is_lru_and_builds_once(service):
+    """Concurrent requests share one build; old variants are evicted."""
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(
+            executor.map(lambda _: service.rendered("casper", "gpu"), range(32))
+        )
+    assert BUILDS == ["gpu"]
+    assert all(result is results[0] for result in results)
+
+    service.rendered("casper", "cpu")
+    service.rendered("casper", "gpu")
+    service.rendered("casper", "login")
+    assert BUILDS == ["gpu", "cpu", "login"]
+    service.rendered("casper", "gpu")
+    assert BUILDS == ["gpu", "cpu", "login"]
+    service.rendered("casper", "cpu")
+    assert BUILDS[-1] == "cpu"
+
+    service.invalidate("casper")
+    service.rendered("casper", "gpu")
+    assert BUILDS[-1] == "gpu"
+    with pytest.raises(UnknownSiteError):
+        service.rendered("derecho", "cpu")
+
+
+def test_register_during_build_drops_stale_result(service):
+    """A build started before ``register`` is not cached afterwards."""
+    started, release = threading.Event(), threading.Event()
+
+    def build_blocked(variant):
+        started.set()
+        release.wait(10)
+        return build_casper("old")
+
+    def build_new(variant):
+        site = build_casper("new")
+        site.config.set_build_jobs(build_jobs=32)
+        return site
+
+    service.register("casper", build_blocked)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        old = executor.submit(service.rendered, "casper", "cpu")
+        assert started.wait(10)
+        service.register("casper", build_new)
+        release.set()
+        assert b"build_jobs: 4" in old.result().files["config.yaml"]
+
+    new = service.rendered("casper", "cpu")
+    assert b"build_jobs: 32" in new.files["config.yaml"]
+    assert service.rendered("casper", "cpu") is new
+    assert BUILDS == ["old", "new"]
+
+
+def test_builder_errors_are_server_errors(service, server):
+    """A failing builder answers 500, even with a KeyError, and can retry."""
+
+    def build_broken(variant):
+        raise KeyError("missing setting")
+
+    service.register("broken", build_broken)
+
+    response, body = _get(server, "/sites/broken/cpu/")
+    assert response.status == 500 and b"missing setting" in body
+    response, _ = _get(server, "/sites/derecho/cpu/")
+    assert response.status == 404
+    assert service._building == {}
+
+    service.register("broken", build_casper)
+    response, _ = _get(server, "/sites/broken/cpu/config.yaml")
+    assert response.status == 200
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Unix sockets")
+def test_serves_over_a_unix_socket(service, tmp_path):
+    """The same protocol works over a Unix socket."""
+    path = tmp_path / "ssg.sock"
+    server = service.unix_server(path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        connection = UnixHTTPConnection(path)
+        connection.request("GET", "/sites/casper/cpu/config.yaml")
+        response = connection.getresponse()
+        assert response.status == 200 and b"build_jobs: 4" in response.read()
+        connection.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert not path.exists()
@@ -1,6 +1,10 @@
+import json
+import time
 import pytest
+import yaml
 from pathlib import Path
 from spack_site_generator.site import Site
+from spack_site_generator.site.matrix import ToolchainMatrix
 
 
 def test_site_write_creates_expected_files(tmp_path: Path):
@@ -36,3 +40,204 @@ def test_site_write_creates_expected_files(tmp_path: Path):
     # Behavior: all expected files are created
     for f in expected_files:
         assert f.exists() and f.is_file()
+
+
+def test_site_write_with_processes_is_byte_identical(tmp_path: Path):
+    """Rendering on a process pool must produce the same files as serial rendering."""
+    site = Site(name="bigsite")
+    for i in range(150):
+        site.packages.add_package(
+            name=f"pkg{i}",
+            spec=f"pkg{i}@1.{i}",
+            buildable=False,
+            modules=[f"pkg{i}/1.{i}"],
+            prefix=f"/opt/pkg{i}",
+            extra_attributes={},
+            override=i % 5 == 0,
+        )
+    site.packages.add_matrix(
+        name="netcdf-c",
+        matrix=ToolchainMatrix(
+            axes={"compiler": [f"gcc@{v}.1.0" for v in range(8, 14)]},
+            template={"spec": "netcdf-c@4.9.2%{compiler}", "prefix": "/opt/netcdf"},
+        ),
+        buildable=False,
+        override=True,
+    )
+    for version in range(8, 14):
+        site.compilers.add_compiler(
+            spec=f"gcc@{version}.1.0",
+            paths={"cc": f"/opt/gcc/{version}/bin/gcc"},
+            operating_system="rhel8",
+            target="x86_64",
+            flags={},
+            modules=[f"gcc/{version}.1.0"],
+            environment={},
+            extra_rpaths=[],
+        )
+
+    site.write(path=tmp_path / "serial")
+    site.write(path=tmp_path / "parallel", processes=2)
+
+    for name in ("packages.yaml", "compilers.yaml"):
+        serial = (tmp_path / "serial" / "bigsite" / name).read_bytes()
+        parallel = (tmp_path / "parallel" / "bigsite" / name).read_bytes()
+        assert parallel == serial
+
+
+def _site_with_packages(name="sharded"):
+    site = Site(name=name)
+    site.upstreams.add_upstream(
+        name="derecho", install_tree="/glade/u/apps/derecho/23.09/spack/opt/spack"
+    )
+    for package in ("zlib", "zstd", "hdf5", "netcdf-c", "cmake"):
+        site.packages.add_package(
+            name=package,
+            spec=f"{package}@1.0",
+            buildable=False,
+            modules=[],
+            prefix=(
+                f"/glade/u/apps/derecho/23.09/spack/opt/spack/{package}"
+                if package != "cmake"
+                else "/usr"
+            ),
+            extra_attributes={},
+            override=False,
+        )
+    site.packages.add_provider(
+        provider_name="mpi",
+        library_name="cray-mpich",
+        library_version="8.1.25",
+        buildable=False,
+    )
+    return site
+
+
+def test_site_render_matches_written_files(tmp_path: Path):
+    """Site.render returns exactly the bytes Site.write stores, sharded or not."""
+    site = _site_with_packages()
+    for options in ({}, {"shard_packages": "prefix"}):
+        site.write(path=tmp_path / "out", **options)
+        site_dir = tmp_path / "out" / "sharded"
+        written = {
+            path.relative_to(site_dir).as_posix(): path.read_bytes()
+            for path in site_dir.rglob("*.yaml")
+        }
+        assert site.render(**options) == written
+
+
+def test_site_render_only_creates_requested_sections():
+    """Sections are created on first access and only requested ones are rendered."""
+    site = Site(name="lazy")
+    assert "mirrors" not in vars(site)
+    site.config.set_build_jobs(build_jobs=4)
+
+    files = site.render(sections=["config", "mirrors"])
+
+    assert list(files) == ["config.yaml"]
+    assert files["config.yaml"] == site.config.render()
+    assert "packages" not in vars(site)
+    assert "mirrors" in vars(site)
+    with pytest.raises(ValueError, match="nope"):
+        site.render(sections=["nope"])
+
+
+def test_site_write_shards_packages_by_prefix(tmp_path: Path):
+    """Sharded packages are listed in include.yaml and hold the same packages."""
+    site = _site_with_packages()
+    site.write(path=tmp_path, shard_packages="prefix", manifest=True)
+
+    site_dir = tmp_path / "sharded"
+    assert not (site_dir / "packages.yaml").exists()
+    include = yaml.safe_load((site_dir / "include.yaml").read_text())
+    assert include == {
+        "include": [
+            "packages/all.yaml",
+            "packages/c.yaml",
+            "packages/h.yaml",
+            "packages/m.yaml",
+            "packages/n.yaml",
+            "packages/z.yaml",
+        ]
+    }
+    merged = {}
+    for shard in include["include"]:
+        merged.update(yaml.safe_load((site_dir / shard).read_text())["packages"])
+    assert merged.keys() == site.packages.config.keys()
+    recorded = json.loads((site_dir / "manifest.json").read_text())["files"]
+    assert "include.yaml" in recorded and "packages/z.yaml" in recorded
+
+
+def test_site_write_rewrites_only_changed_shards(tmp_path: Path):
+    """A change to one package leaves the other shards untouched."""
+    site = _site_with_packages()
+    site.write(path=tmp_path, shard_packages="prefix")
+    shard_dir = tmp_path / "sharded" / "packages"
+    before = {path.name: path.stat().st_mtime_ns for path in shard_dir.iterdir()}
+    time.sleep(0.01)
+
+    site.packages.add_package(
+        name="hdf5",
+        spec="hdf5@1.14.3",
+        buildable=False,
+        modules=[],
+        prefix="/opt/hdf5",
+        extra_attributes={},
+        override=False,
+    )
+    site.write(path=tmp_path, shard_packages="prefix")
+
+    after = {path.name: path.stat().st_mtime_ns for path in shard_dir.iterdir()}
+    changed = sorted(name for name in after if after[name] != before[name])
+    assert changed == ["h.yaml"]
+
+
+def test_site_write_shards_by_upstream_and_switches_layout(tmp_path: Path):
+    """Packages are grouped by upstream, and stale files of other layouts go away."""
+    site = _site_with_packages()
+    site.write(path=tmp_path, shard_packages="prefix")
+    site.write(path=tmp_path, shard_packages="upstream")
+
+    site_dir = tmp_path / "sharded"
+    assert sorted(p.name for p in (site_dir / "packages").iterdir()) == [
+        "derecho.yaml",
+        "site.yaml",
+    ]
+    site_shard = yaml.safe_load((site_dir / "packages" / "site.yaml").read_text())
+    assert set(site_shard["packages"]) == {"cmake", "all", "mpi"}
+
+    site.write(path=tmp_path)
+    assert (site_dir / "packages.yaml").is_file()
+    assert not (site_dir / "include.yaml").exists()
+    assert not (site_dir / "packages").exists()
+
+
+def test_site_preview_module_tree_uses_externals_and_providers():
+    """The preview covers the site's externals and its MPI providers."""
+    site = Site(name="lmod")
+    site.packages.add_provider(
+        provider_name="mpi",
+        library_name="cray-mpich",
+        library_version="8.1.25",
+        buildable=False,
+    )
+    for spec in ("cray-mpich@8.1.25%gcc@12.2.0", "hdf5@1.14.0%gcc@12.2.0 ^cray-mpich"):
+        site.packages.add_package(
+            name=spec.split("@")[0],
+            spec=spec,
+            buildable=False,
+            modules=[],
+            prefix=f"/opt/{spec.split('@')[0]}",
+            extra_attributes={},
+            override=False,
+        )
+    site.modules.set_core_compilers(compilers=["gcc@7.5.0"])
+    site.modules.set_hierarchy(hierarchy=["mpi"])
+
+    preview = site.preview_module_tree()
+
+    assert preview.directories == {
+        "gcc/12.2.0": ["cray-mpich/8.1.25"],
+        "cray-mpich/gcc/12.2.0": ["hdf5/1.14.0"],
+    }
+    assert preview.max_visible == 2
@@ -0,0 +1,81 @@
+import pytest
+
+from spack_site_generator.site import Site
+from spack_site_generator.site.snapshot import MAGIC, source_fingerprint
+
+
+def build_site():
+    """Build a small site with an external and a compiler."""
+    site = Site(name="derecho")
+    for name in ("netcdf-c", "netcdf-fortran"):
+        site.packages.add_package(
+            name=name,
+            spec=f"{name}@4.9.2%gcc@12.2.0",
+            buildable=False,
+            modules=["ncarenv/23.09", "gcc/12.2.0"],
+            prefix=f"/glade/u/apps/derecho/23.09/{name}",
+            extra_attributes={},
+            override=False,
+        )
+    site.config.set_build_jobs(build_jobs=3)
+    return site
+
+
+@pytest.fixture
+def script(tmp_path):
+    """A stand-in for the script a site is generated from."""
+    path = tmp_path / "derecho.py"
+    path.write_text("# build derecho\n")
+    return path
+
+
+def test_snapshot_round_trip(tmp_path, script):
+    """A saved site should reload with its configuration and index intact."""
+    snapshot = tmp_path / "derecho.snapshot"
+    build_site().save_snapshot(snapshot, sources=[script])
+    assert snapshot.read_bytes().startswith(MAGIC)
+
+    site = Site.load_snapshot(snapshot, sources=[script])
+    assert site.packages.to_dict() == build_site().packages.to_dict()
+    assert len(site.find_by_module("gcc/12.2.0")) == 2
+    externals = [
+        site.packages.config[name]["externals"][0]
+        for name in ("netcdf-c", "netcdf-fortran")
+    ]
+    assert externals[0]["modules"] is externals[1]["modules"]
+
+
+def test_changed_sources_trigger_rebuild(tmp_path, script):
+    """A snapshot built from different sources should be rebuilt and replaced."""
+    snapshot = tmp_path / "derecho.snapshot"
+    build_site().save_snapshot(snapshot, sources=[script])
+    script.write_text("# build derecho with more externals\n")
+
+    assert Site.load_snapshot(snapshot, sources=[script]) is None
+
+    rebuilt = []
+
+    def rebuild():
+        rebuilt.append(True)
+        return build_site()
+
+    assert Site.load_snapshot(snapshot, sources=[script], rebuild=rebuild)
+    assert Site.load_snapshot(snapshot, sources=[script], rebuild=rebuild)
+    assert rebuilt == [True]
+
+
+def test_corrupt_or_foreign_snapshot_is_ignored(tmp_path):
+    """Unreadable snapshots should fall back to a rebuild instead of failing."""
+    snapshot = tmp_path / "derecho.snapshot"
+    snapshot.write_bytes(b"not a snapshot")
+    assert Site.load_snapshot(snapshot) is None
+    assert Site.load_snapshot(tmp_path / "missing.snapshot") is None
+    site = Site.load_snapshot(snapshot, rebuild=build_site)
+    assert site.name == "derecho"
+
+
+def test_fingerprint_depends_on_extra_values(script):
+    """Variants of a site should not share snapshots."""
+    assert source_fingerprint([script], extra=["cpu"]) != source_fingerprint(
+        [script], extra=["gpu"]
+    )
@@ -0,0 +1,142 @@
+import json
+
+import pytest
+
+from spack_site_generator.site import Site
+from spack_site_generator.utils.detection_cache import DetectionCache
+from spack_site_generator.utils.spack_db import (
+    InstalledSpec,
+    count_installs,
+    database_path,
+    iter_records,
+    read_installs,
+)
+
+TREE = "/glade/u/apps/derecho/23.09/spack/opt/spack"
+
+
+def _record(name, version, compiler, digest, *, parameters=None, **fields):
+    node = {
+        "name": name,
+        "version": version,
+        "compiler": {"name": compiler[0], "version": compiler[1]},
+        "parameters": parameters or {},
+        "hash": digest,
+    }
+    record = {"spec": node, "path": f"{TREE}/{name}/{version}/{digest[:4]}"}
+    record.update({"installed": True, "explicit": True, **fields})
+    return record
+
+
+INSTALLS = {
+    "3gy6": _record(
+        "netcdf-c",
+        "4.9.2",
+        ("gcc", "12.2.0"),
+        "3gy6",
+        parameters={"mpi": True, "dap": False, "cflags": [], "build_system": "cmake"},
+    ),
+    "ab12": _record("netcdf-fortran", "4.6.1", ("gcc", "12.2.0"), "ab12"),
+    "cd34": _record("netcdf-c", "4.9.2", ("intel", "2023.1.0"), "cd34"),
+    "ef56": _record("zlib", "1.2.13", ("gcc", "12.2.0"), "ef56", explicit=False),
+    "gone": _record("hdf5", "1.14.0", ("gcc", "12.2.0"), "gone", installed=False),
+    # Databases before version 6 key the spec node by package name.
+    "old1": {
+        "spec": {"cmake": {"version": "3.26.3", "compiler": {"name": "gcc"}}},
+        "path": "/opt/cmake",
+        "installed": True,
+    },
+}
+
+
+@pytest.fixture
+def install_tree(tmp_path):
+    """An install tree whose database lists a few installs."""
+    path = database_path(tmp_path)
+    path.parent.mkdir()
+    path.write_text(
+        json.dumps({"database": {"installs": INSTALLS, "version": "7"}}, indent=1)
+    )
+    return tmp_path
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 20])
+def test_iter_records_streams_every_record(install_tree, chunk_size):
+    """Records are decoded one at a time, whatever the chunk boundaries."""
+    records = list(iter_records(database_path(install_tree), chunk_size=chunk_size))
+    assert records == list(INSTALLS.items())
+
+
+def test_iter_records_rejects_other_files(tmp_path):
+    """Files without an installs map or cut short are not databases."""
+    (tmp_path / "other.json").write_text('{"spec": {}}')
+    with pytest.raises(ValueError, match="not a Spack install database"):
+        list(iter_records(tmp_path / "other.json"))
+    (tmp_path / "cut.json").write_text('{"database": {"installs": {"a": {"path"')
+    with pytest.raises(ValueError, match="truncated"):
+        list(iter_records(tmp_path / "cut.json", chunk_size=8))
+
+
+def test_read_installs_builds_external_specs(install_tree):
+    """Removed records are skipped; specs carry compiler and variants."""
+    installs = read_installs(install_tree)
+    assert [install.hash for install in installs] == [
+        "3gy6",
+        "ab12",
+        "cd34",
+        "ef56",
+        "old1",
+    ]
+    assert installs[0] == InstalledSpec(
+        name="netcdf-c",
+        version="4.9.2",
+        compiler="gcc@12.2.0",
+        hash="3gy6",
+        prefix=f"{TREE}/netcdf-c/4.9.2/3gy6",
+        spec="netcdf-c@4.9.2%gcc@12.2.0 build_system=cmake ~dap +mpi",
+        explicit=True,
+    )
+    assert installs[-1].spec == "cmake@3.26.3%gcc"
+    assert count_installs(install_tree) == 5
+
+
+def test_read_installs_filters(install_tree):
+    """Installs are filtered by name, compiler, pattern and explicitness."""
+
+    def hashes(**filters):
+        return [install.hash for install in read_installs(install_tree, **filters)]
+
+    assert hashes(names=["zlib"]) == ["ef56"]
+    assert hashes(compiler="intel") == ["cd34"]
+    assert hashes(compiler="gcc@12") == ["3gy6", "ab12", "ef56"]
+    assert hashes(pattern="netcdf-*") == ["3gy6", "ab12", "cd34"]
+    assert hashes(pattern="netcdf-*", compiler="gcc", explicit=True) == [
+        "3gy6",
+        "ab12",
+    ]
+
+
+def test_read_installs_caches_by_database(install_tree, tmp_path):
+    """The parsed database is cached until the file changes."""
+    cache = DetectionCache(tmp_path / "cache.sqlite")
+    first = read_installs(install_tree, cache=cache)
+    assert cache.get("spack-db", database_path(install_tree)) is not None
+    assert read_installs(install_tree, names=["zlib"], cache=cache) == [first[3]]
+
+
+def test_site_imports_upstream_installs(install_tree):
+    """Upstream installs become non-buildable externals; duplicates are skipped."""
+    site = Site(name="derecho")
+    site.upstreams.add_upstream(name="derecho", install_tree=str(install_tree))
+
+    assert site.import_upstream(name="derecho", pattern="netcdf-*") == 3
+    assert site.import_upstream(name="derecho", names=["netcdf-c"]) == 0
+
+    netcdf = site.packages.to_dict()["packages"]["netcdf-c"]
+    assert netcdf["buildable"] is False
+    assert [external["spec"] for external in netcdf["externals"]] == [
+        "netcdf-c@4.9.2%gcc@12.2.0 build_system=cmake ~dap +mpi",
+        "netcdf-c@4.9.2%intel@2023.1.0",
+    ]
+    with pytest.raises(KeyError):
+        site.import_upstream(name="casper")
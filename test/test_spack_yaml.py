@@ -1,6 +1,15 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import pytest
+import yaml
 
-from spack_site_generator.utils.spack_yaml import to_yaml
+from spack_site_generator.utils.spack_yaml import (
+    map_fragment_lines,
+    render_lines,
+    to_yaml,
+    to_yaml_lines,
+    write_if_changed,
+)
 
 
 @pytest.mark.parametrize(
@@ -18,3 +27,94 @@ from spack_site_generator.utils.spack_yaml import to_yaml
 )
 def test_to_spack_format(yaml_dict, expected_yaml_str):
     assert to_yaml(yaml_dict) == expected_yaml_str
+
+
+def test_shared_lists_are_written_without_aliases():
+    """The default output should spell out shared lists in full."""
+    modules = ["gcc/12.2.0", "netcdf/4.9.2"]
+    rendered = to_yaml({"a": {"modules": modules}, "b": {"modules": modules}})
+    assert "&" not in rendered and "*" not in rendered
+    assert rendered.count("- netcdf/4.9.2") == 2
+
+
+def test_anchors_alias_identical_subtrees():
+    """Anchor mode should alias equal subtrees and load back unchanged."""
+    data = {
+        "a": {"modules": ["gcc/12.2.0", "netcdf/4.9.2"]},
+        "b": {"modules": ["gcc/12.2.0", "netcdf/4.9.2"]},
+    }
+    rendered = to_yaml(data, spack_format=False, anchors=True)
+    assert "&id001" in rendered and "*id001" in rendered
+    assert yaml.safe_load(rendered) == data
+
+
+def test_anchors_never_alias_override_markers():
+    """Subtrees carrying an override marker should keep their `::` rewrite."""
+    data = {
+        "providers": {
+            "mpi": ["cray-mpich@8.1.25", {"override": True}],
+            "blas": ["cray-mpich@8.1.25", {"override": True}],
+        }
+    }
+    rendered = to_yaml(data, anchors=True)
+    assert rendered == to_yaml(data)
+    assert "mpi:: " in rendered and "blas:: " in rendered
+
+
+LARGE = {
+    "packages": {
+        "all": {"providers": {"mpi": [{"override": True}, "openmpi"]}},
+        **{
+            f"pkg{i}": {
+                "buildable": False,
+                **({"override": True} if i % 7 == 0 else {}),
+                "externals": [
+                    {
+                        "spec": f"pkg{i}@1.{i} %gcc@12.2.0",
+                        "prefix": f"/opt/pkg{i}/" + "x" * (i % 90),
+                        "modules": ["gcc/12.2.0", f"pkg{i}/1.{i}"],
+                    }
+                ],
+            }
+            for i in range(200)
+        },
+    },
+    "compilers": [{"override": True}, {"compiler": {"spec": "gcc@12.2.0"}}],
+}
+
+
+@pytest.mark.parametrize("spack_format", [True, False])
+def test_to_yaml_lines_on_a_process_pool_matches_serial(spack_format):
+    """Rendering entries on worker processes must not change a single byte."""
+    expected = to_yaml(LARGE, spack_format=spack_format).splitlines()
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        lines = to_yaml_lines(
+            LARGE, spack_format=spack_format, executor=executor, batch_size=7
+        )
+    assert lines == expected
+
+
+def test_map_fragment_lines_keeps_the_order():
+    """Batches are yielded in submission order, whatever order they finish in."""
+    fragments = [{"a": [{"b": i}]} for i in range(500)]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        lines = list(map_fragment_lines(fragments, 1, executor=executor, batch_size=3))
+    assert lines == [f"- b: {i}" for i in range(500)]
+
+
+@pytest.mark.parametrize("spack_format", [True, False])
+def test_render_lines_matches_to_yaml(spack_format):
+    """Rendering the lines of to_yaml gives its encoded text back."""
+    data = {"packages": {"zlib": {"version": ["1.3"], "buildable": False}}}
+    text = to_yaml(data, spack_format=spack_format)
+    assert render_lines(text.splitlines(), spack_format=spack_format) == (text.encode())
+
+
+def test_write_if_changed_keeps_current_files(tmp_path):
+    """Only differing contents replace the file."""
+    path = tmp_path / "packages.yaml"
+    assert write_if_changed(path, b"packages: {}")
+    assert not write_if_changed(path, b"packages: {}")
+    assert write_if_changed(path, b"packages:\n  all: {}")
+    assert path.read_bytes() == b"packages:\n  all: {}"
+    assert [p.name for p in tmp_path.iterdir()] == ["packages.yaml"]
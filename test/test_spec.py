@@ -0,0 +1,46 @@
+import pytest
+
+from spack_site_generator.utils.spec import ParsedSpec, canonical_spec, parse_spec
+
+
+@pytest.mark.parametrize(
+    "spec, expected",
+    [
+        ("autoconf", ParsedSpec("autoconf", None, None, ())),
+        ("gcc@12.2.0", ParsedSpec("gcc", "12.2.0", None, ())),
+        (
+            "cray-mpich@8.1.25%gcc@12.2.0 +wrappers",
+            ParsedSpec("cray-mpich", "8.1.25", "gcc@12.2.0", ()),
+        ),
+        (
+            "openmpi@4.1.6%gcc@12.2.0+cuda~cxx fabrics=ucx",
+            ParsedSpec("openmpi", "4.1.6", "gcc@12.2.0", ()),
+        ),
+        (
+            "netcdf-c@4.9.2 %intel ^cray-mpich@8.1.25 ^hdf5",
+            ParsedSpec("netcdf-c", "4.9.2", "intel", ("cray-mpich@8.1.25", "hdf5")),
+        ),
+    ],
+)
+def test_parse_spec(spec, expected):
+    assert parse_spec(spec) == expected
+
+
+@pytest.mark.parametrize(
+    "spellings",
+    [
+        (
+            "netcdf-c@4.9.2%gcc@12.2.0+mpi~shared",
+            "netcdf-c @4.9.2 ~shared +mpi % gcc@12.2.0",
+        ),
+        ("a ^c ^b@1", "a ^b @1 ^c"),
+        ('zlib cflags="-O2 -g" +pic', 'zlib+pic cflags="-O2 -g"'),
+    ],
+)
+def test_canonical_spec_ignores_spelling(spellings):
+    assert len({canonical_spec(spec) for spec in spellings}) == 1
+
+
+def test_canonical_spec_keeps_differences():
+    assert canonical_spec("hdf5+mpi") != canonical_spec("hdf5~mpi")
+    assert canonical_spec("hdf5@1.14%gcc") != canonical_spec("hdf5@1.14%intel")
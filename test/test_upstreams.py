@@ -0,0 +1,101 @@
+import json
+
+import pytest
+import yaml
+
+from spack_site_generator.site import Site, Upstreams
+from spack_site_generator.utils.detection_cache import DetectionCache
+from spack_site_generator.utils.schema import SchemaValidationError
+
+
+def _install_tree(root, installed=3, uninstalled=1):
+    """Create an install tree whose database lists installed and removed specs."""
+    database = root / ".spack-db"
+    database.mkdir(parents=True)
+    installs = {
+        f"hash{index}": {"spec": {}, "path": f"/p/{index}", "installed": True}
+        for index in range(installed)
+    }
+    installs.update(
+        {
+            f"gone{index}": {"spec": {}, "path": None, "installed": False}
+            for index in range(uninstalled)
+        }
+    )
+    (database / "index.json").write_text(
+        json.dumps({"database": {"version": "7", "installs": installs}})
+    )
+    return root
+
+
+@pytest.fixture
+def upstreams():
+    """Fixture to create a fresh instance of Upstreams for each test."""
+    return Upstreams()
+
+
+def test_add_upstream(upstreams):
+    """Upstreams are stored with their install tree and module roots."""
+    upstreams.add_upstream(
+        name="derecho",
+        install_tree="/glade/u/apps/derecho/23.09/spack/opt/spack",
+        modules={"lmod": "/glade/u/apps/derecho/modules/23.09"},
+    )
+    upstreams.add_upstream(name="casper", install_tree="/glade/u/apps/casper")
+    assert upstreams.to_dict() == {
+        "upstreams": {
+            "derecho": {
+                "install_tree": "/glade/u/apps/derecho/23.09/spack/opt/spack",
+                "modules": {"lmod": "/glade/u/apps/derecho/modules/23.09"},
+            },
+            "casper": {"install_tree": "/glade/u/apps/casper"},
+        }
+    }
+    assert [reference for _, reference in upstreams.iter_paths()] == [
+        "upstreams.derecho.install_tree",
+        "upstreams.derecho.modules.lmod",
+        "upstreams.casper.install_tree",
+    ]
+
+
+def test_check_counts_installs(upstreams, tmp_path):
+    """Installed specs are counted; missing and broken databases are reported."""
+    upstreams.add_upstream(name="ok", install_tree=str(_install_tree(tmp_path / "a")))
+    upstreams.add_upstream(name="missing", install_tree=str(tmp_path / "b"))
+    broken = tmp_path / "c" / ".spack-db"
+    broken.mkdir(parents=True)
+    (broken / "index.json").write_text("{}")
+    upstreams.add_upstream(name="broken", install_tree=str(tmp_path / "c"))
+
+    statuses = upstreams.check()
+    assert statuses["ok"].exists and statuses["ok"].installs == 3
+    assert not statuses["missing"].exists and statuses["missing"].error
+    assert not statuses["broken"].exists
+    assert "not a Spack install database" in statuses["broken"].error
+
+
+def test_check_uses_detection_cache(tmp_path):
+    """Site.check_upstreams caches install counts until the database changes."""
+    cache = DetectionCache(tmp_path / "cache.sqlite")
+    site = Site(name="testsite", detection_cache=cache)
+    tree = _install_tree(tmp_path / "tree", installed=2)
+    site.upstreams.add_upstream(name="center", install_tree=str(tree))
+    assert site.check_upstreams()["center"].installs == 2
+    assert len(cache) == 1
+    assert site.check_upstreams()["center"].installs == 2
+
+
+def test_write_validates(upstreams, tmp_path):
+    """Upstreams without an install tree are rejected."""
+    upstreams.config["broken"]["modules"]["tcl"] = "/opt/modules"
+    with pytest.raises(SchemaValidationError, match="install_tree"):
+        upstreams.write(path=tmp_path / "upstreams.yaml")
+
+
+def test_site_writes_upstreams(tmp_path):
+    """Site.write writes upstreams.yaml when upstreams are registered."""
+    site = Site(name="testsite")
+    site.upstreams.add_upstream(name="center", install_tree="/opt/spack")
+    site.write(path=tmp_path)
+    written = yaml.safe_load((tmp_path / "testsite" / "upstreams.yaml").read_text())
+    assert written == {"upstreams": {"center": {"install_tree": "/opt/spack"}}}